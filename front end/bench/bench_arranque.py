@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# bench_arranque.py
+# Mide el arranque en frío de la API en procesos nuevos: import de api.py,
+# eventos de startup y latencia de la primera petición (y del primer
+# /openapi.json). Cada repetición usa un intérprete limpio, como un worker
+# recién creado por el autoscaler.
+#
+#   python bench/bench_arranque.py --repeticiones 5
+#   python bench/bench_arranque.py --db-nueva   # incluye creación del esquema
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+
+# Se ejecuta en el proceso hijo; imprime una línea JSON con los tiempos en ms
+MEDICION = r"""
+import asyncio, json, time
+t0 = time.perf_counter()
+import api
+t_import = time.perf_counter()
+
+async def main():
+    import httpx
+    await api.app.router.startup()
+    t_startup = time.perf_counter()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app), base_url="http://bench") as c:
+        t = time.perf_counter()
+        r = await c.get("/api/productos")
+        primera = time.perf_counter() - t
+        assert r.status_code == 200, r.status_code
+        t = time.perf_counter()
+        await c.get("/openapi.json")
+        openapi = time.perf_counter() - t
+    await api.app.router.shutdown()
+    return t_startup, primera, openapi
+
+t_startup, primera, openapi = asyncio.run(main())
+print(json.dumps({
+    "import_ms": (t_import - t0) * 1000,
+    "startup_ms": (t_startup - t_import) * 1000,
+    "primera_peticion_ms": primera * 1000,
+    "primer_openapi_ms": openapi * 1000,
+}))
+"""
+
+
+def medir(db: str) -> dict:
+    env = dict(os.environ, DATABASE_URL=f"sqlite:///{db}", LOG_LEVEL="WARNING")
+    t = subprocess.run([sys.executable, "-c", MEDICION], cwd=RAIZ, env=env,
+                       capture_output=True, text=True, check=True)
+    return json.loads(t.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--db-nueva", action="store_true", help="Base vacía en cada repetición (primer despliegue)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "arranque.db")
+        if not args.db_nueva:
+            medir(db)  # deja la base inicializada
+        muestras = []
+        for _ in range(args.repeticiones):
+            if args.db_nueva and os.path.exists(db):
+                os.remove(db)
+            muestras.append(medir(db))
+
+    resultado = {
+        clave: {
+            "mediana": round(statistics.median(m[clave] for m in muestras), 1),
+            "min": round(min(m[clave] for m in muestras), 1),
+            "max": round(max(m[clave] for m in muestras), 1),
+        }
+        for clave in muestras[0]
+    }
+    resultado["meta"] = {"repeticiones": args.repeticiones, "db_nueva": args.db_nueva,
+                         "python": sys.version.split()[0]}
+    print(json.dumps(resultado, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
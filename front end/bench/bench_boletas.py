@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+# bench_boletas.py
+# Throughput de generación masiva de boletas (p. ej. todas las de un día).
+#
+# Uso:
+#   python bench/bench_boletas.py --pedidos 2000 --workers 4
+#
+# Compara renderizar+guardar en serie contra el pool de procesos que usa la API
+# y reporta boletas/segundo. Los PDFs se escriben en un directorio temporal.
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from natural_power import boleta_pdf  # noqa: E402
+
+PRODUCTOS = [("Verde Detox", 3990), ("Naranja Boost", 3990), ("Rojo Pasión", 4290), ("Amanecer Tropical", 4500), ("Jugo Personalizado", 5200)]
+
+
+def pedidos_sinteticos(n: int, seed: int = 42):
+    rnd = random.Random(seed)
+    for pedido_id in range(1, n + 1):
+        items = []
+        for nombre, precio in rnd.sample(PRODUCTOS, rnd.randint(1, 4)):
+            items.append({"name": nombre, "price": float(precio), "quantity": rnd.randint(1, 3)})
+        yield {
+            "numero": f"B-{pedido_id:06d}",
+            "pedido_id": pedido_id,
+            "fecha": f"19-10-2026 {rnd.randint(8, 21):02d}:{rnd.randint(0, 59):02d}",
+            "email": f"cliente{pedido_id}@example.com",
+            "total": sum(it["price"] * it["quantity"] for it in items),
+            "items": items,
+        }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de generación masiva de boletas")
+    parser.add_argument("--pedidos", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=min(4, os.cpu_count() or 1))
+    args = parser.parse_args()
+    datos = list(pedidos_sinteticos(args.pedidos))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        for d in datos:
+            boleta_pdf.renderizar_y_guardar(os.path.join(tmp, "serie"), d)
+        serie = time.perf_counter() - t0
+
+        destino = os.path.join(tmp, "pool")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            t0 = time.perf_counter()
+            list(pool.map(boleta_pdf.renderizar_y_guardar, [destino] * len(datos), datos, chunksize=64))
+            paralelo = time.perf_counter() - t0
+
+    print(f"pedidos={args.pedidos} workers={args.workers}")
+    print(f"serie:  {serie:.2f}s  ({args.pedidos / serie:,.0f} boletas/s)")
+    print(f"pool:   {paralelo:.2f}s  ({args.pedidos / paralelo:,.0f} boletas/s)")
+
+
+if __name__ == "__main__":
+    main()
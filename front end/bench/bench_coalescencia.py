@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# bench_coalescencia.py
+# Consultas a la base con una estampida de peticiones idénticas al catálogo y al dashboard.
+#
+# Uso (app en proceso con httpx + ASGITransport, sin red):
+#   python bench/seed.py --db bench/bench.db
+#   python bench/bench_coalescencia.py --db bench/bench.db --concurrencia 100
+#
+# Por cada ruta lanza `--concurrencia` peticiones iguales a la vez en tres
+# escenarios: caché fría, caché caliente y justo después de una escritura en la
+# tabla (stale-while-revalidate). Cuenta las sentencias SQL que llegan al motor
+# con un listener de SQLAlchemy. Con la coalescencia, la fría y la invalidada
+# deberían costar lo mismo que una sola petición y la caliente, cero.
+# Para ver el costo sin coalescencia, apuntar --raiz a un checkout anterior
+# (ver bench_middlewares.py).
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+from typing import Dict, List
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+
+from seed import ADMIN_EMAIL  # noqa: E402
+
+# nombre, ruta, tabla que se escribe para invalidar, requiere admin
+RUTAS = [
+    ("catalogo", "/api/productos?pagina=1&limite=20&total=true", "product", False),
+    ("dashboard", "/api/admin/dashboard", "order", True),
+]
+
+
+class ContadorSQL:
+    def __init__(self, engine) -> None:
+        from sqlalchemy import event
+        self.consultas = 0
+        event.listen(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args) -> None:
+        self.consultas += 1
+
+
+async def estampida(cliente, ruta: str, encabezados: Dict[str, str], concurrencia: int, contador: ContadorSQL) -> Dict[str, float]:
+    antes = contador.consultas
+    t0 = time.perf_counter()
+    respuestas = await asyncio.gather(*(cliente.get(ruta, headers=encabezados) for _ in range(concurrencia)))
+    duracion = time.perf_counter() - t0
+    # La revalidación en segundo plano también cuenta: esperar a que termine
+    await asyncio.sleep(0.2)
+    cuerpos = {r.text for r in respuestas}
+    return {
+        "consultas": contador.consultas - antes,
+        "errores": sum(1 for r in respuestas if r.status_code != 200),
+        "distintas": len(cuerpos),
+        "ms": duracion * 1000,
+    }
+
+
+async def ejecutar(args) -> List[str]:
+    import httpx
+    from sqlalchemy import update
+
+    import api
+    from natural_power.db import engine
+    from natural_power.modelos import Order, Product
+    from natural_power.seguridad import crear_access_token
+
+    tablas = {"product": Product, "order": Order}
+    contador = ContadorSQL(engine)
+    admin = {"Authorization": f"Bearer {crear_access_token({'sub': ADMIN_EMAIL})}"}
+    filas = []
+    async with api.app.router.lifespan_context(api.app):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            # Una petición suelta para saber cuánto cuesta calcular una vez
+            r = await cliente.get(RUTAS[0][1])
+            if r.status_code != 200:
+                sys.exit(f"La app respondió {r.status_code}")
+            for nombre, ruta, tabla, autenticada in RUTAS:
+                if args.rutas and nombre not in args.rutas.split(","):
+                    continue
+                modelo = tablas[tabla]
+                encabezados = admin if autenticada else {}
+                _vaciar(nombre)
+                fria = await estampida(cliente, ruta, encabezados, args.concurrencia, contador)
+                caliente = await estampida(cliente, ruta, encabezados, args.concurrencia, contador)
+                # Una escritura que no cambia filas pero marca la tabla como modificada
+                with engine.begin() as conn:
+                    conn.execute(update(modelo).where(modelo.id == 0).values(id=0))
+                invalidada = await estampida(cliente, ruta, encabezados, args.concurrencia, contador)
+                for escenario, r in (("fría", fria), ("caliente", caliente), ("invalidada", invalidada)):
+                    filas.append(f"{nombre:<10} {escenario:<11} {args.concurrencia:5d} {r['consultas']:9d} "
+                                 f"{r['distintas']:9d} {r['errores']:7d} {r['ms']:8.1f}ms")
+    return filas
+
+
+def _vaciar(nombre: str) -> None:
+    try:
+        from natural_power.servicios import lecturas
+    except ImportError:
+        return  # commit sin coalescencia: no hay nada que vaciar
+    getattr(lecturas, nombre)._entradas.clear()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Consultas SQL bajo una estampida de lecturas idénticas")
+    parser.add_argument("--db", default=os.path.join(AQUI, "bench.db"))
+    parser.add_argument("--raiz", default=os.path.dirname(AQUI), help="Carpeta del proyecto a medir (otro commit)")
+    parser.add_argument("--concurrencia", type=int, default=100)
+    parser.add_argument("--rutas", help="Subconjunto separado por comas: " + ",".join(r[0] for r in RUTAS))
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"No existe {args.db}: ejecute primero bench/seed.py")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault("ADMIN_EMAILS", ADMIN_EMAIL)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ.setdefault("DB_INIT", "skip")
+    # Sin admisión: aquí interesa cuántas llegan a la base, no cuántas se rechazan
+    os.environ.setdefault("ADMISION_ENABLED", "0")
+    # Que el lote de actividad no se escriba en medio de una medición
+    os.environ.setdefault("ACTIVIDAD_FLUSH_SECONDS", "3600")
+    sys.path.insert(0, os.path.abspath(args.raiz))
+    filas = asyncio.run(ejecutar(args))
+    print(f"{'ruta':<10} {'escenario':<11} {'peticiones':>5} {'consultas':>9} {'distintas':>9} {'errores':>7} {'tiempo':>10}")
+    for fila in filas:
+        print(fila)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# bench_middlewares.py
+# Peticiones por segundo del catálogo y de los archivos estáticos a través de la pila de middlewares.
+#
+# Uso (app en proceso con httpx + ASGITransport, sin red):
+#   python bench/seed.py --db bench/bench.db
+#   python bench/bench_middlewares.py --db bench/bench.db --segundos 5 --concurrencia 20
+#
+# Para comparar contra otro commit, apuntar --raiz a un checkout de ese commit:
+#   git worktree add /tmp/antes <commit>
+#   python bench/bench_middlewares.py --db bench/bench.db --raiz "/tmp/antes/front end"
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+from typing import Dict, List, Optional
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, AQUI)
+
+from seed import ADMIN_EMAIL  # noqa: E402
+
+RUTAS = [
+    ("catalogo", "/api/productos?limit=20", False),
+    ("catalogo_auth", "/api/productos?limit=20", True),
+    ("static_js", "/static/js/config.js", False),
+    ("app_html", "/app/", False),
+]
+
+
+async def medir(cliente, ruta: str, encabezados: Dict[str, str], segundos: float, concurrencia: int) -> Dict[str, float]:
+    latencias: List[float] = []
+    errores = 0
+    fin = time.perf_counter() + segundos
+
+    async def usuario() -> None:
+        nonlocal errores
+        while time.perf_counter() < fin:
+            t0 = time.perf_counter()
+            r = await cliente.get(ruta, headers=encabezados)
+            latencias.append(time.perf_counter() - t0)
+            if r.status_code != 200:
+                errores += 1
+
+    t0 = time.perf_counter()
+    await asyncio.gather(*(usuario() for _ in range(concurrencia)))
+    duracion = time.perf_counter() - t0
+    latencias.sort()
+    return {
+        "rps": len(latencias) / duracion,
+        "p50_ms": statistics.median(latencias) * 1000,
+        "p99_ms": latencias[int(len(latencias) * 0.99) - 1] * 1000,
+        "errores": errores,
+    }
+
+
+async def ejecutar(args, solo: Optional[List[str]]) -> None:
+    import httpx
+
+    import api
+    from natural_power.seguridad import crear_access_token
+
+    token = crear_access_token({"sub": ADMIN_EMAIL})
+    transporte = httpx.ASGITransport(app=api.app)
+    async with api.app.router.lifespan_context(api.app):
+        async with httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente:
+            for nombre, ruta, autenticada in RUTAS:
+                if solo and nombre not in solo:
+                    continue
+                encabezados = {"Authorization": f"Bearer {token}"} if autenticada else {}
+                await medir(cliente, ruta, encabezados, min(1.0, args.segundos), args.concurrencia)  # calentamiento
+                r = await medir(cliente, ruta, encabezados, args.segundos, args.concurrencia)
+                print(f"{nombre:<14} {r['rps']:8.0f} req/s  p50 {r['p50_ms']:6.2f}ms  p99 {r['p99_ms']:6.2f}ms  errores {r['errores']}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput de la pila de middlewares")
+    parser.add_argument("--db", default=os.path.join(AQUI, "bench.db"))
+    parser.add_argument("--raiz", default=os.path.dirname(AQUI), help="Carpeta del proyecto a medir (otro commit)")
+    parser.add_argument("--segundos", type=float, default=5)
+    parser.add_argument("--concurrencia", type=int, default=20)
+    parser.add_argument("--rutas", help="Subconjunto separado por comas: " + ",".join(r[0] for r in RUTAS))
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"No existe {args.db}: ejecute primero bench/seed.py")
+
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+    os.environ.setdefault("ADMIN_EMAILS", ADMIN_EMAIL)
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    os.environ.setdefault("DB_INIT", "skip")
+    sys.path.insert(0, os.path.abspath(args.raiz))
+    asyncio.run(ejecutar(args, args.rutas.split(",") if args.rutas else None))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# bench_pasarela.py
+# Comportamiento del adaptador de MercadoPago ante un servicio sano, lento y recuperado.
+#
+# Uso:
+#   python bench/bench_pasarela.py --llamadas 200 --concurrencia 50
+#
+# Levanta bench/mp_falso.py en un hilo y crea preferencias a través de
+# servicios.pasarela en tres etapas: servicio sano (latencia normal), servicio
+# colgado (más lento que MP_TIMEOUT: las primeras llamadas agotan el timeout y
+# luego el circuito abierto las rechaza al instante) y recuperación (pasado
+# MP_CB_ESPERA_SECONDS una llamada de prueba cierra el circuito).
+
+import argparse
+import asyncio
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+sys.path.insert(0, os.path.join(RAIZ, "bench"))
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark del adaptador de MercadoPago")
+    parser.add_argument("--llamadas", type=int, default=200)
+    parser.add_argument("--concurrencia", type=int, default=50)
+    parser.add_argument("--latencia-ms", type=float, default=50)
+    parser.add_argument("--timeout", type=float, default=1.0, help="MP_TIMEOUT para la prueba")
+    parser.add_argument("--espera", type=float, default=2.0, help="MP_CB_ESPERA_SECONDS para la prueba")
+    args = parser.parse_args()
+
+    puerto = _puerto_libre()
+    # La configuración se lee al importar: fijarla antes
+    os.environ.update(MP_API_BASE=f"http://127.0.0.1:{puerto}", MP_ACCESS_TOKEN="TEST-falso",
+                      MP_TIMEOUT=str(args.timeout), MP_CB_ESPERA_SECONDS=str(args.espera), LOG_LEVEL="ERROR")
+
+    import uvicorn
+
+    import mp_falso
+    from natural_power.servicios.pasarela import PasarelaNoDisponible, pasarela
+
+    servidor = uvicorn.Server(uvicorn.Config(mp_falso.app, host="127.0.0.1", port=puerto, log_level="error"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    async def una(i: int) -> tuple:
+        t0 = time.perf_counter()
+        try:
+            await pasarela.crear_preferencia({"items": [{"title": "Verde Detox", "quantity": 1, "unit_price": 3990}]}, f"bench-{i}")
+            ok = True
+        except PasarelaNoDisponible:
+            ok = False
+        return ok, (time.perf_counter() - t0) * 1000
+
+    async def fase(nombre: str, latencia_ms: float) -> None:
+        mp_falso.config["latencia_ms"] = latencia_ms
+        limite = asyncio.Semaphore(args.concurrencia)
+
+        async def limitada(i: int) -> tuple:
+            async with limite:
+                return await una(i)
+
+        t0 = time.perf_counter()
+        resultados = await asyncio.gather(*(limitada(i) for i in range(args.llamadas)))
+        total = time.perf_counter() - t0
+        tiempos = sorted(ms for _, ms in resultados)
+        ok = sum(1 for exito, _ in resultados if exito)
+        print(f"{nombre:<14} ok {ok:>4}/{len(resultados)}  total {total:6.2f}s  "
+              f"p50 {statistics.median(tiempos):8.1f}ms  p99 {tiempos[int(len(tiempos) * 0.99) - 1]:8.1f}ms  "
+              f"circuito {pasarela.circuito.estado}")
+
+    async def correr() -> None:
+        await fase("sano", args.latencia_ms)
+        await fase("colgado", args.timeout * 10_000)
+        await fase("aun caído", args.timeout * 10_000)
+        await asyncio.sleep(args.espera)
+        # Semiabierto: pasa una llamada de prueba y las concurrentes se rechazan hasta que responda
+        await fase("semiabierto", args.latencia_ms)
+        await fase("recuperado", args.latencia_ms)
+        await pasarela.cerrar()
+
+    asyncio.run(correr())
+    servidor.should_exit = True
+
+
+if __name__ == "__main__":
+    main()
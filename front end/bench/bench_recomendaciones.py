@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+# bench_recomendaciones.py
+# Construcción y consulta del índice "comprados juntos" sobre un historial sintético.
+#
+# Uso:
+#   python bench/bench_recomendaciones.py --pedidos 1000000 --productos 5000
+#
+# Genera los pares pedido/producto directamente como arreglos (popularidad Zipf
+# más algunos "combos" que se compran juntos), mide la construcción completa,
+# una actualización incremental con --nuevos pedidos, el tamaño de los arreglos
+# que carga la API y la latencia de una consulta. No toca la base de datos.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from natural_power.servicios.recomendaciones import IndiceRecomendaciones, construir_indice  # noqa: E402
+
+
+def historial(n_pedidos: int, n_productos: int, desde: int = 1, seed: int = 42):
+    """(pedidos, productos): entre 1 y 6 líneas por pedido; un 30% incluye un combo de 3 productos."""
+    rnd = np.random.default_rng(seed)
+    lineas = rnd.integers(1, 7, size=n_pedidos)
+    pedidos = np.repeat(np.arange(desde, desde + n_pedidos, dtype=np.int64), lineas)
+    productos = (rnd.zipf(1.3, size=len(pedidos)) - 1) % n_productos + 1
+    combos = rnd.integers(1, n_productos // 3, size=n_pedidos) * 3
+    con_combo = rnd.random(n_pedidos) < 0.3
+    extra_pedidos = np.repeat(np.arange(desde, desde + n_pedidos, dtype=np.int64)[con_combo], 3)
+    extra_productos = (combos[con_combo][:, None] + np.arange(3)).ravel() % n_productos + 1
+    return np.concatenate([pedidos, extra_pedidos]), np.concatenate([productos, extra_productos]).astype(np.int64)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de recomendaciones por co-compra")
+    parser.add_argument("--pedidos", type=int, default=1_000_000)
+    parser.add_argument("--productos", type=int, default=5000)
+    parser.add_argument("--nuevos", type=int, default=20_000, help="pedidos de la corrida incremental")
+    parser.add_argument("--consultas", type=int, default=100_000)
+    parser.add_argument("--k", type=int, default=10)
+    args = parser.parse_args()
+
+    pedidos, productos = historial(args.pedidos, args.productos)
+    print(f"historial: {args.pedidos} pedidos, {len(pedidos)} líneas, {args.productos} productos")
+
+    t0 = time.perf_counter()
+    estado = construir_indice(pedidos, productos, k=args.k)
+    print(f"construcción completa: {time.perf_counter() - t0:.2f}s "
+          f"(co-ocurrencia con {estado['c'].nnz} pares no nulos)")
+
+    nuevos_p, nuevos_prod = historial(args.nuevos, args.productos, desde=args.pedidos + 1, seed=7)
+    t0 = time.perf_counter()
+    estado = construir_indice(nuevos_p, nuevos_prod, previo=estado, k=args.k)
+    print(f"incremental ({args.nuevos} pedidos nuevos): {time.perf_counter() - t0:.2f}s")
+
+    indice = IndiceRecomendaciones(estado["ids"], estado["indptr"], estado["vecinos"], estado["puntajes"])
+    tamano = sum(a.nbytes for a in (indice.ids, indice.indptr, indice.vecinos, indice.puntajes))
+    print(f"índice servido: {len(indice.ids)} productos, {len(indice.vecinos)} recomendaciones, {tamano / 1024:.0f} KiB")
+
+    consultas = np.random.default_rng(1).integers(1, args.productos + 1, size=args.consultas).tolist()
+    tiempos = np.empty(len(consultas))
+    for i, product_id in enumerate(consultas):
+        t = time.perf_counter_ns()
+        indice.recomendados(product_id, args.k)
+        tiempos[i] = time.perf_counter_ns() - t
+    p50, p99 = np.percentile(tiempos, [50, 99]) / 1000
+    print(f"consulta: p50 {p50:.1f}µs, p99 {p99:.1f}µs ({args.consultas} consultas)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+#!/usr/bin/env python
+# bench_sobrecarga.py
+# Goodput bajo sobrecarga: tasas de llegada crecientes con y sin control de admisión.
+#
+# Uso:
+#   python bench/seed.py --db bench/bench.db --usuarios 2000 --productos 2000
+#   python bench/bench_sobrecarga.py --db bench/bench.db --tasas 100,200,400,800 --segundos 10
+#
+# Por cada modo (ADMISION_ENABLED=0 y 1) levanta `uvicorn api:app` en un
+# proceso aparte sobre una copia de la base y le envía carga en lazo abierto
+# (las llegadas no esperan a las respuestas, como usuarios reales): 80 % de
+# navegación (listado y búsqueda) y 20 % de checkouts (agregar al carrito y
+# crear el pedido). Goodput = respuestas correctas dentro del SLO por segundo;
+# pasada la saturación debería mantenerse plano con admisión y desplomarse sin ella.
+#
+# El generador usa un cliente HTTP/1.1 mínimo en vez de httpx, que gasta casi
+# tanto CPU por petición como el servidor. Aun así comparte la máquina: con
+# pocos núcleos, fijarlo a otro (taskset) para que no le robe CPU al servidor.
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+AQUI = os.path.dirname(os.path.abspath(__file__))
+RAIZ = os.path.dirname(AQUI)
+sys.path.insert(0, RAIZ)
+
+from seed import ADMIN_EMAIL, email_usuario  # noqa: E402
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+
+
+class ClienteHTTP:
+    """Cliente HTTP/1.1 con keep-alive, solo lo necesario para la API (respuestas con Content-Length)."""
+
+    def __init__(self, host: str, puerto: int) -> None:
+        self.host = host
+        self.puerto = puerto
+        self._libres: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def pedir(self, metodo: str, ruta: str, cuerpo: Any = None, encabezados: Optional[Dict[str, str]] = None) -> int:
+        conexion = self._libres.pop() if self._libres else await asyncio.open_connection(self.host, self.puerto)
+        lector, escritor = conexion
+        datos = json.dumps(cuerpo).encode() if cuerpo is not None else b""
+        cabecera = f"{metodo} {ruta} HTTP/1.1\r\nHost: bench\r\nContent-Length: {len(datos)}\r\n"
+        if cuerpo is not None:
+            cabecera += "Content-Type: application/json\r\n"
+        for nombre, valor in (encabezados or {}).items():
+            cabecera += f"{nombre}: {valor}\r\n"
+        try:
+            escritor.write(cabecera.encode() + b"\r\n" + datos)
+            crudo = await lector.readuntil(b"\r\n\r\n")
+            largo, cerrar = 0, False
+            for linea in crudo.split(b"\r\n")[1:]:
+                nombre, _, valor = linea.partition(b":")
+                nombre = nombre.strip().lower()
+                if nombre == b"content-length":
+                    largo = int(valor)
+                elif nombre == b"connection" and valor.strip().lower() == b"close":
+                    cerrar = True
+            await lector.readexactly(largo)
+        except BaseException:
+            escritor.close()
+            raise
+        if cerrar:
+            escritor.close()
+        else:
+            self._libres.append(conexion)
+        return int(crudo[9:12])
+
+    def cerrar(self) -> None:
+        for _, escritor in self._libres:
+            escritor.close()
+        self._libres.clear()
+
+
+class Resultado:
+    def __init__(self) -> None:
+        self.ok: Dict[str, List[float]] = {"navegacion": [], "checkout": []}
+        self.rechazadas = 0
+        self.errores = 0
+
+
+async def navegar(cliente, rnd: random.Random, productos: int, res: Resultado, slo: float) -> None:
+    t0 = time.perf_counter()
+    try:
+        if rnd.random() < 0.5:
+            codigo = await cliente.pedir("GET", f"/api/productos?pagina={rnd.randint(1, max(1, productos // 10))}&limite=10")
+        else:
+            codigo = await cliente.pedir("GET", f"/api/productos/buscar?q=jugo+{rnd.randint(1, productos)}")
+    except Exception:
+        res.errores += 1
+        return
+    _anotar(res, "navegacion", codigo, time.perf_counter() - t0, slo)
+
+
+async def comprar(cliente, rnd: random.Random, productos: int, token: str, res: Resultado, slo: float) -> None:
+    encabezados = {"Authorization": f"Bearer {token}"}
+    t0 = time.perf_counter()
+    try:
+        codigo = await cliente.pedir("POST", "/api/carrito/items", {"productoId": rnd.randint(1, productos), "cantidad": 1},
+                                     encabezados)
+        if codigo == 200:
+            codigo = await cliente.pedir("POST", "/api/pedidos", {}, encabezados)
+    except Exception:
+        res.errores += 1
+        return
+    _anotar(res, "checkout", codigo, time.perf_counter() - t0, slo * 2)
+
+
+def _anotar(res: Resultado, tipo: str, codigo: int, duracion: float, slo: float) -> None:
+    if codigo == 503:
+        res.rechazadas += 1
+    elif codigo != 200:
+        res.errores += 1
+    elif duracion <= slo:
+        res.ok[tipo].append(duracion)
+    else:
+        res.errores += 1  # respondió, pero demasiado tarde para servirle a alguien
+
+
+async def nivel(puerto: int, tasa: float, segundos: float, args, tokens: List[str]) -> Dict[str, float]:
+    res = Resultado()
+    rnd = random.Random(args.seed)
+    tareas = []
+    cliente = ClienteHTTP("127.0.0.1", puerto)
+    inicio = time.perf_counter()
+    n = 0
+    while True:
+        ahora = time.perf_counter() - inicio
+        if ahora >= segundos:
+            break
+        # Llegadas a tasa constante: lanzar las que ya tocaban y dormir hasta la siguiente
+        while n < ahora * tasa:
+            if rnd.random() < 0.8:
+                tareas.append(asyncio.create_task(navegar(cliente, rnd, args.productos, res, args.slo)))
+            else:
+                tareas.append(asyncio.create_task(comprar(cliente, rnd, args.productos, rnd.choice(tokens), res, args.slo)))
+            n += 1
+        await asyncio.sleep(max(0.0, (n / tasa) - (time.perf_counter() - inicio)))
+    await asyncio.gather(*tareas)
+    cliente.cerrar()
+    nav, chk = sorted(res.ok["navegacion"]), sorted(res.ok["checkout"])
+    return {
+        "ofrecidas": n,
+        "goodput": (len(nav) + len(chk)) / segundos,
+        "goodput_checkout": len(chk) / segundos,
+        "rechazadas": res.rechazadas,
+        "lentas_o_error": res.errores,
+        "p99_ms": percentil(sorted(nav + chk), 99) * 1000,
+    }
+
+
+def levantar(db: str, admision: bool, puerto: int) -> subprocess.Popen:
+    entorno = dict(os.environ, DATABASE_URL=f"sqlite:///{db}", ADMIN_EMAILS=ADMIN_EMAIL, LOG_LEVEL="ERROR",
+                   ADMISION_ENABLED="1" if admision else "0", DB_INIT="skip")
+    proceso = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--port", str(puerto), "--log-level", "error",
+                                "--no-access-log"], cwd=RAIZ, env=entorno)
+    import httpx
+    for _ in range(200):
+        try:
+            if httpx.get(f"http://127.0.0.1:{puerto}/api/health", timeout=1).status_code == 200:
+                return proceso
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.1)
+    proceso.kill()
+    sys.exit("El servidor no arrancó")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Goodput con y sin control de admisión")
+    parser.add_argument("--db", default=os.path.join(AQUI, "bench.db"))
+    parser.add_argument("--tasas", default="100,200,400,800", help="Peticiones por segundo ofrecidas")
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--slo", type=float, default=1.0, help="Segundos para que una navegación cuente (checkout: el doble)")
+    parser.add_argument("--usuarios", type=int, default=2000, help="Usuarios sembrados")
+    parser.add_argument("--productos", type=int, default=2000, help="Productos sembrados")
+    parser.add_argument("--modos", default="sin,con")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+    if not os.path.exists(args.db):
+        sys.exit(f"No existe {args.db}: ejecute primero bench/seed.py")
+
+    from natural_power.seguridad import crear_access_token
+    tokens = [crear_access_token({"sub": email_usuario(i)}) for i in range(1, min(args.usuarios, 500))]
+
+    print(f"{'modo':<5} {'tasa':>6} {'goodput':>9} {'checkout':>9} {'503':>6} {'lentas':>7} {'p99 ok':>9}")
+    for modo in args.modos.split(","):
+        for tasa in (float(t) for t in args.tasas.split(",")):
+            # Copia nueva por nivel: los pedidos de un nivel no deben frenar al siguiente
+            with tempfile.TemporaryDirectory() as tmp:
+                db = os.path.join(tmp, "bench.db")
+                shutil.copy(args.db, db)
+                puerto = _puerto_libre()
+                servidor = levantar(db, modo == "con", puerto)
+                try:
+                    r = asyncio.run(nivel(puerto, tasa, args.segundos, args, tokens))
+                finally:
+                    servidor.terminate()
+                    servidor.wait()
+            print(f"{modo:<5} {tasa:6.0f} {r['goodput']:9.1f} {r['goodput_checkout']:9.1f} {r['rechazadas']:6d} "
+                  f"{r['lentas_o_error']:7d} {r['p99_ms']:8.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
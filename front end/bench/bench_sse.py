@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# bench_sse.py
+# Cuántos suscriptores SSE ociosos sostiene un worker.
+#
+# Modo en proceso (por defecto): crea N suscriptores sobre hub_pedidos que
+# esperan igual que el endpoint (cola + heartbeat) y mide memoria por
+# suscriptor y latencia de difusión de un cambio de estado a todos.
+#
+#   python bench/bench_sse.py --suscriptores 10000
+#
+# Modo HTTP: abre N conexiones reales contra un servidor levantado aparte.
+#
+#   python bench/bench_sse.py --url http://127.0.0.1:8004 --pedido 1 --token <JWT> --suscriptores 2000
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+async def en_proceso(n: int, heartbeat: float) -> None:
+    from natural_power.servicios.eventos import hub_pedidos as hub
+
+    recibidos = 0
+    listos = asyncio.Event()
+
+    async def suscriptor(order_id: int) -> None:
+        nonlocal recibidos
+        cola = hub.suscribir(order_id)
+        try:
+            while True:
+                try:
+                    await asyncio.wait_for(cola.get(), timeout=heartbeat)
+                except asyncio.TimeoutError:
+                    continue
+                recibidos += 1
+                if recibidos == n:
+                    listos.set()
+        finally:
+            hub.desuscribir(order_id, cola)
+
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    t0 = time.perf_counter()
+    tareas = [asyncio.create_task(suscriptor(1)) for _ in range(n)]
+    await asyncio.sleep(0)
+    while hub.suscriptores() < n:
+        await asyncio.sleep(0.01)
+    alta = time.perf_counter() - t0
+    memoria = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+
+    t0 = time.perf_counter()
+    hub.publicar(1, {"id": 1, "estado": "pagado"})
+    await listos.wait()
+    difusion = time.perf_counter() - t0
+
+    for t in tareas:
+        t.cancel()
+    await asyncio.gather(*tareas, return_exceptions=True)
+    print(f"suscriptores={n}")
+    print(f"alta:      {alta:.3f}s")
+    print(f"memoria:   {memoria / 1024 / 1024:.1f} MiB ({memoria / n:,.0f} bytes/suscriptor)")
+    print(f"difusión:  {difusion * 1000:.1f} ms para entregar un evento a todos")
+
+
+async def http(url: str, pedido: int, token: str, n: int, duracion: float) -> None:
+    import httpx
+
+    abiertas = 0
+    errores = 0
+
+    async def conexion(cliente: "httpx.AsyncClient") -> None:
+        nonlocal abiertas, errores
+        try:
+            async with cliente.stream("GET", f"/api/pedidos/{pedido}/eventos", params={"token": token}) as r:
+                if r.status_code != 200:
+                    errores += 1
+                    return
+                abiertas += 1
+                async for _ in r.aiter_lines():
+                    pass
+        except Exception:
+            errores += 1
+
+    limites = httpx.Limits(max_connections=n, max_keepalive_connections=0)
+    async with httpx.AsyncClient(base_url=url, limits=limites, timeout=None) as cliente:
+        tareas = [asyncio.create_task(conexion(cliente)) for _ in range(n)]
+        await asyncio.sleep(duracion)
+        print(f"conexiones abiertas={abiertas} errores={errores} (de {n})")
+        for t in tareas:
+            t.cancel()
+        await asyncio.gather(*tareas, return_exceptions=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de suscriptores SSE ociosos")
+    parser.add_argument("--suscriptores", type=int, default=10000)
+    parser.add_argument("--heartbeat", type=float, default=15.0)
+    parser.add_argument("--url")
+    parser.add_argument("--pedido", type=int, default=1)
+    parser.add_argument("--token", default="")
+    parser.add_argument("--duracion", type=float, default=10.0)
+    args = parser.parse_args()
+    if args.url:
+        asyncio.run(http(args.url, args.pedido, args.token, args.suscriptores, args.duracion))
+    else:
+        asyncio.run(en_proceso(args.suscriptores, args.heartbeat))
+
+
+if __name__ == "__main__":
+    main()
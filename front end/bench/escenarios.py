@@ -0,0 +1,73 @@
+# escenarios.py
+# Escenarios de carga realistas sobre la API, compartidos por los modos
+# en proceso (ASGI) y HTTP de run_bench.py.
+
+import random
+import time
+from typing import Any, Dict, List, Optional
+
+from seed import ADMIN_EMAIL, BENCH_PASSWORD, email_usuario
+
+
+class Registro:
+    """Latencias por endpoint (etiqueta estable, sin ids) y errores."""
+
+    def __init__(self) -> None:
+        self.latencias: Dict[str, List[float]] = {}
+        self.errores: Dict[str, int] = {}
+
+    async def llamar(self, cliente, etiqueta: str, metodo: str, url: str, **kw: Any) -> Optional[Any]:
+        t0 = time.perf_counter()
+        try:
+            resp = await cliente.request(metodo, url, **kw)
+            ok = resp.status_code < 400
+            cuerpo = resp.json() if ok and resp.headers.get("content-type", "").startswith("application/json") else None
+            # La API devuelve errores de negocio como {"status": 4xx} con HTTP 200
+            if isinstance(cuerpo, dict) and isinstance(cuerpo.get("status"), int) and cuerpo["status"] >= 400:
+                ok = False
+        except Exception:
+            ok, cuerpo = False, None
+        self.latencias.setdefault(etiqueta, []).append(time.perf_counter() - t0)
+        if not ok:
+            self.errores[etiqueta] = self.errores.get(etiqueta, 0) + 1
+        return cuerpo
+
+
+async def login(reg: Registro, cliente, email: str) -> Dict[str, str]:
+    cuerpo = await reg.llamar(cliente, "POST /api/auth/login", "POST", "/api/auth/login",
+                              json={"email": email, "contrasena": BENCH_PASSWORD})
+    token = ((cuerpo or {}).get("body") or {}).get("token", "")
+    return {"Authorization": f"Bearer {token}"}
+
+
+async def comprador(reg: Registro, cliente, rnd: random.Random, usuarios: int, productos: int, iteraciones: int) -> None:
+    """Navegar y buscar en el catálogo -> agregar al carrito -> checkout -> ver historial."""
+    headers = await login(reg, cliente, email_usuario(rnd.randrange(1, usuarios)))
+    for _ in range(iteraciones):
+        for _ in range(rnd.randint(1, 3)):
+            await reg.llamar(cliente, "GET /api/productos", "GET", "/api/productos",
+                             params={"pagina": rnd.randint(1, max(1, productos // 10)), "limite": 10})
+        await reg.llamar(cliente, "GET /api/productos/buscar", "GET", "/api/productos/buscar",
+                         params={"q": f"jugo {rnd.randint(1, productos)}"})
+        for _ in range(rnd.randint(1, 3)):
+            await reg.llamar(cliente, "POST /api/carrito/items", "POST", "/api/carrito/items", headers=headers,
+                             json={"productoId": rnd.randint(1, productos), "cantidad": rnd.randint(1, 2)})
+        await reg.llamar(cliente, "GET /api/carrito", "GET", "/api/carrito", headers=headers)
+        # La mitad de los checkouts usa el cupón de la promoción
+        pedido: Dict[str, Any] = {}
+        if rnd.random() < 0.5:
+            await reg.llamar(cliente, "POST /api/carrito/aplicar-cupon", "POST", "/api/carrito/aplicar-cupon",
+                             headers=headers, json={"codigo": "NATURAL10"})
+            pedido["cupon"] = "NATURAL10"
+        await reg.llamar(cliente, "POST /api/pedidos", "POST", "/api/pedidos", headers=headers, json=pedido)
+        await reg.llamar(cliente, "GET /api/pedidos", "GET", "/api/pedidos", headers=headers)
+
+
+async def administrador(reg: Registro, cliente, rnd: random.Random, iteraciones: int) -> None:
+    """Panel admin: dashboard, productos, usuarios y cola de pedidos."""
+    headers = await login(reg, cliente, ADMIN_EMAIL)
+    for _ in range(iteraciones):
+        await reg.llamar(cliente, "GET /api/admin/dashboard", "GET", "/api/admin/dashboard", headers=headers)
+        await reg.llamar(cliente, "GET /api/admin/productos", "GET", "/api/admin/productos", headers=headers)
+        await reg.llamar(cliente, "GET /api/admin/usuarios", "GET", "/api/admin/usuarios", headers=headers)
+        await reg.llamar(cliente, "GET /api/admin/pedidos", "GET", "/api/admin/pedidos", headers=headers)
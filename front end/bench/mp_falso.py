@@ -0,0 +1,91 @@
+#!/usr/bin/env python
+# mp_falso.py
+# Servidor falso de MercadoPago para pruebas locales: latencia y fallas configurables.
+#
+# Uso:
+#   python bench/mp_falso.py --puerto 8090 --latencia-ms 200 --fallos 0.2
+#   MP_API_BASE=http://127.0.0.1:8090 MP_ACCESS_TOKEN=TEST-falso uvicorn api:app
+#
+# Implementa POST /checkout/preferences y GET /v1/payments/{id} (siempre
+# aprobado; external_reference = el número antes del guion, p. ej. "42-1" es un
+# pago del pedido 42). El comportamiento se cambia en caliente:
+#   curl -X POST localhost:8090/falso/config -d '{"latencia_ms": 8000}'   # más lento que MP_TIMEOUT
+#   curl -X POST localhost:8090/falso/config -d '{"fallos": 1}'           # todo responde 503
+#   curl localhost:8090/falso/stats
+
+import argparse
+import asyncio
+import itertools
+import random
+from typing import Any, Dict, Optional
+
+from fastapi import Body, FastAPI, Header
+from fastapi.responses import JSONResponse
+
+config: Dict[str, float] = {"latencia_ms": 0.0, "fallos": 0.0}
+stats = {"preferencias": 0, "pagos": 0, "fallidas": 0}
+_ids = itertools.count(1)
+
+app = FastAPI(title="MercadoPago falso")
+
+
+async def _simular() -> Optional[JSONResponse]:
+    if config["latencia_ms"]:
+        await asyncio.sleep(config["latencia_ms"] / 1000)
+    if random.random() < config["fallos"]:
+        stats["fallidas"] += 1
+        return JSONResponse({"message": "falla simulada"}, status_code=503)
+    return None
+
+
+@app.post("/checkout/preferences")
+async def crear_preferencia(datos: Dict[str, Any] = Body(...), x_idempotency_key: Optional[str] = Header(default=None)):
+    falla = await _simular()
+    if falla:
+        return falla
+    stats["preferencias"] += 1
+    pref_id = f"pref-falso-{next(_ids)}"
+    return {
+        "id": pref_id,
+        "init_point": f"https://mp.falso/checkout?pref_id={pref_id}",
+        "sandbox_init_point": f"https://sandbox.mp.falso/checkout?pref_id={pref_id}",
+        "metadata": datos.get("metadata", {}),
+        "idempotency_key": x_idempotency_key,
+    }
+
+
+@app.get("/v1/payments/{payment_id}")
+async def obtener_pago(payment_id: str):
+    falla = await _simular()
+    if falla:
+        return falla
+    stats["pagos"] += 1
+    pedido = payment_id.split("-")[0]
+    return {"id": payment_id, "status": "approved", "external_reference": pedido, "metadata": {"order_id": pedido}}
+
+
+@app.post("/falso/config")
+async def cambiar_config(cambios: Dict[str, float] = Body(...)):
+    config.update({k: float(v) for k, v in cambios.items() if k in config})
+    return config
+
+
+@app.get("/falso/stats")
+async def ver_stats():
+    return {**stats, **config}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="MercadoPago falso con latencia y fallas inyectables")
+    parser.add_argument("--puerto", type=int, default=8090)
+    parser.add_argument("--latencia-ms", type=float, default=0)
+    parser.add_argument("--fallos", type=float, default=0, help="fracción de peticiones que responden 503")
+    args = parser.parse_args()
+    config.update(latencia_ms=args.latencia_ms, fallos=args.fallos)
+
+    import uvicorn
+    uvicorn.run(app, host="127.0.0.1", port=args.puerto, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
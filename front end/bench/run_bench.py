@@ -0,0 +1,137 @@
+#!/usr/bin/env python
+# run_bench.py
+# Suite de carga de la API: ejecuta los escenarios de escenarios.py con N
+# usuarios virtuales concurrentes y reporta throughput y p50/p95/p99 por
+# endpoint en JSON (para comparar entre commits).
+#
+# Primero sembrar la base:
+#   python bench/seed.py --db bench/bench.db
+#
+# En proceso (httpx + ASGITransport, sin red):
+#   python bench/run_bench.py --db bench/bench.db --compradores 20 --admins 2 --salida resultados.json
+#
+# Contra un servidor real (generador de carga local):
+#   DATABASE_URL=sqlite:///bench/bench.db ADMIN_EMAILS=admin@bench.naturalpower.cl python run_server.py
+#   python bench/run_bench.py --url http://127.0.0.1:8004 --compradores 50
+#
+# Otros benchmarks puntuales: bench_boletas.py, bench_sse.py.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from typing import Any, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import escenarios  # noqa: E402
+from seed import ADMIN_EMAIL  # noqa: E402
+
+
+def percentil(ordenadas: List[float], p: float) -> float:
+    if not ordenadas:
+        return 0.0
+    k = max(0, min(len(ordenadas) - 1, int(round(p / 100.0 * len(ordenadas) + 0.5)) - 1))
+    return ordenadas[k]
+
+
+def resumen(reg: escenarios.Registro, duracion: float) -> Dict[str, Any]:
+    endpoints = {}
+    for etiqueta, lat in sorted(reg.latencias.items()):
+        orden = sorted(lat)
+        endpoints[etiqueta] = {
+            "n": len(orden),
+            "errores": reg.errores.get(etiqueta, 0),
+            "rps": round(len(orden) / duracion, 2),
+            "p50_ms": round(percentil(orden, 50) * 1000, 2),
+            "p95_ms": round(percentil(orden, 95) * 1000, 2),
+            "p99_ms": round(percentil(orden, 99) * 1000, 2),
+            "max_ms": round(orden[-1] * 1000, 2),
+        }
+    return endpoints
+
+
+def _commit_actual() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return "desconocido"
+
+
+async def ejecutar(args) -> Dict[str, Any]:
+    import httpx
+
+    if args.url:
+        transporte = None
+        base_url = args.url
+        limites = httpx.Limits(max_connections=args.compradores + args.admins)
+    else:
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(args.db)}"
+        os.environ.setdefault("ADMIN_EMAILS", ADMIN_EMAIL)
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        import api
+        transporte = httpx.ASGITransport(app=api.app)
+        base_url = "http://bench"
+        limites = httpx.Limits()
+
+    reg = escenarios.Registro()
+    rnd = random.Random(args.seed)
+    async with httpx.AsyncClient(transport=transporte, base_url=base_url, limits=limites, timeout=60) as cliente:
+        tareas = [
+            escenarios.comprador(reg, cliente, random.Random(rnd.random()), args.usuarios, args.productos, args.iteraciones)
+            for _ in range(args.compradores)
+        ] + [
+            escenarios.administrador(reg, cliente, random.Random(rnd.random()), args.iteraciones)
+            for _ in range(args.admins)
+        ]
+        t0 = time.perf_counter()
+        await asyncio.gather(*tareas)
+        duracion = time.perf_counter() - t0
+
+    total = sum(len(v) for v in reg.latencias.values())
+    return {
+        "meta": {
+            "modo": "http" if args.url else "asgi",
+            "commit": _commit_actual(),
+            "python": platform.python_version(),
+            "compradores": args.compradores,
+            "admins": args.admins,
+            "iteraciones": args.iteraciones,
+            "duracion_s": round(duracion, 3),
+            "peticiones": total,
+            "rps_total": round(total / duracion, 2) if duracion else 0.0,
+        },
+        "endpoints": resumen(reg, duracion),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark de escenarios de la API")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db"))
+    parser.add_argument("--url", help="Servidor ya levantado; si se omite se usa la app en proceso")
+    parser.add_argument("--compradores", type=int, default=10)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--iteraciones", type=int, default=5)
+    parser.add_argument("--usuarios", type=int, default=10000, help="Usuarios sembrados (para elegir cuentas)")
+    parser.add_argument("--productos", type=int, default=1000, help="Productos sembrados")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--salida", help="Archivo JSON de salida (por defecto stdout)")
+    args = parser.parse_args()
+    if not args.url and not os.path.exists(args.db):
+        parser.error(f"No existe {args.db}; ejecutar primero bench/seed.py")
+    resultado = asyncio.run(ejecutar(args))
+    texto = json.dumps(resultado, indent=2, ensure_ascii=False)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            f.write(texto + "\n")
+    else:
+        print(texto)
+
+
+if __name__ == "__main__":
+    main()
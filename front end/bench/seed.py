@@ -0,0 +1,142 @@
+#!/usr/bin/env python
+# seed.py
+# Crea una base SQLite sintética para benchmarks, a escala configurable.
+#
+# Uso:
+#   python bench/seed.py --db bench/bench.db --usuarios 20000 --productos 2000 \
+#       --carritos 5000 --actividad 2000000 --pedidos 200000
+#
+# Todos los usuarios tienen la contraseña BENCH_PASSWORD; el primero es
+# ADMIN_EMAIL (levantar el servidor con ADMIN_EMAILS=admin@bench.naturalpower.cl).
+# Las filas se insertan con executemany por bloques dentro de transacciones.
+
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+BENCH_PASSWORD = "bench1234"
+ADMIN_EMAIL = "admin@bench.naturalpower.cl"
+BLOQUE = 20000
+TIPOS = ["detox", "energia", "antioxidante", "proteico", "citrico"]
+
+
+def email_usuario(i: int) -> str:
+    return ADMIN_EMAIL if i == 0 else f"usuario{i}@bench.naturalpower.cl"
+
+
+def _insertar(conn, tabla, filas) -> int:
+    total = 0
+    bloque = []
+    for fila in filas:
+        bloque.append(fila)
+        if len(bloque) >= BLOQUE:
+            conn.execute(tabla.insert(), bloque)
+            total += len(bloque)
+            bloque = []
+    if bloque:
+        conn.execute(tabla.insert(), bloque)
+        total += len(bloque)
+    return total
+
+
+def sembrar(db: str, usuarios: int, productos: int, carritos: int, actividad: int, pedidos: int, seed: int) -> None:
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.abspath(db)}"
+    from sqlmodel import SQLModel
+
+    from natural_power.db import CUPONES_SEMILLA, SCHEMA_VERSION, crear_indice_busqueda, crear_resumen_carrito, engine
+    from natural_power.seguridad import hashear_contraseña
+
+    if os.path.exists(db):
+        os.remove(db)
+    SQLModel.metadata.create_all(engine)
+    rnd = random.Random(seed)
+    ahora = datetime.now(timezone.utc)
+    # Un único hash para todos: hashear N contraseñas con argon2 tomaría minutos
+    hashed = hashear_contraseña(BENCH_PASSWORD)
+    tablas = SQLModel.metadata.tables
+
+    def medir(nombre, fn):
+        t0 = time.perf_counter()
+        n = fn()
+        print(f"{nombre:<12} {n:>10,} filas en {time.perf_counter() - t0:6.1f}s")
+
+    with engine.begin() as conn:
+        conn.exec_driver_sql("PRAGMA journal_mode=WAL")
+        conn.exec_driver_sql("PRAGMA synchronous=OFF")
+        # Marcar el esquema como inicializado: el arranque no agrega la semilla de ejemplo
+        conn.exec_driver_sql(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        # Los triggers del índice de búsqueda indexan los productos a medida que se insertan
+        crear_indice_busqueda(conn)
+        # Y los del resumen del carrito, los carritos sembrados
+        crear_resumen_carrito(conn)
+
+        medir("productos", lambda: _insertar(conn, tablas["product"], (
+            {"nombre": f"Jugo {i}", "descripcion": f"Jugo sintético {i}", "precio": float(rnd.randint(25, 60) * 100),
+             "image": "/static/imagenes/jugo_verde.png", "stock": 1_000_000, "tipo": rnd.choice(TIPOS), "vendidos": 0}
+            for i in range(1, productos + 1)
+        )))
+        medir("cupones", lambda: _insertar(conn, tablas["coupon"], ({**c, "created_at": ahora} for c in CUPONES_SEMILLA)))
+        medir("usuarios", lambda: _insertar(conn, tablas["user"], (
+            {"nombre": f"Usuario {i}", "email": email_usuario(i), "hashed_password": hashed, "direccion": "Calle 123"}
+            for i in range(usuarios)
+        )))
+        medir("carritos", lambda: _insertar(conn, tablas["cartitem"], (
+            {"user_email": email_usuario(rnd.randrange(1, usuarios)), "product_id": pid, "name": f"Jugo {pid}",
+             "price": 3990.0, "image": None, "description": None, "quantity": rnd.randint(1, 3)}
+            for pid in (rnd.randint(1, productos) for _ in range(carritos))
+        )))
+        medir("actividad", lambda: _insertar(conn, tablas["useractivity"], (
+            {"user_email": email_usuario(rnd.randrange(usuarios)), "action": "GET /api/productos",
+             "details": "Status: 200", "timestamp": ahora - timedelta(seconds=rnd.randrange(90 * 86400)), "ip_address": None}
+            for _ in range(actividad)
+        )))
+
+        def pedidos_e_items():
+            n_items = 0
+            orders = []
+            items = []
+            for oid in range(1, pedidos + 1):
+                lineas = [(rnd.randint(1, productos), rnd.randint(1, 3), float(rnd.randint(25, 60) * 100))
+                          for _ in range(rnd.randint(1, 4))]
+                orders.append({"id": oid, "user_email": email_usuario(rnd.randrange(1, usuarios)),
+                               "total": sum(q * p for _, q, p in lineas), "estado": rnd.choice(["pagado", "entregado", "pendiente"]),
+                               "stock_descontado": True, "created_at": ahora - timedelta(seconds=rnd.randrange(365 * 86400))})
+                items.extend({"order_id": oid, "product_id": pid, "name": f"Jugo {pid}", "price": p, "quantity": q}
+                             for pid, q, p in lineas)
+                if len(items) >= BLOQUE:
+                    conn.execute(tablas["order"].insert(), orders)
+                    conn.execute(tablas["orderitem"].insert(), items)
+                    n_items += len(items)
+                    orders, items = [], []
+            if orders:
+                conn.execute(tablas["order"].insert(), orders)
+                conn.execute(tablas["orderitem"].insert(), items)
+                n_items += len(items)
+            return pedidos
+
+        medir("pedidos", pedidos_e_items)
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+    print(f"Base lista en {db}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Siembra una base sintética para benchmarks")
+    parser.add_argument("--db", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench.db"))
+    parser.add_argument("--usuarios", type=int, default=10000)
+    parser.add_argument("--productos", type=int, default=1000)
+    parser.add_argument("--carritos", type=int, default=5000)
+    parser.add_argument("--actividad", type=int, default=1_000_000)
+    parser.add_argument("--pedidos", type=int, default=100000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    sembrar(args.db, args.usuarios, args.productos, args.carritos, args.actividad, args.pedidos, args.seed)
+
+
+if __name__ == "__main__":
+    main()
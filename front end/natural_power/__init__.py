@@ -0,0 +1,3 @@
+# natural_power
+# Backend de Natural Power. La app FastAPI se arma en natural_power.app y se
+# expone como api:app (ver api.py y run_server.py).
@@ -0,0 +1,222 @@
+# admision.py
+# Control de admisión: límites de concurrencia por tipo de ruta y rechazo rápido con 503 bajo sobrecarga.
+
+import asyncio
+import json
+import os
+from collections import deque
+from typing import Deque, Dict, List, Optional
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from .logs import log
+from .metricas import metricas
+
+# Cuando llegan más peticiones de las que SQLite y los hilos pueden atender,
+# aceptarlas todas hace que todas esperen locks y terminen lentas a la vez. Este
+# middleware deja pasar como máximo `limite` peticiones de cada clase (y
+# ADMISION_MAX_EN_CURSO en total); las demás esperan en una cola acotada con un
+# plazo. Si la cola está llena o se vence el plazo, la respuesta es un 503 con
+# Retry-After al instante, en vez de una petición más compitiendo por la base.
+#
+# Al liberarse un cupo pasa primero la clase de mayor prioridad (checkout antes
+# que login, escrituras y navegación). Además lectura + escritura suman menos
+# que el total, así que siempre queda cupo para comprar aunque el catálogo esté
+# saturado. Health, métricas, streams SSE y archivos estáticos no pasan por aquí.
+# Las exportaciones en streaming tienen su propia clase fuera del total: duran lo
+# que tarde el cliente en descargar y no deben ocupar cupos de la navegación.
+#
+# Con un solo proceso la saturación suele ser de CPU: el event loop se atrasa y
+# las peticiones se acumulan antes de llegar a la app, donde ningún límite de
+# concurrencia las ve. Un monitor mide ese atraso; mientras supere
+# ADMISION_RETRASO_MS, la navegación (lectura y escritura) se rechaza sin
+# esperar y el CPU queda para login y checkout.
+
+ADMISION_ENABLED = os.getenv("ADMISION_ENABLED", "1").strip().lower() in ("1", "true", "si")
+ADMISION_MAX_EN_CURSO = int(os.getenv("ADMISION_MAX_EN_CURSO", "48"))
+ADMISION_RETRY_AFTER = int(os.getenv("ADMISION_RETRY_AFTER", "1"))
+ADMISION_RETRASO_MS = float(os.getenv("ADMISION_RETRASO_MS", "150"))
+MONITOR_INTERVALO = 0.05
+
+# nombre, prioridad (menor pasa antes), límite, cola máxima, espera máxima en ms
+_CLASES_DEFECTO = (
+    ("checkout", 0, 16, 64, 10000),
+    ("auth", 1, 8, 32, 5000),
+    ("escritura", 2, 12, 32, 3000),
+    ("lectura", 3, 24, 64, 500),
+    ("exportacion", 4, 2, 4, 2000),
+)
+# Clases que se rechazan de inmediato con el event loop atrasado
+_PRESCINDIBLES = ("lectura", "escritura", "exportacion")
+# Clases con límite propio que no cuentan en ADMISION_MAX_EN_CURSO
+_FUERA_DEL_TOTAL = ("exportacion",)
+
+_EXENTAS = ("/api/health", "/api/metrics")
+
+
+class ClaseRuta:
+    __slots__ = ("nombre", "prioridad", "limite", "cola_max", "espera", "en_curso", "prescindible", "fuera_del_total", "cola")
+
+    def __init__(self, nombre: str, prioridad: int, limite: int, cola_max: int, espera_ms: float) -> None:
+        self.nombre = nombre
+        self.prioridad = prioridad
+        self.limite = limite
+        self.cola_max = cola_max
+        self.espera = espera_ms / 1000
+        self.en_curso = 0
+        self.prescindible = nombre in _PRESCINDIBLES
+        self.fuera_del_total = nombre in _FUERA_DEL_TOTAL
+        self.cola: Deque["asyncio.Future[None]"] = deque()
+
+
+def _clases_configuradas() -> List[ClaseRuta]:
+    clases = []
+    for nombre, prioridad, limite, cola_max, espera_ms in _CLASES_DEFECTO:
+        prefijo = f"ADMISION_{nombre.upper()}"
+        clases.append(ClaseRuta(
+            nombre, prioridad,
+            int(os.getenv(f"{prefijo}_LIMITE", str(limite))),
+            int(os.getenv(f"{prefijo}_COLA", str(cola_max))),
+            float(os.getenv(f"{prefijo}_ESPERA_MS", str(espera_ms))),
+        ))
+    return clases
+
+
+def clasificar(metodo: str, path: str) -> Optional[str]:
+    """Clase de la petición, o None si no se limita."""
+    if not path.startswith("/api/") or path in _EXENTAS or path.endswith("/eventos"):
+        return None
+    if metodo in ("GET", "HEAD", "OPTIONS"):
+        return "exportacion" if path.endswith("/exportar") else "lectura"
+    if path in ("/api/auth/login", "/api/auth/reset-password", "/api/usuarios/registrar"):
+        return "auth"  # hash de contraseña
+    if path.startswith(("/api/pedidos", "/api/pagos/")):
+        return "checkout"
+    return "escritura"
+
+
+class ControlAdmision:
+    def __init__(self, clases: List[ClaseRuta], max_en_curso: int) -> None:
+        self.clases: Dict[str, ClaseRuta] = {c.nombre: c for c in clases}
+        self._por_prioridad = sorted(clases, key=lambda c: c.prioridad)
+        self.max_en_curso = max_en_curso
+        self.en_curso = 0
+        self.retraso = 0.0  # atraso del event loop en segundos, suavizado
+        self._monitor: Optional["asyncio.Task[None]"] = None
+
+    def _libre(self, clase: ClaseRuta) -> bool:
+        return clase.en_curso < clase.limite and (clase.fuera_del_total or self.en_curso < self.max_en_curso)
+
+    def _ocupar(self, clase: ClaseRuta) -> None:
+        clase.en_curso += 1
+        if not clase.fuera_del_total:
+            self.en_curso += 1
+
+    def _despachar(self) -> None:
+        for clase in self._por_prioridad:
+            while clase.cola and self._libre(clase):
+                futuro = clase.cola.popleft()
+                self._ocupar(clase)
+                futuro.set_result(None)
+
+    def _retirar(self, clase: ClaseRuta, futuro: "asyncio.Future[None]") -> None:
+        futuro.cancel()
+        try:
+            clase.cola.remove(futuro)
+        except ValueError:
+            pass
+
+    async def entrar(self, clase: ClaseRuta) -> Optional[str]:
+        """None si la petición puede pasar (hay que llamar a salir); si no, el motivo del rechazo."""
+        if clase.prescindible and self.retraso * 1000 > ADMISION_RETRASO_MS:
+            return "sobrecarga"
+        # Las colas solo tienen peticiones si su clase o el total están llenos: si
+        # la de esta clase está vacía y hay cupo, nadie con prioridad lo espera
+        if not clase.cola and self._libre(clase):
+            self._ocupar(clase)
+            return None
+        if len(clase.cola) >= clase.cola_max:
+            return "cola_llena"
+        futuro: "asyncio.Future[None]" = asyncio.get_running_loop().create_future()
+        clase.cola.append(futuro)
+        try:
+            await asyncio.wait_for(asyncio.shield(futuro), clase.espera)
+        except asyncio.TimeoutError:
+            pass
+        except asyncio.CancelledError:
+            # El cliente se fue mientras esperaba
+            if futuro.done():
+                self.salir(clase)
+            else:
+                self._retirar(clase, futuro)
+            raise
+        if futuro.done():
+            return None
+        self._retirar(clase, futuro)
+        return "plazo_vencido"
+
+    def salir(self, clase: ClaseRuta) -> None:
+        clase.en_curso -= 1
+        if not clase.fuera_del_total:
+            self.en_curso -= 1
+        self._despachar()
+
+    async def _medir_retraso(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            t0 = loop.time()
+            await asyncio.sleep(MONITOR_INTERVALO)
+            atraso = max(0.0, loop.time() - t0 - MONITOR_INTERVALO)
+            # Sube de golpe y baja de a poco: un respiro corto no reabre la puerta a todos
+            self.retraso = atraso if atraso > self.retraso else 0.8 * self.retraso + 0.2 * atraso
+
+    def iniciar(self) -> None:
+        self._monitor = asyncio.create_task(self._medir_retraso())
+
+    async def detener(self) -> None:
+        if self._monitor is not None:
+            self._monitor.cancel()
+            try:
+                await self._monitor
+            except asyncio.CancelledError:
+                pass
+
+
+control = ControlAdmision(_clases_configuradas(), ADMISION_MAX_EN_CURSO)
+
+for _clase in control.clases.values():
+    metricas.gauge(f"np_admission_{_clase.nombre}_in_flight", f"Peticiones de la clase {_clase.nombre} en curso",
+                   lambda c=_clase: c.en_curso)
+    metricas.gauge(f"np_admission_{_clase.nombre}_queued", f"Peticiones de la clase {_clase.nombre} esperando cupo",
+                   lambda c=_clase: len(c.cola))
+
+metricas.gauge("np_event_loop_lag_seconds", "Atraso del event loop (suavizado)", lambda: control.retraso)
+
+_CUERPO_503 = json.dumps({"detail": "Servidor ocupado; reintenta en unos segundos"}).encode()
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        nombre = clasificar(scope["method"], scope["path"]) if scope["type"] == "http" else None
+        if nombre is None:
+            await self.app(scope, receive, send)
+            return
+        clase = control.clases[nombre]
+        motivo = await control.entrar(clase)
+        if motivo is not None:
+            metricas.rechazo_admision(nombre, motivo)
+            log.debug("Petición %s %s rechazada (%s, %s)", scope["method"], scope["path"], nombre, motivo)
+            await send({"type": "http.response.start", "status": 503, "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(_CUERPO_503)).encode()),
+                (b"retry-after", str(ADMISION_RETRY_AFTER).encode()),
+            ]})
+            await send({"type": "http.response.body", "body": _CUERPO_503})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            control.salir(clase)
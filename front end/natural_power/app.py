@@ -0,0 +1,137 @@
+# app.py
+# Arma la aplicación FastAPI: middlewares, archivos estáticos, routers y ciclo
+# de vida (esquema de BD y workers en segundo plano).
+
+import asyncio
+import os
+
+from fastapi import FastAPI
+from fastapi.middleware.cors import CORSMiddleware
+from fastapi.openapi.utils import get_openapi
+from fastapi.staticfiles import StaticFiles
+
+from .admision import ADMISION_ENABLED, AdmissionControlMiddleware, control as control_admision
+from .config import API_DOCS, BASE_DIR, DB_INIT
+from .db import create_db_and_seed
+from .logs import log
+from .middlewares import ActivityTrackingMiddleware, MetricsMiddleware, RequestIdMiddleware
+from .perfilado import PROFILING_ENABLED, ProfilingMiddleware
+from .routers import (admin, auth, carrito, documentos, infra, jugos, notificaciones, pagos, pedidos, productos, reportes,
+                      usuarios)
+from .servicios.actividad import detener_registro_actividad, iniciar_registro_actividad
+from .servicios.boletas import detener_pool_boletas
+from .servicios.campanas import cancelar_campanas, reanudar_campanas
+from .servicios.correo import detener_worker_correo, iniciar_worker_correo
+from .servicios.paginacion import HEADER_CURSOR, HEADER_TOTAL
+from .servicios.pagos import detener_worker_pagos, iniciar_worker_pagos
+from .servicios.pasarela import pasarela
+from .servicios.pronostico import detener_worker_pronostico, iniciar_worker_pronostico
+from .servicios.recomendaciones import detener_recomendaciones, iniciar_recomendaciones
+
+app = FastAPI(
+    title="Natural Power API (Versión Monolito)",
+    description="Todos los endpoints y modelos DTO en un solo archivo.",
+    version="1.0.0",
+    openapi_url="/openapi.json" if API_DOCS else None,
+    swagger_ui_parameters={
+        "displayOperationId": False,
+        "docExpansion": "none",
+    }
+)
+
+# Configurar esquema de seguridad para Swagger UI
+def custom_openapi():
+    if app.openapi_schema:
+        return app.openapi_schema
+    openapi_schema = get_openapi(
+        title="Natural Power API (Versión Monolito)",
+        version="1.0.0",
+        description="Todos los endpoints y modelos DTO en un solo archivo.",
+        routes=app.routes,
+    )
+    openapi_schema["components"]["securitySchemes"] = {
+        "HTTPBearer": {
+            "type": "http",
+            "scheme": "bearer",
+            "bearerFormat": "JWT",
+            "description": "JWT Token obtenido del endpoint /api/auth/login"
+        }
+    }
+    openapi_schema["security"] = [{"HTTPBearer": []}]
+    app.openapi_schema = openapi_schema
+    return app.openapi_schema
+
+app.openapi = custom_openapi
+
+# El último middleware agregado es el más externo: CORS envuelve a todos y
+# RequestId/Metrics abren el contexto que usan Profiling y los handlers. La
+# admisión va dentro de Metrics para que los 503 por sobrecarga se cuenten.
+app.add_middleware(ActivityTrackingMiddleware)
+if PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+if ADMISION_ENABLED:
+    app.add_middleware(AdmissionControlMiddleware)
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(RequestIdMiddleware)
+app.add_middleware(
+    CORSMiddleware,
+    allow_origins=["*"],
+    allow_credentials=True,
+    allow_methods=["*"],
+    allow_headers=["*"],
+    # Cursor y total de los listados paginados
+    expose_headers=[HEADER_CURSOR, HEADER_TOTAL],
+)
+
+# --- Montar archivos estáticos (CSS, JS, imágenes) ---
+static_dir = os.path.join(BASE_DIR, "static")
+if os.path.isdir(static_dir):
+    app.mount("/static", StaticFiles(directory=static_dir), name="static")
+
+# Servir carpeta de imágenes si existe en BASE_DIR/imagenes
+imagenes_dir = os.path.join(BASE_DIR, "imagenes")
+if os.path.isdir(imagenes_dir):
+    app.mount("/imagenes", StaticFiles(directory=imagenes_dir), name="imagenes")
+
+# --- Montar frontend (historias) como aplicación SPA ---
+frontend_dir = os.path.join(BASE_DIR, "frontend", "historias")
+if os.path.isdir(frontend_dir):
+    # StaticFiles con html=True automáticamente sirve index.html para directorios
+    app.mount("/app", StaticFiles(directory=frontend_dir, html=True), name="app")
+
+for modulo in (infra, pagos, auth, usuarios, productos, jugos, carrito, pedidos, documentos, reportes, notificaciones, admin):
+    app.include_router(modulo.router)
+
+log.debug("Endpoints de Natural Power cargados (%s rutas)", len(app.routes))
+
+
+@app.on_event("startup")
+async def on_startup():
+    if DB_INIT != "skip":
+        create_db_and_seed()
+    if app.openapi_url:
+        # Generar el esquema en un hilo, pasado el arranque (no compite con las
+        # primeras peticiones), para que el primer /docs no lo pague
+        loop = asyncio.get_running_loop()
+        loop.call_later(2.0, loop.run_in_executor, None, app.openapi)
+    if ADMISION_ENABLED:
+        control_admision.iniciar()
+    iniciar_registro_actividad()
+    iniciar_worker_correo()
+    iniciar_worker_pagos()
+    iniciar_recomendaciones()
+    iniciar_worker_pronostico()
+    reanudar_campanas()
+
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    cancelar_campanas()
+    await detener_worker_correo()
+    await detener_worker_pagos()
+    await pasarela.cerrar()
+    await detener_recomendaciones()
+    await detener_worker_pronostico()
+    await detener_registro_actividad()
+    await control_admision.detener()
+    detener_pool_boletas()
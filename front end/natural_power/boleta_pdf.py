@@ -0,0 +1,113 @@
+# boleta_pdf.py
+# Generación de boletas en PDF sin dependencias externas.
+#
+# Este módulo se mantiene liviano a propósito: lo importan los procesos del
+# pool de renderizado, así que no debe importar FastAPI, SQLModel ni otros
+# módulos de natural_power (el __init__ del paquete no importa nada).
+
+import hashlib
+import os
+from typing import Any, Dict, List, Tuple
+
+ANCHO_PAGINA = 595  # A4 en puntos
+ALTO_PAGINA = 842
+MARGEN = 50
+LINEAS_POR_PAGINA = 48
+
+
+def _texto_pdf(texto: str) -> str:
+    """Escapa un texto para usarlo como string literal de PDF (WinAnsi)."""
+    crudo = texto.encode("cp1252", errors="replace").decode("latin-1")
+    return crudo.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _monto(valor: float) -> str:
+    return f"${valor:,.0f}".replace(",", ".")
+
+
+def _lineas_boleta(data: Dict[str, Any]) -> List[Tuple[int, str]]:
+    """Arma las líneas (tamaño de fuente, texto) de la boleta."""
+    lineas: List[Tuple[int, str]] = [
+        (16, "Natural Power"),
+        (12, f"Boleta electrónica {data['numero']}"),
+        (10, f"Pedido #{data['pedido_id']}  -  Fecha: {data['fecha']}"),
+        (10, f"Cliente: {data.get('email') or '-'}"),
+        (10, ""),
+        (10, f"{'Cant.':>5}  {'Producto':<40} {'Precio':>12} {'Subtotal':>12}"),
+    ]
+    for it in data["items"]:
+        subtotal = float(it["price"]) * int(it["quantity"])
+        nombre = str(it["name"])[:40]
+        lineas.append((10, f"{int(it['quantity']):>5}  {nombre:<40} {_monto(float(it['price'])):>12} {_monto(subtotal):>12}"))
+    lineas.append((10, ""))
+    lineas.append((12, f"TOTAL: {_monto(float(data['total']))}"))
+    return lineas
+
+
+def renderizar_boleta(data: Dict[str, Any]) -> bytes:
+    """Renderiza una boleta a PDF.
+
+    `data` debe contener numero, pedido_id, fecha, email, total e items
+    (lista de dicts con name, price y quantity). El resultado es determinista
+    para los mismos datos, lo que permite almacenarlo por contenido.
+    """
+    lineas = _lineas_boleta(data)
+    paginas = [lineas[i:i + LINEAS_POR_PAGINA] for i in range(0, len(lineas), LINEAS_POR_PAGINA)] or [[]]
+
+    objetos: List[bytes] = []
+    # 1: catálogo, 2: árbol de páginas, 3: fuente; luego pares (página, contenido)
+    kids = " ".join(f"{4 + 2 * i} 0 R" for i in range(len(paginas)))
+    objetos.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    objetos.append(f"<< /Type /Pages /Kids [{kids}] /Count {len(paginas)} >>".encode("ascii"))
+    objetos.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+    for i, pagina in enumerate(paginas):
+        y = ALTO_PAGINA - MARGEN
+        partes = ["BT"]
+        for tam, texto in pagina:
+            partes.append(f"/F1 {tam} Tf 1 0 0 1 {MARGEN} {y} Tm ({_texto_pdf(texto)}) Tj")
+            y -= tam + 6
+        partes.append("ET")
+        contenido = "\n".join(partes).encode("latin-1")
+        objetos.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {ANCHO_PAGINA} {ALTO_PAGINA}] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + 2 * i} 0 R >>".encode("ascii")
+        )
+        objetos.append(b"<< /Length " + str(len(contenido)).encode("ascii") + b" >>\nstream\n" + contenido + b"\nendstream")
+
+    salida = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for n, obj in enumerate(objetos, start=1):
+        offsets.append(len(salida))
+        salida += f"{n} 0 obj\n".encode("ascii") + obj + b"\nendobj\n"
+    xref = len(salida)
+    salida += f"xref\n0 {len(objetos) + 1}\n0000000000 65535 f \n".encode("ascii")
+    for off in offsets:
+        salida += f"{off:010d} 00000 n \n".encode("ascii")
+    salida += f"trailer\n<< /Size {len(objetos) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode("ascii")
+    return bytes(salida)
+
+
+def ruta_por_contenido(directorio: str, sha256: str) -> str:
+    """Ruta de almacenamiento de un PDF según su hash (dos niveles de carpeta)."""
+    return os.path.join(directorio, sha256[:2], f"{sha256}.pdf")
+
+
+def guardar_pdf(directorio: str, pdf: bytes) -> str:
+    """Guarda el PDF direccionado por contenido y devuelve su sha256.
+
+    Si ya existe un archivo con el mismo hash no se vuelve a escribir.
+    """
+    sha = hashlib.sha256(pdf).hexdigest()
+    ruta = ruta_por_contenido(directorio, sha)
+    if not os.path.isfile(ruta):
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(pdf)
+        os.replace(tmp, ruta)
+    return sha
+
+
+def renderizar_y_guardar(directorio: str, data: Dict[str, Any]) -> str:
+    """Renderiza y guarda en un solo paso (pensado para ejecutarse en el pool)."""
+    return guardar_pdf(directorio, renderizar_boleta(data))
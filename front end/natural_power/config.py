@@ -0,0 +1,49 @@
+# config.py
+# Configuración compartida leída del entorno (.env). Las opciones propias de un
+# subsistema (correo, boletas, pagos, etc.) se leen en su propio módulo.
+
+import importlib.util
+import os
+from os import getenv
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv()
+except Exception:
+    pass
+
+# Carpeta "front end" (static/, frontend/, database.db)
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATABASE_URL = os.getenv("DATABASE_URL") or f"sqlite:///{os.path.join(BASE_DIR, 'database.db')}"
+
+# Configuración JWT para tokens de autenticación
+SECRET_KEY = "natural-power-secret-key-produccion"
+ALGORITHM = "HS256"
+ACCESS_TOKEN_EXPIRE_MINUTES = 30
+
+# --- Utilidades Admin ---
+admin_env = getenv("ADMIN_EMAILS", "").strip()
+ADMIN_EMAILS = set([e.strip().lower() for e in admin_env.split(",") if e.strip()])
+
+# Configuración MercadoPago
+MP_ACCESS_TOKEN = getenv("MP_ACCESS_TOKEN", "").strip()
+MP_API_BASE = getenv("MP_API_BASE", "https://api.mercadopago.com").strip().rstrip("/")
+FRONTEND_BASE_URL = getenv("FRONTEND_BASE_URL", "http://127.0.0.1:8004").strip()
+
+# Arranque liviano: passlib, jose, smtplib, MercadoPago y httpx se importan en
+# su primer uso. Aquí solo se verifica si las integraciones opcionales están
+# instaladas, sin importarlas.
+# MercadoPago es opcional en arranque: si no está instalado, el backend igual levanta
+MP_AVAILABLE = importlib.util.find_spec("mercadopago") is not None
+# httpx (opcional) permite consultar la API de MercadoPago con un cliente async reutilizable
+HTTPX_AVAILABLE = importlib.util.find_spec("httpx") is not None
+# NumPy + SciPy (opcionales): recomendaciones "comprados juntos" y pronóstico de demanda
+NUMPY_AVAILABLE = importlib.util.find_spec("numpy") is not None and importlib.util.find_spec("scipy") is not None
+
+# API_DOCS=0 desactiva /docs, /redoc y /openapi.json (p. ej. en producción).
+# Si están activos, el esquema se genera en segundo plano poco después del arranque.
+API_DOCS = os.getenv("API_DOCS", "1").strip().lower() in ("1", "true", "si")
+
+# DB_INIT=auto (por defecto) inicializa el esquema al arrancar si hace falta;
+# DB_INIT=skip lo deja al paso de despliegue (`python api.py init-db`).
+DB_INIT = os.getenv("DB_INIT", "auto").strip().lower()
@@ -0,0 +1,243 @@
+# db.py
+# Motor de base de datos, sesión por petición y creación del esquema.
+
+from datetime import datetime, timezone
+from typing import Callable, List, Set, Tuple
+
+from sqlalchemy import exists, insert
+from sqlmodel import SQLModel, create_engine, select
+
+from .config import DATABASE_URL
+from .logs import log
+from .modelos import Coupon, Ingredient, Product
+
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+PRODUCTOS_SEMILLA = [
+    dict(nombre="Verde Detox", descripcion="Mezcla purificante", precio=3990, image="/static/imagenes/jugo_verde.png", stock=10, tipo="detox"),
+    dict(nombre="Naranja Boost", descripcion="Energía y vitamina C", precio=3990, image="/static/imagenes/jugo_naranja.png", stock=5, tipo="energia"),
+    dict(nombre="Rojo Pasión", descripcion="Antioxidante", precio=4290, image="/static/imagenes/jugo_rojo.png", stock=0, tipo="antioxidante"),
+    dict(nombre="Amanecer Tropical", descripcion="Dulzura natural", precio=4500, image="/static/imagenes/jugo_tropical.png", stock=15, tipo="energia"),
+]
+
+# El cupón que antes estaba fijo en el endpoint de carrito
+CUPONES_SEMILLA = [
+    dict(codigo="NATURAL10", tipo="porcentaje", valor=10, subtotal_minimo=0, usos=0, activo=True),
+]
+
+# Bases e ingredientes de "Crea tu jugo" (los que antes traía fijos el frontend)
+INGREDIENTES_SEMILLA = [
+    dict(nombre=nombre, categoria=categoria, precio=precio, stock=100, activo=True)
+    for categoria, nombre, precio in (
+        ("base", "Jugo de Naranja", 1500), ("base", "Agua Purificada", 1000), ("base", "Leche de Almendras", 1800),
+        ("ingrediente", "Frutilla", 500), ("ingrediente", "Plátano", 400), ("ingrediente", "Mango", 700),
+        ("ingrediente", "Espinaca", 300), ("ingrediente", "Piña", 600), ("ingrediente", "Jengibre", 200),
+        ("ingrediente", "Chía", 250), ("ingrediente", "Maracuyá", 700), ("ingrediente", "Menta", 150),
+        ("ingrediente", "Pepino", 200), ("ingrediente", "Manzana Verde", 400), ("ingrediente", "Zanahoria", 300),
+    )
+]
+
+# Índice de búsqueda (FTS5) sobre product: tabla de contenido externo, así que
+# no duplica el texto; los triggers la mantienen al día con cualquier escritura,
+# también las hechas por SQL directo. unicode61 con remove_diacritics ignora
+# mayúsculas y tildes ("pasion" encuentra "Pasión") y el índice de prefijos
+# acelera las búsquedas mientras se escribe. fts5vocab expone el vocabulario
+# para la corrección de errores de tipeo (ver servicios/busqueda.py).
+DDL_BUSQUEDA = (
+    """CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts USING fts5(
+        nombre, descripcion, tipo,
+        content='product', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    "CREATE VIRTUAL TABLE IF NOT EXISTS producto_fts_vocab USING fts5vocab(producto_fts, 'row')",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_ai AFTER INSERT ON product BEGIN
+        INSERT INTO producto_fts(rowid, nombre, descripcion, tipo) VALUES (new.id, new.nombre, new.descripcion, new.tipo);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_ad AFTER DELETE ON product BEGIN
+        INSERT INTO producto_fts(producto_fts, rowid, nombre, descripcion, tipo) VALUES ('delete', old.id, old.nombre, old.descripcion, old.tipo);
+    END""",
+    # Solo columnas indexadas: los cambios de stock no tocan el índice
+    """CREATE TRIGGER IF NOT EXISTS producto_fts_au AFTER UPDATE OF nombre, descripcion, tipo ON product BEGIN
+        INSERT INTO producto_fts(producto_fts, rowid, nombre, descripcion, tipo) VALUES ('delete', old.id, old.nombre, old.descripcion, old.tipo);
+        INSERT INTO producto_fts(rowid, nombre, descripcion, tipo) VALUES (new.id, new.nombre, new.descripcion, new.tipo);
+    END""",
+)
+
+
+def crear_indice_busqueda(conn) -> None:
+    """Crea (si falta) el índice FTS5 de productos y lo reconstruye desde product."""
+    for ddl in DDL_BUSQUEDA:
+        conn.exec_driver_sql(ddl)
+    conn.exec_driver_sql("INSERT INTO producto_fts(producto_fts) VALUES ('rebuild')")
+
+
+# Resumen del carrito (cartsummary): una fila por usuario con líneas, unidades
+# y subtotal. Como el índice de búsqueda, lo mantienen triggers sobre cartitem,
+# así que cualquier escritura (agregar, cambiar cantidad, repreciar, vaciar al
+# crear el pedido) lo ajusta en la misma transacción con solo la diferencia.
+# Los items sin usuario (carrito anónimo) no tienen resumen.
+DDL_RESUMEN_CARRITO = (
+    # Bases anteriores a la versión 7: cartitem se creó sin este índice
+    "CREATE INDEX IF NOT EXISTS ix_cartitem_user_email ON cartitem (user_email)",
+    """CREATE TRIGGER IF NOT EXISTS carrito_resumen_ai AFTER INSERT ON cartitem WHEN new.user_email IS NOT NULL BEGIN
+        INSERT INTO cartsummary(user_email, lineas, unidades, subtotal) VALUES (new.user_email, 1, new.quantity, new.price * new.quantity)
+        ON CONFLICT(user_email) DO UPDATE SET lineas = lineas + 1, unidades = unidades + excluded.unidades,
+            subtotal = subtotal + excluded.subtotal;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS carrito_resumen_ad AFTER DELETE ON cartitem WHEN old.user_email IS NOT NULL BEGIN
+        UPDATE cartsummary SET lineas = lineas - 1, unidades = unidades - old.quantity,
+            subtotal = subtotal - old.price * old.quantity WHERE user_email = old.user_email;
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS carrito_resumen_au AFTER UPDATE OF user_email, price, quantity ON cartitem BEGIN
+        UPDATE cartsummary SET lineas = lineas - 1, unidades = unidades - old.quantity,
+            subtotal = subtotal - old.price * old.quantity WHERE user_email = old.user_email;
+        INSERT INTO cartsummary(user_email, lineas, unidades, subtotal)
+            SELECT new.user_email, 1, new.quantity, new.price * new.quantity WHERE new.user_email IS NOT NULL
+        ON CONFLICT(user_email) DO UPDATE SET lineas = lineas + 1, unidades = unidades + excluded.unidades,
+            subtotal = subtotal + excluded.subtotal;
+    END""",
+)
+
+
+def crear_resumen_carrito(conn) -> None:
+    """Crea (si faltan) los triggers del resumen del carrito y lo recalcula desde cartitem."""
+    for ddl in DDL_RESUMEN_CARRITO:
+        conn.exec_driver_sql(ddl)
+    conn.exec_driver_sql("DELETE FROM cartsummary")
+    conn.exec_driver_sql(
+        """INSERT INTO cartsummary(user_email, lineas, unidades, subtotal)
+        SELECT user_email, count(*), sum(quantity), sum(price * quantity) FROM cartitem
+        WHERE user_email IS NOT NULL GROUP BY user_email"""
+    )
+
+
+def columnas(conn, tabla: str) -> Set[str]:
+    return {fila[1] for fila in conn.exec_driver_sql(f'PRAGMA table_info("{tabla}")')}
+
+
+def agregar_columna(conn, tabla: str, columna: str, definicion: str) -> bool:
+    """ALTER TABLE ... ADD COLUMN si la columna falta; devuelve True si la agregó.
+
+    Revisar antes de agregar hace el paso seguro sobre bases creadas por
+    commits que ya tenían la columna pero aún no llevaban la versión.
+    """
+    if columna in columnas(conn, tabla):
+        return False
+    conn.exec_driver_sql(f'ALTER TABLE "{tabla}" ADD COLUMN {columna} {definicion}')
+    return True
+
+
+def _productos_vendidos(conn) -> None:
+    agregar_columna(conn, "product", "vendidos", "INTEGER NOT NULL DEFAULT 0")
+
+
+def _pedidos_con_estado(conn) -> None:
+    # El esquema original no tenía estado ni otra columna de la que derivarlo (el
+    # webhook no marcaba pedidos): los pedidos existentes quedan "pendiente"
+    if agregar_columna(conn, "order", "estado", "VARCHAR NOT NULL DEFAULT 'pendiente'"):
+        conn.exec_driver_sql("""UPDATE "order" SET estado = 'pendiente' WHERE estado IS NULL OR estado = ''""")
+    conn.exec_driver_sql('CREATE INDEX IF NOT EXISTS ix_order_estado ON "order" (estado)')
+
+
+def _ciclo_de_vida_pedidos(conn) -> None:
+    # Los pedidos anteriores quedan sin stock_descontado: el checkout original
+    # recortaba el descuento en 0 y no guardaba cuánto restó, así que cancelarlos
+    # no devuelve unidades que quizás nunca se descontaron
+    agregar_columna(conn, "order", "stock_descontado", "BOOLEAN NOT NULL DEFAULT 0")
+    conn.exec_driver_sql("CREATE INDEX IF NOT EXISTS ix_orderitem_order_id ON orderitem (order_id)")
+    # Historial: un evento inicial con el estado actual para los pedidos que no tienen ninguno
+    conn.exec_driver_sql(
+        """INSERT INTO orderstatusevent(order_id, estado, created_at)
+        SELECT o.id, o.estado, o.created_at FROM "order" o
+        WHERE NOT EXISTS (SELECT 1 FROM orderstatusevent e WHERE e.order_id = o.id)"""
+    )
+
+
+def _carrito_con_receta(conn) -> None:
+    agregar_columna(conn, "cartitem", "receta", "VARCHAR")
+
+
+def _correo_con_lease(conn) -> None:
+    agregar_columna(conn, "outboundemail", "reclamado_at", "DATETIME")
+
+
+def _entregas_unicas(conn) -> None:
+    agregar_columna(conn, "offerdelivery", "reclamado_at", "DATETIME")
+    # Las bases antiguas pueden tener entregas repetidas: conservar la primera
+    conn.exec_driver_sql(
+        """DELETE FROM offerdelivery WHERE id NOT IN (
+            SELECT MIN(id) FROM offerdelivery GROUP BY campaign_id, user_email)"""
+    )
+    conn.exec_driver_sql(
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_offerdelivery_campana_email ON offerdelivery (campaign_id, user_email)"
+    )
+
+
+def _pagos_con_lease(conn) -> None:
+    agregar_columna(conn, "paymentevent", "reclamado_at", "DATETIME")
+
+
+# La versión del esquema se guarda en PRAGMA user_version; si la base ya está en
+# SCHEMA_VERSION, el arranque no emite DDL ni consultas de semilla. Si no, se
+# crean las tablas que faltan, se aplican en orden los pasos de MIGRACIONES con
+# versión mayor a la de la base y recién entonces se guarda la versión.
+# create_all nunca agrega columnas ni índices a una tabla que ya existe: cada
+# uno de esos cambios (y cada trigger o índice fuera del modelo) es un paso con
+# la versión que lo introduce. Los pasos deben poder repetirse (IF NOT EXISTS,
+# agregar_columna): `init-db --forzar` los aplica todos de nuevo. Subir
+# SCHEMA_VERSION con cada cambio de esquema, también al agregar solo tablas.
+SCHEMA_VERSION = 10
+MIGRACIONES: List[Tuple[int, Callable]] = [
+    (1, _productos_vendidos),
+    (1, _pedidos_con_estado),
+    (1, _ciclo_de_vida_pedidos),
+    (2, crear_indice_busqueda),
+    (4, _carrito_con_receta),
+    (7, crear_resumen_carrito),
+    (8, _correo_con_lease),
+    (9, _entregas_unicas),
+    (10, _pagos_con_lease),
+]
+
+
+def migrar(conn, desde: int) -> None:
+    """Aplica en orden los pasos de MIGRACIONES posteriores a la versión `desde`."""
+    for version, paso in MIGRACIONES:
+        if desde < version:
+            log.info("Migrando esquema: %s (versión %s)", paso.__name__, version)
+            paso(conn)
+
+
+def version_esquema() -> int:
+    with engine.connect() as conn:
+        return int(conn.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+
+
+def create_db_and_seed(forzar: bool = False) -> bool:
+    """Crea las tablas nuevas, aplica las migraciones pendientes y agrega los datos semilla.
+
+    BEGIN IMMEDIATE toma el lock de escritura antes de revisar la versión, así
+    que con varios workers arrancando a la vez solo uno ejecuta el DDL y los
+    demás ven la versión ya actualizada. Devuelve True si hizo cambios.
+    """
+    if not forzar and version_esquema() == SCHEMA_VERSION:
+        return False
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        version = int(conn.exec_driver_sql("PRAGMA user_version").scalar() or 0)
+        if version == SCHEMA_VERSION and not forzar:
+            conn.rollback()
+            return False
+        SQLModel.metadata.create_all(conn)
+        migrar(conn, 0 if forzar else version)
+        # Si no hay productos, insertar algunos de ejemplo
+        if not conn.execute(select(exists().where(Product.id.is_not(None)))).scalar():
+            conn.execute(insert(Product), PRODUCTOS_SEMILLA)
+        if not conn.execute(select(exists().where(Coupon.id.is_not(None)))).scalar():
+            ahora = datetime.now(timezone.utc)
+            conn.execute(insert(Coupon), [{**c, "created_at": ahora} for c in CUPONES_SEMILLA])
+        if not conn.execute(select(exists().where(Ingredient.id.is_not(None)))).scalar():
+            conn.execute(insert(Ingredient), INGREDIENTES_SEMILLA)
+        conn.exec_driver_sql(f"PRAGMA user_version = {int(SCHEMA_VERSION)}")
+        conn.commit()
+    log.info("Esquema de base de datos inicializado", extra={"version_anterior": version, "version": SCHEMA_VERSION})
+    return True
@@ -0,0 +1,32 @@
+# dependencias.py
+# Dependencias de FastAPI compartidas por los routers: sesión de base de datos
+# por petición y usuario autenticado (principal).
+#
+# Son `async def` a propósito: no hacen I/O bloqueante al resolverse y así
+# FastAPI no las despacha al threadpool en cada petición.
+
+from typing import AsyncIterator, Optional
+
+from fastapi import Depends, Header, HTTPException
+from sqlmodel import Session
+
+from .db import engine
+from .seguridad import es_admin, extraer_email_del_header
+
+
+async def obtener_sesion() -> AsyncIterator[Session]:
+    """Una sesión por petición; se cierra al terminar el handler."""
+    with Session(engine) as session:
+        yield session
+
+
+async def email_actual(authorization: Optional[str] = Header(None)) -> Optional[str]:
+    """Email del JWT del header Authorization, o None si no hay token válido."""
+    return extraer_email_del_header(authorization)
+
+
+async def admin_actual(email: Optional[str] = Depends(email_actual)) -> str:
+    """Exige un usuario admin (403 si no lo es)."""
+    if not email or not es_admin(email):
+        raise HTTPException(status_code=403, detail="Admin requerido")
+    return email
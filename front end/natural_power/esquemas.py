@@ -0,0 +1,231 @@
+# esquemas.py
+# Modelos DTO (Pydantic): datos de entrada (Input) y respuesta genérica.
+
+from datetime import date, datetime
+from typing import Any, Dict, List, Literal, Optional, Union
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field as PydField
+
+# Modelo de Respuesta Genérica
+class Response(BaseModel):
+    status: int
+    body: Any
+
+# Respuesta común de los endpoints que exigen token
+NO_AUTENTICADO = Response(status=401, body={"error": "Autenticación requerida"})
+
+# DTOs: Autenticación (Diagramas 2, 3)
+class LoginInput(BaseModel):
+    email: EmailStr
+    contrasena: str
+
+class RecuperacionInput(BaseModel):
+    email: EmailStr
+
+class ResetPasswordInput(BaseModel):
+    token: str
+    nueva_contrasena: str
+
+# ====== Pagos (MercadoPago) DTOs ======
+class MPItem(BaseModel):
+    title: str
+    product_id: Optional[int] = None
+    quantity: int = PydField(gt=0)
+    unit_price: float = PydField(gt=0)
+    picture_url: Optional[str] = None
+    currency_id: Optional[str] = 'CLP'
+
+class MPPreferenceInput(BaseModel):
+    items: List[MPItem]
+    metadata: Optional[Dict[str, Any]] = None
+
+# DTOs: Usuarios (Diagrama 1)
+class RegistroInput(BaseModel):
+    nombre: str
+    email: EmailStr
+    contrasena: str
+    direccion: str
+
+# DTOs: Listados paginados (cursor en el header X-Next-Cursor)
+class ListadoInput(BaseModel):
+    cursor: Optional[str] = None
+    limite: int = PydField(100, ge=1, le=500)
+    fields: Optional[str] = None  # p. ej. "id,nombre,precio"
+    total: bool = False  # agrega X-Total-Count (conteo cacheado)
+
+# DTOs: Productos (Diagramas 4, 5, 6)
+class ProductoQueryInput(ListadoInput):
+    pagina: int = PydField(1, ge=1)  # compatibilidad: se ignora si viene cursor
+    limite: int = PydField(10, ge=1, le=500)
+    bilingue: bool = True  # False omite name/price/description
+
+class BusquedaInput(BaseModel):
+    q: str = PydField(..., min_length=1, max_length=200)
+    limite: int = PydField(20, ge=1, le=100)
+    fields: Optional[str] = None
+    bilingue: bool = True
+
+class RecomendadosInput(BaseModel):
+    limite: int = PydField(5, ge=1, le=50)
+    fields: Optional[str] = None
+    bilingue: bool = True
+
+class ProductoFilterInput(BaseModel):
+    tipo: Optional[List[str]] = PydField(default_factory=list)
+    ingredientes: Optional[List[str]] = PydField(default_factory=list)
+    beneficios: Optional[List[str]] = PydField(default_factory=list)
+
+class StockInput(BaseModel):
+    stock: int = PydField(..., ge=0)
+
+class ProductoCreateInput(BaseModel):
+    nombre: str
+    descripcion: Optional[str] = None
+    precio: float = PydField(..., gt=0)
+    image: Optional[str] = "/static/imagenes/jugo_tropical.png"
+    stock: int = PydField(..., ge=0)
+    tipo: Optional[str] = None
+
+class ProductoUpdateInput(BaseModel):
+    nombre: Optional[str] = None
+    descripcion: Optional[str] = None
+    precio: Optional[float] = PydField(default=None, gt=0)
+    image: Optional[str] = None
+    stock: Optional[int] = PydField(default=None, ge=0)
+    tipo: Optional[str] = None
+
+class ProductoImportInput(BaseModel):
+    """Una fila del archivo de importación: con `id` actualiza las columnas presentes; sin `id` crea el producto."""
+    model_config = ConfigDict(extra="forbid", str_strip_whitespace=True)
+    id: Optional[int] = PydField(default=None, gt=0)
+    nombre: Optional[str] = PydField(default=None, min_length=1)
+    descripcion: Optional[str] = None
+    precio: Optional[float] = PydField(default=None, gt=0)
+    image: Optional[str] = None
+    stock: Optional[int] = PydField(default=None, ge=0)
+    tipo: Optional[str] = None
+
+class ImportarProductosInput(BaseModel):
+    formato: Optional[Literal["csv", "jsonl"]] = None  # None: según el Content-Type
+    parcial: bool = False  # True aplica las filas válidas aunque otras tengan errores
+
+class ExportarProductosInput(BaseModel):
+    formato: Literal["csv", "jsonl"] = "csv"
+
+class PronosticoInput(BaseModel):
+    estado: Literal["alertas", "agotado", "reponer", "todos"] = "alertas"
+    limite: int = PydField(50, ge=1, le=500)
+
+# DTOs: Carrito (Diagramas 7, 8, 18)
+class PersonalizacionInput(BaseModel):
+    """Receta de "Crea tu jugo" (productoId -1); bases e ingredientes por id o por nombre.
+    El precio lo calcula el servidor.
+    """
+    base: Union[int, str]
+    ingredientes: List[Union[int, str]] = PydField(default_factory=list)
+    customName: Optional[str] = PydField(None, max_length=60)
+
+class CarritoItemInput(BaseModel):
+    productoId: int
+    cantidad: int = PydField(..., ge=1)
+    personalizacion: Optional[PersonalizacionInput] = None
+
+class CotizacionJugoInput(BaseModel):
+    base: Union[int, str]
+    ingredientes: List[Union[int, str]] = PydField(default_factory=list)
+    cantidad: int = PydField(1, ge=1, le=100)
+
+class CotizacionLoteInput(BaseModel):
+    recetas: List[CotizacionJugoInput] = PydField(..., min_length=1, max_length=50)
+
+class IngredienteCreateInput(BaseModel):
+    nombre: str = PydField(..., min_length=1, max_length=60)
+    categoria: Literal["base", "ingrediente"] = "ingrediente"
+    precio: float = PydField(..., gt=0)
+    stock: int = PydField(0, ge=0)
+    activo: bool = True
+
+class IngredienteUpdateInput(BaseModel):
+    nombre: Optional[str] = PydField(None, min_length=1, max_length=60)
+    categoria: Optional[Literal["base", "ingrediente"]] = None
+    precio: Optional[float] = PydField(None, gt=0)
+    stock: Optional[int] = PydField(None, ge=0)
+    activo: Optional[bool] = None
+
+class CarritoUpdateInput(BaseModel):
+    cantidad: int = PydField(..., ge=1)
+    productoId: Optional[int] = None
+
+class CuponInput(BaseModel):
+    codigo: str = PydField(..., min_length=1, max_length=40)
+
+class CuponCreateInput(BaseModel):
+    codigo: str = PydField(..., min_length=3, max_length=40)
+    tipo: Literal["porcentaje", "monto"] = "porcentaje"
+    valor: float = PydField(..., gt=0)  # % (hasta 100) o monto en CLP
+    subtotal_minimo: float = PydField(0, ge=0)
+    productos: Optional[List[int]] = None  # Alcance por producto; junto con `tipos` basta cumplir uno
+    tipos: Optional[List[str]] = None
+    usos_max: Optional[int] = PydField(None, ge=1)
+    usos_por_usuario: Optional[int] = PydField(None, ge=1)
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    activo: bool = True
+
+class CuponUpdateInput(BaseModel):
+    """Solo se aplican los campos enviados (null quita la restricción)."""
+    codigo: Optional[str] = PydField(None, min_length=3, max_length=40)
+    tipo: Optional[Literal["porcentaje", "monto"]] = None
+    valor: Optional[float] = PydField(None, gt=0)
+    subtotal_minimo: Optional[float] = PydField(None, ge=0)
+    productos: Optional[List[int]] = None
+    tipos: Optional[List[str]] = None
+    usos_max: Optional[int] = PydField(None, ge=1)
+    usos_por_usuario: Optional[int] = PydField(None, ge=1)
+    desde: Optional[datetime] = None
+    hasta: Optional[datetime] = None
+    activo: Optional[bool] = None
+
+# DTOs: Pedidos (Diagrama 9)
+class CancelarInput(BaseModel):
+    motivo: str
+
+class CambioEstadoInput(BaseModel):
+    estado: str
+    motivo: Optional[str] = None
+# (Diagramas 11 y 14 no tienen DTO de entrada)
+
+# DTOs: Pagos (Diagrama 10)
+class IniciarPagoInput(BaseModel):
+    pedidoId: str
+    metodoPago: str
+
+# DTOs: Documentos (Diagrama 12)
+class EnviarBoletaInput(BaseModel):
+    pedidoId: str
+
+# DTOs: Reportes (Diagramas 15, 16)
+class ReporteInput(BaseModel):
+    fechaInicio: date
+    fechaFin: date
+
+class ExportarInput(BaseModel):
+    fechaInicio: date
+    fechaFin: date
+    formato: str
+
+# DTOs: Notificaciones (Diagrama 20)
+class NotificacionOfertaInput(BaseModel):
+    titulo: str
+    mensaje: str
+    segmento: str  # todos | compradores:<tipo> | con_puntos | inactivos[:dias]
+    canal: str = "email"
+
+# DTOs: Pedidos (checkout)
+class PedidoInput(BaseModel):
+    name: Optional[str] = None
+    email: Optional[EmailStr] = None
+    address: Optional[str] = None
+    city: Optional[str] = None
+    phone: Optional[str] = None
+    cupon: Optional[str] = None  # Código validado antes con /api/carrito/aplicar-cupon
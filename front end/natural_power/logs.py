@@ -0,0 +1,122 @@
+# logs.py
+# Logging estructurado de la API.
+
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Optional
+
+from . import config  # noqa: F401  (carga .env antes de leer LOG_*)
+
+# Los handlers encolan el registro (QueueHandler) y un hilo aparte (QueueListener)
+# lo formatea y escribe, así el event loop nunca espera por stdout. Los mensajes
+# usan formato perezoso (%s) para no construir strings de niveles desactivados.
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json").lower()  # json | texto
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "0.1"))
+# Loggers de rutas de alto volumen: sus DEBUG/INFO se muestrean con LOG_SAMPLE_RATE
+LOGGERS_MUESTREADOS = {"natural_power.productos", "natural_power.carrito"}
+
+request_id_actual: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+class ContextoLogFilter(logging.Filter):
+    """Agrega el request_id de la petición en curso y muestrea rutas de alto volumen."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if (record.name in LOGGERS_MUESTREADOS and record.levelno < logging.WARNING
+                and random.random() >= LOG_SAMPLE_RATE):
+            return False
+        record.request_id = request_id_actual.get()
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    CAMPOS_ESTANDAR = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "request_id": getattr(record, "request_id", "-"),
+            "msg": record.getMessage(),
+        }
+        # Campos pasados con extra={...}
+        for clave, valor in vars(record).items():
+            if clave not in self.CAMPOS_ESTANDAR:
+                data[clave] = valor
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data["exc"] = record.exc_text
+        return json.dumps(data, ensure_ascii=False, default=str)
+
+
+class ColaHandler(logging.handlers.QueueHandler):
+    """QueueHandler que conserva la excepción y los campos extra para el formatter.
+
+    El prepare() de la librería formatea el registro completo con el formatter
+    por defecto (la traza queda pegada al mensaje) y borra exc_info, así que
+    JsonFormatter ya no podía emitir "exc". Aquí solo se resuelven los %s y se
+    pasa la traza a exc_text; el formato final sigue en el hilo del listener.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = record.exc_text or _FORMATO_EXC.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+_FORMATO_EXC = logging.Formatter()
+
+
+def configurar_logging() -> None:
+    raiz = logging.getLogger("natural_power")
+    if getattr(raiz, "_np_configurado", False):
+        return
+    raiz.setLevel(LOG_LEVEL)
+    raiz.propagate = False
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    salida = logging.StreamHandler()
+    if LOG_FORMAT == "json":
+        salida.setFormatter(JsonFormatter())
+    else:
+        salida.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s [%(request_id)s] %(message)s"))
+    listener = logging.handlers.QueueListener(cola, salida, respect_handler_level=True)
+    handler = ColaHandler(cola)
+    handler.addFilter(ContextoLogFilter())
+    raiz.addHandler(handler)
+    listener.start()
+    atexit.register(listener.stop)
+    raiz._np_configurado = True  # type: ignore[attr-defined]
+
+
+def enmascarar_email(email: Optional[str]) -> str:
+    """b***@gmail.com: suficiente para correlacionar sin dejar datos personales en los logs"""
+    if not email or "@" not in email:
+        return "-"
+    usuario, dominio = email.split("@", 1)
+    return f"{usuario[:1]}***@{dominio}"
+
+
+configurar_logging()
+log = logging.getLogger("natural_power")
+log_auth = logging.getLogger("natural_power.auth")
+log_productos = logging.getLogger("natural_power.productos")
+log_carrito = logging.getLogger("natural_power.carrito")
+log_pedidos = logging.getLogger("natural_power.pedidos")
+log_mail = logging.getLogger("natural_power.mail")
+log_pagos = logging.getLogger("natural_power.pagos")
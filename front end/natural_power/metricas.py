@@ -0,0 +1,169 @@
+# metricas.py
+# Métricas en memoria (formato Prometheus en /api/metrics).
+
+import time as time_mod
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from .db import engine
+
+# Los registros los escribe solo el hilo del event loop (middleware y tareas
+# async), así que no necesitan locks. Las consultas SQL que corren en el
+# threadpool se acumulan en el contexto de su propia petición y se vuelcan al
+# registro cuando la petición termina.
+
+LATENCIA_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONSULTAS_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+# Montajes de archivos estáticos: una serie por montaje, no por archivo
+PREFIJOS_ESTATICOS = ("/static", "/imagenes", "/app")
+
+
+class Histograma:
+    __slots__ = ("buckets", "conteos", "suma", "total")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.conteos = [0] * (len(buckets) + 1)
+        self.suma = 0.0
+        self.total = 0
+
+    def observar(self, valor: float) -> None:
+        self.conteos[bisect_left(self.buckets, valor)] += 1
+        self.suma += valor
+        self.total += 1
+
+
+class ContextoPeticion:
+    """Datos acumulados durante una petición (consultas SQL y su duración)."""
+    __slots__ = ("consultas", "tiempo_db", "sentencias", "max_sentencias")
+
+    def __init__(self) -> None:
+        self.consultas = 0
+        self.tiempo_db = 0.0
+        # Solo con el perfilado activo: las primeras max_sentencias con su duración
+        self.sentencias: Optional[List[Tuple[str, float]]] = None
+        self.max_sentencias = 0
+
+
+contexto_peticion: ContextVar[Optional[ContextoPeticion]] = ContextVar("contexto_peticion", default=None)
+
+
+class RegistroMetricas:
+    def __init__(self) -> None:
+        self.peticiones: Dict[Tuple[str, str, int], int] = {}
+        self.latencia: Dict[Tuple[str, str], Histograma] = {}
+        self.consultas_db: Dict[Tuple[str, str], Histograma] = {}
+        self.tiempo_db: Dict[Tuple[str, str], Histograma] = {}
+        self.en_curso: Dict[str, int] = {}
+        self.estaticos: Dict[str, int] = {}
+        self.cache: Dict[str, List[int]] = {}
+        self.rechazos: Dict[Tuple[str, str], int] = {}
+        self.gauges: Dict[str, Tuple[str, Callable[[], float]]] = {}
+
+    def registrar_peticion(self, metodo: str, ruta: str, codigo: int, duracion: float, ctx: ContextoPeticion) -> None:
+        clave = (metodo, ruta)
+        self.peticiones[(metodo, ruta, codigo)] = self.peticiones.get((metodo, ruta, codigo), 0) + 1
+        h = self.latencia.get(clave)
+        if h is None:
+            h = self.latencia[clave] = Histograma(LATENCIA_BUCKETS)
+            self.consultas_db[clave] = Histograma(CONSULTAS_BUCKETS)
+            self.tiempo_db[clave] = Histograma(LATENCIA_BUCKETS)
+        h.observar(duracion)
+        self.consultas_db[clave].observar(ctx.consultas)
+        self.tiempo_db[clave].observar(ctx.tiempo_db)
+
+    def peticion_estatica(self, path: str) -> None:
+        """Un contador por montaje: sin histogramas ni contexto para cada archivo servido."""
+        for prefijo in PREFIJOS_ESTATICOS:
+            if path.startswith(prefijo):
+                self.estaticos[prefijo] = self.estaticos.get(prefijo, 0) + 1
+                return
+
+    def cache_acceso(self, nombre: str, acierto: bool) -> None:
+        c = self.cache.get(nombre)
+        if c is None:
+            c = self.cache[nombre] = [0, 0]
+        c[0 if acierto else 1] += 1
+
+    def rechazo_admision(self, clase: str, motivo: str) -> None:
+        self.rechazos[(clase, motivo)] = self.rechazos.get((clase, motivo), 0) + 1
+
+    def gauge(self, nombre: str, ayuda: str, leer: Callable[[], float]) -> None:
+        self.gauges[nombre] = (ayuda, leer)
+
+    @staticmethod
+    def _etiquetas(**kw: Any) -> str:
+        return "{" + ",".join(f'{k}="{str(v)}"' for k, v in kw.items()) + "}"
+
+    def _exportar_histograma(self, nombre: str, datos: Dict[Tuple[str, str], Histograma], lineas: List[str]) -> None:
+        lineas.append(f"# TYPE {nombre} histogram")
+        for (metodo, ruta), h in datos.items():
+            acumulado = 0
+            for limite, n in zip(h.buckets, h.conteos):
+                acumulado += n
+                lineas.append(f"{nombre}_bucket{self._etiquetas(method=metodo, route=ruta, le=limite)} {acumulado}")
+            lineas.append(f"{nombre}_bucket{self._etiquetas(method=metodo, route=ruta, le='+Inf')} {h.total}")
+            lineas.append(f"{nombre}_sum{self._etiquetas(method=metodo, route=ruta)} {h.suma}")
+            lineas.append(f"{nombre}_count{self._etiquetas(method=metodo, route=ruta)} {h.total}")
+
+    def exportar(self) -> str:
+        lineas = ["# TYPE np_http_requests_total counter"]
+        for (metodo, ruta, codigo), n in self.peticiones.items():
+            lineas.append(f"np_http_requests_total{self._etiquetas(method=metodo, route=ruta, status=codigo)} {n}")
+        self._exportar_histograma("np_http_request_duration_seconds", self.latencia, lineas)
+        self._exportar_histograma("np_db_queries_per_request", self.consultas_db, lineas)
+        self._exportar_histograma("np_db_time_per_request_seconds", self.tiempo_db, lineas)
+        lineas.append("# TYPE np_http_requests_in_flight gauge")
+        for ruta, n in self.en_curso.items():
+            lineas.append(f"np_http_requests_in_flight{self._etiquetas(route=ruta)} {n}")
+        lineas.append("# TYPE np_http_static_requests_total counter")
+        for prefijo, n in self.estaticos.items():
+            lineas.append(f"np_http_static_requests_total{self._etiquetas(mount=prefijo)} {n}")
+        lineas.append("# TYPE np_cache_hits_total counter")
+        lineas.append("# TYPE np_cache_misses_total counter")
+        for nombre, (hits, misses) in self.cache.items():
+            lineas.append(f"np_cache_hits_total{self._etiquetas(cache=nombre)} {hits}")
+            lineas.append(f"np_cache_misses_total{self._etiquetas(cache=nombre)} {misses}")
+        lineas.append("# TYPE np_admission_rejected_total counter")
+        for (clase, motivo), n in self.rechazos.items():
+            lineas.append(f"np_admission_rejected_total{self._etiquetas(route_class=clase, reason=motivo)} {n}")
+        for nombre, (ayuda, leer) in self.gauges.items():
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} gauge")
+            lineas.append(f"{nombre} {leer()}")
+        return "\n".join(lineas) + "\n"
+
+
+metricas = RegistroMetricas()
+
+
+@event.listens_for(engine, "before_cursor_execute")
+def _db_antes(conn, cursor, statement, parameters, context, executemany):
+    context._np_t0 = time_mod.perf_counter()
+
+
+@event.listens_for(engine, "after_cursor_execute")
+def _db_despues(conn, cursor, statement, parameters, context, executemany):
+    ctx = contexto_peticion.get()
+    if ctx is None:
+        return
+    duracion = time_mod.perf_counter() - context._np_t0
+    ctx.consultas += 1
+    ctx.tiempo_db += duracion
+    if ctx.sentencias is not None and len(ctx.sentencias) < ctx.max_sentencias:
+        ctx.sentencias.append((statement, duracion))
+
+
+def plantilla_ruta(scope: Dict[str, Any]) -> str:
+    """Ruta parametrizada (p. ej. /api/pedidos/{id}) para no crear una serie por id."""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return route.path
+    path = scope.get("path", "")
+    for prefijo in PREFIJOS_ESTATICOS:
+        if path.startswith(prefijo):
+            return prefijo
+    return "sin_ruta"
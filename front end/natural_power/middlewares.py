@@ -0,0 +1,129 @@
+# middlewares.py
+# Middlewares ASGI: métricas, request id y actividad de usuarios.
+
+import time as time_mod
+import uuid
+from typing import Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logs import request_id_actual
+from .metricas import PREFIJOS_ESTATICOS, ContextoPeticion, contexto_peticion, metricas, plantilla_ruta
+from .seguridad import extraer_email_del_header
+from .servicios.actividad import encolar_actividad
+
+# Middlewares ASGI puros (sin BaseHTTPMiddleware): no crean una tarea ni
+# envuelven el cuerpo de la respuesta, así que el streaming (SSE, archivos)
+# pasa tal cual. Cada uno mira solo el path y los headers que necesita, y las
+# peticiones que no le interesan (archivos estáticos, /app) pasan sin trabajo.
+
+# Rutas de /api sin usuario que registrar (el token aún no existe o no se usa)
+_SIN_ACTIVIDAD = ("/api/auth/login", "/api/auth/recuperar")
+
+
+def header(scope: Scope, nombre: bytes) -> Optional[str]:
+    """Valor de un header de la petición (`nombre` en minúsculas) o None."""
+    for clave, valor in scope["headers"]:
+        if clave == nombre:
+            return valor.decode("latin-1")
+    return None
+
+
+def es_estatico(path: str) -> bool:
+    return path.startswith(PREFIJOS_ESTATICOS)
+
+
+class ActivityTrackingMiddleware:
+    """Registra las peticiones autenticadas a /api (se escriben por lotes, ver servicios/actividad.py)."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith("/api/") or scope["path"].startswith(_SIN_ACTIVIDAD):
+            await self.app(scope, receive, send)
+            return
+        autorizacion = header(scope, b"authorization")
+        if not autorizacion:
+            await self.app(scope, receive, send)
+            return
+
+        codigo = 500
+
+        async def enviar(message: Message) -> None:
+            nonlocal codigo
+            if message["type"] == "http.response.start":
+                codigo = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            email = extraer_email_del_header(autorizacion)
+            if email:
+                encolar_actividad(email, f"{scope['method']} {scope['path']}", f"Status: {codigo}")
+
+
+class MetricsMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        path = scope["path"]
+        if es_estatico(path):
+            # Archivos estáticos: solo se cuentan, sin contexto, reloj ni histogramas
+            metricas.peticion_estatica(path)
+            await self.app(scope, receive, send)
+            return
+        ctx = ContextoPeticion()
+        token_ctx = contexto_peticion.set(ctx)
+        inicio = time_mod.perf_counter()
+        # Antes del ruteo no se conoce la plantilla: agrupar por recurso (/api/<recurso>)
+        ruta_curso = "/".join(path.split("/")[:3]) if path.startswith("/api/") else "otros"
+        en_curso = metricas.en_curso
+        en_curso[ruta_curso] = en_curso.get(ruta_curso, 0) + 1
+        codigo = 500
+
+        async def enviar(message: Message) -> None:
+            nonlocal codigo
+            if message["type"] == "http.response.start":
+                codigo = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            en_curso[ruta_curso] -= 1
+            if not en_curso[ruta_curso]:
+                del en_curso[ruta_curso]
+            metricas.registrar_peticion(scope["method"], plantilla_ruta(scope), codigo,
+                                        time_mod.perf_counter() - inicio, ctx)
+            contexto_peticion.reset(token_ctx)
+
+
+class RequestIdMiddleware:
+    """Asigna un request id (o respeta X-Request-ID entrante) para correlacionar logs."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or es_estatico(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        request_id = header(scope, b"x-request-id") or uuid.uuid4().hex[:16]
+        encabezado = (b"x-request-id", request_id.encode("latin-1"))
+
+        async def enviar(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", ()), encabezado]
+            await send(message)
+
+        token_ctx = request_id_actual.set(request_id)
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            request_id_actual.reset(token_ctx)
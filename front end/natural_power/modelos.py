@@ -0,0 +1,261 @@
+# modelos.py
+# Modelos de persistencia (SQLModel).
+
+from datetime import date, datetime, timezone
+from typing import Optional
+
+from sqlalchemy import Index
+from sqlmodel import SQLModel, Field
+
+class Product(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nombre: str
+    descripcion: Optional[str] = None
+    precio: float
+    image: Optional[str] = None
+    stock: int = 0
+    tipo: Optional[str] = None
+    vendidos: int = 0
+
+
+class User(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nombre: str
+    email: str
+    hashed_password: str
+    direccion: Optional[str] = None
+
+
+class CartItem(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_email: Optional[str] = Field(default=None, index=True)
+    product_id: int
+    name: str
+    price: float
+    image: Optional[str] = None
+    description: Optional[str] = None
+    quantity: int = 1
+    receta: Optional[str] = None  # Jugos personalizados: JSON {"base": id, "ingredientes": [ids]}
+
+
+class CartSummary(SQLModel, table=True):
+    """Totales del carrito de un usuario; los mantienen triggers sobre cartitem (ver db.py)"""
+    user_email: str = Field(primary_key=True)
+    lineas: int = 0
+    unidades: int = 0
+    subtotal: float = 0.0
+
+
+class Order(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_email: Optional[str] = None
+    total: float = 0.0
+    estado: str = Field(default="pendiente", index=True)  # Estado actual (ver TRANSICIONES_PEDIDO)
+    stock_descontado: bool = False
+    created_at: datetime = Field(default_factory=datetime.utcnow)
+
+
+class OrderItem(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: int = Field(index=True)
+    product_id: int
+    name: str
+    price: float
+    quantity: int
+
+
+class OrderStatusEvent(SQLModel, table=True):
+    """Historial append-only de cambios de estado de un pedido"""
+    __table_args__ = (
+        Index("ix_orderstatusevent_order_id", "order_id", "id"),
+        Index("ix_orderstatusevent_estado", "estado", "created_at"),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: int
+    estado_anterior: Optional[str] = None
+    estado: str
+    motivo: Optional[str] = None
+    actor: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class UserSession(SQLModel, table=True):
+    """Tabla para rastrear sesiones activas y actividad del usuario"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_email: str
+    token: str
+    login_time: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    last_activity: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    ip_address: Optional[str] = None
+    is_active: bool = True
+
+
+class UserActivity(SQLModel, table=True):
+    """Tabla para registrar todas las acciones del usuario"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_email: str
+    action: str
+    details: Optional[str] = None
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    ip_address: Optional[str] = None
+
+
+class PasswordResetToken(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    email: str
+    token_hash: str
+    expira: datetime
+    usado: bool = False
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class OutboundEmail(SQLModel, table=True):
+    """Cola persistente de correos salientes (la procesa un worker en segundo plano)"""
+    __table_args__ = (Index("ix_outboundemail_estado_proximo", "estado", "proximo_intento"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    to_email: str
+    plantilla: str
+    asunto: str
+    cuerpo: str
+    estado: str = "pendiente"  # pendiente | enviando | enviado | fallido | omitido
+    intentos: int = 0
+    lote: Optional[str] = None  # Marca del worker que tomó el correo
+    reclamado_at: Optional[datetime] = None  # Cuándo lo tomó (vence tras MAIL_LEASE_SECONDS)
+    proximo_intento: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    ultimo_error: Optional[str] = None
+    adjunto_path: Optional[str] = None  # PDF adjunto (p. ej. boletas)
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    enviado_at: Optional[datetime] = None
+
+
+class LoyaltyPoint(SQLModel, table=True):
+    """Movimientos de puntos de lealtad (positivos al acumular, negativos al canjear)"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_email: str = Field(index=True)
+    puntos: int
+    motivo: Optional[str] = None
+    order_id: Optional[int] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class OfferCampaign(SQLModel, table=True):
+    """Campaña de ofertas enviada a un segmento de clientes"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    titulo: str
+    mensaje: str
+    segmento: str
+    canal: str = "email"
+    estado: str = "en_cola"  # en_cola | enviando | completada | fallida
+    total: int = 0
+    enviados: int = 0
+    fallidos: int = 0
+    creada_por: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    finished_at: Optional[datetime] = None
+
+
+class OfferDelivery(SQLModel, table=True):
+    """Cola de entregas de una campaña: una fila por destinatario"""
+    __table_args__ = (
+        Index("ix_offerdelivery_campana_estado", "campaign_id", "estado", "id"),
+        # Un destinatario recibe cada campaña una sola vez
+        Index("ux_offerdelivery_campana_email", "campaign_id", "user_email", unique=True),
+    )
+    id: Optional[int] = Field(default=None, primary_key=True)
+    campaign_id: int
+    user_email: str
+    canal: str = "email"
+    estado: str = "pendiente"  # pendiente | enviando | enviado | fallido
+    reclamado_at: Optional[datetime] = None  # Cuándo la tomó un worker (vence tras NOTIF_LEASE_SECONDS)
+    ultimo_error: Optional[str] = None
+
+
+class PaymentEvent(SQLModel, table=True):
+    """Notificaciones recibidas de MercadoPago (una fila por clave de idempotencia)"""
+    __table_args__ = (Index("ix_paymentevent_estado_proximo", "estado", "proximo_intento"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    idempotency_key: str = Field(unique=True)
+    tipo: str
+    data_id: str
+    payload: str
+    estado: str = "pendiente"  # pendiente | procesando | procesado | error
+    reclamado_at: Optional[datetime] = None  # Cuándo la tomó un worker (vence tras PAGOS_LEASE_SECONDS)
+    intentos: int = 0
+    ultimo_error: Optional[str] = None
+    proximo_intento: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    processed_at: Optional[datetime] = None
+
+
+class Boleta(SQLModel, table=True):
+    """Boleta emitida para un pedido; el PDF se guarda en disco por su sha256"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    order_id: int = Field(index=True, unique=True)
+    numero: str
+    sha256: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Coupon(SQLModel, table=True):
+    """Cupón de descuento; las reglas se compilan y cachean por código (ver servicios/cupones.py)"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    codigo: str = Field(unique=True)  # En mayúsculas
+    tipo: str = "porcentaje"  # porcentaje | monto
+    valor: float
+    subtotal_minimo: float = 0.0
+    productos: Optional[str] = None  # Ids separados por coma; None = sin restricción
+    tipos: Optional[str] = None  # Tipos de producto separados por coma; None = sin restricción
+    usos: int = 0
+    usos_max: Optional[int] = None  # Tope global
+    usos_por_usuario: Optional[int] = None
+    desde: Optional[datetime] = None  # UTC
+    hasta: Optional[datetime] = None  # UTC
+    activo: bool = True
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class CouponRedemption(SQLModel, table=True):
+    """Uso de un cupón en un pedido"""
+    __table_args__ = (Index("ix_couponredemption_cupon_usuario", "coupon_id", "user_email"),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    coupon_id: int
+    user_email: str
+    order_id: int = Field(index=True)
+    descuento: float
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class Ingredient(SQLModel, table=True):
+    """Base o ingrediente de "Crea tu jugo"; el stock se cuenta en porciones"""
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nombre: str = Field(unique=True)
+    categoria: str = "ingrediente"  # base | ingrediente
+    precio: float
+    stock: int = 0
+    activo: bool = True
+
+
+class ProductDailySales(SQLModel, table=True):
+    """Unidades vendidas por producto y día (UTC), agregadas de forma incremental (ver servicios/pronostico.py)"""
+    product_id: int = Field(primary_key=True)
+    dia: date = Field(primary_key=True)
+    unidades: int = 0
+
+
+class JobCheckpoint(SQLModel, table=True):
+    """Hasta dónde procesó un job incremental (p. ej. el último id de pedido leído)"""
+    nombre: str = Field(primary_key=True)
+    valor: int = 0
+
+
+class IdempotencyRecord(SQLModel, table=True):
+    """Respuesta guardada de una petición con Idempotency-Key (ver servicios/idempotencia.py)"""
+    __table_args__ = (Index("ix_idempotencyrecord_alcance_clave", "alcance", "clave", unique=True),)
+    id: Optional[int] = Field(default=None, primary_key=True)
+    alcance: str  # Endpoint y usuario: la misma clave de dos usuarios no choca
+    clave: str
+    huella: str  # sha256 del cuerpo de la petición
+    estado: str = "en_curso"  # en_curso | completado
+    respuesta: Optional[str] = None  # JSON {"status", "body"}
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expira: datetime = Field(index=True)
@@ -0,0 +1,138 @@
+# perfilado.py
+# Perfilado opcional de peticiones lentas.
+
+import os
+import sys
+import threading
+import time as time_mod
+from collections import Counter, deque
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from .logs import log, request_id_actual
+from .metricas import PREFIJOS_ESTATICOS, contexto_peticion, plantilla_ruta
+
+# Con PROFILING_ENABLED=1 se guardan en un ring buffer las peticiones que superan
+# PROFILING_THRESHOLD_MS: SQL ejecutado con tiempos, wall/CPU del handler y, con
+# PROFILING_STACKS=1, pilas muestreadas. Desactivado no se instala el middleware.
+# Las respuestas en streaming (SSE, exportaciones) no se perfilan: su duración es
+# la de la conexión abierta, no la del trabajo del servidor.
+
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "0").strip().lower() in ("1", "true", "si")
+PROFILING_THRESHOLD_MS = float(os.getenv("PROFILING_THRESHOLD_MS", "500"))
+PROFILING_MAX_TRAZAS = int(os.getenv("PROFILING_MAX_TRAZAS", "50"))
+PROFILING_STACKS = os.getenv("PROFILING_STACKS", "0").strip().lower() in ("1", "true", "si")
+PROFILING_SAMPLE_MS = float(os.getenv("PROFILING_SAMPLE_MS", "5"))
+PROFILING_MAX_SENTENCIAS = int(os.getenv("PROFILING_MAX_SENTENCIAS", "200"))
+
+_trazas_lentas: "deque[Dict[str, Any]]" = deque(maxlen=PROFILING_MAX_TRAZAS)
+_trazas_seq = 0
+_perfiles_activos: Dict[int, "Counter[str]"] = {}
+_perfiles_lock = threading.Lock()
+_muestreador: Optional[threading.Thread] = None
+
+
+def trazas_recientes(limite: int) -> List[Dict[str, Any]]:
+    """Últimas trazas capturadas, más recientes primero."""
+    return list(reversed(_trazas_lentas))[:limite]
+
+
+def _pila_colapsada(frame: Any, profundidad: int = 20) -> str:
+    partes = []
+    while frame is not None and len(partes) < profundidad:
+        code = frame.f_code
+        partes.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+        frame = frame.f_back
+    return ";".join(reversed(partes))
+
+
+# Hilos bloqueados esperando trabajo: no aportan información a la traza
+_FUNCIONES_OCIOSAS = {"wait", "dequeue", "get", "select", "sleep", "poll", "accept", "acquire", "_worker", "_bucle_muestreador"}
+
+
+def _bucle_muestreador() -> None:
+    """Muestrea las pilas de todos los hilos mientras haya peticiones perfiladas en curso."""
+    propio = threading.get_ident()
+    while True:
+        time_mod.sleep(PROFILING_SAMPLE_MS / 1000.0)
+        if not _perfiles_activos:
+            continue
+        pilas = [
+            _pila_colapsada(f) for tid, f in sys._current_frames().items()
+            if tid != propio and f.f_code.co_name not in _FUNCIONES_OCIOSAS
+        ]
+        with _perfiles_lock:
+            for muestras in _perfiles_activos.values():
+                muestras.update(pilas)
+
+
+class ProfilingMiddleware:
+    """Debe ir dentro de MetricsMiddleware: reutiliza su ContextoPeticion."""
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        global _trazas_seq, _muestreador
+        ctx = contexto_peticion.get()
+        if scope["type"] != "http" or ctx is None or scope["path"].startswith(PREFIJOS_ESTATICOS):
+            await self.app(scope, receive, send)
+            return
+        ctx.sentencias = []
+        ctx.max_sentencias = PROFILING_MAX_SENTENCIAS
+        clave = id(ctx)
+        if PROFILING_STACKS:
+            if _muestreador is None:
+                _muestreador = threading.Thread(target=_bucle_muestreador, name="profiler", daemon=True)
+                _muestreador.start()
+            with _perfiles_lock:
+                _perfiles_activos[clave] = Counter()
+        wall0 = time_mod.perf_counter()
+        cpu0 = time_mod.process_time()
+        codigo = 500
+        streaming = False
+
+        async def enviar(message: Message) -> None:
+            nonlocal codigo, streaming
+            if message["type"] == "http.response.start":
+                codigo = message["status"]
+                tipo = dict(message.get("headers", [])).get(b"content-type", b"")
+                streaming = tipo.startswith(b"text/event-stream")
+            elif message.get("more_body"):
+                streaming = True  # StreamingResponse / FileResponse: el cuerpo va por partes
+            if streaming and ctx.sentencias is not None:
+                # Se deja de acumular SQL y pilas mientras la conexión siga abierta
+                ctx.sentencias = None
+                with _perfiles_lock:
+                    _perfiles_activos.pop(clave, None)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            wall_ms = (time_mod.perf_counter() - wall0) * 1000
+            cpu_ms = (time_mod.process_time() - cpu0) * 1000
+            with _perfiles_lock:
+                muestras = _perfiles_activos.pop(clave, None)
+            if wall_ms >= PROFILING_THRESHOLD_MS and not streaming:
+                _trazas_seq += 1
+                _trazas_lentas.append({
+                    "id": _trazas_seq,
+                    "fecha": datetime.now(timezone.utc).isoformat(),
+                    "request_id": request_id_actual.get(),
+                    "metodo": scope["method"],
+                    "ruta": plantilla_ruta(scope),
+                    "path": scope["path"],
+                    "status": codigo,
+                    "wall_ms": round(wall_ms, 2),
+                    # CPU de todo el proceso durante la petición (incluye peticiones concurrentes)
+                    "cpu_ms": round(cpu_ms, 2),
+                    "consultas": ctx.consultas,
+                    "tiempo_db_ms": round(ctx.tiempo_db * 1000, 2),
+                    "sentencias": [{"sql": sql, "ms": round(d * 1000, 3)} for sql, d in ctx.sentencias],
+                    "sentencias_omitidas": max(0, ctx.consultas - len(ctx.sentencias)),
+                    "pilas": [{"pila": p, "muestras": n} for p, n in muestras.most_common(20)] if muestras else [],
+                })
+                log.info("Petición lenta %s %s: %.0f ms (%s consultas)", scope["method"], scope["path"], wall_ms, ctx.consultas)
@@ -0,0 +1,2 @@
+# routers
+# Un APIRouter por área; natural_power.app los incluye en orden.
@@ -0,0 +1,292 @@
+# admin.py
+# Endpoints: Admin (/api/admin). Todas las rutas exigen un usuario admin.
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Path, Query, Request, status
+from fastapi import Response as RespuestaHTTP
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from ..config import NUMPY_AVAILABLE
+from ..db import engine
+from ..dependencias import admin_actual, obtener_sesion
+from ..esquemas import (CambioEstadoInput, CuponCreateInput, CuponUpdateInput, ExportarProductosInput,
+                        ImportarProductosInput, IngredienteCreateInput, IngredienteUpdateInput, ListadoInput,
+                        ProductoCreateInput, ProductoUpdateInput, PronosticoInput, Response)
+from ..logs import log_productos
+from ..modelos import Coupon, Ingredient, Order, Product, User
+from ..perfilado import PROFILING_ENABLED, PROFILING_THRESHOLD_MS, trazas_recientes
+from ..servicios.cupones import actualizar_cupon, crear_cupon, cupon_a_dict
+from ..servicios.inventario import (ArchivoDemasiadoGrande, ImportacionRechazada, aplicar_importacion, exportar_productos,
+                                    validar_importacion)
+from ..servicios.lecturas import dashboard, pronostico_stock
+from ..servicios.jugos import actualizar_ingrediente, crear_ingrediente, ingrediente_a_dict
+from ..servicios.paginacion import contar, encabezados_pagina, pagina_keyset, parsear_campos, recortar
+from ..servicios.pedidos import ESTADOS_ABIERTOS, TransicionInvalida, cambiar_estado_pedido, evento_a_dict
+from ..servicios.productos import CAMPOS_ADMIN, actualizar_producto, crear_producto, eliminar_producto, producto_admin
+from ..servicios.pronostico import alertas_stock
+
+router = APIRouter(prefix="/api/admin", tags=["Admin"], dependencies=[Depends(admin_actual)])
+
+# Los listados se paginan por cursor (header X-Next-Cursor) y aceptan ?fields= y ?total=1
+CAMPOS_USUARIO = ("id", "nombre", "email", "registered", "status")
+CAMPOS_PEDIDO = ("id", "user_email", "total", "estado", "created_at")
+CAMPOS_CUPON = ("id", "codigo", "tipo", "valor", "subtotal_minimo", "productos", "tipos", "usos", "usos_max",
+                "usos_por_usuario", "desde", "hasta", "activo")
+
+TIPOS_EXPORTACION = {"csv": "text/csv; charset=utf-8", "jsonl": "application/x-ndjson"}
+
+
+def _formato_por_content_type(content_type: str) -> Optional[str]:
+    if "csv" in content_type:
+        return "csv"
+    if "ndjson" in content_type or "jsonl" in content_type:
+        return "jsonl"
+    return None
+
+
+def _usuario_admin(u: User) -> Dict[str, Any]:
+    return {
+        "id": u.id,
+        "nombre": u.nombre,
+        "email": u.email,
+        "registered": u.id,  # Usar id como proxy para orden de registro
+        "status": "Activo",
+    }
+
+
+def _pedido_admin(o: Order) -> Dict[str, Any]:
+    return {
+        "id": o.id,
+        "user_email": o.user_email,
+        "total": o.total,
+        "estado": o.estado,
+        "created_at": o.created_at.isoformat(),
+    }
+
+
+@router.get("/productos", response_model=Response)
+async def admin_get_productos(respuesta: RespuestaHTTP, params: ListadoInput = Depends(), session: Session = Depends(obtener_sesion)):
+    """Obtener los productos con stock actual para el panel admin"""
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_ADMIN)
+        productos, siguiente = pagina_keyset(session, Product, params.cursor, params.limite)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    encabezados_pagina(respuesta, siguiente, contar(session, Product) if params.total else None)
+    return Response(status=status.HTTP_200_OK, body=[recortar(producto_admin(p), campos) for p in productos])
+
+
+@router.post("/productos", response_model=Response)
+async def admin_create_producto(input: ProductoCreateInput, session: Session = Depends(obtener_sesion)):
+    """Crear nuevo producto desde el panel admin"""
+    nuevo_producto = crear_producto(session, input)
+    return Response(status=status.HTTP_201_CREATED, body=producto_admin(nuevo_producto))
+
+
+@router.post("/productos/importar", response_model=Response)
+async def admin_importar_productos(request: Request, params: ImportarProductosInput = Depends(),
+                                   session: Session = Depends(obtener_sesion)):
+    """Alta/actualización masiva desde CSV (con encabezado) o JSONL, enviado como body crudo.
+    Filas con `id` actualizan solo las columnas presentes; sin `id` crean el producto.
+    Por defecto es todo o nada: con errores no se aplica ninguna fila salvo `parcial=true`.
+    """
+    formato = params.formato or _formato_por_content_type(request.headers.get("content-type", ""))
+    if formato is None:
+        return Response(status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+                        body={"error": "Formato no soportado: use ?formato=csv o ?formato=jsonl"})
+    try:
+        resultado = await validar_importacion(session, request.stream(), formato)
+    except ArchivoDemasiadoGrande as e:
+        return Response(status=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, body={"error": str(e)})
+    if resultado.total_errores and not params.parcial:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body=resultado.resumen(aplicado=False))
+    try:
+        aplicar_importacion(session, resultado)
+    except ImportacionRechazada as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={**resultado.resumen(aplicado=False), "error": str(e)})
+    log_productos.info("Importación de productos: %s creados, %s actualizados, %s errores",
+                       resultado.creados, resultado.actualizados, resultado.total_errores)
+    return Response(status=status.HTTP_200_OK, body=resultado.resumen(aplicado=True))
+
+
+@router.get("/productos/exportar")
+async def admin_exportar_productos(params: ExportarProductosInput = Depends()):
+    """Descargar el catálogo completo en CSV o JSONL (mismas columnas que acepta la importación)"""
+    return StreamingResponse(
+        exportar_productos(params.formato),  # generador síncrono: Starlette lo recorre en el threadpool
+        media_type=TIPOS_EXPORTACION[params.formato],
+        headers={"Content-Disposition": f'attachment; filename="productos.{params.formato}"'},
+    )
+
+
+@router.put("/productos/{id}", response_model=Response)
+async def admin_update_producto(id: int = Path(..., gt=0), input: ProductoUpdateInput = Body(...),
+                                session: Session = Depends(obtener_sesion)):
+    """Actualizar un producto (campos parciales)"""
+    producto = actualizar_producto(session, id, input)
+    if not producto:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Producto no encontrado"})
+    return Response(status=status.HTTP_200_OK, body=producto_admin(producto))
+
+
+@router.delete("/productos/{id}", response_model=Response)
+async def admin_delete_producto(id: int = Path(..., gt=0), session: Session = Depends(obtener_sesion)):
+    """Eliminar un producto"""
+    if not eliminar_producto(session, id):
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Producto no encontrado"})
+    return Response(status=status.HTTP_200_OK, body={"message": f"Producto {id} eliminado"})
+
+
+@router.get("/cupones", response_model=Response)
+async def admin_get_cupones(respuesta: RespuestaHTTP, params: ListadoInput = Depends(), session: Session = Depends(obtener_sesion)):
+    """Cupones de descuento con sus reglas y usos"""
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_CUPON)
+        cupones, siguiente = pagina_keyset(session, Coupon, params.cursor, params.limite)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    encabezados_pagina(respuesta, siguiente, contar(session, Coupon) if params.total else None)
+    return Response(status=status.HTTP_200_OK, body=[recortar(cupon_a_dict(c), campos) for c in cupones])
+
+
+@router.post("/cupones", response_model=Response)
+async def admin_create_cupon(input: CuponCreateInput, session: Session = Depends(obtener_sesion)):
+    """Crear un cupón (porcentaje o monto fijo, con alcance, topes de uso y vigencia opcionales)"""
+    try:
+        cupon = crear_cupon(session, input.model_dump())
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    return Response(status=status.HTTP_201_CREATED, body=cupon_a_dict(cupon))
+
+
+@router.put("/cupones/{id}", response_model=Response)
+async def admin_update_cupon(id: int = Path(..., gt=0), input: CuponUpdateInput = Body(...),
+                             session: Session = Depends(obtener_sesion)):
+    """Editar un cupón (campos parciales; `activo: false` lo desactiva)"""
+    try:
+        cupon = actualizar_cupon(session, id, input.model_dump(exclude_unset=True))
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    if not cupon:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Cupón no encontrado"})
+    return Response(status=status.HTTP_200_OK, body=cupon_a_dict(cupon))
+
+
+@router.get("/ingredientes", response_model=Response)
+async def admin_get_ingredientes(session: Session = Depends(obtener_sesion)):
+    """Bases e ingredientes de "Crea tu jugo" (incluye los inactivos)"""
+    ingredientes = session.exec(select(Ingredient).order_by(Ingredient.categoria, Ingredient.id)).all()
+    return Response(status=status.HTTP_200_OK, body=[ingrediente_a_dict(i) for i in ingredientes])
+
+
+@router.post("/ingredientes", response_model=Response)
+async def admin_create_ingrediente(input: IngredienteCreateInput, session: Session = Depends(obtener_sesion)):
+    """Crear una base o ingrediente"""
+    try:
+        ingrediente = crear_ingrediente(session, input.model_dump())
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    return Response(status=status.HTTP_201_CREATED, body=ingrediente_a_dict(ingrediente))
+
+
+@router.put("/ingredientes/{id}", response_model=Response)
+async def admin_update_ingrediente(id: int = Path(..., gt=0), input: IngredienteUpdateInput = Body(...),
+                                   session: Session = Depends(obtener_sesion)):
+    """Editar precio, stock o disponibilidad de un ingrediente (campos parciales)"""
+    try:
+        ingrediente = actualizar_ingrediente(session, id, input.model_dump(exclude_unset=True))
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    if not ingrediente:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Ingrediente no encontrado"})
+    return Response(status=status.HTTP_200_OK, body=ingrediente_a_dict(ingrediente))
+
+
+def _calcular_pronostico_stock(estado: str, limite: int) -> Dict[str, Any]:
+    with Session(engine) as session:
+        return alertas_stock(session, estado, limite)
+
+
+@router.get("/inventario/pronostico", response_model=Response)
+async def admin_pronostico_stock(params: PronosticoInput = Depends()):
+    """Días hasta el quiebre de stock y reposición sugerida según la demanda reciente.
+    Por defecto solo los productos agotados o bajo su punto de reorden, los más urgentes primero.
+    """
+    if not NUMPY_AVAILABLE:
+        return Response(status=status.HTTP_503_SERVICE_UNAVAILABLE, body={"error": "Pronóstico no disponible en el servidor"})
+    # En un hilo y una vez por consulta en vuelo: si el pronóstico venció, recalcularlo
+    # (NumPy, bajo el lock de PronosticoDemanda) no bloquea el event loop
+    body = await pronostico_stock.obtener(("admin", params.estado, params.limite),
+                                          lambda: _calcular_pronostico_stock(params.estado, params.limite))
+    return Response(status=status.HTTP_200_OK, body=body)
+
+
+@router.get("/usuarios", response_model=Response)
+async def admin_get_usuarios(respuesta: RespuestaHTTP, params: ListadoInput = Depends(), session: Session = Depends(obtener_sesion)):
+    """Obtener los usuarios registrados para el panel admin"""
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_USUARIO)
+        usuarios, siguiente = pagina_keyset(session, User, params.cursor, params.limite)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    encabezados_pagina(respuesta, siguiente, contar(session, User) if params.total else None)
+    return Response(status=status.HTTP_200_OK, body=[recortar(_usuario_admin(u), campos) for u in usuarios])
+
+
+@router.get("/pedidos", response_model=Response)
+async def admin_get_pedidos(respuesta: RespuestaHTTP, estado: str = Query("abiertos"), limite: int = Query(50, ge=1, le=500),
+                            cursor: Optional[str] = Query(None), fields: Optional[str] = Query(None), total: bool = Query(False),
+                            session: Session = Depends(obtener_sesion)):
+    """Cola de pedidos por estado ('abiertos' = todos los no finalizados), más antiguos primero"""
+    estados = ESTADOS_ABIERTOS if estado == "abiertos" else (estado,)
+    condiciones = (Order.estado.in_(estados),)
+    try:
+        campos = parsear_campos(fields, CAMPOS_PEDIDO)
+        pedidos, siguiente = pagina_keyset(session, Order, cursor, limite, condiciones)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    encabezados_pagina(respuesta, siguiente, contar(session, Order, condiciones, clave=estado) if total else None)
+    return Response(status=status.HTTP_200_OK, body=[recortar(_pedido_admin(o), campos) for o in pedidos])
+
+
+@router.put("/pedidos/{id}/estado", response_model=Response)
+async def admin_cambiar_estado_pedido(id: int = Path(..., gt=0), input: CambioEstadoInput = Body(...),
+                                      admin_email: str = Depends(admin_actual), session: Session = Depends(obtener_sesion)):
+    """Avanzar un pedido en su ciclo de vida (pagado -> preparando -> enviado -> entregado)"""
+    try:
+        evento = cambiar_estado_pedido(session, id, input.estado, motivo=input.motivo, actor=admin_email)
+    except LookupError:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Pedido no encontrado"})
+    except TransicionInvalida as e:
+        return Response(status=status.HTTP_409_CONFLICT, body={"error": str(e)})
+    session.commit()
+    session.refresh(evento)
+    return Response(status=status.HTTP_200_OK, body={"id": id, **evento_a_dict(evento)})
+
+
+@router.get("/profiling/trazas", response_model=Response)
+async def admin_profiling_trazas(limite: int = Query(20, ge=1, le=500)):
+    """Últimas peticiones lentas capturadas (requiere PROFILING_ENABLED=1), más recientes primero"""
+    return Response(status=status.HTTP_200_OK, body={
+        "habilitado": PROFILING_ENABLED,
+        "umbral_ms": PROFILING_THRESHOLD_MS,
+        "trazas": trazas_recientes(limite),
+    })
+
+
+def _calcular_dashboard() -> Dict[str, Any]:
+    # Contar usuarios, pedidos y calcular ingresos en la base, sin traer las filas
+    with Session(engine) as session:
+        pedidos, ingresos = session.exec(select(func.count(Order.id), func.coalesce(func.sum(Order.total), 0.0))).one()
+        usuarios = session.exec(select(func.count(User.id))).one()
+    return {"revenue": float(ingresos), "orders": pedidos, "newUsers": usuarios}
+
+
+@router.get("/dashboard", response_model=Response)
+async def admin_dashboard():
+    """Obtener estadísticas del dashboard admin"""
+    # Igual para todos los admins: una sola consulta aunque lo pidan muchos a la vez
+    return Response(status=status.HTTP_200_OK, body=await dashboard.obtener(("admin",), _calcular_dashboard))
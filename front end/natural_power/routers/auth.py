@@ -0,0 +1,98 @@
+# auth.py
+# Endpoints: Autenticación (/api/auth)
+
+import os
+import secrets
+from datetime import datetime, timedelta, timezone
+
+from fastapi import APIRouter, BackgroundTasks, Body, Depends, status
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..dependencias import obtener_sesion
+from ..esquemas import LoginInput, RecuperacionInput, ResetPasswordInput, Response
+from ..logs import enmascarar_email, log_auth
+from ..modelos import PasswordResetToken, UserSession
+from ..seguridad import crear_access_token, en_pool_hash, hash_token, hashear_contraseña, verificar_contraseña
+from ..servicios.correo import despertar_worker_correo, encolar_email
+from ..servicios.usuarios import cerrar_sesiones, registrar_actividad, usuario_por_email
+
+router = APIRouter(prefix="/api/auth", tags=["Autenticación"])
+
+
+@router.post("/login", response_model=Response)
+async def auth_login(input: LoginInput = Body(...), session: Session = Depends(obtener_sesion)):
+    """Diagrama 2: Iniciar sesión - Guarda sesión y actividad"""
+    log_auth.debug("Intento de login para %s", enmascarar_email(input.email))
+    user = usuario_por_email(session, input.email)
+    if not user:
+        registrar_actividad(session, input.email, "LOGIN_FALLIDO", "Usuario no encontrado")
+        session.commit()
+        return Response(status=status.HTTP_401_UNAUTHORIZED, body={"error": "Email o contraseña incorrectos"})
+
+    if not await en_pool_hash(verificar_contraseña, input.contrasena, user.hashed_password):
+        registrar_actividad(session, input.email, "LOGIN_FALLIDO", "Contraseña incorrecta")
+        session.commit()
+        return Response(status=status.HTTP_401_UNAUTHORIZED, body={"error": "Email o contraseña incorrectos"})
+
+    # Crear token JWT y guardar la sesión activa
+    token = crear_access_token({"sub": user.email, "user_id": user.id})
+    session.add(UserSession(user_email=user.email, token=token, is_active=True))
+    registrar_actividad(session, user.email, "LOGIN_EXITOSO", f"Usuario {user.nombre} inició sesión")
+    session.commit()
+
+    return Response(status=status.HTTP_200_OK, body={
+        "token": token,
+        "usuario": {
+            "id": user.id,
+            "nombre": user.nombre,
+            "email": user.email
+        }
+    })
+
+def _enviar_enlace_recuperacion(email: str) -> None:
+    """Crea el token y encola el correo; corre después de responder (ver auth_recuperar_password)."""
+    with Session(engine) as session:
+        if not usuario_por_email(session, email):
+            return
+        token = secrets.token_urlsafe(48)
+        expira = datetime.now(timezone.utc) + timedelta(minutes=30)
+        session.add(PasswordResetToken(email=email, token_hash=hash_token(token), expira=expira, usado=False))
+        frontend_base = os.getenv("FRONTEND_BASE_URL", "http://127.0.0.1:8004/app")
+        reset_link = f"{frontend_base}/reset/?token={token}"
+        encolar_email(session, email, "reset_password", reset_link=reset_link)
+        session.commit()
+    despertar_worker_correo()
+
+@router.post("/recuperar-password", response_model=Response)
+async def auth_recuperar_password(tareas: BackgroundTasks, input: RecuperacionInput = Body(...)):
+    """Solicita un enlace de recuperación (respuesta genérica para evitar enumeración).
+
+    La búsqueda del usuario y la escritura del token van en una tarea posterior a la
+    respuesta: el tiempo de respuesta es el mismo exista o no el email.
+    """
+    tareas.add_task(_enviar_enlace_recuperacion, input.email.lower().strip())
+    return Response(status=status.HTTP_200_OK, body={"message": "Si tu correo existe, recibirás un enlace de restablecimiento"})
+
+@router.post("/reset-password", response_model=Response)
+async def auth_reset_password(input: ResetPasswordInput = Body(...), session: Session = Depends(obtener_sesion)):
+    """Restablecer contraseña usando un token de un solo uso."""
+    now = datetime.now(timezone.utc)
+    prt = session.exec(
+        select(PasswordResetToken)
+        .where(PasswordResetToken.token_hash == hash_token(input.token))
+        .order_by(PasswordResetToken.created_at.desc())
+    ).first()
+    if (not prt) or prt.usado or prt.expira < now:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Token inválido o expirado"})
+    user = usuario_por_email(session, prt.email)
+    if not user:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Token inválido o expirado"})
+    user.hashed_password = await en_pool_hash(hashear_contraseña, input.nueva_contrasena)
+    prt.usado = True
+    session.add(user)
+    session.add(prt)
+    # Revocar sesiones activas
+    cerrar_sesiones(session, user.email)
+    session.commit()
+    return Response(status=status.HTTP_200_OK, body={"message": "Contraseña actualizada"})
@@ -0,0 +1,142 @@
+# carrito.py
+# Endpoints: Carrito (/api/carrito)
+
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Path, status
+from sqlmodel import Session
+
+from ..dependencias import email_actual, obtener_sesion
+from ..esquemas import NO_AUTENTICADO, CarritoItemInput, CarritoUpdateInput, CuponInput, Response
+from ..logs import log_carrito
+from ..modelos import CartItem, Product
+from ..servicios.carrito import (
+    PRODUCTO_PERSONALIZADO,
+    StockInsuficiente,
+    agregar_personalizado,
+    agregar_producto,
+    item_a_dict,
+    items_del_carrito,
+    resumen_carrito,
+)
+from ..servicios.cupones import CuponInvalido, evaluar_cupon
+from ..servicios.jugos import RecetaInvalida
+from ..servicios.usuarios import previsualizar_canje, puntos_disponibles
+
+router = APIRouter(prefix="/api/carrito", tags=["Carrito"])
+
+
+@router.post("/items", response_model=Response)
+async def carrito_add_item(input: CarritoItemInput = Body(...), user_email: Optional[str] = Depends(email_actual),
+                           session: Session = Depends(obtener_sesion)):
+    """Añadir item al carrito (persistente) - usa user del token si está presente. Si el producto ya existe, aumenta la cantidad."""
+    log_carrito.debug("Añadiendo item al carrito: producto %s, cantidad %s", input.productoId, input.cantidad)
+
+    if input.productoId == PRODUCTO_PERSONALIZADO:
+        if input.personalizacion is None:
+            return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Falta la receta del jugo personalizado"})
+        try:
+            cart_item = agregar_personalizado(session, user_email, input.personalizacion, input.cantidad)
+        except RecetaInvalida as e:
+            return Response(status=e.status, body={"error": str(e)})
+        return Response(status=status.HTTP_201_CREATED, body={**item_a_dict(cart_item), "description": cart_item.description})
+
+    product = session.get(Product, input.productoId)
+    if not product:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Producto no encontrado"})
+    try:
+        cart_item = agregar_producto(session, user_email, product, input.cantidad)
+    except StockInsuficiente as e:
+        return Response(status=e.status, body={"error": str(e)})
+    return Response(status=status.HTTP_201_CREATED, body=item_a_dict(cart_item))
+
+
+@router.put("/items/{id}", response_model=Response)
+async def carrito_update_item(id: int = Path(...), input: CarritoUpdateInput = Body(...),
+                              user_email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Actualizar cantidad de un item del carrito (solo propietario autenticado)."""
+    if not user_email:
+        return NO_AUTENTICADO
+
+    item = session.get(CartItem, id)
+    if not item:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Item no encontrado"})
+    if item.user_email != user_email:
+        return Response(status=status.HTTP_403_FORBIDDEN, body={"error": "No autorizado"})
+
+    # Normalizar cantidad
+    try:
+        qty = int(input.cantidad)
+        if qty < 1:
+            qty = 1
+    except Exception:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Cantidad inválida"})
+
+    # Validar stock si se proporciona productoId o usar el product_id actual
+    prod_id = input.productoId if input.productoId is not None else item.product_id
+    product = session.get(Product, prod_id) if prod_id else None
+    if product and qty > product.stock:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Stock insuficiente"})
+
+    item.quantity = qty
+    if input.productoId is not None:
+        item.product_id = input.productoId
+    session.add(item)
+    session.commit()
+    session.refresh(item)
+    return Response(status=status.HTTP_200_OK, body=item_a_dict(item))
+
+@router.post("/aplicar-cupon", response_model=Response)
+async def carrito_aplicar_cupon(input: CuponInput = Body(...), user_email: Optional[str] = Depends(email_actual),
+                                session: Session = Depends(obtener_sesion)):
+    """Diagrama 18: Aplicar cupón de descuento (previsualización sobre el carrito actual).
+    El cupón se canjea al crear el pedido enviando `cupon` en POST /api/pedidos.
+    """
+    if not user_email:
+        return NO_AUTENTICADO
+    log_carrito.debug("Aplicando cupón %s", input.codigo)
+    items = items_del_carrito(session, user_email)
+    if not items:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Carrito vacío"})
+    try:
+        _, calculo = evaluar_cupon(session, input.codigo, user_email, items)
+    except CuponInvalido as e:
+        return Response(status=e.status, body={"error": str(e)})
+    return Response(status=status.HTTP_200_OK, body=calculo)
+
+
+@router.get("", response_model=Response)
+async def carrito_get_items(user_email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Obtener items del carrito para el usuario autenticado. Si no hay usuario, devuelve lista vacía."""
+    if not user_email:
+        return Response(status=status.HTTP_200_OK, body=[])
+    body = [{**item_a_dict(it), "description": it.description or ""} for it in items_del_carrito(session, user_email)]
+    return Response(status=status.HTTP_200_OK, body=body)
+
+
+@router.get("/resumen", response_model=Response)
+async def carrito_resumen(user_email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Resumen del carrito para el badge y el checkout: líneas, unidades, subtotal y descuento por puntos disponible.
+    Se lee de una sola fila que se actualiza con cada cambio del carrito; el subtotal usa los precios al agregar
+    (al crear el pedido se cobra el precio vigente).
+    """
+    if not user_email:
+        return Response(status=status.HTTP_200_OK, body={"lineas": 0, "unidades": 0, "subtotal": 0.0, "descuentos": {}})
+    resumen = resumen_carrito(session, user_email)
+    canje = previsualizar_canje(puntos_disponibles(session, user_email), resumen["subtotal"], None)
+    body = {**resumen, "descuentos": {"puntos": canje["descuento"]} if canje["descuento"] else {}}
+    return Response(status=status.HTTP_200_OK, body=body)
+
+
+@router.delete("/items/{id}", response_model=Response)
+async def carrito_delete_item(id: int = Path(...), user_email: Optional[str] = Depends(email_actual),
+                              session: Session = Depends(obtener_sesion)):
+    """Eliminar item del carrito (si pertenece al usuario autenticado)."""
+    item = session.get(CartItem, id)
+    if not item:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Item no encontrado"})
+    if item.user_email != user_email:
+        return Response(status=status.HTTP_403_FORBIDDEN, body={"error": "No autorizado"})
+    session.delete(item)
+    session.commit()
+    return Response(status=status.HTTP_200_OK, body={"deleted": id})
@@ -0,0 +1,68 @@
+# documentos.py
+# Endpoints: Documentos (/api/boletas)
+
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, HTTPException, Path, status
+from fastapi.responses import FileResponse
+from sqlmodel import Session
+
+from ..dependencias import email_actual, obtener_sesion
+from ..esquemas import NO_AUTENTICADO, EnviarBoletaInput, Response
+from ..modelos import Order
+from ..servicios.boletas import obtener_boleta
+from ..servicios.correo import despertar_worker_correo, encolar_email
+from ..servicios.pedidos import puede_ver_pedido
+
+router = APIRouter(prefix="/api/boletas", tags=["Documentos"])
+
+
+@router.post("/enviar-email", response_model=Response)
+async def documentos_enviar_boleta(input: EnviarBoletaInput = Body(...), email: Optional[str] = Depends(email_actual),
+                                   session: Session = Depends(obtener_sesion)):
+    """Diagrama 12: Generar la boleta del pedido y enviarla por email (en segundo plano)"""
+    if not email:
+        return NO_AUTENTICADO
+    try:
+        pedido_id = int(input.pedidoId)
+    except ValueError:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "pedidoId inválido"})
+    order = session.get(Order, pedido_id)
+    if not order:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Pedido no encontrado"})
+    if not puede_ver_pedido(order, email):
+        return Response(status=status.HTTP_403_FORBIDDEN, body={"error": "No autorizado"})
+    destinatario = order.user_email
+    total = float(order.total)
+
+    numero, ruta = await obtener_boleta(pedido_id)
+    email_encolado = False
+    if destinatario:
+        frontend_base = os.getenv("FRONTEND_BASE_URL", "http://127.0.0.1:8004/app")
+        encolar_email(session, destinatario, "boleta", adjunto_path=ruta, numero=numero, pedido_id=pedido_id,
+                      total=f"{total:,.0f}", cuenta_url=f"{frontend_base}/cuenta/")
+        session.commit()
+        despertar_worker_correo()
+        email_encolado = True
+    return Response(status=status.HTTP_200_OK, body={
+        "pedidoId": input.pedidoId,
+        "numero": numero,
+        "pdfUrl": f"/api/boletas/{pedido_id}/pdf",
+        "email_encolado": email_encolado,
+    })
+
+
+@router.get("/{pedido_id}/pdf")
+async def documentos_descargar_boleta(pedido_id: int = Path(..., gt=0), email: Optional[str] = Depends(email_actual),
+                                      session: Session = Depends(obtener_sesion)):
+    """Descargar el PDF de la boleta (se genera la primera vez y luego se sirve desde disco)"""
+    if not email:
+        raise HTTPException(status_code=401, detail="Autenticación requerida")
+    order = session.get(Order, pedido_id)
+    if not order:
+        raise HTTPException(status_code=404, detail="Pedido no encontrado")
+    if not puede_ver_pedido(order, email):
+        raise HTTPException(status_code=403, detail="No autorizado")
+    numero, ruta = await obtener_boleta(pedido_id)
+    return FileResponse(ruta, media_type="application/pdf", filename=f"{numero}.pdf")
@@ -0,0 +1,70 @@
+# infra.py
+# Salud, métricas, raíz y archivos sueltos (favicon, test_auth.html).
+
+import os
+import secrets
+from datetime import datetime, timezone
+from typing import Optional
+
+from fastapi import APIRouter, Header, HTTPException
+from fastapi.responses import FileResponse, PlainTextResponse
+from fastapi.responses import Response as RespuestaVacia
+
+from ..config import BASE_DIR, MP_ACCESS_TOKEN, MP_AVAILABLE
+from ..metricas import metricas
+from ..seguridad import es_admin, extraer_email_del_header
+from ..servicios.pasarela import pasarela
+
+router = APIRouter()
+
+static_dir = os.path.join(BASE_DIR, "static")
+
+# Token fijo para el scraper de Prometheus (Authorization: Bearer <token>); sin él
+# las métricas solo las ve un admin con su JWT
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "").strip()
+
+
+# Ruta para favicon.ico
+@router.get("/favicon.ico", include_in_schema=False)
+async def favicon():
+    favicon_path = os.path.join(static_dir, "favicon.ico")
+    if os.path.isfile(favicon_path):
+        return FileResponse(favicon_path, media_type="image/x-icon")
+    # Si no existe, devolver un 204 No Content en lugar de 404
+    return RespuestaVacia(status_code=204)
+
+# Ruta específica para test_auth.html
+@router.get("/test_auth.html")
+async def test_auth():
+    test_file = os.path.join(BASE_DIR, "test_auth.html")
+    if os.path.isfile(test_file):
+        return FileResponse(test_file)
+    raise HTTPException(status_code=404, detail="test_auth.html not found")
+
+# --- Endpoint de métricas (Prometheus) ---
+@router.get("/api/metrics", tags=["Infra"], include_in_schema=False)
+async def metrics_endpoint(authorization: Optional[str] = Header(None)):
+    credencial = (authorization or "").removeprefix("Bearer ").strip()
+    if not (METRICS_TOKEN and secrets.compare_digest(credencial.encode(), METRICS_TOKEN.encode())):
+        email = extraer_email_del_header(authorization)
+        if not email or not es_admin(email):
+            raise HTTPException(status_code=403, detail="Admin o METRICS_TOKEN requerido")
+    return PlainTextResponse(metricas.exportar(), media_type="text/plain; version=0.0.4")
+
+# --- Endpoint de salud ---
+@router.get("/api/health", tags=["Infra"])
+async def health():
+    return {"status": 200, "body": {
+        "ok": True,
+        "mp_available": MP_AVAILABLE,
+        "mp_configured": bool(MP_ACCESS_TOKEN),
+        "mp_circuit": pasarela.circuito.estado,
+        "time": datetime.now(timezone.utc).isoformat()
+    }}
+
+# --- Endpoint: Raíz ---
+
+@router.get("/", tags=["Root"])
+async def read_root():
+    """Endpoint de bienvenida"""
+    return {"message": "Bienvenido a la API de Natural Power (Versión Monolito)"}
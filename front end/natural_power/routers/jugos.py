@@ -0,0 +1,41 @@
+# jugos.py
+# Endpoints: Crea tu jugo (/api/jugos)
+
+from fastapi import APIRouter, Body, status
+
+from ..esquemas import CotizacionJugoInput, CotizacionLoteInput, Response
+from ..servicios.jugos import RecetaInvalida, cotizar, cotizar_lote, tabla_ingredientes
+
+router = APIRouter(prefix="/api/jugos", tags=["Crea tu jugo"])
+
+# Ninguno de estos endpoints consulta la base si la tabla de ingredientes está vigente
+
+
+@router.get("/ingredientes", response_model=Response)
+async def jugos_ingredientes():
+    """Bases e ingredientes disponibles con su precio"""
+    return Response(status=status.HTTP_200_OK, body=tabla_ingredientes.catalogo())
+
+
+@router.post("/cotizar", response_model=Response)
+async def jugos_cotizar(input: CotizacionJugoInput = Body(...)):
+    """Precio de un jugo personalizado (vista previa del armador)"""
+    try:
+        cotizacion = cotizar(input.base, input.ingredientes, input.cantidad)
+    except RecetaInvalida as e:
+        return Response(status=e.status, body={"error": str(e)})
+    return Response(status=status.HTTP_200_OK, body=cotizacion.a_dict())
+
+
+@router.post("/cotizar/lote", response_model=Response)
+async def jugos_cotizar_lote(input: CotizacionLoteInput = Body(...)):
+    """Precio de varios jugos a la vez (p. ej. un carrito con muchos personalizados).
+    El stock de cada ingrediente se reparte entre las recetas en orden; las que no
+    alcanzan traen `error` y no suman al total.
+    """
+    resultados = cotizar_lote([(r.base, r.ingredientes, r.cantidad) for r in input.recetas])
+    cotizados = [r for r in resultados if not isinstance(r, RecetaInvalida)]
+    return Response(status=status.HTTP_200_OK, body={
+        "recetas": [{"error": str(r)} if isinstance(r, RecetaInvalida) else r.a_dict() for r in resultados],
+        "total": sum(c.precio_unitario * c.cantidad for c in cotizados),
+    })
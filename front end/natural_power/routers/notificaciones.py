@@ -0,0 +1,41 @@
+# notificaciones.py
+# Endpoints: Notificaciones (/api/notificaciones)
+
+from fastapi import APIRouter, Body, Depends, Path, status
+from sqlmodel import Session
+
+from ..dependencias import admin_actual, obtener_sesion
+from ..esquemas import NotificacionOfertaInput, Response
+from ..modelos import OfferCampaign
+from ..servicios.campanas import CANALES_NOTIFICACION, consulta_segmento, lanzar_campana, progreso_campana
+
+router = APIRouter(prefix="/api/notificaciones", tags=["Notificaciones"])
+
+
+@router.post("/ofertas", response_model=Response)
+async def notificaciones_enviar_oferta(input: NotificacionOfertaInput = Body(...), admin_email: str = Depends(admin_actual),
+                                       session: Session = Depends(obtener_sesion)):
+    """Diagrama 20: Crear una campaña de ofertas; el envío corre en segundo plano"""
+    if input.canal not in CANALES_NOTIFICACION:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": f"Canal no soportado: {input.canal}"})
+    try:
+        consulta_segmento(input.segmento)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    campaign = OfferCampaign(titulo=input.titulo, mensaje=input.mensaje, segmento=input.segmento,
+                             canal=input.canal, creada_por=admin_email)
+    session.add(campaign)
+    session.commit()
+    session.refresh(campaign)
+    body = progreso_campana(campaign)
+    lanzar_campana(body["id"])
+    return Response(status=status.HTTP_202_ACCEPTED, body=body)
+
+
+@router.get("/ofertas/{id}", response_model=Response, dependencies=[Depends(admin_actual)])
+async def notificaciones_progreso_oferta(id: int = Path(..., gt=0), session: Session = Depends(obtener_sesion)):
+    """Consultar el progreso de una campaña de ofertas"""
+    campaign = session.get(OfferCampaign, id)
+    if not campaign:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Campaña no encontrada"})
+    return Response(status=status.HTTP_200_OK, body=progreso_campana(campaign))
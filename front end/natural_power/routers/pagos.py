@@ -0,0 +1,127 @@
+# pagos.py
+# Endpoints: Pagos (/api/pagos) con MercadoPago
+
+from typing import Any, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, status
+from fastapi import Response as RespuestaHTTP
+from sqlmodel import Session
+
+from ..config import FRONTEND_BASE_URL, MP_ACCESS_TOKEN
+from ..dependencias import email_actual, obtener_sesion
+from ..esquemas import IniciarPagoInput, MPPreferenceInput, Response
+from ..logs import log_pagos
+from ..servicios.idempotencia import con_idempotencia
+from ..servicios.pagos import cancelar_pedido_sin_preferencia, crear_pedido_preferencia, despertar_worker_pagos, registrar_notificacion
+from ..servicios.pasarela import PASARELA_DISPONIBLE, PasarelaNoDisponible, pasarela
+
+router = APIRouter(prefix="/api/pagos")
+
+NO_RESPONDE = "MercadoPago no responde en este momento; intenta de nuevo en unos minutos o elige otro medio de pago"
+
+
+@router.post("/crear-preferencia")
+async def crear_preferencia_mp(respuesta: RespuestaHTTP, pref: MPPreferenceInput, user_email: Optional[str] = Depends(email_actual),
+                               idempotency_key: Optional[str] = Header(default=None), session: Session = Depends(obtener_sesion)):
+    """Crea el pedido y su preferencia de pago. Con el header Idempotency-Key, un reintento
+    devuelve la misma preferencia en vez de crear otro pedido.
+    """
+    if not PASARELA_DISPONIBLE:
+        # Permite levantar backend aunque no esté MercadoPago
+        raise HTTPException(status_code=503, detail="MercadoPago no disponible en el servidor")
+    if not MP_ACCESS_TOKEN:
+        raise HTTPException(status_code=503, detail="MercadoPago no configurado: falta MP_ACCESS_TOKEN")
+    if not pasarela.disponible():
+        # Circuito abierto: responder al instante, sin crear un pedido que no se podría pagar
+        raise HTTPException(status_code=503, detail=NO_RESPONDE)
+
+    async def producir() -> Dict[str, Any]:
+        order = None
+        try:
+            # 1) Crear pedido previo con los items recibidos y el usuario
+            order = crear_pedido_preferencia(session, user_email, pref.items)
+
+            # 2) Armar items para la preferencia
+            items = []
+            for it in pref.items:
+                items.append({
+                    "title": it.title,
+                    "quantity": int(it.quantity),
+                    "unit_price": float(it.unit_price),
+                    "currency_id": it.currency_id or 'CLP',
+                    **({"picture_url": it.picture_url} if it.picture_url else {})
+                })
+
+            preference_data = {
+                "items": items,
+                "back_urls": {
+                    "success": f"{FRONTEND_BASE_URL}/app/cuenta/?pago=ok",
+                    "failure": f"{FRONTEND_BASE_URL}/app/checkout/?pago=fail",
+                    "pending": f"{FRONTEND_BASE_URL}/app/cuenta/?pago=pending"
+                },
+                "auto_return": "approved",
+                "metadata": {**(pref.metadata or {}), "order_id": order.id}
+            }
+
+            resp = await pasarela.crear_preferencia(preference_data, clave_idempotencia=f"preferencia-{order.id}")
+            init_point = resp.get("init_point") or resp.get("sandbox_init_point")
+            pref_id = resp.get("id")
+
+            if not init_point:
+                raise HTTPException(status_code=500, detail="No se obtuvo init_point de MercadoPago")
+
+            return {"status": 200, "body": {"preference_id": pref_id, "init_point": init_point}}
+        except PasarelaNoDisponible as e:
+            log_pagos.warning("No se pudo crear la preferencia del pedido %s: %s", order.id, e)
+            cancelar_pedido_sin_preferencia(session, order.id)
+            raise HTTPException(status_code=503, detail=NO_RESPONDE)
+        except Exception as e:
+            if order is not None:
+                # Sin preferencia el pedido no se puede pagar: no dejarlo pendiente
+                cancelar_pedido_sin_preferencia(session, order.id)
+            raise HTTPException(status_code=500, detail=f"Error creando preferencia: {str(e)}")
+
+    return await con_idempotencia(respuesta, idempotency_key, f"POST /api/pagos/crear-preferencia:{user_email or '-'}",
+                                  pref.model_dump(mode="json"), producir)
+
+
+@router.post("/webhook")
+async def mp_webhook(payload: Dict[str, Any] = Body(default_factory=dict), x_request_id: Optional[str] = Header(default=None),
+                     session: Session = Depends(obtener_sesion)):
+    """Webhook de MercadoPago: registra la notificación y responde de inmediato.
+    Espera notificaciones con `type` payment y `data.id` (payment_id). El pago se
+    consulta y se aplica al pedido en segundo plano (ver servicios.pagos); las
+    notificaciones repetidas se descartan por su clave de idempotencia.
+    """
+    if not MP_ACCESS_TOKEN:
+        return {"status": 200, "body": {"ok": False, "reason": "mp_not_configured"}}
+    notif_type = payload.get("type") or payload.get("topic") or payload.get("action")
+    data_id = None
+    if isinstance(payload.get("data"), dict):
+        data_id = payload["data"].get("id")
+    elif payload.get("resource"):
+        # resource URL .../payments/<id>
+        data_id = str(payload.get("resource")).rstrip('/').split('/')[-1]
+    if notif_type != "payment" or not data_id:
+        return {"status": 200, "body": {"ok": True, "ignored": True}}
+
+    # MercadoPago reintenta la misma notificación con el mismo id / x-request-id
+    notif_id = payload.get("id") or x_request_id or f"{payload.get('action') or 'payment'}:{payload.get('date_created') or ''}"
+    idempotency_key = f"payment:{data_id}:{notif_id}"
+    duplicado = not registrar_notificacion(session, idempotency_key, notif_type, str(data_id), payload)
+    if not duplicado:
+        despertar_worker_pagos()
+    return {"status": 200, "body": {"ok": True, "duplicate": duplicado}}
+
+
+@router.post("/iniciar-transaccion", tags=["Pagos"], response_model=Response)
+async def pagos_iniciar(input: IniciarPagoInput = Body(...)):
+    """Diagrama 10: Iniciar transacción de pago"""
+    log_pagos.info("Iniciando pago para pedido %s con %s", input.pedidoId, input.metodoPago)
+    total_pedido = 12500.0
+    link_pago = f"https://pasarela.pago.cl/pagar?id={input.pedidoId}&monto={total_pedido}"
+
+    return Response(
+        status=status.HTTP_201_CREATED,
+        body={"url_pago": link_pago, "transaccion_id": "txn_123abc"}
+    )
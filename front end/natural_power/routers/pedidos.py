@@ -0,0 +1,190 @@
+# pedidos.py
+# Endpoints: Pedidos (/api/pedidos)
+
+import asyncio
+from typing import Any, AsyncIterator, Dict, Optional
+
+from fastapi import APIRouter, Body, Depends, Header, HTTPException, Path, Query, Request, status
+from fastapi import Response as RespuestaHTTP
+from fastapi.responses import StreamingResponse
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..dependencias import admin_actual, email_actual, obtener_sesion
+from ..esquemas import NO_AUTENTICADO, CancelarInput, PedidoInput, Response
+from ..logs import log_pedidos
+from ..modelos import Order, OrderStatusEvent
+from ..seguridad import es_admin, obtener_email_del_token
+from ..servicios.carrito import StockInsuficiente
+from ..servicios.cupones import CuponInvalido
+from ..servicios.eventos import SSE_HEARTBEAT_SECONDS, formato_sse, hub_pedidos
+from ..servicios.idempotencia import con_idempotencia
+from ..servicios.pedidos import (
+    ESTADOS_CANCELABLES_CLIENTE,
+    ESTADOS_PEDIDO,
+    TransicionInvalida,
+    cambiar_estado_pedido,
+    crear_pedido_desde_carrito,
+    evento_a_dict,
+    pedidos_de_usuario,
+    puede_ver_pedido,
+)
+
+router = APIRouter(prefix="/api/pedidos", tags=["Pedidos"])
+
+
+@router.post("", response_model=Response)
+async def crear_pedido(respuesta: RespuestaHTTP, input: PedidoInput = Body(...), token_email: Optional[str] = Depends(email_actual),
+                       idempotency_key: Optional[str] = Header(default=None), session: Session = Depends(obtener_sesion)):
+    """Crear un pedido a partir del carrito del usuario autenticado.
+    - Prioriza el email del token. Si no hay token, usa input.email.
+    - Campos del input son opcionales para evitar 422 si la UI no los envía.
+    - Con el header Idempotency-Key, un reintento devuelve el pedido ya creado en vez de otro.
+    - Se cobra al precio vigente; las líneas que cambiaron desde que se agregaron vienen en `precios_actualizados`.
+    """
+    user_email = (token_email or (input.email if input and input.email else None))
+    if not user_email:
+        return NO_AUTENTICADO
+
+    async def producir() -> Dict[str, Any]:
+        try:
+            try:
+                creado = crear_pedido_desde_carrito(session, user_email, cupon=input.cupon)
+            except (CuponInvalido, StockInsuficiente) as e:
+                return {"status": e.status, "body": {"error": str(e)}}
+            if creado is None:
+                return {"status": status.HTTP_400_BAD_REQUEST, "body": {"error": "Carrito vacío"}}
+            order, repreciados = creado
+
+            # Preparar respuesta segura (serializable)
+            body = {"id": order.id, "total": float(order.total), "estado": order.estado, "created_at": order.created_at.isoformat()}
+            if repreciados:
+                body["precios_actualizados"] = repreciados
+            return {"status": status.HTTP_201_CREATED, "body": body}
+        except Exception:
+            log_pedidos.exception("No se pudo crear el pedido")
+            # Soltar el lock de escritura antes de que la idempotencia libere la clave
+            session.rollback()
+            return {"status": status.HTTP_500_INTERNAL_SERVER_ERROR, "body": {"error": "No se pudo crear el pedido"}}
+
+    resultado = await con_idempotencia(respuesta, idempotency_key, f"POST /api/pedidos:{user_email}",
+                                       input.model_dump(mode="json"), producir)
+    return Response(**resultado)
+
+@router.get("", response_model=Response)
+async def obtener_pedidos_usuario(user_email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Obtener todos los pedidos del usuario autenticado."""
+    if not user_email:
+        return NO_AUTENTICADO
+    return Response(status=status.HTTP_200_OK, body=pedidos_de_usuario(session, user_email))
+
+@router.put("/{id}/cancelar", response_model=Response)
+async def pedidos_cancelar(id: int = Path(..., gt=0), input: CancelarInput = Body(...),
+                           email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Diagrama 9: Cancelar un pedido (devuelve el stock descontado)"""
+    if not email:
+        return NO_AUTENTICADO
+    admin = es_admin(email)
+    order = session.get(Order, id)
+    if not order:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Pedido no encontrado"})
+    if order.user_email != email and not admin:
+        return Response(status=status.HTTP_403_FORBIDDEN, body={"error": "No autorizado"})
+    if not admin and order.estado not in ESTADOS_CANCELABLES_CLIENTE:
+        return Response(status=status.HTTP_409_CONFLICT, body={"error": "El pedido ya no se puede cancelar"})
+    try:
+        evento = cambiar_estado_pedido(session, id, "cancelado", motivo=input.motivo, actor=email)
+    except TransicionInvalida as e:
+        return Response(status=status.HTTP_409_CONFLICT, body={"error": str(e)})
+    session.commit()
+    return Response(status=status.HTTP_200_OK, body={"id": id, "estado": evento.estado, "estado_anterior": evento.estado_anterior})
+
+@router.put("/{id}/confirmar-pago", response_model=Response)
+async def pedidos_confirmar_pago(id: int = Path(..., gt=0), admin_email: str = Depends(admin_actual),
+                                 session: Session = Depends(obtener_sesion)):
+    """Diagrama 11: Confirmar pago manualmente (los pagos MercadoPago llegan por webhook)"""
+    try:
+        evento = cambiar_estado_pedido(session, id, "pagado", actor=admin_email)
+    except LookupError:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Pedido no encontrado"})
+    except TransicionInvalida as e:
+        return Response(status=status.HTTP_409_CONFLICT, body={"error": str(e)})
+    session.commit()
+    session.refresh(evento)
+    return Response(status=status.HTTP_200_OK, body={"id": id, "estado": evento.estado, "timestamp_pago": evento.created_at.isoformat()})
+
+@router.get("/{id}/seguimiento", response_model=Response)
+async def pedidos_seguimiento(id: int = Path(..., gt=0), email: Optional[str] = Depends(email_actual),
+                              session: Session = Depends(obtener_sesion)):
+    """Diagrama 14: Obtener seguimiento de pedido (estado actual e historial)"""
+    if not email:
+        return NO_AUTENTICADO
+    order = session.get(Order, id)
+    if not order:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Pedido no encontrado"})
+    if not puede_ver_pedido(order, email):
+        return Response(status=status.HTTP_403_FORBIDDEN, body={"error": "No autorizado"})
+    eventos = session.exec(
+        select(OrderStatusEvent).where(OrderStatusEvent.order_id == id).order_by(OrderStatusEvent.id)
+    ).all()
+    return Response(status=status.HTTP_200_OK, body={
+        "id": id,
+        "estado": order.estado,
+        "etiqueta": ESTADOS_PEDIDO.get(order.estado, order.estado),
+        "historial": [evento_a_dict(ev) for ev in eventos],
+    })
+
+@router.get("/{id}/eventos")
+async def pedidos_eventos(request: Request, id: int = Path(..., gt=0), token: Optional[str] = Query(None),
+                          email_header: Optional[str] = Depends(email_actual), last_event_id: Optional[str] = Header(None)):
+    """Seguimiento en vivo (text/event-stream). EventSource no envía headers, por eso
+    también acepta el JWT en `?token=`. Al reconectar, Last-Event-ID recupera lo perdido."""
+    email = email_header or (obtener_email_del_token(token) if token else None)
+    if not email:
+        raise HTTPException(status_code=401, detail="Autenticación requerida")
+    # Sesión propia y corta: el stream puede durar horas y no debe retener la de la petición
+    with Session(engine) as session:
+        order = session.get(Order, id)
+        if not order:
+            raise HTTPException(status_code=404, detail="Pedido no encontrado")
+        if not puede_ver_pedido(order, email):
+            raise HTTPException(status_code=403, detail="No autorizado")
+    try:
+        ultimo_id = int(last_event_id) if last_event_id else 0
+    except ValueError:
+        ultimo_id = 0
+
+    async def stream() -> AsyncIterator[str]:
+        nonlocal ultimo_id
+        # Suscribirse antes de leer el historial para no perder eventos en medio
+        cola = hub_pedidos.suscribir(id)
+        try:
+            yield "retry: 3000\n\n"
+            with Session(engine) as session:
+                consulta = select(OrderStatusEvent).where(OrderStatusEvent.order_id == id)
+                if ultimo_id:
+                    consulta = consulta.where(OrderStatusEvent.id > ultimo_id).order_by(OrderStatusEvent.id)
+                else:
+                    # Conexión nueva: solo el estado actual
+                    consulta = consulta.order_by(OrderStatusEvent.id.desc()).limit(1)
+                pendientes = [evento_a_dict(ev) for ev in session.exec(consulta).all()]
+            for ev in sorted(pendientes, key=lambda e: e["id"]):
+                ultimo_id = ev["id"]
+                yield formato_sse(ev)
+            while True:
+                if await request.is_disconnected():
+                    break
+                try:
+                    ev = await asyncio.wait_for(cola.get(), timeout=SSE_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                if ev["id"] <= ultimo_id:
+                    continue
+                ultimo_id = ev["id"]
+                yield formato_sse(ev)
+        finally:
+            hub_pedidos.desuscribir(id, cola)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
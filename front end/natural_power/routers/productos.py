@@ -0,0 +1,112 @@
+# productos.py
+# Endpoints: Productos (/api/productos)
+
+import logging
+
+from fastapi import APIRouter, Body, Depends, Path, status
+from fastapi import Response as RespuestaHTTP
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..dependencias import admin_actual, obtener_sesion
+from ..esquemas import BusquedaInput, ProductoFilterInput, ProductoQueryInput, RecomendadosInput, Response, StockInput
+from ..logs import log_productos
+from ..modelos import Product
+from ..servicios.busqueda import buscar_productos
+from ..servicios.lecturas import catalogo
+from ..servicios.paginacion import contar, encabezados_pagina, parsear_campos, recortar
+from ..servicios.productos import CAMPOS_PUBLICOS, actualizar_stock, listar_productos, producto_publico
+from ..servicios.recomendaciones import RECOMENDACIONES_K, recomendados
+
+router = APIRouter(prefix="/api/productos", tags=["Productos"])
+
+
+@router.get("", response_model=Response)
+async def productos_query(respuesta: RespuestaHTTP, params: ProductoQueryInput = Depends()): # <- Depends() se usa aquí
+    """Diagrama 4: Obtener productos con paginación.
+    Acepta `pagina` o el `cursor` recibido en X-Next-Cursor; `fields` y `bilingue=false` reducen el payload.
+    """
+    log_productos.debug("Consultando productos: página %s, límite %s", params.pagina, params.limite)
+
+    def calcular():
+        with Session(engine) as session:
+            productos, siguiente = listar_productos(session, params.limite, params.cursor, params.pagina, campos, params.bilingue)
+            return productos, siguiente, contar(session, Product) if params.total else None
+
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_PUBLICOS)
+        # Mismo catálogo para todos: la clave son solo los parámetros normalizados
+        pagina = ("cursor", params.cursor) if params.cursor else ("pagina", params.pagina)
+        clave = ("publico", params.limite, pagina, tuple(sorted(campos)) if campos else None, params.bilingue, params.total)
+        productos, siguiente, total = await catalogo.obtener(clave, calcular)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    encabezados_pagina(respuesta, siguiente, total)
+    return Response(
+        status=status.HTTP_200_OK,
+        body=productos
+    )
+
+@router.get("/buscar", response_model=Response)
+async def productos_buscar(params: BusquedaInput = Depends(), session: Session = Depends(obtener_sesion)):
+    """Búsqueda por texto en nombre, descripción y tipo, ordenada por relevancia.
+    Ignora tildes y mayúsculas, acepta prefijos ("pasi") y corrige errores de tipeo;
+    `corregida` trae la consulta usada cuando hubo corrección.
+    """
+    log_productos.debug("Buscando productos: %r", params.q)
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_PUBLICOS)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    productos, corregida = buscar_productos(session, params.q, params.limite)
+    return Response(status=status.HTTP_200_OK, body={
+        "resultados": [recortar(producto_publico(p, params.bilingue), campos) for p in productos],
+        "corregida": corregida,
+    })
+
+@router.get("/{id}/recomendados", response_model=Response)
+async def productos_recomendados(id: int = Path(..., gt=0), params: RecomendadosInput = Depends(),
+                                 session: Session = Depends(obtener_sesion)):
+    """Productos que suelen comprarse junto a `id`, más afines primero (`puntaje` entre 0 y 1).
+    Sale del índice precalculado; lista vacía si el producto no tiene historial o no hay índice.
+    """
+    try:
+        campos = parsear_campos(params.fields, CAMPOS_PUBLICOS)
+    except ValueError as e:
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": str(e)})
+    vecinos = recomendados(id, min(params.limite, RECOMENDACIONES_K))
+    if not vecinos:
+        return Response(status=status.HTTP_200_OK, body=[])
+    # Los recomendados agotados o dados de baja se omiten (el índice se regenera aparte)
+    por_id = {p.id: p for p in session.exec(
+        select(Product).where(Product.id.in_([v for v, _ in vecinos]), Product.stock > 0)
+    ).all()}
+    return Response(status=status.HTTP_200_OK, body=[
+        {**recortar(producto_publico(por_id[v], params.bilingue), campos), "puntaje": round(puntaje, 4)}
+        for v, puntaje in vecinos if v in por_id
+    ])
+
+@router.get("/filtrar", response_model=Response)
+async def productos_filtrar(params: ProductoFilterInput = Depends()): # <- Depends() se usa aquí
+    """Diagrama 5: Filtrar productos por criterios"""
+    if log_productos.isEnabledFor(logging.DEBUG):
+        log_productos.debug("Filtrando productos por %s", params.model_dump_json())
+    productos_filtrados = [
+        {"id": 101, "nombre": "Jugo Detox Verde", "tipo": "jugo", "ingredientes": ["espinaca", "manzana"]}
+    ]
+    return Response(
+        status=status.HTTP_200_OK,
+        body=productos_filtrados
+    )
+
+@router.put("/{id}/stock", response_model=Response, dependencies=[Depends(admin_actual)])
+async def productos_update_stock(id: int = Path(..., gt=0), input: StockInput = Body(...),
+                                 session: Session = Depends(obtener_sesion)):
+    """Diagrama 6: Actualizar stock de un producto (solo admin; para muchos productos usar /api/admin/productos/importar)"""
+    log_productos.info("Actualizando stock para producto %s: %s", id, input.stock)
+    if not actualizar_stock(session, id, input.stock):
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Producto no encontrado"})
+    return Response(
+        status=status.HTTP_200_OK,
+        body={"id": id, "stock": input.stock}
+    )
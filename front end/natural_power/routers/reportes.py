@@ -0,0 +1,38 @@
+# reportes.py
+# Endpoints: Reportes (/api/reportes)
+
+from fastapi import APIRouter, Depends, status
+
+from ..esquemas import ExportarInput, ReporteInput, Response
+from ..logs import log
+
+router = APIRouter(prefix="/api/reportes", tags=["Reportes"])
+
+
+@router.get("/ventas", response_model=Response)
+async def reportes_ventas(params: ReporteInput = Depends()): # <- Depends() se usa aquí
+    """Diagrama 15: Obtener reporte de ventas (JSON)"""
+    log.info("Generando reporte de ventas desde %s hasta %s", params.fechaInicio, params.fechaFin)
+    reporte_data = {
+        "rango_fechas": f"{params.fechaInicio} a {params.fechaFin}",
+        "total_ventas": 1500000.0,
+        "pedidos_completados": 120
+    }
+    return Response(
+        status=status.HTTP_200_OK,
+        body=reporte_data
+    )
+
+@router.get("/ventas/exportar", response_model=Response)
+async def reportes_exportar_ventas(params: ExportarInput = Depends()): # <- Depends() se usa aquí
+    """Diagrama 16: Exportar reporte de ventas (Archivo)"""
+    log.info("Exportando reporte de ventas (%s) desde %s hasta %s", params.formato, params.fechaInicio, params.fechaFin)
+    respuesta_archivo = {
+        "formato": params.formato,
+        "url_descarga": f"https://storage.azure.com/reportes/ventas_{params.fechaInicio}_{params.fechaFin}.{params.formato}",
+        "expira": "2025-11-03T22:00:00Z"
+    }
+    return Response(
+        status=status.HTTP_200_OK,
+        body=respuesta_archivo
+    )
@@ -0,0 +1,139 @@
+# usuarios.py
+# Endpoints: Usuarios (/api/usuarios)
+
+from typing import Optional
+
+from fastapi import APIRouter, Body, Depends, Query, status
+from sqlmodel import Session, select
+
+from ..dependencias import email_actual, obtener_sesion
+from ..esquemas import NO_AUTENTICADO, RegistroInput, Response
+from ..logs import enmascarar_email, log_auth
+from ..modelos import User, UserActivity
+from ..seguridad import en_pool_hash, es_admin, hashear_contraseña
+from ..servicios.carrito import resumen_carrito
+from ..servicios.usuarios import (
+    cerrar_sesiones,
+    previsualizar_canje,
+    puntos_disponibles,
+    registrar_actividad,
+    sesiones_activas,
+    usuario_por_email,
+)
+
+router = APIRouter(prefix="/api/usuarios", tags=["Usuarios"])
+
+
+@router.post("/registrar", response_model=Response)
+async def usuarios_registrar(input: RegistroInput = Body(...), session: Session = Depends(obtener_sesion)):
+    """Diagrama 1: Registrar nuevo usuario - Guarda actividad"""
+    log_auth.info("Registrando nuevo usuario %s", enmascarar_email(input.email))
+    if usuario_por_email(session, input.email):
+        return Response(status=status.HTTP_400_BAD_REQUEST, body={"error": "Email ya registrado"})
+
+    hashed = await en_pool_hash(hashear_contraseña, input.contrasena)
+    new_user = User(
+        nombre=input.nombre,
+        email=input.email,
+        hashed_password=hashed,
+        direccion=input.direccion
+    )
+    session.add(new_user)
+    session.commit()
+    session.refresh(new_user)
+
+    registrar_actividad(session, new_user.email, "REGISTRO_EXITOSO", f"Usuario {new_user.nombre} se registró")
+    session.commit()
+
+    nuevo_usuario = {"id": new_user.id, "nombre": new_user.nombre, "email": new_user.email}
+    return Response(status=status.HTTP_201_CREATED, body=nuevo_usuario)
+
+@router.get("/me", response_model=Response)
+async def usuarios_me(email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Obtener información completa del usuario autenticado"""
+    if not email:
+        return NO_AUTENTICADO
+    user = usuario_por_email(session, email)
+    if not user:
+        return Response(status=status.HTTP_404_NOT_FOUND, body={"error": "Usuario no encontrado"})
+
+    return Response(status=status.HTTP_200_OK, body={
+        "id": user.id,
+        "nombre": user.nombre,
+        "email": user.email,
+        "direccion": user.direccion,
+        "sesiones_activas": len(sesiones_activas(session, email)),
+        "es_admin": es_admin(email)
+    })
+
+@router.get("/me/actividad", response_model=Response)
+async def usuarios_me_actividad(email: Optional[str] = Depends(email_actual), limite: int = Query(20),
+                                session: Session = Depends(obtener_sesion)):
+    """Obtener historial de actividad del usuario autenticado"""
+    if not email:
+        return NO_AUTENTICADO
+
+    actividades = session.exec(
+        select(UserActivity)
+        .where(UserActivity.user_email == email)
+        .order_by(UserActivity.timestamp.desc())
+        .limit(limite)
+    ).all()
+
+    actividad_list = [
+        {
+            "id": act.id,
+            "action": act.action,
+            "details": act.details,
+            "timestamp": act.timestamp.isoformat(),
+        }
+        for act in actividades
+    ]
+    return Response(status=status.HTTP_200_OK, body={"actividades": actividad_list})
+
+@router.get("/me/sesiones", response_model=Response)
+async def usuarios_me_sesiones(email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Obtener todas las sesiones activas del usuario"""
+    if not email:
+        return NO_AUTENTICADO
+
+    sesiones_list = [
+        {
+            "id": s.id,
+            "login_time": s.login_time.isoformat(),
+            "last_activity": s.last_activity.isoformat(),
+            "is_active": s.is_active
+        }
+        for s in sesiones_activas(session, email)
+    ]
+    return Response(status=status.HTTP_200_OK, body={"sesiones": sesiones_list})
+
+@router.post("/me/logout", response_model=Response)
+async def usuarios_logout(email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Cerrar sesión del usuario autenticado"""
+    if not email:
+        return NO_AUTENTICADO
+
+    cerrar_sesiones(session, email)
+    registrar_actividad(session, email, "LOGOUT", "Usuario cerró sesión")
+    session.commit()
+    return Response(status=status.HTTP_200_OK, body={"mensaje": "Sesión cerrada correctamente"})
+
+@router.get("/me/puntos", response_model=Response)
+async def usuarios_get_puntos(email: Optional[str] = Depends(email_actual), session: Session = Depends(obtener_sesion)):
+    """Consultar puntos de lealtad reales acumulados."""
+    if not email:
+        return NO_AUTENTICADO
+    return Response(status=status.HTTP_200_OK, body={"email": email, "puntos": puntos_disponibles(session, email)})
+
+@router.post("/me/puntos/canjear", response_model=Response)
+async def usuarios_canjear_puntos(email: Optional[str] = Depends(email_actual), monto: Optional[int] = Body(default=None),
+                                  session: Session = Depends(obtener_sesion)):
+    """Previsualizar canje de puntos sobre el carrito actual.
+    Regla: 1 punto = $100 CLP de descuento. Se puede canjear hasta el total del carrito.
+    Si 'monto' no se especifica, intenta canjear el máximo posible.
+    """
+    if not email:
+        return NO_AUTENTICADO
+    subtotal = resumen_carrito(session, email)["subtotal"]
+    return Response(status=status.HTTP_200_OK, body=previsualizar_canje(puntos_disponibles(session, email), subtotal, monto))
@@ -0,0 +1,154 @@
+# seguridad.py
+# Contraseñas (argon2 en un pool de hilos), JWT y verificación de admin.
+
+import asyncio
+import functools
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import TYPE_CHECKING, Any, Callable, Optional
+
+from sqlmodel import Session, select
+
+from .config import ACCESS_TOKEN_EXPIRE_MINUTES, ADMIN_EMAILS, ALGORITHM, SECRET_KEY
+from .db import engine
+from .metricas import metricas
+from .modelos import User
+
+if TYPE_CHECKING:
+    from passlib.context import CryptContext
+
+# Usamos argon2 para mayor seguridad en las contraseñas (compatible con Windows).
+# El contexto (y el backend argon2) se construye en el primer hash/verificación.
+@functools.lru_cache(maxsize=1)
+def _contexto_hash() -> "CryptContext":
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["argon2"], deprecated="auto")
+
+# Hashing de contraseñas en un pool de hilos dedicado: argon2 tarda decenas de
+# ms y bloquearía el event loop si se ejecutara dentro de un handler async.
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+_hash_executor = ThreadPoolExecutor(max_workers=HASH_WORKERS, thread_name_prefix="hash")
+_hash_pendientes = 0
+
+
+async def en_pool_hash(fn: Callable[..., Any], *args: Any) -> Any:
+    global _hash_pendientes
+    _hash_pendientes += 1
+    try:
+        return await asyncio.get_running_loop().run_in_executor(_hash_executor, fn, *args)
+    finally:
+        _hash_pendientes -= 1
+
+
+metricas.gauge("np_password_hash_in_flight", "Hashes de contraseña en curso o en espera",
+               lambda: _hash_pendientes)
+metricas.gauge("np_password_hash_queue_depth", "Hashes de contraseña esperando un hilo libre",
+               lambda: max(0, _hash_pendientes - HASH_WORKERS))
+
+
+def verificar_contraseña(plain_password: str, hashed_password: str) -> bool:
+    """Verifica una contraseña en texto plano contra su hash con bcrypt
+    
+    Args:
+        plain_password: Contraseña en texto plano
+        hashed_password: Contraseña hasheada almacenada en la BD
+    
+    Returns:
+        True si coinciden, False en caso contrario
+    """
+    return _contexto_hash().verify(plain_password, hashed_password)
+
+
+def hashear_contraseña(password: str) -> str:
+    """Hashea una contraseña usando bcrypt para almacenarla de forma segura
+    
+    Args:
+        password: Contraseña en texto plano
+    
+    Returns:
+        Contraseña hasheada con bcrypt
+    """
+    return _contexto_hash().hash(password)
+
+
+def crear_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
+    """Crea un JWT token con expiracion configurable
+    
+    Args:
+        data: Diccionario con los datos a codificar (ej: {"sub": "email@example.com"})
+        expires_delta: Timedelta personalizado para expiracion (default: 30 minutos)
+    
+    Returns:
+        Token JWT codificado
+    """
+    to_encode = data.copy()
+    if expires_delta:
+        expire = datetime.now(timezone.utc) + expires_delta
+    else:
+        expire = datetime.now(timezone.utc) + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
+    to_encode.update({"exp": expire})
+    from jose import jwt
+    encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
+    return encoded_jwt
+
+
+def hash_token(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def obtener_email_del_token(token: str) -> Optional[str]:
+    """Extrae el email del JWT token validando su firma
+    
+    Args:
+        token: JWT token a decodificar
+    
+    Returns:
+        Email del usuario si el token es válido, None en caso contrario
+    """
+    from jose import JWTError, jwt
+    try:
+        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        email: str = payload.get("sub")
+        if email is None:
+            return None
+        return email
+    except JWTError:
+        return None
+
+
+def extraer_email_del_header(authorization: Optional[str]) -> Optional[str]:
+    """Extrae el email del JWT token del header Authorization
+    
+    Args:
+        authorization: Header Authorization que puede ser "Bearer <token>" o None
+    
+    Returns:
+        Email del usuario si el token es válido, None en caso contrario
+    """
+    if not authorization:
+        return None
+    
+    # Extraer token de "Bearer <token>"
+    token = None
+    if authorization.startswith("Bearer "):
+        token = authorization[7:]  # Quitar "Bearer "
+    else:
+        token = authorization  # Por compatibilidad con tokens directos
+    
+    return obtener_email_del_token(token)
+
+def es_admin(email: Optional[str]) -> bool:
+    if not email:
+        return False
+    email_norm = email.lower()
+    # Si hay correos configurados en ADMIN_EMAILS, solo esos son admin
+    if len(ADMIN_EMAILS) > 0:
+        return email_norm in ADMIN_EMAILS
+    # Fallback (solo cuando no hay ADMIN_EMAILS): primer usuario (id=1)
+    try:
+        with Session(engine) as session:
+            user = session.exec(select(User).where(User.email == email)).first()
+            return bool(user and user.id == 1)
+    except Exception:
+        return False
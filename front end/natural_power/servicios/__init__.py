@@ -0,0 +1,4 @@
+# servicios
+# Lógica de negocio compartida por los routers. Las funciones reciben la sesión
+# del llamador (la de la petición) y no hacen commit salvo que se indique.
+
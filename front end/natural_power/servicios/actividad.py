@@ -0,0 +1,76 @@
+# actividad.py
+# Registro de actividad de las peticiones autenticadas, escrito por lotes en segundo plano.
+
+import asyncio
+import os
+from collections import deque
+from datetime import datetime, timezone
+from typing import Deque, Dict, List, Optional
+
+from sqlalchemy import insert
+from sqlmodel import Session
+
+from ..db import engine
+from ..logs import log
+from ..modelos import UserActivity
+
+# El middleware solo encola (sin tocar la base en el camino de la petición) y
+# este worker inserta lo acumulado cada ACTIVIDAD_FLUSH_SECONDS en un hilo, con
+# un único executemany. Si la base no da abasto, el buffer descarta lo más
+# antiguo pasado ACTIVIDAD_BUFFER_MAX registros: es un registro informativo.
+
+ACTIVIDAD_FLUSH_SECONDS = float(os.getenv("ACTIVIDAD_FLUSH_SECONDS", "2"))
+ACTIVIDAD_BUFFER_MAX = int(os.getenv("ACTIVIDAD_BUFFER_MAX", "10000"))
+
+_pendientes: Deque[Dict[str, object]] = deque(maxlen=ACTIVIDAD_BUFFER_MAX)
+_actividad_task: Optional["asyncio.Task[None]"] = None
+
+
+def encolar_actividad(email: str, accion: str, detalle: str) -> None:
+    _pendientes.append({"user_email": email, "action": accion, "details": detalle,
+                        "timestamp": datetime.now(timezone.utc)})
+
+
+def _insertar(filas: List[Dict[str, object]]) -> None:
+    with Session(engine) as session:
+        session.execute(insert(UserActivity), filas)
+        session.commit()
+
+
+async def volcar_actividad() -> int:
+    """Inserta lo encolado hasta ahora; devuelve cuántos registros se escribieron."""
+    filas = []
+    while _pendientes:
+        filas.append(_pendientes.popleft())
+    if filas:
+        await asyncio.to_thread(_insertar, filas)
+    return len(filas)
+
+
+async def _actividad_worker() -> None:
+    while True:
+        await asyncio.sleep(ACTIVIDAD_FLUSH_SECONDS)
+        try:
+            await volcar_actividad()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log.exception("Error guardando actividad de usuarios")
+
+
+def iniciar_registro_actividad() -> None:
+    global _actividad_task
+    _actividad_task = asyncio.create_task(_actividad_worker())
+
+
+async def detener_registro_actividad() -> None:
+    if _actividad_task is not None:
+        _actividad_task.cancel()
+        try:
+            await _actividad_task
+        except asyncio.CancelledError:
+            pass
+    try:
+        await volcar_actividad()
+    except Exception:
+        log.exception("Error guardando actividad de usuarios")
@@ -0,0 +1,108 @@
+# boletas.py
+# Boletas en PDF renderizadas en un pool de procesos.
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from .. import boleta_pdf
+from ..config import BASE_DIR
+from ..db import engine
+from ..metricas import metricas
+from ..modelos import Boleta, Order, OrderItem
+
+# El PDF se guarda en disco direccionado por su sha256; la tabla Boleta y un
+# LRU en memoria permiten servir descargas repetidas directo desde el archivo.
+
+BOLETAS_DIR = os.getenv("BOLETAS_DIR", os.path.join(BASE_DIR, "boletas"))
+BOLETAS_WORKERS = int(os.getenv("BOLETAS_WORKERS", "0") or 0) or min(4, os.cpu_count() or 1)
+BOLETAS_CACHE_MAX = 1024
+
+_boletas_pool: Optional[ProcessPoolExecutor] = None
+_boletas_pool_lock = threading.Lock()
+_boletas_cache: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()  # order_id -> (numero, sha256)
+
+
+def obtener_pool_boletas() -> ProcessPoolExecutor:
+    global _boletas_pool
+    with _boletas_pool_lock:
+        if _boletas_pool is None:
+            _boletas_pool = ProcessPoolExecutor(max_workers=BOLETAS_WORKERS)
+        return _boletas_pool
+
+
+def _numero_boleta(order_id: int) -> str:
+    return f"B-{order_id:06d}"
+
+
+def _datos_boleta(session: Session, order: Order) -> Dict[str, Any]:
+    items = session.exec(select(OrderItem).where(OrderItem.order_id == order.id).order_by(OrderItem.id)).all()
+    return {
+        "numero": _numero_boleta(order.id),
+        "pedido_id": order.id,
+        "fecha": order.created_at.strftime("%d-%m-%Y %H:%M"),
+        "email": order.user_email,
+        "total": float(order.total),
+        "items": [{"name": it.name, "price": float(it.price), "quantity": int(it.quantity)} for it in items],
+    }
+
+
+def _cachear_boleta(order_id: int, numero: str, sha: str) -> None:
+    _boletas_cache[order_id] = (numero, sha)
+    _boletas_cache.move_to_end(order_id)
+    while len(_boletas_cache) > BOLETAS_CACHE_MAX:
+        _boletas_cache.popitem(last=False)
+
+
+async def obtener_boleta(order_id: int) -> Optional[Tuple[str, str]]:
+    """Devuelve (numero, ruta_pdf) de la boleta del pedido, generándola si no existe.
+
+    Devuelve None si el pedido no existe.
+    """
+    cacheado = _boletas_cache.get(order_id)
+    if cacheado and os.path.isfile(boleta_pdf.ruta_por_contenido(BOLETAS_DIR, cacheado[1])):
+        _boletas_cache.move_to_end(order_id)
+        metricas.cache_acceso("boletas_memoria", True)
+        return cacheado[0], boleta_pdf.ruta_por_contenido(BOLETAS_DIR, cacheado[1])
+    metricas.cache_acceso("boletas_memoria", False)
+
+    with Session(engine) as session:
+        boleta = session.exec(select(Boleta).where(Boleta.order_id == order_id)).first()
+        if boleta and os.path.isfile(boleta_pdf.ruta_por_contenido(BOLETAS_DIR, boleta.sha256)):
+            _cachear_boleta(order_id, boleta.numero, boleta.sha256)
+            metricas.cache_acceso("boletas_disco", True)
+            return boleta.numero, boleta_pdf.ruta_por_contenido(BOLETAS_DIR, boleta.sha256)
+        metricas.cache_acceso("boletas_disco", False)
+        order = session.get(Order, order_id)
+        if not order:
+            return None
+        data = _datos_boleta(session, order)
+
+    loop = asyncio.get_running_loop()
+    sha = await loop.run_in_executor(obtener_pool_boletas(), boleta_pdf.renderizar_y_guardar, BOLETAS_DIR, data)
+
+    with Session(engine) as session:
+        boleta = session.exec(select(Boleta).where(Boleta.order_id == order_id)).first()
+        if boleta:
+            boleta.sha256 = sha  # Archivo regenerado (p. ej. se borró del disco)
+        else:
+            boleta = Boleta(order_id=order_id, numero=data["numero"], sha256=sha)
+        session.add(boleta)
+        try:
+            session.commit()
+        except IntegrityError:
+            # Otra petición concurrente registró la misma boleta: el contenido es idéntico
+            session.rollback()
+    _cachear_boleta(order_id, data["numero"], sha)
+    return data["numero"], boleta_pdf.ruta_por_contenido(BOLETAS_DIR, sha)
+
+
+def detener_pool_boletas() -> None:
+    if _boletas_pool is not None:
+        _boletas_pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,137 @@
+# busqueda.py
+# Búsqueda de productos sobre el índice FTS5 (ver db.DDL_BUSQUEDA).
+
+import os
+import re
+import time as time_mod
+import unicodedata
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, text
+from sqlmodel import Session, select
+
+from ..metricas import metricas
+from ..modelos import Product
+
+# Cada término se busca como prefijo ("pasi" encuentra "Pasión") y todos deben
+# aparecer; el orden es BM25 con más peso para el nombre que para la
+# descripción y el tipo. Si no hay resultados, cada término desconocido se
+# reemplaza por la palabra del vocabulario del índice más parecida según sus
+# trigramas (tolerancia a errores de tipeo) y se vuelve a buscar.
+
+BUSQUEDA_PESOS = (10.0, 2.0, 1.0)  # nombre, descripcion, tipo
+BUSQUEDA_SIMILITUD_MIN = float(os.getenv("BUSQUEDA_SIMILITUD_MIN", "0.25"))
+BUSQUEDA_VOCAB_TTL_SECONDS = float(os.getenv("BUSQUEDA_VOCAB_TTL_SECONDS", "300"))
+BUSQUEDA_MAX_TERMINOS = 8
+
+_SQL_BUSQUEDA = text(
+    "SELECT rowid FROM producto_fts WHERE producto_fts MATCH :consulta "
+    f"ORDER BY bm25(producto_fts, {', '.join(str(p) for p in BUSQUEDA_PESOS)}) LIMIT :limite"
+)
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, igual que el tokenizer unicode61 del índice."""
+    descompuesto = unicodedata.normalize("NFKD", texto.lower())
+    return "".join(c for c in descompuesto if not unicodedata.combining(c))
+
+
+def terminos(consulta: str) -> List[str]:
+    return re.findall(r"\w+", normalizar(consulta))[:BUSQUEDA_MAX_TERMINOS]
+
+
+def trigramas(termino: str) -> Set[str]:
+    relleno = f"  {termino} "
+    return {relleno[i:i + 3] for i in range(len(relleno) - 2)}
+
+
+class Vocabulario:
+    """Términos del índice agrupados por trigrama, recargados al cambiar el catálogo."""
+
+    def __init__(self) -> None:
+        self.terminos: Set[str] = set()
+        self.por_trigrama: Dict[str, Set[str]] = {}
+        self.cargado = 0.0
+        self.vigente = False
+
+    def invalidar(self) -> None:
+        self.vigente = False
+
+    def _cargar(self, session: Session) -> None:
+        self.terminos = {fila[0] for fila in session.execute(text("SELECT term FROM producto_fts_vocab"))}
+        por_trigrama: Dict[str, Set[str]] = defaultdict(set)
+        for termino in self.terminos:
+            for tri in trigramas(termino):
+                por_trigrama[tri].add(termino)
+        self.por_trigrama = dict(por_trigrama)
+        self.cargado = time_mod.monotonic()
+        self.vigente = True
+
+    def corregir(self, session: Session, termino: str) -> Optional[str]:
+        """Término del vocabulario más parecido (similitud de Jaccard sobre trigramas), o None."""
+        vencido = time_mod.monotonic() - self.cargado > BUSQUEDA_VOCAB_TTL_SECONDS
+        metricas.cache_acceso("vocabulario_busqueda", self.vigente and not vencido)
+        if not self.vigente or vencido:
+            self._cargar(session)
+        # Ya existe (o es prefijo de una palabra): "  x" es el primer trigrama de las palabras que empiezan con x
+        if termino in self.terminos or any(t.startswith(termino) for t in self.por_trigrama.get(f"  {termino[:1]}", ())):
+            return termino
+        propios = trigramas(termino)
+        comunes: Counter = Counter()
+        for tri in propios:
+            comunes.update(self.por_trigrama.get(tri, ()))
+        mejor, mejor_sim = None, 0.0
+        for candidato, n in comunes.items():
+            sim = n / (len(propios) + len(trigramas(candidato)) - n)
+            if sim > mejor_sim or (sim == mejor_sim and mejor is not None and candidato < mejor):
+                mejor, mejor_sim = candidato, sim
+        return mejor if mejor_sim >= BUSQUEDA_SIMILITUD_MIN else None
+
+
+vocabulario = Vocabulario()
+
+
+def _ids_por_consulta(session: Session, lista: List[str], limite: int) -> List[int]:
+    # Los términos salen de \w+, así que no traen comillas ni operadores de FTS5
+    consulta = " ".join(f'"{t}"*' for t in lista)
+    return [fila[0] for fila in session.execute(_SQL_BUSQUEDA, {"consulta": consulta, "limite": limite})]
+
+
+def buscar_productos(session: Session, consulta: str, limite: int) -> Tuple[List[Product], Optional[str]]:
+    """Productos que coinciden con `consulta`, del más relevante al menos.
+
+    Devuelve también la consulta corregida cuando hubo que aplicar la
+    tolerancia a errores de tipeo (None si se usó tal cual).
+    """
+    lista = terminos(consulta)
+    if not lista:
+        return [], None
+    ids = _ids_por_consulta(session, lista, limite)
+    corregida = None
+    if not ids:
+        corregidos = [vocabulario.corregir(session, t) for t in lista]
+        if any(c is not None and c != t for c, t in zip(corregidos, lista)):
+            lista = [c for c in corregidos if c is not None]
+            if lista:
+                ids = _ids_por_consulta(session, lista, limite)
+                corregida = " ".join(lista) if ids else None
+    if not ids:
+        return [], None
+    por_id = {p.id: p for p in session.exec(select(Product).where(Product.id.in_(ids))).all()}
+    return [por_id[i] for i in ids if i in por_id], corregida
+
+
+def _cambia_texto(obj: Product) -> bool:
+    estado = inspect(obj)
+    return any(estado.attrs[c].history.has_changes() for c in ("nombre", "descripcion", "tipo"))
+
+
+@event.listens_for(Session, "before_flush")
+def _invalidar_vocabulario(session, flush_context, instances):
+    # Los cambios de stock (cada pedido) no alteran el vocabulario
+    if not vocabulario.vigente:
+        return
+    if any(isinstance(obj, Product) for obj in (*session.new, *session.deleted)) or \
+            any(isinstance(obj, Product) and _cambia_texto(obj) for obj in session.dirty):
+        vocabulario.invalidar()
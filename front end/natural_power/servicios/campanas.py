@@ -0,0 +1,266 @@
+# campanas.py
+# Campañas de ofertas (fan-out en segundo plano).
+
+import asyncio
+import os
+import time as time_mod
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from sqlalchemy import and_, exists, func, literal, or_, true, update
+from sqlalchemy.dialects.sqlite import insert
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..logs import log
+from ..modelos import LoyaltyPoint, OfferCampaign, OfferDelivery, Order, OrderItem, Product, User
+from .correo import enviar_correo, obtener_smtp_pool, renderizar_email
+
+# El segmento se resuelve con un INSERT ... SELECT directo a la cola OfferDelivery;
+# luego se envía por bloques con concurrencia acotada y límite de tasa por canal.
+
+NOTIF_CHUNK = int(os.getenv("NOTIF_CHUNK", "500"))
+NOTIF_CONCURRENCIA = int(os.getenv("NOTIF_CONCURRENCIA", "8"))
+NOTIF_INACTIVOS_DIAS = 30
+# Una entrega "enviando" por más tiempo que esto quedó de un worker que murió y se reintenta
+NOTIF_LEASE_SECONDS = float(os.getenv("NOTIF_LEASE_SECONDS", "600"))
+
+
+class LimitadorTasa:
+    """Token bucket para un único event loop (mensajes por segundo con ráfaga)."""
+
+    def __init__(self, tasa: float, rafaga: Optional[int] = None):
+        self.tasa = tasa
+        self.capacidad = float(rafaga or max(1, int(tasa)))
+        self._tokens = self.capacidad
+        self._ultimo = time_mod.monotonic()
+
+    async def adquirir(self) -> None:
+        while True:
+            ahora = time_mod.monotonic()
+            self._tokens = min(self.capacidad, self._tokens + (ahora - self._ultimo) * self.tasa)
+            self._ultimo = ahora
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.tasa)
+
+
+async def _enviar_oferta_email(destinatario: str, asunto: str, cuerpo: str) -> None:
+    pool = obtener_smtp_pool()
+    if pool is None:
+        raise RuntimeError("SMTP no configurado")
+    await asyncio.to_thread(enviar_correo, pool, destinatario, asunto, cuerpo)
+
+
+# Canales disponibles: nombre -> (enviar(destinatario, asunto, cuerpo), mensajes por segundo)
+CANALES_NOTIFICACION: Dict[str, Tuple[Callable[[str, str, str], Awaitable[None]], float]] = {
+    "email": (_enviar_oferta_email, float(os.getenv("NOTIF_RATE_EMAIL", "10"))),
+}
+_limitadores: Dict[str, LimitadorTasa] = {}
+_campanas_activas: Dict[int, "asyncio.Task[None]"] = {}
+
+
+def consulta_segmento(segmento: str):
+    """Traduce un segmento a un SELECT de emails (una columna `email`).
+
+    Lanza ValueError si el segmento no es válido.
+    """
+    nombre, _, parametro = segmento.strip().partition(":")
+    nombre = nombre.lower()
+    if nombre == "todos":
+        return select(User.email.label("email"))
+    if nombre == "compradores":
+        if not parametro:
+            raise ValueError("El segmento compradores requiere un tipo (compradores:<tipo>)")
+        return (
+            select(Order.user_email.label("email"))
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .join(Product, Product.id == OrderItem.product_id)
+            .where(Product.tipo == parametro, Order.user_email.is_not(None))
+            .distinct()
+        )
+    if nombre == "con_puntos":
+        return (
+            select(LoyaltyPoint.user_email.label("email"))
+            .group_by(LoyaltyPoint.user_email)
+            .having(func.sum(LoyaltyPoint.puntos) > 0)
+        )
+    if nombre == "inactivos":
+        dias = int(parametro) if parametro else NOTIF_INACTIVOS_DIAS
+        desde = datetime.now(timezone.utc) - timedelta(days=dias)
+        compras_recientes = exists().where(Order.user_email == User.email, Order.created_at >= desde)
+        return select(User.email.label("email")).where(~compras_recientes)
+    raise ValueError(f"Segmento desconocido: {segmento}")
+
+
+def _resolver_destinatarios(campaign: OfferCampaign) -> Optional[int]:
+    """Toma la campaña e inserta en la cola una entrega por destinatario del segmento.
+
+    El paso en_cola -> enviando es un UPDATE condicional: si otro worker ya tomó
+    la campaña devuelve None y este no debe enviarla. Todo ocurre en una sola
+    transacción, así que una caída a mitad deja la campaña en_cola.
+    """
+    segmento = consulta_segmento(campaign.segmento).subquery()
+    # WHERE explícito: SQLite no admite ON CONFLICT tras un SELECT sin WHERE
+    origen = select(literal(campaign.id), segmento.c.email, literal(campaign.canal), literal("pendiente")).where(true())
+    with Session(engine) as session:
+        tomada = session.exec(
+            update(OfferCampaign)
+            .where(OfferCampaign.id == campaign.id, OfferCampaign.estado == "en_cola")
+            .values(estado="enviando")
+        )
+        if tomada.rowcount == 0:
+            session.rollback()
+            return None
+        session.exec(
+            insert(OfferDelivery)
+            .from_select(["campaign_id", "user_email", "canal", "estado"], origen)
+            .on_conflict_do_nothing(index_elements=["campaign_id", "user_email"])
+        )
+        total = session.exec(
+            select(func.count()).select_from(OfferDelivery).where(OfferDelivery.campaign_id == campaign.id)
+        ).one()
+        session.exec(update(OfferCampaign).where(OfferCampaign.id == campaign.id).values(total=total))
+        session.commit()
+    return total
+
+
+def _tomar_bloque(campaign_id: int) -> List[Tuple[int, str]]:
+    """Marca como "enviando" el siguiente bloque de entregas y lo devuelve.
+
+    El UPDATE ... RETURNING es atómico, así que dos workers con la misma campaña
+    nunca toman la misma entrega. Se retoman también las que quedaron
+    "enviando" de un worker que murió, una vez vencido su lease.
+    """
+    now = datetime.now(timezone.utc)
+    disponible = or_(
+        OfferDelivery.estado == "pendiente",
+        and_(
+            OfferDelivery.estado == "enviando",
+            or_(
+                OfferDelivery.reclamado_at.is_(None),
+                OfferDelivery.reclamado_at < now - timedelta(seconds=NOTIF_LEASE_SECONDS),
+            ),
+        ),
+    )
+    siguientes = (
+        select(OfferDelivery.id)
+        .where(OfferDelivery.campaign_id == campaign_id, disponible)
+        .order_by(OfferDelivery.id)
+        .limit(NOTIF_CHUNK)
+    )
+    with Session(engine) as session:
+        bloque = session.exec(
+            update(OfferDelivery)
+            .where(OfferDelivery.id.in_(siguientes), disponible)
+            .values(estado="enviando", reclamado_at=now)
+            .returning(OfferDelivery.id, OfferDelivery.user_email)
+            .execution_options(synchronize_session=False)
+        ).all()
+        session.commit()
+    return sorted((d_id, email) for d_id, email in bloque)
+
+
+async def _ejecutar_campana(campaign_id: int) -> None:
+    """Resuelve el segmento (si falta) y envía las entregas pendientes por bloques.
+
+    Varios workers pueden ejecutar la misma campaña (p. ej. al reanudarla tras
+    un reinicio): cada bloque se toma atómicamente con _tomar_bloque.
+    """
+    try:
+        with Session(engine) as session:
+            campaign = session.get(OfferCampaign, campaign_id)
+            if not campaign:
+                return
+            session.expunge(campaign)
+        if campaign.estado == "en_cola":
+            if await asyncio.to_thread(_resolver_destinatarios, campaign) is None:
+                log.info("Campaña de ofertas %s ya tomada por otro worker", campaign_id)
+                return
+
+        enviar, tasa = CANALES_NOTIFICACION[campaign.canal]
+        limitador = _limitadores.setdefault(campaign.canal, LimitadorTasa(tasa))
+        semaforo = asyncio.Semaphore(NOTIF_CONCURRENCIA)
+        asunto, cuerpo = renderizar_email("oferta", titulo=campaign.titulo, mensaje=campaign.mensaje)
+
+        async def entregar(destinatario: str) -> None:
+            async with semaforo:
+                await limitador.adquirir()
+                await enviar(destinatario, asunto, cuerpo)
+
+        while True:
+            bloque = await asyncio.to_thread(_tomar_bloque, campaign_id)
+            if not bloque:
+                break
+            resultados = await asyncio.gather(*(entregar(email) for _, email in bloque), return_exceptions=True)
+            ok = [d_id for (d_id, _), r in zip(bloque, resultados) if not isinstance(r, BaseException)]
+            errores = [(d_id, str(r)[:500]) for (d_id, _), r in zip(bloque, resultados) if isinstance(r, BaseException)]
+            with Session(engine) as session:
+                if ok:
+                    session.exec(update(OfferDelivery).where(OfferDelivery.id.in_(ok)).values(estado="enviado"))
+                for d_id, error in errores:
+                    session.exec(update(OfferDelivery).where(OfferDelivery.id == d_id).values(estado="fallido", ultimo_error=error))
+                session.exec(
+                    update(OfferCampaign)
+                    .where(OfferCampaign.id == campaign_id)
+                    .values(enviados=OfferCampaign.enviados + len(ok), fallidos=OfferCampaign.fallidos + len(errores))
+                )
+                session.commit()
+
+        # Si otro worker todavía tiene entregas en curso, él cierra la campaña
+        en_curso = exists().where(
+            OfferDelivery.campaign_id == campaign_id, OfferDelivery.estado.in_(["pendiente", "enviando"])
+        )
+        with Session(engine) as session:
+            session.exec(
+                update(OfferCampaign)
+                .where(OfferCampaign.id == campaign_id, OfferCampaign.estado == "enviando", ~en_curso)
+                .values(estado="completada", finished_at=datetime.now(timezone.utc))
+            )
+            session.commit()
+    except asyncio.CancelledError:
+        raise
+    except Exception:
+        log.exception("Campaña de ofertas %s falló", campaign_id)
+        with Session(engine) as session:
+            session.exec(update(OfferCampaign).where(OfferCampaign.id == campaign_id).values(estado="fallida"))
+            session.commit()
+    finally:
+        _campanas_activas.pop(campaign_id, None)
+
+
+def lanzar_campana(campaign_id: int) -> None:
+    if campaign_id not in _campanas_activas:
+        _campanas_activas[campaign_id] = asyncio.create_task(_ejecutar_campana(campaign_id))
+
+
+def progreso_campana(c: OfferCampaign) -> Dict[str, Any]:
+    procesados = c.enviados + c.fallidos
+    return {
+        "id": c.id,
+        "titulo": c.titulo,
+        "segmento": c.segmento,
+        "canal": c.canal,
+        "estado": c.estado,
+        "total": c.total,
+        "enviados": c.enviados,
+        "fallidos": c.fallidos,
+        "pendientes": max(0, c.total - procesados),
+        "progreso": round(100.0 * procesados / c.total, 1) if c.total else (100.0 if c.estado == "completada" else 0.0),
+    }
+
+
+def reanudar_campanas() -> None:
+    """Retomar campañas que quedaron a medias en un reinicio."""
+    with Session(engine) as session:
+        pendientes = session.exec(
+            select(OfferCampaign.id).where(OfferCampaign.estado.in_(["en_cola", "enviando"]))
+        ).all()
+    for campaign_id in pendientes:
+        lanzar_campana(campaign_id)
+
+
+def cancelar_campanas() -> None:
+    for tarea in list(_campanas_activas.values()):
+        tarea.cancel()
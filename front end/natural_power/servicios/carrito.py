@@ -0,0 +1,156 @@
+# carrito.py
+# Carrito persistente por usuario.
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import func, update
+from sqlmodel import Session, select
+
+from ..esquemas import PersonalizacionInput
+from ..logs import enmascarar_email, log_carrito
+from ..modelos import CartItem, CartSummary, Product
+from .jugos import JUGO_IMAGEN, cotizar, ingredientes_faltantes, porciones_de_items, precio_receta
+
+# product_id reservado para jugos personalizados (no existe en el catálogo)
+PRODUCTO_PERSONALIZADO = -1
+
+
+class StockInsuficiente(Exception):
+    """Se piden más unidades (o porciones) de las disponibles; `status` es el código a devolver"""
+
+    def __init__(self, mensaje: str, status: int = 409) -> None:
+        super().__init__(mensaje)
+        self.status = status
+
+
+def item_a_dict(it: CartItem) -> Dict[str, Any]:
+    return {
+        "id": it.id,
+        "product_id": it.product_id,
+        "name": it.name,
+        "price": it.price,
+        "image": it.image,
+        "quantity": it.quantity,
+    }
+
+
+def items_del_carrito(session: Session, user_email: str) -> List[CartItem]:
+    return session.exec(select(CartItem).where(CartItem.user_email == user_email)).all()
+
+
+def agregar_personalizado(session: Session, user_email: Optional[str], personalizacion: PersonalizacionInput, cantidad: int) -> CartItem:
+    """Agrega un jugo personalizado con precio calculado en el servidor (hace commit).
+    Siempre crea un item nuevo (no deduplica). Lanza RecetaInvalida si la receta no se puede preparar.
+    """
+    # Las porciones de los otros jugos del carrito cuentan para la disponibilidad
+    reservado = porciones_de_items(items_del_carrito(session, user_email)) if user_email else None
+    cotizacion = cotizar(personalizacion.base, personalizacion.ingredientes, cantidad, reservado)
+    custom_name = personalizacion.customName or 'Jugo Personalizado'
+
+    log_carrito.debug("Jugo personalizado %r a $%s para %s", custom_name, cotizacion.precio_unitario, enmascarar_email(user_email))
+
+    cart_item = CartItem(
+        user_email=user_email,
+        product_id=PRODUCTO_PERSONALIZADO,
+        name=custom_name,
+        price=cotizacion.precio_unitario,
+        image=JUGO_IMAGEN,
+        description=cotizacion.descripcion,
+        quantity=cantidad,
+        receta=cotizacion.receta(),
+    )
+    session.add(cart_item)
+    session.commit()
+    session.refresh(cart_item)
+
+    log_carrito.debug("Item personalizado guardado con id %s", cart_item.id)
+    return cart_item
+
+
+def agregar_producto(session: Session, user_email: Optional[str], product: Product, cantidad: int) -> CartItem:
+    """Agrega un producto del catálogo (hace commit); si ya está en el carrito, suma la cantidad.
+    Lanza StockInsuficiente si el total en el carrito supera el stock.
+    """
+    existing_item = session.exec(
+        select(CartItem).where(
+            (CartItem.user_email == user_email) & (CartItem.product_id == product.id)
+        )
+    ).first()
+
+    if (existing_item.quantity if existing_item else 0) + cantidad > product.stock:
+        raise StockInsuficiente("Stock insuficiente", 400)
+    if existing_item:
+        existing_item.quantity += cantidad
+        cart_item = existing_item
+    else:
+        cart_item = CartItem(user_email=user_email, product_id=product.id, name=product.nombre, price=product.precio, image=product.image, quantity=cantidad)
+    session.add(cart_item)
+    session.commit()
+    session.refresh(cart_item)
+    return cart_item
+
+
+def resumen_carrito(session: Session, user_email: str) -> Dict[str, Any]:
+    """Líneas, unidades y subtotal del carrito desde su fila de resumen (ver db.py), sin leer los items."""
+    fila = session.get(CartSummary, user_email)
+    if fila is None:
+        return {"lineas": 0, "unidades": 0, "subtotal": 0.0}
+    # El resumen acumula sumas y restas: redondear para no arrastrar residuos de punto flotante
+    return {"lineas": fila.lineas, "unidades": fila.unidades, "subtotal": round(fila.subtotal, 2)}
+
+
+def verificar_stock(session: Session, items: List[CartItem]) -> None:
+    """Lanza StockInsuficiente si los items piden más unidades o porciones de las que hay en la base.
+
+    Se llama en la transacción del pedido después de una escritura, con el lock
+    de escritura de SQLite ya tomado: el stock leído no cambia antes de descontarlo.
+    Una cantidad menor a 1 (fila escrita sin pasar por la API) se rechaza con 400:
+    cobraría un total negativo y sumaría stock en vez de descontarlo.
+    """
+    if any(it.quantity < 1 for it in items):
+        raise StockInsuficiente("Cantidad inválida en el carrito", 400)
+    ids = [it.id for it in items if it.product_id != PRODUCTO_PERSONALIZADO]
+    faltantes = list(session.exec(
+        select(Product.nombre).join(CartItem, CartItem.product_id == Product.id)
+        .where(CartItem.id.in_(ids)).group_by(Product.id)
+        .having(func.sum(CartItem.quantity) > Product.stock)
+    ).all()) if ids else []
+    faltantes += ingredientes_faltantes(session, items)
+    if faltantes:
+        raise StockInsuficiente(f"Stock insuficiente de {', '.join(faltantes)}")
+
+
+def repreciar_carrito(session: Session, user_email: str) -> Tuple[List[CartItem], List[Dict[str, Any]]]:
+    """Lleva el carrito a los precios vigentes antes de cobrarlo (no hace commit).
+
+    CartItem.price es el precio al momento de agregar. Los productos del
+    catálogo se comparan contra Product.precio y se corrigen en una sola
+    sentencia; los jugos personalizados se recotizan con la tabla de
+    ingredientes en memoria. Devuelve los items ya corregidos y las líneas que
+    cambiaron de precio.
+    """
+    precio_vigente = select(Product.precio).where(Product.id == CartItem.product_id).scalar_subquery()
+    cambios = [
+        {"id": id, "name": name, "price": float(price)}
+        for id, name, price in session.exec(
+            update(CartItem)
+            .where(CartItem.user_email == user_email, CartItem.product_id != PRODUCTO_PERSONALIZADO,
+                   CartItem.price != precio_vigente)
+            .values(price=precio_vigente)
+            .returning(CartItem.id, CartItem.name, CartItem.price)
+            .execution_options(synchronize_session=False)
+        ).all()
+    ]
+    items = items_del_carrito(session, user_email)
+    for it in items:
+        if not it.receta:
+            continue
+        precio = precio_receta(it.receta)
+        # Sin precio (se desactivó algún ingrediente) se mantiene el cotizado al agregarlo
+        if precio is not None and precio != it.price:
+            it.price = precio
+            session.add(it)
+            cambios.append({"id": it.id, "name": it.name, "price": precio})
+    if cambios:
+        log_carrito.info("Carrito de %s repreciado: %s líneas", enmascarar_email(user_email), len(cambios))
+    return items, cambios
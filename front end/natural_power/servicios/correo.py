@@ -0,0 +1,313 @@
+# correo.py
+# Cola de correos salientes (SMTP en segundo plano).
+
+import asyncio
+import os
+import queue
+import random
+import threading
+import time as time_mod
+import uuid
+from datetime import datetime, timedelta, timezone
+from email.message import EmailMessage
+from string import Template
+from typing import TYPE_CHECKING, Any, Dict, Optional, Tuple
+
+from sqlalchemy import and_, or_, update
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..logs import enmascarar_email, log_mail
+from ..modelos import OutboundEmail
+
+if TYPE_CHECKING:
+    import smtplib
+
+# Los endpoints solo encolan el correo en la tabla OutboundEmail; un worker
+# asíncrono lo envía reutilizando conexiones SMTP, con reintentos y backoff.
+
+MAIL_MAX_INTENTOS = int(os.getenv("MAIL_MAX_INTENTOS", "5"))
+MAIL_BACKOFF_BASE = float(os.getenv("MAIL_BACKOFF_BASE", "30"))  # segundos
+MAIL_BACKOFF_MAX = float(os.getenv("MAIL_BACKOFF_MAX", "3600"))
+MAIL_POLL_SECONDS = float(os.getenv("MAIL_POLL_SECONDS", "15"))
+MAIL_LOTE = int(os.getenv("MAIL_LOTE", "20"))
+# Un correo "enviando" por más tiempo que esto se da por abandonado (el proceso
+# que lo tomó murió a mitad del lote) y cualquier worker puede volver a tomarlo.
+# Debe superar lo que tarda un lote completo con los timeouts de SMTP.
+MAIL_LEASE_SECONDS = float(os.getenv("MAIL_LEASE_SECONDS", "600"))
+
+# Plantillas compartidas: recuperación, confirmación de pedido y boletas
+EMAIL_PLANTILLAS: Dict[str, Tuple[Template, Template]] = {
+    "reset_password": (
+        Template("Restablecer tu contraseña"),
+        Template("Hola,\n\nPara restablecer tu contraseña, usa este enlace (expira en 30 minutos):\n$reset_link\n\nSi no solicitaste esto, ignora este mensaje."),
+    ),
+    "confirmacion_pedido": (
+        Template("Recibimos tu pedido #$pedido_id"),
+        Template("Hola,\n\nGracias por tu compra en Natural Power. Detalle del pedido #$pedido_id:\n$detalle\n\nTotal: $$$total\n\nTe avisaremos cuando esté en camino."),
+    ),
+    "oferta": (
+        Template("$titulo"),
+        Template("Hola,\n\n$mensaje\n\nEquipo Natural Power"),
+    ),
+    "boleta": (
+        Template("Tu boleta $numero - Natural Power"),
+        Template("Hola,\n\nAdjuntamos la boleta $numero correspondiente a tu pedido #$pedido_id por un total de $$$total.\n\nTambién puedes descargarla desde tu cuenta:\n$cuenta_url"),
+    ),
+}
+
+
+def renderizar_email(plantilla: str, **contexto: Any) -> Tuple[str, str]:
+    """Devuelve (asunto, cuerpo) de una plantilla de correo con el contexto dado"""
+    asunto, cuerpo = EMAIL_PLANTILLAS[plantilla]
+    return asunto.safe_substitute(contexto), cuerpo.safe_substitute(contexto)
+
+
+def encolar_email(session: Session, to_email: str, plantilla: str, adjunto_path: Optional[str] = None, **contexto: Any) -> OutboundEmail:
+    """Agrega un correo a la cola dentro de la transacción del llamador.
+
+    El correo se envía recién cuando el llamador hace commit y el worker lo toma;
+    llamar a despertar_worker_correo() después del commit para no esperar al polling.
+    """
+    asunto, cuerpo = renderizar_email(plantilla, **contexto)
+    correo = OutboundEmail(to_email=to_email, plantilla=plantilla, asunto=asunto, cuerpo=cuerpo, adjunto_path=adjunto_path)
+    session.add(correo)
+    return correo
+
+
+class SMTPPool:
+    """Pool thread-safe de conexiones SMTP reutilizables.
+
+    Limita las conexiones simultáneas a `size` y valida con NOOP las conexiones
+    que llevan mucho tiempo ociosas antes de reutilizarlas.
+    """
+
+    def __init__(self, host: str, port: int, user: Optional[str], pwd: Optional[str],
+                 starttls: bool = True, size: int = 2, timeout: float = 10.0, idle_check: float = 30.0):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.pwd = pwd
+        self.starttls = starttls
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _conectar(self) -> "smtplib.SMTP":
+        import smtplib
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            if self.starttls:
+                server.starttls()
+            if self.user and self.pwd:
+                server.login(self.user, self.pwd)
+        except Exception:
+            server.close()
+            raise
+        return server
+
+    def _tomar(self) -> "smtplib.SMTP":
+        while True:
+            try:
+                server, ultimo_uso = self._idle.get_nowait()
+            except queue.Empty:
+                return self._conectar()
+            if time_mod.monotonic() - ultimo_uso < self.idle_check:
+                return server
+            try:
+                server.noop()
+                return server
+            except Exception:
+                server.close()
+
+    def enviar(self, msg: EmailMessage) -> None:
+        with self._slots:
+            server = self._tomar()
+            try:
+                server.send_message(msg)
+            except Exception:
+                # No sabemos en qué estado quedó la conexión: descartarla
+                server.close()
+                raise
+            self._idle.put((server, time_mod.monotonic()))
+
+    def cerrar(self) -> None:
+        while True:
+            try:
+                server, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                server.quit()
+            except Exception:
+                server.close()
+
+
+_smtp_pool: Optional[SMTPPool] = None
+_smtp_pool_lock = threading.Lock()
+_mail_wakeup: Optional[asyncio.Event] = None
+_mail_loop: Optional[asyncio.AbstractEventLoop] = None
+_mail_task: Optional["asyncio.Task[None]"] = None
+
+
+def obtener_smtp_pool() -> Optional[SMTPPool]:
+    """Crea el pool SMTP al primer uso. Devuelve None si SMTP no está configurado."""
+    global _smtp_pool
+    host = os.getenv("SMTP_HOST")
+    port = int(os.getenv("SMTP_PORT", "0") or 0)
+    if not host or not port or not (os.getenv("SMTP_FROM") or os.getenv("SMTP_USER")):
+        return None
+    with _smtp_pool_lock:
+        if _smtp_pool is None:
+            _smtp_pool = SMTPPool(
+                host=host,
+                port=port,
+                user=os.getenv("SMTP_USER"),
+                pwd=os.getenv("SMTP_PASS"),
+                starttls=os.getenv("SMTP_STARTTLS", "1").strip().lower() not in ("0", "false", "no"),
+                size=int(os.getenv("SMTP_POOL_SIZE", "2")),
+                timeout=float(os.getenv("SMTP_TIMEOUT", "10")),
+            )
+        return _smtp_pool
+
+
+def despertar_worker_correo() -> None:
+    """Avisa al worker que hay correos nuevos (seguro desde cualquier hilo)."""
+    if _mail_loop is None or _mail_wakeup is None:
+        return
+    try:
+        _mail_loop.call_soon_threadsafe(_mail_wakeup.set)
+    except RuntimeError:
+        pass  # Loop cerrado (apagado del servidor)
+
+
+def enviar_correo(pool: SMTPPool, to_email: str, asunto: str, cuerpo: str, adjunto_path: Optional[str] = None) -> None:
+    msg = EmailMessage()
+    msg["Subject"] = asunto
+    msg["From"] = os.getenv("SMTP_FROM") or os.getenv("SMTP_USER") or ""
+    msg["To"] = to_email
+    msg.set_content(cuerpo)
+    if adjunto_path:
+        with open(adjunto_path, "rb") as f:
+            msg.add_attachment(f.read(), maintype="application", subtype="pdf", filename=os.path.basename(adjunto_path))
+    pool.enviar(msg)
+
+
+def _backoff_correo(intentos: int) -> timedelta:
+    espera = min(MAIL_BACKOFF_MAX, MAIL_BACKOFF_BASE * (2 ** max(0, intentos - 1)))
+    return timedelta(seconds=espera + random.uniform(0, espera * 0.1))
+
+
+async def _procesar_lote_correos() -> int:
+    """Toma un lote de correos vencidos, los envía y registra el resultado.
+
+    Devuelve la cantidad de correos procesados.
+    """
+    now = datetime.now(timezone.utc)
+    lote = uuid.uuid4().hex
+    # Vencidos, o tomados por un worker cuyo lease ya expiró. Solo se recuperan
+    # los abandonados: los que otro worker vivo está enviando conservan su lease.
+    disponible = or_(
+        and_(OutboundEmail.estado == "pendiente", OutboundEmail.proximo_intento <= now),
+        and_(
+            OutboundEmail.estado == "enviando",
+            or_(
+                OutboundEmail.reclamado_at.is_(None),
+                OutboundEmail.reclamado_at < now - timedelta(seconds=MAIL_LEASE_SECONDS),
+            ),
+        ),
+    )
+    with Session(engine) as session:
+        pendientes = (
+            select(OutboundEmail.id)
+            .where(disponible)
+            .order_by(OutboundEmail.proximo_intento)
+            .limit(MAIL_LOTE)
+        )
+        session.exec(
+            update(OutboundEmail)
+            .where(OutboundEmail.id.in_(pendientes), disponible)
+            .values(estado="enviando", lote=lote, reclamado_at=now)
+        )
+        session.commit()
+        correos = session.exec(select(OutboundEmail).where(OutboundEmail.lote == lote)).all()
+        if not correos:
+            return 0
+
+        pool = obtener_smtp_pool()
+        if pool is None:
+            for c in correos:
+                # Sin SMTP configurado: dejar el contenido en el log (útil en desarrollo)
+                log_mail.warning("SMTP no configurado; correo %s omitido (%s para %s)", c.id, c.plantilla, enmascarar_email(c.to_email))
+                log_mail.debug("Contenido del correo %s:\n%s", c.id, c.cuerpo)
+                c.estado = "omitido"
+                c.lote = None
+                c.reclamado_at = None
+                session.add(c)
+            session.commit()
+            return len(correos)
+
+        resultados = await asyncio.gather(
+            *(asyncio.to_thread(enviar_correo, pool, c.to_email, c.asunto, c.cuerpo, c.adjunto_path) for c in correos),
+            return_exceptions=True,
+        )
+        now = datetime.now(timezone.utc)
+        for c, res in zip(correos, resultados):
+            c.lote = None
+            c.reclamado_at = None
+            if isinstance(res, BaseException):
+                c.intentos += 1
+                c.ultimo_error = str(res)[:500]
+                if c.intentos >= MAIL_MAX_INTENTOS:
+                    c.estado = "fallido"
+                else:
+                    c.estado = "pendiente"
+                    c.proximo_intento = now + _backoff_correo(c.intentos)
+                log_mail.warning("Error enviando correo %s (intento %s): %s", c.id, c.intentos, res)
+            else:
+                c.estado = "enviado"
+                c.enviado_at = now
+            session.add(c)
+        session.commit()
+        return len(correos)
+
+
+async def _mail_worker() -> None:
+    """Bucle del worker: procesa lotes hasta vaciar la cola y luego espera aviso o polling."""
+    global _mail_wakeup, _mail_loop
+    _mail_loop = asyncio.get_running_loop()
+    _mail_wakeup = asyncio.Event()
+    # Los correos que quedaron "enviando" porque un proceso murió a mitad de un
+    # lote los recupera _procesar_lote_correos cuando vence su lease
+    while True:
+        _mail_wakeup.clear()
+        try:
+            procesados = await _procesar_lote_correos()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log_mail.exception("Error en worker de correo")
+            procesados = 0
+        if procesados:
+            continue
+        try:
+            await asyncio.wait_for(_mail_wakeup.wait(), timeout=MAIL_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def iniciar_worker_correo() -> None:
+    global _mail_task
+    _mail_task = asyncio.create_task(_mail_worker())
+
+
+async def detener_worker_correo() -> None:
+    if _mail_task is not None:
+        _mail_task.cancel()
+        try:
+            await _mail_task
+        except asyncio.CancelledError:
+            pass
+    if _smtp_pool is not None:
+        _smtp_pool.cerrar()
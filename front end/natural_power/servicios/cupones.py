@@ -0,0 +1,265 @@
+# cupones.py
+# Cupones de descuento: reglas compiladas en memoria y canje atómico.
+
+import os
+import time as time_mod
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from sqlalchemy import event, func, insert, literal, or_, update
+from sqlmodel import Session, select
+
+from ..metricas import metricas
+from ..modelos import CartItem, Coupon, CouponRedemption, Product
+
+# Cada cupón se compila a una ReglaCupon inmutable (sets de ids y tipos, fechas
+# normalizadas) y se cachea por código, incluidos los códigos inexistentes: en
+# una promoción, validar un cupón es una búsqueda en memoria. El contador de
+# usos no se cachea; el canje lo incrementa con un UPDATE condicional
+# (`usos < usos_max`) y registra el uso con un INSERT condicionado al tope por
+# usuario, ambos en la transacción del pedido.
+
+CUPON_CACHE_TTL_SECONDS = float(os.getenv("CUPON_CACHE_TTL_SECONDS", "60"))
+CUPON_CACHE_MAX = 10000  # los códigos inventados también se cachean: acotar el tamaño
+TIPOS_CUPON = ("porcentaje", "monto")
+CAMPOS_OBLIGATORIOS = ("codigo", "tipo", "valor", "subtotal_minimo", "activo")  # null en una edición = sin cambio
+NO_VALIDO = "Cupón no válido o expirado"
+
+
+class CuponInvalido(Exception):
+    """El cupón no aplica al carrito; `status` es el código a devolver"""
+
+    def __init__(self, mensaje: str, status: int = 400) -> None:
+        super().__init__(mensaje)
+        self.status = status
+
+
+def normalizar_codigo(codigo: str) -> str:
+    return codigo.strip().upper()
+
+
+def _utc_naive(dt: Optional[datetime]) -> Optional[datetime]:
+    """SQLite devuelve fechas sin zona: se comparan todas como UTC sin tzinfo."""
+    if dt is None or dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _lista(valor: Optional[str]) -> List[str]:
+    return [v.strip() for v in (valor or "").split(",") if v.strip()]
+
+
+@dataclass(frozen=True)
+class ReglaCupon:
+    id: int
+    codigo: str
+    porcentaje: bool
+    valor: float
+    subtotal_minimo: float
+    productos: Optional[FrozenSet[int]]
+    tipos: Optional[FrozenSet[str]]
+    usos_por_usuario: Optional[int]
+    desde: Optional[datetime]
+    hasta: Optional[datetime]
+
+    @classmethod
+    def compilar(cls, c: Coupon) -> "ReglaCupon":
+        productos = frozenset(int(p) for p in _lista(c.productos))
+        tipos = frozenset(t.lower() for t in _lista(c.tipos))
+        return cls(
+            id=c.id,
+            codigo=c.codigo,
+            porcentaje=c.tipo == "porcentaje",
+            valor=float(c.valor),
+            subtotal_minimo=float(c.subtotal_minimo or 0),
+            productos=productos or None,
+            tipos=tipos or None,
+            usos_por_usuario=c.usos_por_usuario,
+            desde=_utc_naive(c.desde),
+            hasta=_utc_naive(c.hasta),
+        )
+
+    def vigente(self, ahora: datetime) -> bool:
+        return (self.desde is None or self.desde <= ahora) and (self.hasta is None or ahora < self.hasta)
+
+    def aplica_a(self, product_id: int, tipo: Optional[str]) -> bool:
+        if self.productos is None and self.tipos is None:
+            return True
+        return (self.productos is not None and product_id in self.productos) or \
+            (self.tipos is not None and (tipo or "").lower() in self.tipos)
+
+    def descuento(self, elegible: float) -> float:
+        """Monto a descontar (pesos enteros) sobre el subtotal de los items alcanzados."""
+        monto = elegible * self.valor / 100 if self.porcentaje else self.valor
+        return float(round(min(monto, elegible)))
+
+
+class CacheReglas:
+    """Reglas compiladas por código; None cachea que el código no existe o está inactivo."""
+
+    def __init__(self) -> None:
+        self._reglas: Dict[str, Tuple[float, Optional[ReglaCupon]]] = {}
+
+    def obtener(self, session: Session, codigo: str) -> Optional[ReglaCupon]:
+        codigo = normalizar_codigo(codigo)
+        ahora = time_mod.monotonic()
+        guardada = self._reglas.get(codigo)
+        if guardada is not None and ahora - guardada[0] < CUPON_CACHE_TTL_SECONDS:
+            metricas.cache_acceso("cupones", True)
+            return guardada[1]
+        metricas.cache_acceso("cupones", False)
+        cupon = session.exec(select(Coupon).where(Coupon.codigo == codigo)).first()
+        regla = ReglaCupon.compilar(cupon) if cupon and cupon.activo else None
+        if len(self._reglas) >= CUPON_CACHE_MAX:
+            self._reglas.clear()
+        self._reglas[codigo] = (ahora, regla)
+        return regla
+
+    def invalidar(self, codigo: Optional[str] = None) -> None:
+        if codigo is None:
+            self._reglas.clear()
+        else:
+            self._reglas.pop(normalizar_codigo(codigo), None)
+
+
+reglas = CacheReglas()
+
+
+def _usos_de_usuario(session: Session, coupon_id: int, user_email: str) -> int:
+    return int(session.exec(
+        select(func.count()).select_from(CouponRedemption)
+        .where(CouponRedemption.coupon_id == coupon_id, CouponRedemption.user_email == user_email)
+    ).one())
+
+
+def evaluar_cupon(session: Session, codigo: str, user_email: str, items: List[CartItem]) -> Tuple[ReglaCupon, Dict[str, Any]]:
+    """Valida el cupón contra los items del carrito y calcula el descuento.
+
+    No revisa el tope global de usos: lo garantiza el canje al crear el pedido.
+    Lanza CuponInvalido si no aplica.
+    """
+    regla = reglas.obtener(session, codigo)
+    if regla is None or not regla.vigente(datetime.now(timezone.utc).replace(tzinfo=None)):
+        raise CuponInvalido(NO_VALIDO, 404)
+    if regla.usos_por_usuario is not None and _usos_de_usuario(session, regla.id, user_email) >= regla.usos_por_usuario:
+        raise CuponInvalido("Ya usaste este cupón", 409)
+
+    tipos: Dict[int, Optional[str]] = {}
+    if regla.tipos is not None:
+        ids = {it.product_id for it in items}
+        tipos = dict(session.exec(select(Product.id, Product.tipo).where(Product.id.in_(ids))).all())
+    subtotal = elegible = 0.0
+    for it in items:
+        importe = float(it.price) * int(it.quantity)
+        subtotal += importe
+        if regla.aplica_a(it.product_id, tipos.get(it.product_id)):
+            elegible += importe
+    if subtotal < regla.subtotal_minimo:
+        raise CuponInvalido(f"El cupón requiere un subtotal mínimo de ${regla.subtotal_minimo:,.0f}")
+    if elegible <= 0:
+        raise CuponInvalido("El cupón no aplica a los productos del carrito")
+    descuento = regla.descuento(elegible)
+    return regla, {
+        "codigo": regla.codigo,
+        "total_anterior": subtotal,
+        "descuento": descuento,
+        "total_nuevo": max(0.0, subtotal - descuento),
+    }
+
+
+def canjear_cupon(session: Session, regla: ReglaCupon, user_email: str, order_id: int, descuento: float) -> None:
+    """Cuenta el uso y lo registra (no hace commit). CuponInvalido(409) si se alcanzó algún tope."""
+    resultado = session.execute(
+        update(Coupon)
+        .where(Coupon.id == regla.id, or_(Coupon.usos_max.is_(None), Coupon.usos < Coupon.usos_max))
+        .values(usos=Coupon.usos + 1)
+    )
+    if resultado.rowcount == 0:
+        raise CuponInvalido("Cupón agotado", 409)
+
+    fila = select(
+        literal(regla.id), literal(user_email), literal(order_id), literal(descuento),
+        literal(datetime.now(timezone.utc).replace(tzinfo=None)),
+    )
+    if regla.usos_por_usuario is not None:
+        usos_previos = (
+            select(func.count()).select_from(CouponRedemption)
+            .where(CouponRedemption.coupon_id == regla.id, CouponRedemption.user_email == user_email)
+            .scalar_subquery()
+        )
+        fila = fila.where(usos_previos < regla.usos_por_usuario)
+    resultado = session.execute(
+        insert(CouponRedemption).from_select(["coupon_id", "user_email", "order_id", "descuento", "created_at"], fila)
+    )
+    if resultado.rowcount == 0:
+        raise CuponInvalido("Ya usaste este cupón", 409)
+
+
+def cupon_a_dict(c: Coupon) -> Dict[str, Any]:
+    return {
+        "id": c.id,
+        "codigo": c.codigo,
+        "tipo": c.tipo,
+        "valor": c.valor,
+        "subtotal_minimo": c.subtotal_minimo,
+        "productos": [int(p) for p in _lista(c.productos)],
+        "tipos": _lista(c.tipos),
+        "usos": c.usos,
+        "usos_max": c.usos_max,
+        "usos_por_usuario": c.usos_por_usuario,
+        "desde": c.desde.isoformat() if c.desde else None,
+        "hasta": c.hasta.isoformat() if c.hasta else None,
+        "activo": c.activo,
+    }
+
+
+def _aplicar_campos(cupon: Coupon, campos: Dict[str, Any]) -> None:
+    for campo, valor in campos.items():
+        if valor is None and campo in CAMPOS_OBLIGATORIOS:
+            continue
+        if campo == "codigo":
+            valor = normalizar_codigo(valor)
+        elif campo in ("productos", "tipos"):
+            valor = ",".join(str(v) for v in valor) if valor else None
+        elif campo in ("desde", "hasta"):
+            valor = _utc_naive(valor)
+        setattr(cupon, campo, valor)
+    if cupon.tipo not in TIPOS_CUPON:
+        raise ValueError(f"Tipo de cupón inválido: use {' o '.join(TIPOS_CUPON)}")
+    if cupon.tipo == "porcentaje" and cupon.valor > 100:
+        raise ValueError("Un cupón de porcentaje no puede superar 100")
+    if cupon.desde and cupon.hasta and cupon.hasta <= cupon.desde:
+        raise ValueError("'hasta' debe ser posterior a 'desde'")
+
+
+def crear_cupon(session: Session, campos: Dict[str, Any]) -> Coupon:
+    """Crea un cupón (hace commit). ValueError si las reglas no son coherentes o el código ya existe."""
+    if session.exec(select(Coupon.id).where(Coupon.codigo == normalizar_codigo(campos["codigo"]))).first():
+        raise ValueError("Ya existe un cupón con ese código")
+    cupon = Coupon(codigo="", valor=0)
+    _aplicar_campos(cupon, campos)
+    session.add(cupon)
+    session.commit()
+    session.refresh(cupon)
+    return cupon
+
+
+def actualizar_cupon(session: Session, id: int, campos: Dict[str, Any]) -> Optional[Coupon]:
+    """Aplica los campos provistos (hace commit). None si no existe; ValueError si queda incoherente."""
+    cupon = session.get(Coupon, id)
+    if not cupon:
+        return None
+    _aplicar_campos(cupon, campos)
+    session.add(cupon)
+    session.commit()
+    session.refresh(cupon)
+    return cupon
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_reglas(session, flush_context):
+    # Cambios del panel admin (poco frecuentes; el código mismo puede cambiar).
+    # Los canjes tocan `usos` por SQL directo y no pasan por aquí: no se cachea.
+    if any(isinstance(obj, Coupon) for obj in (*session.new, *session.dirty, *session.deleted)):
+        reglas.invalidar()
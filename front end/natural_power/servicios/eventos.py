@@ -0,0 +1,129 @@
+# eventos.py
+# Seguimiento en vivo de pedidos (Server-Sent Events).
+
+import asyncio
+import json
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Optional, Set
+
+from sqlalchemy import event
+from sqlmodel import Session
+
+from ..metricas import metricas
+from .pedidos import evento_a_dict
+
+# Los cambios de estado se publican en un hub en memoria al hacer commit. El hub
+# entrega a los suscriptores locales a través de un broker: el BrokerLocal sirve
+# para un solo proceso; con varios workers se reemplaza por uno que reenvíe
+# entre procesos (p. ej. Redis pub/sub) llamando al mismo callback de entrega.
+
+SSE_HEARTBEAT_SECONDS = float(os.getenv("SSE_HEARTBEAT_SECONDS", "15"))
+SSE_COLA_MAX = 32
+
+
+class BrokerPedidos(ABC):
+    """Interfaz del broker de eventos de pedidos."""
+
+    @abstractmethod
+    def conectar(self, entregar: Callable[[int, Dict[str, Any]], None]) -> None:
+        """Registra el callback que entrega un evento a los suscriptores locales."""
+
+    @abstractmethod
+    def publicar(self, order_id: int, evento: Dict[str, Any]) -> None:
+        """Hace llegar el evento al callback de entrega de cada proceso."""
+
+
+class BrokerLocal(BrokerPedidos):
+    """Broker en proceso: publicar es entregar directamente."""
+
+    def __init__(self) -> None:
+        self._entregar: Optional[Callable[[int, Dict[str, Any]], None]] = None
+
+    def conectar(self, entregar: Callable[[int, Dict[str, Any]], None]) -> None:
+        self._entregar = entregar
+
+    def publicar(self, order_id: int, evento: Dict[str, Any]) -> None:
+        if self._entregar is not None:
+            self._entregar(order_id, evento)
+
+
+class HubEventosPedido:
+    """Suscripciones por pedido; cada suscriptor tiene una cola acotada propia."""
+
+    def __init__(self, broker: BrokerPedidos):
+        self.broker = broker
+        self._subs: Dict[int, Set["asyncio.Queue[Dict[str, Any]]"]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        broker.conectar(self._entregar)
+
+    def suscribir(self, order_id: int) -> "asyncio.Queue[Dict[str, Any]]":
+        self._loop = asyncio.get_running_loop()
+        cola: "asyncio.Queue[Dict[str, Any]]" = asyncio.Queue(maxsize=SSE_COLA_MAX)
+        self._subs.setdefault(order_id, set()).add(cola)
+        return cola
+
+    def desuscribir(self, order_id: int, cola: "asyncio.Queue[Dict[str, Any]]") -> None:
+        colas = self._subs.get(order_id)
+        if colas is not None:
+            colas.discard(cola)
+            if not colas:
+                del self._subs[order_id]
+
+    def suscriptores(self) -> int:
+        return sum(len(c) for c in self._subs.values())
+
+    def publicar(self, order_id: int, evento: Dict[str, Any]) -> None:
+        self.broker.publicar(order_id, evento)
+
+    def _entregar(self, order_id: int, evento: Dict[str, Any]) -> None:
+        if self._loop is None or order_id not in self._subs:
+            return
+        try:
+            en_loop = asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            en_loop = False
+        if en_loop:
+            self._entregar_en_loop(order_id, evento)
+        else:
+            try:
+                self._loop.call_soon_threadsafe(self._entregar_en_loop, order_id, evento)
+            except RuntimeError:
+                pass  # Loop cerrado
+
+    def _entregar_en_loop(self, order_id: int, evento: Dict[str, Any]) -> None:
+        for cola in list(self._subs.get(order_id, ())):
+            if cola.full():
+                # Cliente lento: descartar lo más antiguo; al reconectar recupera con Last-Event-ID
+                cola.get_nowait()
+            cola.put_nowait(evento)
+
+
+hub_pedidos = HubEventosPedido(BrokerLocal())
+metricas.gauge("np_sse_subscribers", "Suscriptores SSE conectados a este worker", hub_pedidos.suscriptores)
+
+
+@event.listens_for(Session, "after_flush")
+def _capturar_eventos_pedido(session, flush_context):
+    eventos = session.info.pop("eventos_pedido", None)
+    if eventos:
+        # Después del flush ya tienen id; se serializan aquí porque tras el commit expiran
+        session.info.setdefault("eventos_pedido_listos", []).extend(
+            (ev.order_id, evento_a_dict(ev)) for ev in eventos
+        )
+
+
+@event.listens_for(Session, "after_commit")
+def _publicar_eventos_pedido(session):
+    for order_id, evento in session.info.pop("eventos_pedido_listos", ()):
+        hub_pedidos.publicar(order_id, evento)
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_eventos_pedido(session):
+    session.info.pop("eventos_pedido", None)
+    session.info.pop("eventos_pedido_listos", None)
+
+
+def formato_sse(evento: Dict[str, Any]) -> str:
+    return f"id: {evento['id']}\nevent: estado\ndata: {json.dumps(evento)}\n\n"
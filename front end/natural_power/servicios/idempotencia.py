@@ -0,0 +1,200 @@
+# idempotencia.py
+# Header Idempotency-Key: los reintentos de una petición que crea algo reciben la respuesta original.
+
+import asyncio
+import hashlib
+import json
+import os
+import time as time_mod
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from fastapi import Response as RespuestaHTTP
+from sqlalchemy import delete, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..metricas import metricas
+from ..modelos import IdempotencyRecord
+
+# Cada clave se registra por endpoint y usuario junto con la huella (sha256) del
+# cuerpo. Al terminar bien (status 2xx) se guarda la respuesta y los reintentos
+# con la misma clave y el mismo cuerpo la reciben tal cual, con el header
+# Idempotent-Replayed; si la petición falla, la clave se libera y el reintento
+# se ejecuta de nuevo. Reusar la clave con otro cuerpo es un 422.
+#
+# Hay dos niveles: en el proceso, las respuestas recientes se sirven de memoria
+# y un duplicado concurrente espera el resultado de la primera petición en vez
+# de ejecutarse; entre procesos, la fila en_curso (índice único por alcance y
+# clave) hace que el duplicado reciba un 409 y reintente. Una reserva en_curso
+# de más de IDEMPOTENCIA_EN_CURSO_SECONDS se da por abandonada (proceso caído).
+
+IDEMPOTENCIA_TTL_SECONDS = float(os.getenv("IDEMPOTENCIA_TTL_SECONDS", str(24 * 3600)))
+IDEMPOTENCIA_EN_CURSO_SECONDS = float(os.getenv("IDEMPOTENCIA_EN_CURSO_SECONDS", "60"))
+IDEMPOTENCIA_CACHE_MAX = 10000
+LIMPIEZA_SECONDS = 600  # cada cuánto se borran de la tabla las claves vencidas
+CLAVE_MAX = 255
+HEADER_REPETIDA = "Idempotent-Replayed"
+
+Respuesta = Dict[str, Any]  # {"status": ..., "body": ...}
+
+
+class ConflictoIdempotencia(Exception):
+    """La clave no se puede usar para esta petición; `status` es el código a devolver"""
+
+    def __init__(self, mensaje: str, status: int) -> None:
+        super().__init__(mensaje)
+        self.status = status
+
+
+def huella(cuerpo: Any) -> str:
+    return hashlib.sha256(json.dumps(cuerpo, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def _ahora() -> datetime:
+    # SQLite devuelve fechas sin zona: todo en UTC sin tzinfo
+    return datetime.utcnow()
+
+
+def _guardable(respuesta: Respuesta) -> bool:
+    return 200 <= int(respuesta.get("status", 500)) < 300
+
+
+class RegistroIdempotencia:
+    def __init__(self) -> None:
+        # (alcance, clave) -> (huella, respuesta, vence en monotonic)
+        self._completadas: "OrderedDict[Tuple[str, str], Tuple[str, Respuesta, float]]" = OrderedDict()
+        # (alcance, clave) -> (huella, futuro con la respuesta guardable o None)
+        self._en_curso: Dict[Tuple[str, str], Tuple[str, "asyncio.Future[Optional[Respuesta]]"]] = {}
+        self._ultima_limpieza = 0.0
+
+    def _recordar(self, llave: Tuple[str, str], huella_: str, respuesta: Respuesta) -> None:
+        self._completadas[llave] = (huella_, respuesta, time_mod.monotonic() + IDEMPOTENCIA_TTL_SECONDS)
+        self._completadas.move_to_end(llave)
+        while len(self._completadas) > IDEMPOTENCIA_CACHE_MAX:
+            self._completadas.popitem(last=False)
+
+    def _en_memoria(self, llave: Tuple[str, str]) -> Optional[Tuple[str, Respuesta]]:
+        guardada = self._completadas.get(llave)
+        if guardada is None or guardada[2] < time_mod.monotonic():
+            self._completadas.pop(llave, None)
+            return None
+        return guardada[0], guardada[1]
+
+    def _reservar(self, alcance: str, clave: str, huella_: str) -> Optional[Respuesta]:
+        """Registra la clave como en curso (hace commit). Devuelve la respuesta guardada si ya se completó."""
+        ahora = _ahora()
+        condicion = (IdempotencyRecord.alcance == alcance, IdempotencyRecord.clave == clave)
+        with Session(engine) as session:
+            if time_mod.monotonic() - self._ultima_limpieza > LIMPIEZA_SECONDS:
+                session.execute(delete(IdempotencyRecord).where(IdempotencyRecord.expira < ahora))
+                self._ultima_limpieza = time_mod.monotonic()
+            else:
+                session.execute(delete(IdempotencyRecord).where(*condicion, IdempotencyRecord.expira < ahora))
+            resultado = session.execute(
+                sqlite_insert(IdempotencyRecord)
+                .values(alcance=alcance, clave=clave, huella=huella_, estado="en_curso", created_at=ahora,
+                        expira=ahora + timedelta(seconds=IDEMPOTENCIA_TTL_SECONDS))
+                .on_conflict_do_nothing(index_elements=["alcance", "clave"])
+            )
+            if resultado.rowcount:
+                session.commit()
+                return None
+            fila = session.exec(select(IdempotencyRecord).where(*condicion)).one()
+            if fila.huella != huella_:
+                raise ConflictoIdempotencia("La Idempotency-Key ya se usó con otra petición", 422)
+            if fila.estado == "completado":
+                return json.loads(fila.respuesta)
+            if ahora - fila.created_at < timedelta(seconds=IDEMPOTENCIA_EN_CURSO_SECONDS):
+                raise ConflictoIdempotencia("Hay una petición con esta Idempotency-Key en curso; reintente en unos segundos", 409)
+            # Reserva abandonada: tomarla, salvo que otro proceso se adelante
+            tomada = session.execute(
+                update(IdempotencyRecord)
+                .where(IdempotencyRecord.id == fila.id, IdempotencyRecord.estado == "en_curso",
+                       IdempotencyRecord.created_at == fila.created_at)
+                .values(created_at=ahora)
+            )
+            session.commit()
+            if not tomada.rowcount:
+                raise ConflictoIdempotencia("Hay una petición con esta Idempotency-Key en curso; reintente en unos segundos", 409)
+            return None
+
+    def _cerrar(self, alcance: str, clave: str, respuesta: Optional[Respuesta]) -> None:
+        """Guarda la respuesta, o libera la clave si no es guardable (None = la petición falló)."""
+        condicion = (IdempotencyRecord.alcance == alcance, IdempotencyRecord.clave == clave,
+                     IdempotencyRecord.estado == "en_curso")
+        with Session(engine) as session:
+            if respuesta is not None and _guardable(respuesta):
+                session.execute(update(IdempotencyRecord).where(*condicion)
+                                .values(estado="completado", respuesta=json.dumps(respuesta, default=str)))
+            else:
+                session.execute(delete(IdempotencyRecord).where(*condicion))
+            session.commit()
+
+    async def ejecutar(self, alcance: str, clave: str, huella_: str,
+                       producir: Callable[[], Awaitable[Respuesta]]) -> Tuple[Respuesta, bool]:
+        """Respuesta de `producir()` o la guardada para la clave; el bool indica si es repetida.
+
+        Lanza ConflictoIdempotencia si la clave se usó con otro cuerpo o está en curso en otro proceso.
+        """
+        llave = (alcance, clave)
+        guardada = self._en_memoria(llave)
+        metricas.cache_acceso("idempotencia", guardada is not None)
+        if guardada is not None:
+            if guardada[0] != huella_:
+                raise ConflictoIdempotencia("La Idempotency-Key ya se usó con otra petición", 422)
+            return guardada[1], True
+
+        en_curso = self._en_curso.get(llave)
+        if en_curso is not None:
+            if en_curso[0] != huella_:
+                raise ConflictoIdempotencia("La Idempotency-Key ya se usó con otra petición", 422)
+            respuesta = await asyncio.shield(en_curso[1])
+            if respuesta is None:
+                # La primera falló y liberó la clave: este reintento se ejecuta de verdad
+                return await self.ejecutar(alcance, clave, huella_, producir)
+            return respuesta, True
+
+        futuro: "asyncio.Future[Optional[Respuesta]]" = asyncio.get_running_loop().create_future()
+        self._en_curso[llave] = (huella_, futuro)
+        final: Optional[Respuesta] = None
+        try:
+            previa = self._reservar(alcance, clave, huella_)
+            if previa is not None:
+                self._recordar(llave, huella_, previa)
+                final = previa
+                return previa, True
+            respuesta: Optional[Respuesta] = None
+            try:
+                respuesta = await producir()
+            finally:
+                self._cerrar(alcance, clave, respuesta)
+            if _guardable(respuesta):
+                self._recordar(llave, huella_, respuesta)
+                final = respuesta
+            return respuesta, False
+        finally:
+            del self._en_curso[llave]
+            futuro.set_result(final)
+
+
+registro = RegistroIdempotencia()
+
+
+async def con_idempotencia(respuesta_http: RespuestaHTTP, clave: Optional[str], alcance: str, cuerpo: Any,
+                           producir: Callable[[], Awaitable[Respuesta]]) -> Respuesta:
+    """Ejecuta `producir` respetando el header Idempotency-Key (sin header, la ejecuta sin más)."""
+    if clave is None:
+        return await producir()
+    clave = clave.strip()
+    if not clave or len(clave) > CLAVE_MAX:
+        return {"status": 400, "body": {"error": f"Idempotency-Key debe tener entre 1 y {CLAVE_MAX} caracteres"}}
+    try:
+        respuesta, repetida = await registro.ejecutar(alcance, clave, huella(cuerpo), producir)
+    except ConflictoIdempotencia as e:
+        return {"status": e.status, "body": {"error": str(e)}}
+    if repetida:
+        respuesta_http.headers[HEADER_REPETIDA] = "true"
+    return respuesta
@@ -0,0 +1,256 @@
+# inventario.py
+# Importación/exportación masiva del catálogo (CSV o JSONL).
+
+import codecs
+import csv
+import io
+import json
+import os
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import bindparam, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+
+from ..db import engine
+from ..esquemas import ProductoCreateInput, ProductoImportInput
+from ..modelos import Product
+from .busqueda import vocabulario
+from .paginacion import invalidar_conteos
+
+# El archivo se lee por chunks a medida que llega y se valida línea a línea
+# (los ids a actualizar se verifican por lotes). Recién al final se abre la
+# transacción de escritura: todas las altas y cambios se aplican con
+# executemany en lotes de IMPORT_LOTE, agrupando las actualizaciones por el
+# conjunto de columnas que traen, y se confirma una sola vez.
+
+IMPORT_LOTE = int(os.getenv("IMPORT_LOTE", "1000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(20 * 1024 * 1024)))
+IMPORT_MAX_ERRORES = 100  # errores detallados en la respuesta (el total siempre se informa)
+
+COLUMNAS_EXPORTACION = ("id", "nombre", "descripcion", "precio", "image", "stock", "tipo")
+# Columnas NOT NULL de product: una fila puede omitirlas, pero no mandarlas en null
+COLUMNAS_NO_NULAS = ("nombre", "precio", "stock")
+# Valores de una fila nueva que no trae la columna (executemany exige las mismas claves en todas);
+# la imagen por defecto es la misma del alta desde el panel
+VALORES_NUEVO = {
+    "descripcion": None,
+    "image": ProductoCreateInput.model_fields["image"].default,
+    "stock": 0,
+    "tipo": None,
+    "vendidos": 0,
+}
+
+
+class ArchivoDemasiadoGrande(Exception):
+    pass
+
+
+class ImportacionRechazada(Exception):
+    """La base rechazó las filas ya validadas (p. ej. una restricción); no se aplicó nada"""
+
+
+@dataclass
+class ResultadoImportacion:
+    creados: int = 0
+    actualizados: int = 0
+    total_errores: int = 0
+    errores: List[Dict[str, Any]] = field(default_factory=list)
+    # (línea, id o None, columnas a escribir)
+    filas: List[Tuple[int, Optional[int], Dict[str, Any]]] = field(default_factory=list)
+
+    def error(self, linea: int, mensaje: str) -> None:
+        self.total_errores += 1
+        if len(self.errores) < IMPORT_MAX_ERRORES:
+            self.errores.append({"linea": linea, "error": mensaje})
+
+    def resumen(self, aplicado: bool) -> Dict[str, Any]:
+        return {
+            "aplicado": aplicado,
+            "creados": self.creados if aplicado else 0,
+            "actualizados": self.actualizados if aplicado else 0,
+            "filas_validas": len(self.filas),
+            "total_errores": self.total_errores,
+            # Los ids inexistentes se detectan por lote, después de los errores de formato
+            "errores": sorted(self.errores, key=lambda e: e["linea"]),
+        }
+
+
+async def _lineas(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decodificador = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    recibidos = 0
+    resto = ""
+    async for chunk in chunks:
+        recibidos += len(chunk)
+        if recibidos > IMPORT_MAX_BYTES:
+            raise ArchivoDemasiadoGrande(f"El archivo supera {IMPORT_MAX_BYTES} bytes")
+        partes = (resto + decodificador.decode(chunk)).split("\n")
+        resto = partes.pop()
+        for linea in partes:
+            yield linea
+    resto += decodificador.decode(b"", final=True)
+    if resto:
+        yield resto
+
+
+async def _registros_csv(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    """(línea, dict) por registro; la primera línea trae los nombres de columna."""
+    encabezado: Optional[List[str]] = None
+    pendiente: List[str] = []
+    inicio = numero = 0
+    async for linea in _lineas(chunks):
+        numero += 1
+        if not pendiente:
+            inicio = numero
+        pendiente.append(linea.rstrip("\r"))
+        # Un campo entre comillas puede contener saltos de línea: esperar a que cierre
+        if sum(p.count('"') for p in pendiente) % 2:
+            continue
+        texto = "\n".join(pendiente)
+        pendiente = []
+        if not texto.strip():
+            continue
+        valores = next(csv.reader([texto]))
+        if encabezado is None:
+            encabezado = [v.strip().lower() for v in valores]
+            continue
+        if len(valores) != len(encabezado):
+            yield inicio, ValueError(f"Se esperaban {len(encabezado)} columnas y hay {len(valores)}")
+            continue
+        # Celdas vacías = columna no informada (una fila toda vacía se ignora)
+        registro = {k: v for k, v in zip(encabezado, valores) if v.strip() != ""}
+        if registro:
+            yield inicio, registro
+    if pendiente:
+        yield inicio, ValueError("Comillas sin cerrar")
+
+
+async def _registros_jsonl(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, Any]]:
+    numero = 0
+    async for linea in _lineas(chunks):
+        numero += 1
+        if not linea.strip():
+            continue
+        try:
+            dato = json.loads(linea)
+        except ValueError as e:
+            yield numero, ValueError(f"JSON inválido: {e}")
+            continue
+        yield numero, dato if isinstance(dato, dict) else ValueError("Cada línea debe ser un objeto JSON")
+
+
+def _mensaje_validacion(e: ValidationError) -> str:
+    return "; ".join(f"{'.'.join(str(p) for p in err['loc']) or 'fila'}: {err['msg']}" for err in e.errors())
+
+
+def _verificar_ids(session: Session, resultado: ResultadoImportacion, desde: int) -> None:
+    """Descarta (como error) las actualizaciones de ids inexistentes desde la fila `desde`."""
+    ids = {fila_id for _, fila_id, _ in resultado.filas[desde:] if fila_id is not None}
+    if not ids:
+        return
+    existentes = set(session.execute(select(Product.id).where(Product.id.in_(ids))).scalars())
+    conservadas = []
+    for linea, fila_id, valores in resultado.filas[desde:]:
+        if fila_id is not None and fila_id not in existentes:
+            resultado.error(linea, f"Producto {fila_id} no existe")
+        else:
+            conservadas.append((linea, fila_id, valores))
+    resultado.filas[desde:] = conservadas
+
+
+async def validar_importacion(session: Session, chunks: AsyncIterator[bytes], formato: str) -> ResultadoImportacion:
+    """Lee y valida el archivo completo sin escribir nada."""
+    resultado = ResultadoImportacion()
+    registros = _registros_csv(chunks) if formato == "csv" else _registros_jsonl(chunks)
+    verificadas = 0
+    async for linea, registro in registros:
+        if isinstance(registro, Exception):
+            resultado.error(linea, str(registro))
+            continue
+        try:
+            fila = ProductoImportInput.model_validate(registro)
+        except ValidationError as e:
+            resultado.error(linea, _mensaje_validacion(e))
+            continue
+        valores = fila.model_dump(exclude_unset=True, exclude={"id"})
+        nulas = [c for c in COLUMNAS_NO_NULAS if c in valores and valores[c] is None]
+        if nulas:
+            resultado.error(linea, f"{', '.join(nulas)}: no puede ser null")
+            continue
+        if fila.id is None and (fila.nombre is None or fila.precio is None):
+            resultado.error(linea, "Un producto nuevo requiere nombre y precio")
+            continue
+        if fila.id is not None and not valores:
+            resultado.error(linea, "La fila no trae columnas para actualizar")
+            continue
+        resultado.filas.append((linea, fila.id, valores))
+        if len(resultado.filas) - verificadas >= IMPORT_LOTE:
+            _verificar_ids(session, resultado, verificadas)
+            verificadas = len(resultado.filas)
+    _verificar_ids(session, resultado, verificadas)
+    return resultado
+
+
+def _lotes(filas: List[Dict[str, Any]]) -> Iterator[List[Dict[str, Any]]]:
+    for i in range(0, len(filas), IMPORT_LOTE):
+        yield filas[i:i + IMPORT_LOTE]
+
+
+def aplicar_importacion(session: Session, resultado: ResultadoImportacion) -> None:
+    """Escribe las filas válidas en una sola transacción (hace commit).
+    Lanza ImportacionRechazada, sin escribir nada, si la base rechaza alguna fila.
+    """
+    tabla = Product.__table__
+    nuevas: List[Dict[str, Any]] = []
+    cambios: Dict[Tuple[str, ...], List[Dict[str, Any]]] = {}
+    for _, fila_id, valores in resultado.filas:
+        if fila_id is None:
+            nuevas.append({**VALORES_NUEVO, **valores})
+        else:
+            cambios.setdefault(tuple(sorted(valores)), []).append({"_id": fila_id, **valores})
+
+    conn = session.connection()
+    try:
+        for lote in _lotes(nuevas):
+            conn.execute(insert(tabla), lote)
+        for columnas, filas in cambios.items():
+            sentencia = update(tabla).where(tabla.c.id == bindparam("_id")).values({c: bindparam(c) for c in columnas})
+            for lote in _lotes(filas):
+                conn.execute(sentencia, lote)
+    except IntegrityError as e:
+        session.rollback()
+        raise ImportacionRechazada(f"La base rechazó la importación: {e.orig}") from e
+    session.commit()
+    resultado.creados = len(nuevas)
+    resultado.actualizados = sum(len(f) for f in cambios.values())
+    # SQL directo: el ORM no se entera, invalidar a mano lo cacheado del catálogo
+    invalidar_conteos(Product.__tablename__)
+    vocabulario.invalidar()
+
+
+def exportar_productos(formato: str) -> Iterator[str]:
+    """Recorre el catálogo por id en lotes, con una sesión propia (el stream puede durar)."""
+    if formato == "csv":
+        buffer = io.StringIO()
+        escritor = csv.writer(buffer, lineterminator="\n")
+        escritor.writerow(COLUMNAS_EXPORTACION)
+        yield buffer.getvalue()
+    ultimo = 0
+    with Session(engine) as session:
+        while True:
+            filas = session.execute(
+                select(*(getattr(Product, c) for c in COLUMNAS_EXPORTACION))
+                .where(Product.id > ultimo).order_by(Product.id).limit(IMPORT_LOTE)
+            ).all()
+            if not filas:
+                break
+            ultimo = filas[-1].id
+            if formato == "csv":
+                buffer = io.StringIO()
+                escritor = csv.writer(buffer, lineterminator="\n")
+                escritor.writerows(filas)
+                yield buffer.getvalue()
+            else:
+                yield "".join(json.dumps(dict(zip(COLUMNAS_EXPORTACION, f)), ensure_ascii=False) + "\n" for f in filas)
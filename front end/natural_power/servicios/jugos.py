@@ -0,0 +1,274 @@
+# jugos.py
+# "Crea tu jugo": catálogo de bases/ingredientes y precio calculado en el servidor.
+
+import json
+import os
+import time as time_mod
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+from sqlalchemy import bindparam, event, func, update
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..metricas import metricas
+from ..modelos import CartItem, Ingredient
+from .busqueda import normalizar
+
+# El precio de un jugo personalizado es el de su base más el de cada
+# ingrediente; nunca se toma el que manda el cliente. Los ingredientes se
+# cargan en una tabla en memoria (por id y por nombre normalizado) que se
+# recarga cuando cambian (commit de una edición o de un pedido que descuenta
+# porciones) o al vencer JUGO_TABLA_TTL_SECONDS, así que cotizar, incluso
+# muchos jugos a la vez, no consulta la base.
+
+JUGO_MAX_INGREDIENTES = int(os.getenv("JUGO_MAX_INGREDIENTES", "4"))
+JUGO_TABLA_TTL_SECONDS = float(os.getenv("JUGO_TABLA_TTL_SECONDS", "60"))
+JUGO_IMAGEN = "/static/imagenes/jugo_tropical.png"
+CATEGORIAS = ("base", "ingrediente")
+
+ClaveIngrediente = Union[int, str]  # id o nombre
+
+
+class RecetaInvalida(Exception):
+    """La receta no se puede preparar; `status` es el código a devolver"""
+
+    def __init__(self, mensaje: str, status: int = 400) -> None:
+        super().__init__(mensaje)
+        self.status = status
+
+
+@dataclass(frozen=True)
+class IngredienteTabla:
+    id: int
+    nombre: str
+    categoria: str
+    precio: float
+    stock: int
+
+
+@dataclass(frozen=True)
+class Cotizacion:
+    base: IngredienteTabla
+    ingredientes: Tuple[IngredienteTabla, ...]
+    cantidad: int
+
+    @property
+    def precio_unitario(self) -> float:
+        return self.base.precio + sum(i.precio for i in self.ingredientes)
+
+    @property
+    def descripcion(self) -> str:
+        if not self.ingredientes:
+            return self.base.nombre
+        return f"{self.base.nombre} con {', '.join(i.nombre for i in self.ingredientes)}"
+
+    def receta(self) -> str:
+        return json.dumps({"base": self.base.id, "ingredientes": [i.id for i in self.ingredientes]})
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {
+            "base": {"id": self.base.id, "nombre": self.base.nombre, "precio": self.base.precio},
+            "ingredientes": [{"id": i.id, "nombre": i.nombre, "precio": i.precio} for i in self.ingredientes],
+            "descripcion": self.descripcion,
+            "precio_unitario": self.precio_unitario,
+            "cantidad": self.cantidad,
+            "total": self.precio_unitario * self.cantidad,
+        }
+
+
+class TablaIngredientes:
+    """Ingredientes activos por id y por nombre normalizado."""
+
+    def __init__(self) -> None:
+        self.por_id: Dict[int, IngredienteTabla] = {}
+        self.por_nombre: Dict[str, IngredienteTabla] = {}
+        self.cargado = 0.0
+        self.vigente = False
+
+    def invalidar(self) -> None:
+        self.vigente = False
+
+    def _asegurar(self) -> None:
+        vencida = time_mod.monotonic() - self.cargado > JUGO_TABLA_TTL_SECONDS
+        metricas.cache_acceso("ingredientes", self.vigente and not vencida)
+        if self.vigente and not vencida:
+            return
+        with Session(engine) as session:
+            filas = session.exec(select(Ingredient).where(Ingredient.activo == True).order_by(Ingredient.id)).all()
+        por_id = {f.id: IngredienteTabla(f.id, f.nombre, f.categoria, float(f.precio), int(f.stock)) for f in filas}
+        self.por_id = por_id
+        self.por_nombre = {normalizar(i.nombre): i for i in por_id.values()}
+        self.cargado = time_mod.monotonic()
+        self.vigente = True
+
+    def buscar(self, clave: ClaveIngrediente) -> Optional[IngredienteTabla]:
+        self._asegurar()
+        if isinstance(clave, int):
+            return self.por_id.get(clave)
+        return self.por_nombre.get(normalizar(clave.strip()))
+
+    def catalogo(self) -> Dict[str, Any]:
+        self._asegurar()
+        def vista(i: IngredienteTabla) -> Dict[str, Any]:
+            return {"id": i.id, "nombre": i.nombre, "precio": i.precio, "disponible": i.stock > 0}
+        return {
+            "bases": [vista(i) for i in self.por_id.values() if i.categoria == "base"],
+            "ingredientes": [vista(i) for i in self.por_id.values() if i.categoria == "ingrediente"],
+            "max_ingredientes": JUGO_MAX_INGREDIENTES,
+        }
+
+
+tabla_ingredientes = TablaIngredientes()
+
+
+def _cotizar(base: ClaveIngrediente, ingredientes: Sequence[ClaveIngrediente], cantidad: int,
+             reservado: Counter) -> Cotizacion:
+    """Valida la receta contra la tabla descontando lo ya `reservado` por otros jugos del mismo lote."""
+    # Una cantidad negativa pasaría la revisión de stock y daría un precio negativo
+    if cantidad < 1:
+        raise RecetaInvalida("La cantidad debe ser al menos 1")
+    b = tabla_ingredientes.buscar(base)
+    if b is None or b.categoria != "base":
+        raise RecetaInvalida(f"Base no disponible: {base}")
+    if len(ingredientes) > JUGO_MAX_INGREDIENTES:
+        raise RecetaInvalida(f"Máximo {JUGO_MAX_INGREDIENTES} ingredientes por jugo")
+    elegidos: List[IngredienteTabla] = []
+    for clave in ingredientes:
+        i = tabla_ingredientes.buscar(clave)
+        if i is None or i.categoria != "ingrediente":
+            raise RecetaInvalida(f"Ingrediente no disponible: {clave}")
+        if i in elegidos:
+            raise RecetaInvalida(f"Ingrediente repetido: {i.nombre}")
+        elegidos.append(i)
+    for i in (b, *elegidos):
+        if i.stock - reservado[i.id] < cantidad:
+            raise RecetaInvalida(f"Sin stock suficiente de {i.nombre}", 409)
+    for i in (b, *elegidos):
+        reservado[i.id] += cantidad
+    return Cotizacion(b, tuple(elegidos), cantidad)
+
+
+def cotizar(base: ClaveIngrediente, ingredientes: Sequence[ClaveIngrediente], cantidad: int = 1,
+            reservado: Optional[Counter] = None) -> Cotizacion:
+    """Precio y disponibilidad de un jugo. Lanza RecetaInvalida si no se puede preparar.
+
+    `reservado` son porciones ya comprometidas (p. ej. otros jugos del mismo carrito).
+    """
+    return _cotizar(base, ingredientes, cantidad, Counter(reservado or ()))
+
+
+def cotizar_lote(recetas: Sequence[Tuple[ClaveIngrediente, Sequence[ClaveIngrediente], int]]
+                 ) -> List[Union[Cotizacion, RecetaInvalida]]:
+    """Cotiza varios jugos en una pasada; el stock se reparte entre ellos en orden."""
+    reservado: Counter = Counter()
+    resultado: List[Union[Cotizacion, RecetaInvalida]] = []
+    for base, ingredientes, cantidad in recetas:
+        try:
+            resultado.append(_cotizar(base, ingredientes, cantidad, reservado))
+        except RecetaInvalida as e:
+            resultado.append(e)
+    return resultado
+
+
+def porciones_de_items(items: Sequence[CartItem]) -> Counter:
+    """Porciones de cada ingrediente que consumen los jugos personalizados de `items`."""
+    porciones: Counter = Counter()
+    for it in items:
+        if not it.receta:
+            continue
+        receta = json.loads(it.receta)
+        for ingrediente_id in (receta["base"], *receta["ingredientes"]):
+            porciones[ingrediente_id] += int(it.quantity)
+    return porciones
+
+
+def precio_receta(receta: str) -> Optional[float]:
+    """Precio unitario vigente de una receta guardada en el carrito; None si ya no se puede preparar."""
+    datos = json.loads(receta)
+    partes = [tabla_ingredientes.buscar(i) for i in (datos["base"], *datos["ingredientes"])]
+    if any(p is None for p in partes):
+        return None
+    return sum(p.precio for p in partes)
+
+
+def ingredientes_faltantes(session: Session, items: Sequence[CartItem]) -> List[str]:
+    """Ingredientes sin stock suficiente en la base para las porciones de `items`."""
+    porciones = porciones_de_items(items)
+    if not porciones:
+        return []
+    filas = session.exec(select(Ingredient.id, Ingredient.nombre, Ingredient.stock).where(Ingredient.id.in_(porciones))).all()
+    return [nombre for id, nombre, stock in filas if stock < porciones[id]]
+
+
+def descontar_ingredientes(session: Session, items: Sequence[CartItem]) -> None:
+    """Descuenta en una sola sentencia (executemany) las porciones usadas (no hace commit).
+    El stock se verifica antes (ver ingredientes_faltantes): se resta exactamente lo usado.
+    """
+    porciones = porciones_de_items(items)
+    if not porciones:
+        return
+    tabla = Ingredient.__table__
+    session.connection().execute(
+        update(tabla).where(tabla.c.id == bindparam("_id")).values(stock=tabla.c.stock - bindparam("_n")),
+        [{"_id": i, "_n": n} for i, n in porciones.items()],
+    )
+    session.info["ingredientes_cambiados"] = True
+
+
+def ingrediente_a_dict(i: Ingredient) -> Dict[str, Any]:
+    return {"id": i.id, "nombre": i.nombre, "categoria": i.categoria, "precio": i.precio, "stock": i.stock, "activo": i.activo}
+
+
+def _validar_ingrediente(session: Session, ingrediente: Ingredient) -> None:
+    if ingrediente.categoria not in CATEGORIAS:
+        raise ValueError(f"Categoría inválida: use {' o '.join(CATEGORIAS)}")
+    repetido = session.exec(
+        select(Ingredient.id).where(func.lower(Ingredient.nombre) == ingrediente.nombre.lower(), Ingredient.id != ingrediente.id)
+    ).first()
+    if repetido:
+        raise ValueError("Ya existe un ingrediente con ese nombre")
+
+
+def crear_ingrediente(session: Session, campos: Dict[str, Any]) -> Ingredient:
+    """Crea un ingrediente (hace commit). ValueError si el nombre ya existe."""
+    ingrediente = Ingredient(**campos)
+    _validar_ingrediente(session, ingrediente)
+    session.add(ingrediente)
+    session.commit()
+    session.refresh(ingrediente)
+    return ingrediente
+
+
+def actualizar_ingrediente(session: Session, id: int, campos: Dict[str, Any]) -> Optional[Ingredient]:
+    """Aplica los campos provistos (hace commit). None si no existe."""
+    ingrediente = session.get(Ingredient, id)
+    if not ingrediente:
+        return None
+    for campo, valor in campos.items():
+        if valor is not None:
+            setattr(ingrediente, campo, valor)
+    _validar_ingrediente(session, ingrediente)
+    session.add(ingrediente)
+    session.commit()
+    session.refresh(ingrediente)
+    return ingrediente
+
+
+@event.listens_for(Session, "after_flush")
+def _marcar_ingredientes(session, flush_context):
+    if any(isinstance(obj, Ingredient) for obj in (*session.new, *session.dirty, *session.deleted)):
+        session.info["ingredientes_cambiados"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _recargar_ingredientes(session):
+    # Recién tras el commit: recargar antes podría volver a cachear los valores viejos
+    if session.info.pop("ingredientes_cambiados", False):
+        tabla_ingredientes.invalidar()
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_ingredientes(session):
+    session.info.pop("ingredientes_cambiados", None)
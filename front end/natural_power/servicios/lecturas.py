@@ -0,0 +1,119 @@
+# lecturas.py
+# Lecturas caras compartidas: una sola consulta por clave en vuelo (single-flight) y stale-while-revalidate.
+
+import asyncio
+import os
+import time as time_mod
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from sqlalchemy import event
+
+from ..db import engine
+from ..logs import log
+from ..metricas import metricas
+
+# Cuando el catálogo o el dashboard vencen, decenas de peticiones idénticas
+# llegan a la vez y cada una consultaba la base. Aquí la primera calcula (en un
+# hilo, con su propia sesión) y las demás con la misma clave esperan ese mismo
+# resultado. La clave es la ruta, los parámetros normalizados y el alcance de
+# quien pregunta (p. ej. "publico" o "admin"), nunca datos de un usuario que
+# otro no deba ver.
+#
+# Un resultado vale `ttl` segundos. Pasado eso, o si se escribió en alguna de
+# sus tablas, durante LECTURAS_STALE_SECONDS más se sigue entregando al instante
+# mientras se recalcula en segundo plano (una vez, no por petición). Más viejo
+# que eso se trata como ausente y se espera el cálculo.
+
+LECTURAS_STALE_SECONDS = float(os.getenv("LECTURAS_STALE_SECONDS", "30"))
+LECTURAS_MAX_ENTRADAS = int(os.getenv("LECTURAS_MAX_ENTRADAS", "1000"))
+CATALOGO_TTL_SECONDS = float(os.getenv("CATALOGO_TTL_SECONDS", "5"))
+DASHBOARD_TTL_SECONDS = float(os.getenv("DASHBOARD_TTL_SECONDS", "10"))
+PRONOSTICO_STOCK_TTL_SECONDS = float(os.getenv("PRONOSTICO_STOCK_TTL_SECONDS", "10"))
+
+_lecturas_por_tabla: Dict[str, List["LecturaCompartida"]] = {}
+
+
+class LecturaCompartida:
+    def __init__(self, nombre: str, ttl: float, tablas: Tuple[str, ...]) -> None:
+        self.nombre = nombre
+        self.ttl = ttl
+        self.generacion = 0
+        # clave -> (valor, calculado en monotonic, generación al empezar el cálculo)
+        self._entradas: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._en_vuelo: Dict[Hashable, "asyncio.Future[Any]"] = {}
+        for tabla in tablas:
+            _lecturas_por_tabla.setdefault(tabla, []).append(self)
+
+    def invalidar(self) -> None:
+        """Marca todo como vencido: se sigue sirviendo mientras se recalcula."""
+        self.generacion += 1
+
+    def _calcular(self, clave: Hashable, calcular: Callable[[], Any]) -> "asyncio.Future[Any]":
+        futuro = self._en_vuelo.get(clave)
+        if futuro is None:
+            futuro = asyncio.ensure_future(self._ejecutar(clave, calcular))
+            self._en_vuelo[clave] = futuro
+        return futuro
+
+    async def _ejecutar(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        # Con la generación y la hora del inicio: si se escribe durante el cálculo, el resultado ya nace vencido
+        generacion, inicio = self.generacion, time_mod.monotonic()
+        try:
+            valor = await asyncio.to_thread(calcular)
+        finally:
+            del self._en_vuelo[clave]
+        self._entradas[clave] = (valor, inicio, generacion)
+        self._entradas.move_to_end(clave)
+        while len(self._entradas) > LECTURAS_MAX_ENTRADAS:
+            self._entradas.popitem(last=False)
+        return valor
+
+    def _revalidar(self, clave: Hashable, calcular: Callable[[], Any]) -> None:
+        if clave in self._en_vuelo:
+            return
+        self._calcular(clave, calcular).add_done_callback(self._registrar_error)
+
+    def _registrar_error(self, futuro: "asyncio.Future[Any]") -> None:
+        if not futuro.cancelled() and futuro.exception() is not None:
+            log.warning("No se pudo recalcular %s: %s", self.nombre, futuro.exception())
+
+    async def obtener(self, clave: Hashable, calcular: Callable[[], Any]) -> Any:
+        """Valor para `clave`; `calcular` (síncrona, abre su propia sesión) corre en un hilo si hace falta."""
+        entrada = self._entradas.get(clave)
+        if entrada is not None:
+            valor, calculado, generacion = entrada
+            edad = time_mod.monotonic() - calculado
+            if generacion == self.generacion and edad < self.ttl:
+                metricas.cache_acceso(self.nombre, True)
+                return valor
+            if edad < self.ttl + LECTURAS_STALE_SECONDS:
+                metricas.cache_acceso(self.nombre, True)
+                self._revalidar(clave, calcular)
+                return valor
+        # Esperar al que ya está calculando cuenta como acierto: no va a la base
+        metricas.cache_acceso(self.nombre, clave in self._en_vuelo)
+        # shield: si este cliente se va, el cálculo sigue para los demás
+        return await asyncio.shield(self._calcular(clave, calcular))
+
+    def en_vuelo(self) -> int:
+        return len(self._en_vuelo)
+
+
+catalogo = LecturaCompartida("catalogo", CATALOGO_TTL_SECONDS, ("product",))
+dashboard = LecturaCompartida("dashboard", DASHBOARD_TTL_SECONDS, ("user", "order"))
+# Alertas de stock: cruza el pronóstico (NumPy, puede recalcularse) con el stock actual
+pronostico_stock = LecturaCompartida("pronostico_stock", PRONOSTICO_STOCK_TTL_SECONDS, ("product",))
+
+metricas.gauge("np_coalesced_reads_in_flight", "Lecturas compartidas calculándose ahora",
+               lambda: catalogo.en_vuelo() + dashboard.en_vuelo() + pronostico_stock.en_vuelo())
+
+
+@event.listens_for(engine, "after_execute")
+def _invalidar_lecturas(conn, clauseelement, multiparams, params, execution_options, result):
+    # Cualquier INSERT/UPDATE/DELETE, del ORM o SQL Core (p. ej. el descuento de stock de un pedido)
+    if not getattr(clauseelement, "is_dml", False):
+        return
+    tabla: Optional[Any] = getattr(clauseelement, "table", None)
+    for lectura in _lecturas_por_tabla.get(getattr(tabla, "name", None), ()):
+        lectura.invalidar()
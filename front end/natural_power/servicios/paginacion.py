@@ -0,0 +1,113 @@
+# paginacion.py
+# Paginación por cursor (keyset), conteos cacheados y selección de campos
+# para los listados.
+
+import base64
+import json
+import os
+import time as time_mod
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from fastapi import Response as RespuestaHTTP
+from sqlalchemy import event, func
+from sqlmodel import Session, select
+
+from ..metricas import metricas
+
+# Los listados se recorren por id ascendente: `WHERE id > :ultimo ORDER BY id
+# LIMIT n` usa la clave primaria y cuesta lo mismo en la página 1 que en la
+# 1000, a diferencia de OFFSET. El cursor es opaco para el cliente y viaja en
+# el header X-Next-Cursor (el body sigue siendo la lista, como antes); con
+# ?total=1 se agrega X-Total-Count.
+
+CONTEO_TTL_SECONDS = float(os.getenv("CONTEO_TTL_SECONDS", "30"))
+HEADER_CURSOR = "X-Next-Cursor"
+HEADER_TOTAL = "X-Total-Count"
+
+_conteos: Dict[Tuple[str, str], Tuple[float, int]] = {}
+
+
+def codificar_cursor(ultimo_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": ultimo_id}).encode()).decode().rstrip("=")
+
+
+def decodificar_cursor(cursor: str) -> int:
+    """Id del último elemento entregado. ValueError si el cursor no es válido."""
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(datos["id"])
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+
+def parsear_campos(fields: Optional[str], permitidos: Iterable[str]) -> Optional[Set[str]]:
+    """Convierte `?fields=id,nombre` en un set. None = todos. ValueError si hay campos desconocidos."""
+    if not fields:
+        return None
+    campos = {c.strip() for c in fields.split(",") if c.strip()}
+    desconocidos = campos - set(permitidos)
+    if desconocidos:
+        raise ValueError(f"Campos no soportados: {', '.join(sorted(desconocidos))}")
+    return campos
+
+
+def recortar(d: Dict[str, Any], campos: Optional[Set[str]]) -> Dict[str, Any]:
+    if campos is None:
+        return d
+    return {k: v for k, v in d.items() if k in campos}
+
+
+def pagina_keyset(session: Session, modelo: Any, cursor: Optional[str], limite: int,
+                  condiciones: Sequence[Any] = ()) -> Tuple[List[Any], Optional[str]]:
+    """Una página de `modelo` ordenada por id y el cursor de la siguiente (None si no hay más)."""
+    consulta = select(modelo)
+    for condicion in condiciones:
+        consulta = consulta.where(condicion)
+    if cursor:
+        consulta = consulta.where(modelo.id > decodificar_cursor(cursor))
+    # Se pide uno de más para saber si hay otra página sin un COUNT
+    filas = session.exec(consulta.order_by(modelo.id).limit(limite + 1)).all()
+    if len(filas) > limite:
+        return filas[:limite], codificar_cursor(filas[limite - 1].id)
+    return filas, None
+
+
+def contar(session: Session, modelo: Any, condiciones: Sequence[Any] = (), clave: str = "") -> int:
+    """COUNT(*) cacheado por tabla (y `clave` del filtro) durante CONTEO_TTL_SECONDS.
+
+    Se invalida al escribir filas de la tabla por el ORM en este proceso; las
+    escrituras de otros workers o por SQL directo se ven al vencer el TTL.
+    """
+    k = (modelo.__tablename__, clave)
+    ahora = time_mod.monotonic()
+    guardado = _conteos.get(k)
+    if guardado is not None and ahora - guardado[0] < CONTEO_TTL_SECONDS:
+        metricas.cache_acceso("conteos", True)
+        return guardado[1]
+    metricas.cache_acceso("conteos", False)
+    consulta = select(func.count()).select_from(modelo)
+    for condicion in condiciones:
+        consulta = consulta.where(condicion)
+    total = int(session.exec(consulta).one())
+    _conteos[k] = (ahora, total)
+    return total
+
+
+def encabezados_pagina(respuesta: RespuestaHTTP, siguiente: Optional[str], total: Optional[int] = None) -> None:
+    if siguiente:
+        respuesta.headers[HEADER_CURSOR] = siguiente
+    if total is not None:
+        respuesta.headers[HEADER_TOTAL] = str(total)
+
+
+def invalidar_conteos(*tablas: str) -> None:
+    """Descarta los conteos cacheados de `tablas` (p. ej. tras escribir por SQL directo)."""
+    for k in [k for k in _conteos if k[0] in tablas]:
+        del _conteos[k]
+
+
+@event.listens_for(Session, "after_flush")
+def _invalidar_conteos(session, flush_context):
+    if not _conteos:
+        return
+    invalidar_conteos(*{getattr(obj, "__tablename__", None) for obj in (*session.new, *session.dirty, *session.deleted)})
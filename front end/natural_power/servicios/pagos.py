@@ -0,0 +1,224 @@
+# pagos.py
+# Pagos con MercadoPago: notificaciones del webhook procesadas en segundo plano.
+
+import asyncio
+import json
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session, select
+
+from ..db import engine
+from ..logs import log_pagos
+from ..esquemas import MPItem
+from ..modelos import Order, OrderItem, PaymentEvent
+from .pasarela import PasarelaNoDisponible, pasarela
+from .pedidos import TransicionInvalida, cambiar_estado_pedido, registrar_estado_inicial
+
+PAGOS_MAX_INTENTOS = int(os.getenv("PAGOS_MAX_INTENTOS", "8"))
+PAGOS_POLL_SECONDS = float(os.getenv("PAGOS_POLL_SECONDS", "30"))
+# Una notificación "procesando" por más tiempo que esto se da por abandonada (el
+# proceso que la tomó murió) y cualquier worker puede volver a tomarla. Debe
+# superar lo que tarda consultar el pago con los timeouts de MercadoPago.
+PAGOS_LEASE_SECONDS = float(os.getenv("PAGOS_LEASE_SECONDS", "300"))
+
+_pagos_wakeup: Optional[asyncio.Event] = None
+_pagos_loop: Optional[asyncio.AbstractEventLoop] = None
+_pagos_task: Optional["asyncio.Task[None]"] = None
+
+
+def marcar_pedido_pagado(session: Session, order_id: int, actor: Optional[str] = "mercadopago") -> bool:
+    """Marca el pedido como pagado si sigue pendiente (idempotente ante notificaciones repetidas)."""
+    try:
+        cambiar_estado_pedido(session, order_id, "pagado", actor=actor)
+        return True
+    except (TransicionInvalida, LookupError):
+        return False
+
+
+def crear_pedido_preferencia(session: Session, user_email: Optional[str], items: List[MPItem]) -> Order:
+    """Crea el pedido previo a la preferencia de pago con los items recibidos (hace commit)."""
+    total = sum([float(it.unit_price) * int(it.quantity) for it in items])
+    order = Order(user_email=user_email, total=total)
+    session.add(order)
+    session.commit()
+    session.refresh(order)
+    registrar_estado_inicial(session, order, actor=user_email)
+    # Agregar items del pedido
+    for it in items:
+        oi = OrderItem(order_id=order.id, product_id=it.product_id or 0, name=it.title, price=float(it.unit_price), quantity=int(it.quantity))
+        session.add(oi)
+    session.commit()
+    return order
+
+
+def cancelar_pedido_sin_preferencia(session: Session, order_id: int) -> None:
+    """Cancela el pedido recién creado si no se pudo crear su preferencia (hace commit)."""
+    session.rollback()
+    try:
+        cambiar_estado_pedido(session, order_id, "cancelado", motivo="No se pudo crear la preferencia de pago", actor="mercadopago")
+        session.commit()
+    except (TransicionInvalida, LookupError):
+        session.rollback()
+
+
+def registrar_notificacion(session: Session, idempotency_key: str, tipo: str, data_id: str, payload: Dict[str, Any]) -> bool:
+    """Guarda una notificación del webhook (hace commit).
+
+    Devuelve False si la clave de idempotencia ya estaba registrada (reintento de MercadoPago).
+    """
+    result = session.exec(
+        sqlite_insert(PaymentEvent)
+        .values(idempotency_key=idempotency_key, tipo=tipo, data_id=str(data_id),
+                payload=json.dumps(payload, default=str)[:10000], estado="pendiente",
+                intentos=0, proximo_intento=datetime.now(timezone.utc), created_at=datetime.now(timezone.utc))
+        .on_conflict_do_nothing(index_elements=["idempotency_key"])
+    )
+    session.commit()
+    return result.rowcount != 0
+
+
+def despertar_worker_pagos() -> None:
+    if _pagos_loop is None or _pagos_wakeup is None:
+        return
+    try:
+        _pagos_loop.call_soon_threadsafe(_pagos_wakeup.set)
+    except RuntimeError:
+        pass
+
+
+async def _procesar_evento_pago(evento_id: int, data_id: str) -> None:
+    payment = await pasarela.obtener_pago(data_id)
+    status_mp = payment.get("status")
+    order_id = (payment.get("metadata") or {}).get("order_id") or payment.get("external_reference")
+    with Session(engine) as session:
+        if status_mp == "approved" and order_id:
+            marcar_pedido_pagado(session, int(order_id))
+        session.exec(
+            update(PaymentEvent)
+            .where(PaymentEvent.id == evento_id)
+            .values(estado="procesado", processed_at=datetime.now(timezone.utc), ultimo_error=None, reclamado_at=None)
+        )
+        session.commit()
+
+
+def _disponible(now: datetime):
+    """Vencidas, o tomadas por un worker cuyo lease ya expiró (las que otro worker vivo procesa conservan su lease)."""
+    return or_(
+        and_(PaymentEvent.estado == "pendiente", PaymentEvent.proximo_intento <= now),
+        and_(
+            PaymentEvent.estado == "procesando",
+            or_(
+                PaymentEvent.reclamado_at.is_(None),
+                PaymentEvent.reclamado_at < now - timedelta(seconds=PAGOS_LEASE_SECONDS),
+            ),
+        ),
+    )
+
+
+def _reclamar_evento(evento_id: int) -> bool:
+    """Pasa la notificación a "procesando" si sigue disponible; False si otro worker la tomó antes."""
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        result = session.exec(
+            update(PaymentEvent)
+            .where(PaymentEvent.id == evento_id, _disponible(now))
+            .values(estado="procesando", reclamado_at=now)
+        )
+        session.commit()
+    return result.rowcount == 1
+
+
+def _liberar_evento(evento_id: int) -> None:
+    """Devuelve a la cola una notificación tomada sin gastar un intento."""
+    with Session(engine) as session:
+        session.exec(
+            update(PaymentEvent)
+            .where(PaymentEvent.id == evento_id, PaymentEvent.estado == "procesando")
+            .values(estado="pendiente", reclamado_at=None)
+        )
+        session.commit()
+
+
+async def _procesar_lote_pagos() -> int:
+    now = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        eventos = session.exec(
+            select(PaymentEvent.id, PaymentEvent.data_id, PaymentEvent.intentos)
+            .where(_disponible(now))
+            .order_by(PaymentEvent.id)
+            .limit(20)
+        ).all()
+    procesados = 0
+    for evento_id, data_id, intentos in eventos:
+        # Cada notificación se toma justo antes de consultarla: con varios workers
+        # (o procesos) leyendo la misma cola, solo uno la procesa
+        if not _reclamar_evento(evento_id):
+            continue
+        procesados += 1
+        try:
+            await _procesar_evento_pago(evento_id, data_id)
+        except asyncio.CancelledError:
+            _liberar_evento(evento_id)
+            raise
+        except PasarelaNoDisponible as e:
+            # Caída de MercadoPago, no del evento: no gasta intentos, se retoma en el próximo ciclo
+            _liberar_evento(evento_id)
+            log_pagos.warning("MercadoPago no disponible; notificaciones en espera: %s", e)
+            return 0
+        except Exception as e:
+            intentos += 1
+            espera = timedelta(seconds=min(3600, 5 * (2 ** intentos)))
+            with Session(engine) as session:
+                session.exec(
+                    update(PaymentEvent)
+                    .where(PaymentEvent.id == evento_id)
+                    .values(
+                        intentos=intentos,
+                        ultimo_error=str(e)[:500],
+                        estado="error" if intentos >= PAGOS_MAX_INTENTOS else "pendiente",
+                        proximo_intento=datetime.now(timezone.utc) + espera,
+                        reclamado_at=None,
+                    )
+                )
+                session.commit()
+            log_pagos.warning("Error procesando notificación %s (intento %s): %s", evento_id, intentos, e)
+    return procesados
+
+
+async def _pagos_worker() -> None:
+    global _pagos_wakeup, _pagos_loop
+    _pagos_loop = asyncio.get_running_loop()
+    _pagos_wakeup = asyncio.Event()
+    while True:
+        _pagos_wakeup.clear()
+        try:
+            procesados = await _procesar_lote_pagos()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            log_pagos.exception("Error en worker de pagos")
+            procesados = 0
+        if procesados:
+            continue
+        try:
+            await asyncio.wait_for(_pagos_wakeup.wait(), timeout=PAGOS_POLL_SECONDS)
+        except asyncio.TimeoutError:
+            pass
+
+
+def iniciar_worker_pagos() -> None:
+    global _pagos_task
+    _pagos_task = asyncio.create_task(_pagos_worker())
+
+
+async def detener_worker_pagos() -> None:
+    if _pagos_task is not None:
+        _pagos_task.cancel()
+        try:
+            await _pagos_task
+        except asyncio.CancelledError:
+            pass
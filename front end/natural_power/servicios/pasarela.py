@@ -0,0 +1,194 @@
+# pasarela.py
+# Adaptador async de MercadoPago: pool HTTP reutilizado, timeouts estrictos y circuit breaker.
+
+import asyncio
+import functools
+import os
+import time as time_mod
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, Optional
+
+from ..config import HTTPX_AVAILABLE, MP_ACCESS_TOKEN, MP_API_BASE, MP_AVAILABLE
+from ..logs import log_pagos
+from ..metricas import metricas
+
+if TYPE_CHECKING:
+    import httpx
+
+# Todas las llamadas a MercadoPago pasan por aquí. Con httpx se usa un único
+# AsyncClient (conexiones keep-alive) con timeouts de conexión, lectura y de
+# espera por una conexión libre del pool, así que una petición lenta nunca
+# retiene un worker más de MP_CONNECT_TIMEOUT + MP_TIMEOUT. Sin httpx se usa el
+# SDK oficial en un hilo con el mismo tope.
+#
+# El circuit breaker cuenta fallas seguidas (timeouts, errores de conexión, 5xx
+# y 429; un 4xx es culpa de la petición y no cuenta). Con MP_CB_FALLOS seguidas
+# se abre: durante MP_CB_ESPERA_SECONDS las llamadas fallan al instante con
+# PasarelaNoDisponible. Luego pasa a semiabierto y deja pasar una sola llamada
+# de prueba: si responde se cierra, si falla vuelve a abrirse.
+
+MP_TIMEOUT = float(os.getenv("MP_TIMEOUT", "5"))
+MP_CONNECT_TIMEOUT = float(os.getenv("MP_CONNECT_TIMEOUT", "2"))
+MP_POOL_TIMEOUT = 1.0  # espera máxima por una conexión libre antes de dar la llamada por fallida
+MP_MAX_CONEXIONES = int(os.getenv("MP_MAX_CONEXIONES", "20"))
+MP_CB_FALLOS = int(os.getenv("MP_CB_FALLOS", "5"))
+MP_CB_ESPERA_SECONDS = float(os.getenv("MP_CB_ESPERA_SECONDS", "30"))
+
+# Con httpx no hace falta el SDK
+PASARELA_DISPONIBLE = HTTPX_AVAILABLE or MP_AVAILABLE
+
+CERRADO, SEMI_ABIERTO, ABIERTO = "cerrado", "semi_abierto", "abierto"
+
+
+class PasarelaNoDisponible(Exception):
+    """MercadoPago no responde o el circuito está abierto: conviene ofrecer otro medio de pago"""
+
+
+class ErrorPasarela(Exception):
+    """MercadoPago rechazó la petición (4xx): reintentarla igual no sirve"""
+
+
+class _Caida(Exception):
+    """Falla que cuenta para el circuit breaker"""
+
+
+@functools.lru_cache(maxsize=1)
+def sdk_mp() -> Any:
+    """SDK de MercadoPago, importado y creado en el primer uso."""
+    import mercadopago  # type: ignore
+    return mercadopago.SDK(MP_ACCESS_TOKEN)
+
+
+class CircuitBreaker:
+    def __init__(self, nombre: str, fallos_max: int, espera: float) -> None:
+        self.nombre = nombre
+        self.fallos_max = fallos_max
+        self.espera = espera
+        self.fallos = 0
+        self.abierto_desde: Optional[float] = None
+        self._probando = False
+
+    @property
+    def estado(self) -> str:
+        if self.abierto_desde is None:
+            return CERRADO
+        if time_mod.monotonic() - self.abierto_desde >= self.espera:
+            return SEMI_ABIERTO
+        return ABIERTO
+
+    def permitir(self) -> bool:
+        estado = self.estado
+        if estado == CERRADO:
+            return True
+        if estado == SEMI_ABIERTO and not self._probando:
+            self._probando = True  # solo una llamada de prueba a la vez
+            return True
+        return False
+
+    def exito(self) -> None:
+        if self.abierto_desde is not None:
+            log_pagos.info("Circuito %s cerrado: el servicio volvió a responder", self.nombre)
+        self.fallos = 0
+        self.abierto_desde = None
+        self._probando = False
+
+    def fallo(self) -> None:
+        self.fallos += 1
+        if self._probando or self.fallos >= self.fallos_max:
+            if self.abierto_desde is None:
+                log_pagos.warning("Circuito %s abierto tras %s fallas seguidas", self.nombre, self.fallos)
+            self.abierto_desde = time_mod.monotonic()
+        self._probando = False
+
+    def liberar(self) -> None:
+        """La llamada de prueba terminó sin veredicto (p. ej. se canceló)."""
+        self._probando = False
+
+    async def llamar(self, funcion: Callable[[], Awaitable[Any]]) -> Any:
+        if not self.permitir():
+            raise PasarelaNoDisponible(f"{self.nombre} no disponible por el momento")
+        try:
+            resultado = await funcion()
+        except _Caida as e:
+            self.fallo()
+            raise PasarelaNoDisponible(str(e)) from e
+        except ErrorPasarela:
+            self.exito()  # respondió: el servicio está sano
+            raise
+        except BaseException:
+            self.liberar()
+            raise
+        self.exito()
+        return resultado
+
+
+class PasarelaMercadoPago:
+    def __init__(self) -> None:
+        self.circuito = CircuitBreaker("MercadoPago", MP_CB_FALLOS, MP_CB_ESPERA_SECONDS)
+        self._http: Optional["httpx.AsyncClient"] = None
+
+    def _cliente(self) -> "httpx.AsyncClient":
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(
+                base_url=MP_API_BASE,
+                headers={"Authorization": f"Bearer {MP_ACCESS_TOKEN}"},
+                timeout=httpx.Timeout(MP_TIMEOUT, connect=MP_CONNECT_TIMEOUT, pool=MP_POOL_TIMEOUT),
+                limits=httpx.Limits(max_connections=MP_MAX_CONEXIONES, max_keepalive_connections=MP_MAX_CONEXIONES),
+            )
+        return self._http
+
+    @staticmethod
+    def _clasificar(codigo: int, detalle: Any) -> None:
+        if codigo == 429 or codigo >= 500:
+            raise _Caida(f"MercadoPago respondió {codigo}")
+        if codigo >= 400:
+            raise ErrorPasarela(f"MercadoPago rechazó la petición ({codigo}): {str(detalle)[:200]}")
+
+    async def _http_json(self, metodo: str, ruta: str, **kwargs: Any) -> Dict[str, Any]:
+        import httpx
+        try:
+            resp = await self._cliente().request(metodo, ruta, **kwargs)
+        except httpx.TransportError as e:  # timeouts (incluido el del pool) y errores de conexión
+            raise _Caida(f"MercadoPago no respondió: {type(e).__name__}") from e
+        self._clasificar(resp.status_code, resp.text)
+        return resp.json()
+
+    async def _sdk(self, llamada: Callable[..., Dict[str, Any]], *args: Any) -> Dict[str, Any]:
+        # El hilo sigue hasta que el SDK termine, pero la petición no lo espera
+        try:
+            result = await asyncio.wait_for(asyncio.to_thread(llamada, *args), MP_CONNECT_TIMEOUT + MP_TIMEOUT)
+        except asyncio.TimeoutError as e:
+            raise _Caida("MercadoPago no respondió a tiempo") from e
+        except Exception as e:
+            raise _Caida(f"Error del SDK de MercadoPago: {e}") from e
+        self._clasificar(int(result.get("status") or 200), result.get("response"))
+        return result.get("response") or {}
+
+    def disponible(self) -> bool:
+        """False si no hay cliente o credenciales, o el circuito está abierto (fallaría al instante)."""
+        return PASARELA_DISPONIBLE and bool(MP_ACCESS_TOKEN) and self.circuito.estado != ABIERTO
+
+    async def crear_preferencia(self, datos: Dict[str, Any], clave_idempotencia: Optional[str] = None) -> Dict[str, Any]:
+        """Crea una preferencia de pago. PasarelaNoDisponible si MercadoPago no responde."""
+        if HTTPX_AVAILABLE:
+            encabezados = {"X-Idempotency-Key": clave_idempotencia} if clave_idempotencia else {}
+            return await self.circuito.llamar(lambda: self._http_json("POST", "/checkout/preferences", json=datos, headers=encabezados))
+        return await self.circuito.llamar(lambda: self._sdk(sdk_mp().preference().create, datos))
+
+    async def obtener_pago(self, payment_id: str) -> Dict[str, Any]:
+        if HTTPX_AVAILABLE:
+            return await self.circuito.llamar(lambda: self._http_json("GET", f"/v1/payments/{payment_id}"))
+        if not MP_AVAILABLE:
+            raise RuntimeError("Ni httpx ni el SDK de MercadoPago están instalados")
+        return await self.circuito.llamar(lambda: self._sdk(sdk_mp().payment().get, payment_id))
+
+    async def cerrar(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+
+pasarela = PasarelaMercadoPago()
+
+metricas.gauge("np_mp_circuit_state", "Circuito hacia MercadoPago (0 cerrado, 1 semiabierto, 2 abierto)",
+               lambda: (CERRADO, SEMI_ABIERTO, ABIERTO).index(pasarela.circuito.estado))
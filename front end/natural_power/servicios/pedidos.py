@@ -0,0 +1,205 @@
+# pedidos.py
+# Ciclo de vida de pedidos.
+
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import delete, func, insert, literal, update
+from sqlmodel import Session, select
+
+from ..logs import enmascarar_email, log_pedidos
+from ..modelos import CartItem, Order, OrderItem, OrderStatusEvent, Product
+from ..seguridad import es_admin
+from .carrito import StockInsuficiente, repreciar_carrito, verificar_stock
+from .correo import despertar_worker_correo, encolar_email
+from .cupones import CuponInvalido, canjear_cupon, evaluar_cupon
+from .jugos import descontar_ingredientes
+
+# Order.estado guarda el estado actual (consulta barata e indexada) y
+# OrderStatusEvent el historial; ambos se escriben en la misma transacción.
+
+ESTADOS_PEDIDO: Dict[str, str] = {
+    "pendiente": "Pendiente de pago",
+    "pagado": "Pagado",
+    "preparando": "En preparación",
+    "enviado": "Enviado",
+    "entregado": "Entregado",
+    "cancelado": "Cancelado",
+}
+TRANSICIONES_PEDIDO: Dict[str, Tuple[str, ...]] = {
+    "pendiente": ("pagado", "cancelado"),
+    "pagado": ("preparando", "cancelado"),
+    "preparando": ("enviado", "cancelado"),
+    "enviado": ("entregado",),
+    "entregado": (),
+    "cancelado": (),
+}
+ESTADOS_ABIERTOS = ("pendiente", "pagado", "preparando", "enviado")
+ESTADOS_CANCELABLES_CLIENTE = ("pendiente", "pagado")
+
+
+class TransicionInvalida(Exception):
+    """El pedido no puede pasar al estado pedido desde su estado actual"""
+
+
+def _sumar_items_a_producto(session: Session, order_id: int, columna: str, signo: int) -> None:
+    """Suma (o resta) las unidades del pedido a una columna de Product en una sola sentencia."""
+    unidades = (
+        select(func.coalesce(func.sum(OrderItem.quantity), 0))
+        .where(OrderItem.order_id == order_id, OrderItem.product_id == Product.id)
+        .scalar_subquery()
+    )
+    col = getattr(Product, columna)
+    session.exec(
+        update(Product)
+        .where(Product.id.in_(select(OrderItem.product_id).where(OrderItem.order_id == order_id)))
+        .values({columna: col + signo * unidades})
+    )
+
+
+def registrar_estado_inicial(session: Session, order: Order, actor: Optional[str] = None) -> None:
+    session.add(OrderStatusEvent(order_id=order.id, estado=order.estado, actor=actor))
+
+
+def cambiar_estado_pedido(session: Session, order_id: int, nuevo: str,
+                          motivo: Optional[str] = None, actor: Optional[str] = None) -> OrderStatusEvent:
+    """Aplica una transición de estado dentro de la transacción del llamador.
+
+    La actualización es condicional sobre el estado leído, así que dos cambios
+    concurrentes no pueden aplicarse ambos. Al pagar suma Product.vendidos; al
+    cancelar devuelve el stock descontado (y resta vendidos si estaba pagado).
+    Lanza TransicionInvalida si la transición no está permitida y LookupError
+    si el pedido no existe.
+    """
+    if nuevo not in ESTADOS_PEDIDO:
+        raise TransicionInvalida(f"Estado desconocido: {nuevo}")
+    fila = session.exec(select(Order.estado, Order.stock_descontado).where(Order.id == order_id)).first()
+    if fila is None:
+        raise LookupError(f"Pedido {order_id} no encontrado")
+    actual, stock_descontado = fila
+    if nuevo not in TRANSICIONES_PEDIDO.get(actual, ()):
+        raise TransicionInvalida(f"No se puede pasar de '{actual}' a '{nuevo}'")
+
+    valores: Dict[str, Any] = {"estado": nuevo}
+    if nuevo == "cancelado":
+        valores["stock_descontado"] = False
+    result = session.exec(update(Order).where(Order.id == order_id, Order.estado == actual).values(**valores))
+    if result.rowcount != 1:
+        raise TransicionInvalida("El pedido cambió de estado mientras se procesaba")
+
+    if nuevo == "pagado":
+        _sumar_items_a_producto(session, order_id, "vendidos", 1)
+    elif nuevo == "cancelado":
+        if stock_descontado:
+            _sumar_items_a_producto(session, order_id, "stock", 1)
+        if actual != "pendiente":
+            _sumar_items_a_producto(session, order_id, "vendidos", -1)
+
+    evento = OrderStatusEvent(order_id=order_id, estado_anterior=actual, estado=nuevo, motivo=motivo, actor=actor)
+    session.add(evento)
+    # Se publica a los suscriptores recién cuando la transacción hace commit
+    session.info.setdefault("eventos_pedido", []).append(evento)
+    return evento
+
+
+def evento_a_dict(ev: OrderStatusEvent) -> Dict[str, Any]:
+    return {
+        "id": ev.id,
+        "estado": ev.estado,
+        "etiqueta": ESTADOS_PEDIDO.get(ev.estado, ev.estado),
+        "estado_anterior": ev.estado_anterior,
+        "motivo": ev.motivo,
+        "fecha": ev.created_at.isoformat(),
+    }
+
+
+def puede_ver_pedido(order: Order, email: str) -> bool:
+    """El dueño del pedido o un admin."""
+    return order.user_email == email or es_admin(email)
+
+
+def crear_pedido_desde_carrito(session: Session, user_email: str, cupon: Optional[str] = None
+                               ) -> Optional[Tuple[Order, List[Dict[str, Any]]]]:
+    """Convierte el carrito en un pedido: lo lleva a los precios vigentes, aplica
+    el cupón, descuenta stock, vacía el carrito y encola el correo de
+    confirmación (hace commit). Devuelve el pedido y las líneas que cambiaron de
+    precio, o None si el carrito está vacío; lanza CuponInvalido o
+    StockInsuficiente (sin escribir nada) si el cupón no aplica o falta stock.
+    """
+    items, repreciados = repreciar_carrito(session, user_email)
+    log_pedidos.info("Crear pedido para %s con %s items", enmascarar_email(user_email), len(items))
+    if not items:
+        session.rollback()  # el UPDATE del repreciado abrió la transacción de escritura
+        return None
+
+    # Sin recortes al descontar: si se restara menos de lo pedido, cancelar devolvería unidades que no existían
+    try:
+        verificar_stock(session, items)
+    except StockInsuficiente:
+        session.rollback()  # deshacer el repreciado
+        raise
+
+    total = sum([float(it.price) * int(it.quantity) for it in items])
+    regla = None
+    if cupon:
+        try:
+            regla, calculo = evaluar_cupon(session, cupon, user_email, items)
+        except CuponInvalido:
+            session.rollback()  # deshacer el repreciado
+            raise
+        total = calculo["total_nuevo"]
+    order = Order(user_email=user_email, total=total, stock_descontado=True)
+    session.add(order)
+    # flush (no commit) para tener el id: el canje del cupón va en la misma transacción
+    session.flush()
+    if regla is not None:
+        try:
+            canjear_cupon(session, regla, user_email, order.id, calculo["descuento"])
+        except CuponInvalido:
+            session.rollback()
+            raise
+    registrar_estado_inicial(session, order, actor=user_email)
+
+    # Copiar los items al pedido y reducir stock con una sentencia cada uno (los jugos personalizados no están en product)
+    ids = [it.id for it in items]
+    session.exec(insert(OrderItem).from_select(
+        ["order_id", "product_id", "name", "price", "quantity"],
+        select(literal(order.id), CartItem.product_id, CartItem.name, CartItem.price, CartItem.quantity).where(CartItem.id.in_(ids)),
+    ))
+    _sumar_items_a_producto(session, order.id, "stock", -1)
+
+    # Porciones de los jugos personalizados
+    descontar_ingredientes(session, items)
+
+    # Limpiar carrito (solo los items cobrados: uno agregado recién queda para la próxima compra)
+    session.exec(delete(CartItem).where(CartItem.id.in_(ids)))
+
+    detalle = "\n".join(f"- {it.quantity} x {it.name}: ${float(it.price) * int(it.quantity):,.0f}" for it in items)
+    if regla is not None:
+        detalle += f"\n- Cupón {regla.codigo}: -${calculo['descuento']:,.0f}"
+    encolar_email(session, user_email, "confirmacion_pedido", pedido_id=order.id, detalle=detalle, total=f"{total:,.0f}")
+    session.commit()
+    despertar_worker_correo()
+    return order, repreciados
+
+
+def pedidos_de_usuario(session: Session, user_email: str) -> List[Dict[str, Any]]:
+    """Pedidos del usuario, más recientes primero, con sus items."""
+    orders = session.exec(select(Order).where(Order.user_email == user_email).order_by(Order.created_at.desc())).all()
+
+    result = []
+    for order in orders:
+        # Obtener items del pedido
+        items = session.exec(select(OrderItem).where(OrderItem.order_id == order.id)).all()
+
+        result.append({
+            "id": order.id,
+            "total": order.total,
+            "estado": order.estado,
+            "created_at": order.created_at.isoformat(),
+            "items": [{
+                "name": item.name,
+                "price": item.price,
+                "quantity": item.quantity
+            } for item in items]
+        })
+    return result
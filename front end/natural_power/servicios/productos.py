@@ -0,0 +1,123 @@
+# productos.py
+# Catálogo de productos (vista pública y panel admin).
+
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from sqlmodel import Session, select
+
+from ..esquemas import ProductoCreateInput, ProductoUpdateInput
+from ..modelos import Product
+from .paginacion import codificar_cursor, pagina_keyset, recortar
+
+# Campos editables desde el panel admin (ProductoUpdateInput aplica solo los provistos)
+CAMPOS_EDITABLES = ("nombre", "descripcion", "precio", "image", "stock", "tipo")
+
+# Campos admitidos en ?fields= ("name", "price" y "description" son los duplicados en inglés)
+CAMPOS_PUBLICOS = ("id", "nombre", "name", "precio", "price", "image", "descripcion", "description", "stock", "tipo")
+CAMPOS_ADMIN = ("id", "nombre", "precio", "stock", "image", "descripcion", "tipo")
+
+
+def producto_publico(p: Product, bilingue: bool = True) -> Dict[str, Any]:
+    """Producto para la tienda; por defecto duplica claves en inglés para el frontend."""
+    if not bilingue:
+        return {
+            "id": p.id,
+            "nombre": p.nombre,
+            "precio": p.precio,
+            "image": p.image,
+            "descripcion": p.descripcion,
+            "stock": p.stock,
+            "tipo": p.tipo,
+        }
+    return {
+        "id": p.id,
+        "nombre": p.nombre,
+        "name": p.nombre,
+        "precio": p.precio,
+        "price": p.precio,
+        "image": p.image,
+        "descripcion": p.descripcion,
+        "description": p.descripcion,
+        "stock": p.stock,
+        "tipo": p.tipo,
+    }
+
+
+def producto_admin(p: Product) -> Dict[str, Any]:
+    return {
+        "id": p.id,
+        "nombre": p.nombre,
+        "precio": p.precio,
+        "stock": p.stock,
+        "image": p.image,
+        "descripcion": p.descripcion,
+        "tipo": p.tipo,
+    }
+
+
+def listar_productos(session: Session, limite: int, cursor: Optional[str] = None, pagina: int = 1,
+                     campos: Optional[Set[str]] = None, bilingue: bool = True) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Página del catálogo y cursor de la siguiente.
+
+    Con cursor se usa keyset; sin cursor se respeta `pagina` (OFFSET) para los
+    clientes existentes, pero igual se devuelve el cursor para continuar.
+    """
+    if cursor or pagina == 1:
+        results, siguiente = pagina_keyset(session, Product, cursor, limite)
+    else:
+        results = session.exec(select(Product).order_by(Product.id).offset((pagina - 1) * limite).limit(limite + 1)).all()
+        siguiente = codificar_cursor(results[limite - 1].id) if len(results) > limite else None
+        results = results[:limite]
+    return [recortar(producto_publico(p, bilingue), campos) for p in results], siguiente
+
+
+def crear_producto(session: Session, input: ProductoCreateInput) -> Product:
+    """Crea un producto (hace commit)."""
+    producto = Product(
+        nombre=input.nombre,
+        descripcion=input.descripcion,
+        precio=input.precio,
+        image=input.image,
+        stock=input.stock,
+        tipo=input.tipo
+    )
+    session.add(producto)
+    session.commit()
+    session.refresh(producto)
+    return producto
+
+
+def actualizar_producto(session: Session, id: int, input: ProductoUpdateInput) -> Optional[Product]:
+    """Aplica solo los campos provistos (hace commit). None si no existe."""
+    producto = session.get(Product, id)
+    if not producto:
+        return None
+    for campo in CAMPOS_EDITABLES:
+        valor = getattr(input, campo)
+        if valor is not None:
+            setattr(producto, campo, valor)
+    session.add(producto)
+    session.commit()
+    session.refresh(producto)
+    return producto
+
+
+def actualizar_stock(session: Session, id: int, stock: int) -> bool:
+    """Fija el stock de un producto (hace commit). False si no existe."""
+    producto = session.get(Product, id)
+    if not producto:
+        return False
+    producto.stock = stock
+    session.add(producto)
+    session.commit()
+    return True
+
+
+def eliminar_producto(session: Session, id: int) -> bool:
+    """Elimina un producto (hace commit). False si no existe."""
+    producto = session.get(Product, id)
+    if not producto:
+        return False
+    session.delete(producto)
+    session.commit()
+    return True
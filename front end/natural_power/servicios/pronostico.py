@@ -0,0 +1,272 @@
+# pronostico.py
+# Pronóstico de demanda por producto: días hasta quedar sin stock y sugerencias de reposición.
+
+import asyncio
+import math
+import os
+import threading
+import time as time_mod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Optional
+
+from sqlalchemy import Integer, cast, func, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlmodel import Session
+
+from ..config import NUMPY_AVAILABLE
+from ..db import engine
+from ..logs import log
+from ..modelos import JobCheckpoint, Order, OrderItem, OrderStatusEvent, Product, ProductDailySales
+
+# Las ventas se agregan por producto y día en ProductDailySales de forma
+# incremental: cada corrida suma solo los pedidos con id mayor al último leído
+# y resta los pedidos ya contados que se cancelaron desde entonces (eventos de
+# OrderStatusEvent con id mayor al último leído). Ambos puntos de avance se
+# guardan en JobCheckpoint en la misma transacción que la suma.
+#
+# Sobre la ventana de PRONOSTICO_VENTANA_DIAS días completos se arma una matriz
+# productos x días y se calcula, para todos los productos a la vez, el
+# suavizado exponencial (un producto matriz-vector con los pesos alfa(1-alfa)^k),
+# los promedios móviles de 7 y 28 días y la desviación diaria. Con el stock
+# actual eso da los días hasta el quiebre, el punto de reorden (demanda del
+# plazo de reposición más un stock de seguridad) y cuánto reponer para cubrir
+# PRONOSTICO_COBERTURA_DIAS más.
+
+PRONOSTICO_VENTANA_DIAS = int(os.getenv("PRONOSTICO_VENTANA_DIAS", "56"))
+PRONOSTICO_ALFA = float(os.getenv("PRONOSTICO_ALFA", "0.3"))
+PRONOSTICO_LEAD_DIAS = float(os.getenv("PRONOSTICO_LEAD_DIAS", "3"))
+PRONOSTICO_COBERTURA_DIAS = float(os.getenv("PRONOSTICO_COBERTURA_DIAS", "14"))
+PRONOSTICO_Z = float(os.getenv("PRONOSTICO_Z", "1.65"))  # stock de seguridad: ~95% de días sin quiebre
+PRONOSTICO_INTERVALO_SECONDS = float(os.getenv("PRONOSTICO_INTERVALO_SECONDS", "900"))
+
+MARCA_PEDIDO = "ventas_diarias.pedido"
+MARCA_EVENTO = "ventas_diarias.evento"
+ESTADOS_ALERTA = ("agotado", "reponer")
+
+
+def _acumular(conn: Any, consulta: Any) -> None:
+    """Suma (product_id, dia, unidades) de `consulta` a ProductDailySales."""
+    sentencia = sqlite_insert(ProductDailySales).from_select(["product_id", "dia", "unidades"], consulta)
+    conn.execute(sentencia.on_conflict_do_update(
+        index_elements=["product_id", "dia"],
+        set_={"unidades": ProductDailySales.unidades + sentencia.excluded.unidades},
+    ))
+
+
+def agregar_ventas() -> Dict[str, int]:
+    """Lleva ProductDailySales al día con los pedidos y cancelaciones nuevos.
+
+    BEGIN IMMEDIATE toma el lock de escritura antes de leer los puntos de
+    avance: con varios workers corriendo el job a la vez, cada pedido se suma
+    una sola vez.
+    """
+    with engine.connect() as conn:
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+        marcas = dict(conn.execute(
+            select(JobCheckpoint.nombre, JobCheckpoint.valor).where(JobCheckpoint.nombre.in_((MARCA_PEDIDO, MARCA_EVENTO)))
+        ).all())
+        desde_pedido, desde_evento = marcas.get(MARCA_PEDIDO, 0), marcas.get(MARCA_EVENTO, 0)
+        hasta_pedido = conn.execute(select(func.coalesce(func.max(Order.id), 0))).scalar()
+        hasta_evento = conn.execute(select(func.coalesce(func.max(OrderStatusEvent.id), 0))).scalar()
+        if (hasta_pedido, hasta_evento) == (desde_pedido, desde_evento):
+            conn.rollback()
+            return {"pedidos": 0, "eventos": 0}
+
+        dia = func.date(Order.created_at)
+        _acumular(conn, (
+            select(OrderItem.product_id, dia, func.sum(OrderItem.quantity))
+            .join(Order, Order.id == OrderItem.order_id)
+            .where(Order.id > desde_pedido, Order.id <= hasta_pedido, Order.estado != "cancelado", OrderItem.product_id > 0)
+            .group_by(OrderItem.product_id, dia)
+        ))
+        # Solo pedidos ya sumados en corridas anteriores; los nuevos cancelados no se sumaron
+        _acumular(conn, (
+            select(OrderItem.product_id, dia, -func.sum(OrderItem.quantity))
+            .select_from(OrderStatusEvent)
+            .join(Order, Order.id == OrderStatusEvent.order_id)
+            .join(OrderItem, OrderItem.order_id == Order.id)
+            .where(OrderStatusEvent.id > desde_evento, OrderStatusEvent.id <= hasta_evento,
+                   OrderStatusEvent.estado == "cancelado", Order.id <= desde_pedido, OrderItem.product_id > 0)
+            .group_by(OrderItem.product_id, dia)
+        ))
+        marca = sqlite_insert(JobCheckpoint)
+        conn.execute(
+            marca.on_conflict_do_update(index_elements=["nombre"], set_={"valor": marca.excluded.valor}),
+            [{"nombre": MARCA_PEDIDO, "valor": hasta_pedido}, {"nombre": MARCA_EVENTO, "valor": hasta_evento}],
+        )
+        conn.commit()
+    return {"pedidos": hasta_pedido - desde_pedido, "eventos": hasta_evento - desde_evento}
+
+
+@dataclass(frozen=True)
+class Pronostico:
+    """Demanda diaria estimada por producto (arreglos alineados con `ids`, ordenados)."""
+    ids: Any
+    demanda: Any
+    desviacion: Any
+    promedio_7d: Any
+    promedio_28d: Any
+    generado: str
+
+
+def calcular_pronostico(ventana: int = PRONOSTICO_VENTANA_DIAS, alfa: float = PRONOSTICO_ALFA) -> Pronostico:
+    """Ajusta los modelos sobre los últimos `ventana` días completos, todos los productos a la vez."""
+    import numpy as np
+
+    hoy = datetime.now(timezone.utc).date()
+    inicio = hoy - timedelta(days=ventana)
+    with engine.connect() as conn:
+        ids = np.fromiter(conn.execute(select(Product.id).order_by(Product.id)).scalars(), dtype=np.int64)
+        filas = conn.execute(
+            select(ProductDailySales.product_id,
+                   cast(func.julianday(ProductDailySales.dia) - func.julianday(inicio.isoformat()), Integer),
+                   ProductDailySales.unidades)
+            .where(ProductDailySales.dia >= inicio, ProductDailySales.dia < hoy)
+        ).all()
+    ventas = np.fromiter((v for f in filas for v in f), dtype=np.int64, count=3 * len(filas)).reshape(-1, 3)
+    ventas = ventas[np.isin(ventas[:, 0], ids)]  # productos eliminados
+    matriz = np.zeros((len(ids), ventana))
+    matriz[np.searchsorted(ids, ventas[:, 0]), ventas[:, 1]] = ventas[:, 2]
+
+    # Suavizado exponencial cerrado: nivel = sum_t alfa(1-alfa)^(T-1-t) x_t + (1-alfa)^T nivel_0,
+    # con la media de la ventana como nivel inicial
+    pesos = alfa * (1 - alfa) ** np.arange(ventana - 1, -1, -1)
+    demanda = matriz @ pesos + (1 - alfa) ** ventana * matriz.mean(axis=1)
+    return Pronostico(
+        ids=ids,
+        demanda=np.maximum(demanda, 0),
+        desviacion=matriz.std(axis=1),
+        promedio_7d=matriz[:, -7:].mean(axis=1),
+        promedio_28d=matriz[:, -28:].mean(axis=1),
+        generado=datetime.now(timezone.utc).isoformat(),
+    )
+
+
+class PronosticoDemanda:
+    """Último pronóstico calculado; se recalcula si tiene más de PRONOSTICO_INTERVALO_SECONDS."""
+
+    def __init__(self) -> None:
+        self.actual: Optional[Pronostico] = None
+        self.calculado = 0.0
+        self._lock = threading.Lock()
+
+    def _vencido(self) -> bool:
+        return self.actual is None or time_mod.monotonic() - self.calculado > PRONOSTICO_INTERVALO_SECONDS
+
+    def actualizar(self, solo_si_vencido: bool = False) -> Pronostico:
+        with self._lock:
+            # Otro hilo pudo recalcularlo mientras se esperaba el lock
+            if solo_si_vencido and not self._vencido():
+                return self.actual
+            t0 = time_mod.perf_counter()
+            agregados = agregar_ventas()
+            self.actual = calcular_pronostico()
+            self.calculado = time_mod.monotonic()
+        log.info("Pronóstico de demanda actualizado", extra={
+            **agregados, "productos": len(self.actual.ids), "segundos": round(time_mod.perf_counter() - t0, 2),
+        })
+        return self.actual
+
+    def obtener(self) -> Pronostico:
+        return self.actualizar(solo_si_vencido=True) if self._vencido() else self.actual
+
+
+pronostico = PronosticoDemanda()
+
+
+def _redondear(valor: float, decimales: int) -> Optional[float]:
+    return None if math.isinf(valor) else round(valor, decimales)
+
+
+def alertas_stock(session: Session, estado: str = "alertas", limite: int = 50) -> Dict[str, Any]:
+    """Productos por estado de stock con el stock actual, los que se agotan antes primero.
+
+    `estado`: 'alertas' (agotado o reponer), 'agotado', 'reponer' o 'todos'.
+    """
+    import numpy as np
+
+    p = pronostico.obtener()
+    filas = session.execute(select(Product.id, Product.stock).order_by(Product.id)).all()
+    valores = np.fromiter((v for f in filas for v in f), dtype=np.int64, count=2 * len(filas)).reshape(-1, 2)
+    ids, stock = valores[:, 0], np.maximum(valores[:, 1], 0).astype(np.float64)
+
+    # Productos creados después del último pronóstico: sin historial, demanda 0
+    conocido = np.isin(ids, p.ids)
+    pos = np.searchsorted(p.ids, ids[conocido])
+    def alinear(arreglo: Any) -> Any:
+        alineado = np.zeros(len(ids))
+        alineado[conocido] = arreglo[pos]
+        return alineado
+    demanda, desviacion = alinear(p.demanda), alinear(p.desviacion)
+    promedio_7d, promedio_28d = alinear(p.promedio_7d), alinear(p.promedio_28d)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        dias = np.where(stock <= 0, 0.0, np.where(demanda > 0, stock / demanda, np.inf))
+    seguridad = PRONOSTICO_Z * desviacion * math.sqrt(PRONOSTICO_LEAD_DIAS)
+    punto_reorden = np.ceil(demanda * PRONOSTICO_LEAD_DIAS + seguridad)
+    reponer = (demanda > 0) & (stock <= punto_reorden)
+    objetivo = demanda * (PRONOSTICO_LEAD_DIAS + PRONOSTICO_COBERTURA_DIAS) + seguridad
+    sugerido = np.where(reponer | (stock <= 0), np.ceil(np.maximum(objetivo - stock, 0)), 0)
+    estados = np.where(stock <= 0, "agotado", np.where(reponer, "reponer", "ok"))
+
+    if estado == "alertas":
+        elegidos = np.isin(estados, ESTADOS_ALERTA)
+    elif estado == "todos":
+        elegidos = np.ones(len(ids), dtype=bool)
+    else:
+        elegidos = estados == estado
+    indices = np.flatnonzero(elegidos)
+    indices = indices[np.lexsort((-demanda[indices], dias[indices]))][:limite]
+
+    nombres = dict(session.execute(select(Product.id, Product.nombre).where(Product.id.in_(ids[indices].tolist()))).all())
+    return {
+        "generado": p.generado,
+        "ventana_dias": PRONOSTICO_VENTANA_DIAS,
+        "total": int(elegidos.sum()),
+        "productos": [
+            {
+                "id": int(ids[i]),
+                "nombre": nombres.get(int(ids[i])),
+                "stock": int(stock[i]),
+                "estado": str(estados[i]),
+                "demanda_diaria": round(float(demanda[i]), 2),
+                "promedio_7d": round(float(promedio_7d[i]), 2),
+                "promedio_28d": round(float(promedio_28d[i]), 2),
+                "dias_hasta_quiebre": _redondear(float(dias[i]), 1),
+                "punto_reorden": int(punto_reorden[i]),
+                "sugerido": int(sugerido[i]),
+            }
+            for i in indices.tolist()
+        ],
+    }
+
+
+_pronostico_task: Optional["asyncio.Task[None]"] = None
+
+
+async def _pronostico_worker() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, pronostico.actualizar)
+        except Exception:
+            log.exception("Error actualizando el pronóstico de demanda")
+        await asyncio.sleep(PRONOSTICO_INTERVALO_SECONDS)
+
+
+def iniciar_worker_pronostico() -> None:
+    global _pronostico_task
+    if not NUMPY_AVAILABLE:
+        log.info("NumPy/SciPy no instalados: pronóstico de demanda desactivado")
+        return
+    _pronostico_task = asyncio.create_task(_pronostico_worker())
+
+
+async def detener_worker_pronostico() -> None:
+    if _pronostico_task is not None:
+        _pronostico_task.cancel()
+        try:
+            await _pronostico_task
+        except asyncio.CancelledError:
+            pass
@@ -0,0 +1,255 @@
+# recomendaciones.py
+# "Los clientes también compraron": co-ocurrencia de productos en pedidos.
+
+import asyncio
+import os
+import time as time_mod
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from ..config import BASE_DIR, NUMPY_AVAILABLE
+from ..db import engine
+from ..logs import log
+from ..modelos import Order, OrderItem
+
+# El índice se construye fuera de línea (`python api.py recomendaciones`) con
+# NumPy/SciPy: una matriz dispersa pedido x producto B, la co-ocurrencia
+# C = BᵀB y la similitud coseno C_ij / sqrt(n_i n_j), donde n_i es la cantidad
+# de pedidos con el producto i. De cada fila se guardan los top-k en arreglos
+# planos estilo CSR (indptr, vecinos, puntajes), así que responder es cortar un
+# tramo de k elementos. El archivo también guarda C y el último pedido leído:
+# una corrida incremental solo lee los pedidos nuevos y los suma (los pedidos
+# cancelados después de contarse siguen sumando hasta la próxima corrida con
+# --completo). La API carga el archivo al arrancar y lo recarga si cambia.
+#
+# NumPy y SciPy son opcionales: sin ellos la API levanta y el endpoint responde
+# una lista vacía.
+
+RECOMENDACIONES_PATH = os.getenv("RECOMENDACIONES_PATH", os.path.join(BASE_DIR, "recomendaciones.npz"))
+RECOMENDACIONES_K = int(os.getenv("RECOMENDACIONES_K", "10"))
+RECOMENDACIONES_MIN_SOPORTE = int(os.getenv("RECOMENDACIONES_MIN_SOPORTE", "2"))
+RECOMENDACIONES_RECARGA_SECONDS = float(os.getenv("RECOMENDACIONES_RECARGA_SECONDS", "300"))
+LOTE_LECTURA = 200_000  # filas de OrderItem por lectura
+
+
+class IndiceRecomendaciones:
+    """Top-k por producto en arreglos planos: los vecinos de la posición p están en [indptr[p], indptr[p+1])."""
+
+    def __init__(self, ids: Any, indptr: Any, vecinos: Any, puntajes: Any, generado: str = "", pedidos: int = 0) -> None:
+        self.ids = ids
+        self.indptr = indptr
+        self.vecinos = vecinos
+        self.puntajes = puntajes
+        self.generado = generado
+        self.pedidos = pedidos
+        self._posicion: Dict[int, int] = dict(zip(ids.tolist(), range(len(ids))))
+
+    def recomendados(self, product_id: int, k: int) -> List[Tuple[int, float]]:
+        pos = self._posicion.get(product_id)
+        if pos is None:
+            return []
+        inicio = int(self.indptr[pos])
+        fin = min(int(self.indptr[pos + 1]), inicio + k)
+        return list(zip(self.vecinos[inicio:fin].tolist(), self.puntajes[inicio:fin].tolist()))
+
+
+def coocurrencias(pedidos: Any, productos: Any, ids: Any) -> Tuple[Any, Any]:
+    """Co-ocurrencia (CSR, sin diagonal) y pedidos por producto, indexados como `ids` (ordenado)."""
+    import numpy as np
+    import scipy.sparse as sp
+
+    columnas = np.searchsorted(ids, productos)
+    _, filas = np.unique(pedidos, return_inverse=True)
+    b = sp.csr_matrix(
+        (np.ones(len(filas), dtype=np.int32), (filas, columnas)),
+        shape=(int(filas.max()) + 1 if len(filas) else 0, len(ids)),
+    )
+    b.sum_duplicates()
+    b.data[:] = 1  # el mismo producto en dos líneas de un pedido cuenta una vez
+    c = (b.T @ b).tocsr()
+    por_producto = c.diagonal().astype(np.int64)
+    c.setdiag(0)
+    c.eliminate_zeros()
+    return c, por_producto
+
+
+def top_k(c: Any, por_producto: Any, ids: Any, k: int, min_soporte: int) -> Tuple[Any, Any, Any]:
+    """(indptr, vecinos, puntajes) con los k vecinos más similares de cada producto, sin bucles por fila."""
+    import numpy as np
+
+    coo = c.tocoo()
+    soporte = coo.data >= min_soporte
+    filas, cols, co = coo.row[soporte], coo.col[soporte], coo.data[soporte]
+    puntajes = co / np.sqrt(por_producto[filas].astype(np.float64) * por_producto[cols])
+    orden = np.lexsort((cols, -puntajes, filas))  # por fila, de mayor a menor puntaje
+    filas, cols, puntajes = filas[orden], cols[orden], puntajes[orden]
+    inicio_fila = np.searchsorted(filas, np.arange(len(ids)))
+    rango = np.arange(len(filas)) - inicio_fila[filas]
+    dentro = rango < k
+    filas, cols, puntajes = filas[dentro], cols[dentro], puntajes[dentro]
+    indptr = np.zeros(len(ids) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(filas, minlength=len(ids)), out=indptr[1:])
+    return indptr, ids[cols].astype(np.int64), puntajes.astype(np.float32)
+
+
+def _reindexar(c: Any, ids_viejos: Any, ids_nuevos: Any) -> Any:
+    import numpy as np
+    import scipy.sparse as sp
+
+    mapa = np.searchsorted(ids_nuevos, ids_viejos)
+    coo = c.tocoo()
+    return sp.csr_matrix((coo.data, (mapa[coo.row], mapa[coo.col])), shape=(len(ids_nuevos), len(ids_nuevos)))
+
+
+def construir_indice(pedidos: Any, productos: Any, previo: Optional[Dict[str, Any]] = None,
+                     k: int = RECOMENDACIONES_K, min_soporte: int = RECOMENDACIONES_MIN_SOPORTE) -> Dict[str, Any]:
+    """Arreglos del índice (y el estado para la próxima corrida) a partir de pares pedido/producto.
+
+    Con `previo` (el estado guardado) se suman los pares nuevos a la co-ocurrencia existente.
+    """
+    import numpy as np
+
+    ids = np.unique(productos).astype(np.int64)
+    if previo is not None:
+        ids = np.union1d(previo["ids"], ids).astype(np.int64)
+    c, por_producto = coocurrencias(pedidos, productos, ids)
+    if previo is not None:
+        c = c + _reindexar(previo["c"], previo["ids"], ids)
+        por_producto = por_producto.copy()
+        por_producto[np.searchsorted(ids, previo["ids"])] += previo["por_producto"]
+    indptr, vecinos, puntajes = top_k(c, por_producto, ids, k, min_soporte)
+    return {"ids": ids, "indptr": indptr, "vecinos": vecinos, "puntajes": puntajes, "c": c.tocsr(), "por_producto": por_producto}
+
+
+def _leer_pares(desde_pedido: int) -> Tuple[Any, Any, int]:
+    """Pares (pedido, producto) de pedidos no cancelados con id > desde_pedido, leídos por lotes."""
+    import numpy as np
+
+    consulta = (
+        select(OrderItem.order_id, OrderItem.product_id)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(OrderItem.order_id > desde_pedido, OrderItem.product_id > 0, Order.estado != "cancelado")
+    )
+    partes = []
+    with engine.connect() as conn:
+        resultado = conn.execution_options(yield_per=LOTE_LECTURA).execute(consulta)
+        for filas in resultado.partitions():
+            # np.array sobre objetos Row es ~10x más lento que recorrerlos como valores planos
+            partes.append(np.fromiter((v for fila in filas for v in fila), dtype=np.int64, count=2 * len(filas)))
+    if not partes:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), desde_pedido
+    pares = np.concatenate(partes).reshape(-1, 2)
+    return pares[:, 0], pares[:, 1], int(pares[:, 0].max())
+
+
+def _cargar_estado(ruta: str) -> Optional[Dict[str, Any]]:
+    import numpy as np
+    import scipy.sparse as sp
+
+    if not os.path.exists(ruta):
+        return None
+    with np.load(ruta) as z:
+        ids = z["ids"]
+        return {
+            "ids": ids,
+            "c": sp.csr_matrix((z["c_data"], z["c_indices"], z["c_indptr"]), shape=(len(ids), len(ids))),
+            "por_producto": z["por_producto"],
+            "ultimo_pedido": int(z["ultimo_pedido"]),
+            "pedidos": int(z["pedidos"]),
+        }
+
+
+def generar_recomendaciones(completo: bool = False, ruta: str = RECOMENDACIONES_PATH) -> Dict[str, Any]:
+    """Job fuera de línea: (re)construye el índice y lo guarda en `ruta` de forma atómica."""
+    import numpy as np
+
+    t0 = time_mod.perf_counter()
+    previo = None if completo else _cargar_estado(ruta)
+    desde = previo["ultimo_pedido"] if previo else 0
+    pedidos, productos, ultimo = _leer_pares(desde)
+    if previo is not None and len(pedidos) == 0:
+        return {"pedidos_nuevos": 0, "productos": len(previo["ids"]), "segundos": round(time_mod.perf_counter() - t0, 2)}
+    indice = construir_indice(pedidos, productos, previo)
+    total_pedidos = (previo["pedidos"] if previo else 0) + len(np.unique(pedidos))
+    temporal = f"{ruta}.tmp.npz"
+    np.savez(
+        temporal,
+        ids=indice["ids"], indptr=indice["indptr"], vecinos=indice["vecinos"], puntajes=indice["puntajes"],
+        c_data=indice["c"].data, c_indices=indice["c"].indices, c_indptr=indice["c"].indptr,
+        por_producto=indice["por_producto"], ultimo_pedido=np.int64(ultimo), pedidos=np.int64(total_pedidos),
+        generado=np.str_(datetime.now(timezone.utc).isoformat()),
+    )
+    os.replace(temporal, ruta)
+    resumen = {
+        "pedidos_nuevos": int(len(np.unique(pedidos))),
+        "pedidos": total_pedidos,
+        "productos": int(len(indice["ids"])),
+        "recomendaciones": int(len(indice["vecinos"])),
+        "segundos": round(time_mod.perf_counter() - t0, 2),
+    }
+    log.info("Recomendaciones generadas", extra=resumen)
+    return resumen
+
+
+def cargar_indice(ruta: str = RECOMENDACIONES_PATH) -> Optional[IndiceRecomendaciones]:
+    """Lee solo los arreglos que usa la API (no la matriz de co-ocurrencia)."""
+    import numpy as np
+
+    if not os.path.exists(ruta):
+        return None
+    with np.load(ruta) as z:
+        return IndiceRecomendaciones(z["ids"], z["indptr"], z["vecinos"], z["puntajes"], str(z["generado"]), int(z["pedidos"]))
+
+
+_indice: Optional[IndiceRecomendaciones] = None
+_cargado_mtime = 0.0
+_recarga_task: Optional["asyncio.Task[None]"] = None
+
+
+def recomendados(product_id: int, k: int) -> List[Tuple[int, float]]:
+    """(id, puntaje) de los productos comprados junto a `product_id`, más similares primero."""
+    if _indice is None:
+        return []
+    return _indice.recomendados(product_id, k)
+
+
+def _recargar_si_cambio() -> None:
+    global _indice, _cargado_mtime
+    try:
+        mtime = os.path.getmtime(RECOMENDACIONES_PATH)
+    except OSError:
+        return
+    if mtime == _cargado_mtime:
+        return
+    _indice = cargar_indice()
+    _cargado_mtime = mtime
+    log.info("Índice de recomendaciones cargado", extra={"productos": len(_indice.ids), "pedidos": _indice.pedidos})
+
+
+async def _recargar_periodicamente() -> None:
+    loop = asyncio.get_running_loop()
+    while True:
+        try:
+            await loop.run_in_executor(None, _recargar_si_cambio)
+        except Exception:
+            log.exception("No se pudo cargar el índice de recomendaciones")
+        await asyncio.sleep(RECOMENDACIONES_RECARGA_SECONDS)
+
+
+def iniciar_recomendaciones() -> None:
+    global _recarga_task
+    if not NUMPY_AVAILABLE:
+        log.info("NumPy/SciPy no instalados: recomendaciones desactivadas")
+        return
+    _recarga_task = asyncio.create_task(_recargar_periodicamente())
+
+
+async def detener_recomendaciones() -> None:
+    if _recarga_task is not None:
+        _recarga_task.cancel()
+        try:
+            await _recarga_task
+        except asyncio.CancelledError:
+            pass
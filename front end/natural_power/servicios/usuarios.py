@@ -0,0 +1,64 @@
+# usuarios.py
+# Cuentas, sesiones, actividad y puntos de lealtad.
+
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from ..modelos import LoyaltyPoint, User, UserActivity, UserSession
+
+# 1 punto = $100 CLP de descuento
+VALOR_PUNTO = 100.0
+
+
+def usuario_por_email(session: Session, email: str) -> Optional[User]:
+    return session.exec(select(User).where(User.email == email)).first()
+
+
+def registrar_actividad(session: Session, email: str, accion: str, detalle: str) -> None:
+    """Agrega un registro de actividad a la sesión (no hace commit)."""
+    session.add(UserActivity(user_email=email, action=accion, details=detalle))
+
+
+def sesiones_activas(session: Session, email: str) -> List[UserSession]:
+    return session.exec(
+        select(UserSession)
+        .where(UserSession.user_email == email, UserSession.is_active == True)
+        .order_by(UserSession.login_time.desc())
+    ).all()
+
+
+def cerrar_sesiones(session: Session, email: str) -> int:
+    """Marca como inactivas todas las sesiones del usuario (no hace commit)."""
+    sesiones = sesiones_activas(session, email)
+    for s in sesiones:
+        s.is_active = False
+        session.add(s)
+    return len(sesiones)
+
+
+def puntos_disponibles(session: Session, email: str) -> int:
+    total = session.exec(select(func.sum(LoyaltyPoint.puntos)).where(LoyaltyPoint.user_email == email)).one()
+    return int(total or 0)
+
+
+def previsualizar_canje(total_pts: int, subtotal: float, monto: Optional[int]) -> Dict[str, Any]:
+    """Descuento por canje de puntos, acotado al subtotal del carrito (nunca negativo).
+    Sin `monto` se canjea el máximo posible.
+    """
+    max_descuento = total_pts * VALOR_PUNTO
+    if monto is None:
+        descuento = max(0, min(max_descuento, subtotal))
+        puntos_usados = int(descuento // VALOR_PUNTO)
+    else:
+        puntos_usados = max(0, min(int(monto), int(max_descuento // VALOR_PUNTO)))
+        descuento = max(0, min(puntos_usados * VALOR_PUNTO, subtotal))
+    return {
+        "puntos_disponibles": total_pts,
+        "puntos_usados": puntos_usados,
+        "valor_punto": VALOR_PUNTO,
+        "subtotal": subtotal,
+        "descuento": descuento,
+        "total_nuevo": max(0.0, subtotal - descuento),
+    }
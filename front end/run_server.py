@@ -13,5 +13,7 @@ if __name__ == "__main__":
         host=host,
         port=port,
         reload=False,
-        log_level="info"
+        log_level="info",
+        # El access log de uvicorn escribe una línea síncrona por petición
+        access_log=os.getenv("ACCESS_LOG", "0").strip().lower() in ("1", "true", "si"),
     )
@@ -128,6 +128,36 @@ const Cart = {
         }
     },
 
+    /**
+     * Obtener el resumen del carrito (líneas, unidades, subtotal) sin traer los items
+     * @returns {Promise<Object>} Resumen del carrito
+     */
+    async getSummary() {
+        const vacio = { lineas: 0, unidades: 0, subtotal: 0, descuentos: {} };
+        const token = localStorage.getItem('auth_token');
+        if (!token) {
+            return vacio;
+        }
+
+        try {
+            const response = await fetch(`${API_BASE_URL}/api/carrito/resumen`, {
+                method: 'GET',
+                headers: {
+                    'Authorization': `Bearer ${token}`
+                }
+            });
+
+            if (response.ok) {
+                const data = await response.json();
+                return data.body || vacio;
+            }
+            return vacio;
+        } catch (error) {
+            console.error('Error al obtener resumen del carrito:', error);
+            return vacio;
+        }
+    },
+
     /**
      * Actualizar cantidad de un item
      * @param {number} itemId - ID del item en el carrito
@@ -223,7 +253,8 @@ const Cart = {
                 method: 'POST',
                 headers: {
                     'Content-Type': 'application/json',
-                    'Authorization': `Bearer ${token}`
+                    'Authorization': `Bearer ${token}`,
+                    ...claveIdempotencia('/api/pedidos', orderData)
                 },
                 body: JSON.stringify(orderData)
             });
@@ -231,6 +262,7 @@ const Cart = {
             const data = await response.json();
 
             if (response.ok && data.body) {
+                olvidarClaveIdempotencia();
                 mostrarNotificacion('Pedido creado exitosamente', 'success');
                 this.updateCartBadge();
                 return data.body;
@@ -259,8 +291,7 @@ const Cart = {
      * Actualizar el badge del carrito con la cantidad de items
      */
     async updateCartBadge() {
-        const items = await this.getItems();
-        const totalItems = items.reduce((sum, item) => sum + item.quantity, 0);
+        const totalItems = (await this.getSummary()).unidades;
         
         const badge = document.querySelector('.cart-badge');
         if (badge) {
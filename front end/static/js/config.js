@@ -5,11 +5,12 @@ const API_BASE_URL = (typeof window !== 'undefined' && window.location && window
     : 'http://127.0.0.1:8004';
 
 // Función para hacer peticiones al API con manejo de errores automático
-async function apiCall(endpoint, method = 'GET', body = null) {
+async function apiCall(endpoint, method = 'GET', body = null, headers = {}) {
     const options = {
         method: method,
         headers: {
             'Content-Type': 'application/json',
+            ...headers
         }
     };
 
@@ -26,7 +27,7 @@ async function apiCall(endpoint, method = 'GET', body = null) {
         const data = await response.json();
         
         if (!response.ok) {
-            throw new Error(data.body?.error || `Error ${response.status}`);
+            throw new Error(data.body?.error || data.detail || `Error ${response.status}`);
         }
 
         return data.body;
@@ -35,3 +36,22 @@ async function apiCall(endpoint, method = 'GET', body = null) {
         throw error;
     }
 }
+
+// Idempotency-Key para los POST que crean pedidos: la misma clave mientras se reintenta
+// el mismo cuerpo, así un reintento tras un corte de red devuelve el pedido ya creado
+let _intentoIdempotente = { cuerpo: null, clave: null };
+function claveIdempotencia(endpoint, cuerpo) {
+    const json = JSON.stringify([endpoint, cuerpo]);
+    if (_intentoIdempotente.cuerpo !== json) {
+        const clave = (window.crypto && crypto.randomUUID)
+            ? crypto.randomUUID()
+            : `${Date.now().toString(36)}-${Math.random().toString(36).slice(2)}`;
+        _intentoIdempotente = { cuerpo: json, clave };
+    }
+    return { 'Idempotency-Key': _intentoIdempotente.clave };
+}
+
+// Tras un pedido exitoso: la próxima compra usa una clave nueva
+function olvidarClaveIdempotencia() {
+    _intentoIdempotente = { cuerpo: null, clave: null };
+}
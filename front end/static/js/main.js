@@ -229,9 +229,8 @@ async function addToCart(productId, quantity = 1) {
 
 async function updateCartCounter() {
   try {
-    if (window.Cart && typeof Cart.getItems === 'function') {
-      const items = await Cart.getItems();
-      const total = items.reduce((s, it) => s + (it.quantity||0), 0);
+    if (window.Cart && typeof Cart.getSummary === 'function') {
+      const total = (await Cart.getSummary()).unidades;
       const badge = document.querySelector('#cart-counter, .cart-badge');
       if (badge) { badge.textContent = total; badge.style.display = total > 0 ? 'inline-block' : 'none'; }
       return;
@@ -267,25 +266,41 @@ const juiceBuilderData = {
   maxIngredients: 4,
 };
 
-function initializeJuiceBuilder() {
+// Precios y disponibilidad vienen del servidor; los de arriba quedan como respaldo sin conexión
+async function fetchJuiceBuilderData() {
+  try {
+    const body = await apiCall('/api/jugos/ingredientes', 'GET');
+    if (body && Array.isArray(body.bases) && body.bases.length) {
+      const map = it => ({ name: it.nombre, price: Number(it.precio), disabled: it.disponible === false });
+      juiceBuilderData.bases = body.bases.map(map);
+      juiceBuilderData.ingredients = body.ingredientes.map(map);
+      juiceBuilderData.maxIngredients = body.max_ingredientes ?? juiceBuilderData.maxIngredients;
+    }
+  } catch (e) {
+    console.warn('Usando ingredientes locales', e);
+  }
+}
+
+async function initializeJuiceBuilder() {
   const basesContainer = document.getElementById('bases-container');
   const ingredientsContainer = document.getElementById('ingredients-container');
   const form = document.getElementById('juice-builder-form');
   if (!basesContainer || !ingredientsContainer || !form) return;
+  await fetchJuiceBuilderData();
 
   basesContainer.innerHTML = '';
   ingredientsContainer.innerHTML = '';
 
   juiceBuilderData.bases.forEach((base, i) => {
     basesContainer.innerHTML += `<div class="form-check">
-      <input class="form-check-input" type="radio" name="base" id="base-${i}" value="${base.price}" data-name="${base.name}" required>
+      <input class="form-check-input" type="radio" name="base" id="base-${i}" value="${base.price}" data-name="${base.name}" ${base.disabled ? 'disabled' : ''} required>
       <label class="form-check-label" for="base-${i}">${base.name} <span class="text-muted">(+$${base.price.toLocaleString('es-CL')})</span></label>
     </div>`;
   });
 
   juiceBuilderData.ingredients.forEach((ing, i) => {
     ingredientsContainer.innerHTML += `<div class="col-md-6"><div class="form-check">
-      <input class="form-check-input ingredient-check" type="checkbox" value="${ing.price}" data-name="${ing.name}" id="ingredient-${i}">
+      <input class="form-check-input ingredient-check" type="checkbox" value="${ing.price}" data-name="${ing.name}" id="ingredient-${i}" ${ing.disabled ? 'disabled data-agotado="1"' : ''}>
       <label class="form-check-label" for="ingredient-${i}">${ing.name} <span class="text-muted">(+$${ing.price.toLocaleString('es-CL')})</span></label>
     </div></div>`;
   });
@@ -314,7 +329,7 @@ function updateCustomJuicePrice() {
   if (selectedIngredients.length >= juiceBuilderData.maxIngredients) {
     all.forEach(c => { if (!c.checked) c.disabled = true; });
   } else {
-    all.forEach(c => { c.disabled = false; });
+    all.forEach(c => { c.disabled = c.dataset.agotado === '1'; });
   }
 
   const totalEl = document.getElementById('total-price');
@@ -336,11 +351,13 @@ async function addCustomJuiceToCart(event) {
 
   try {
     if (token) {
-      await apiCall('/api/carrito/items', 'POST', {
+      // El servidor calcula el precio a partir de la receta
+      const res = await apiCall('/api/carrito/items', 'POST', {
         productoId: -1,
         cantidad: 1,
-        personalizacion: { customName: 'Jugo Personalizado', customDescription, customPrice: totalPrice }
+        personalizacion: { customName: 'Jugo Personalizado', base: selectedBase.dataset.name, ingredientes: ingredientNames }
       });
+      if (res && res.error) { showToast(res.error, 'error'); return; }
       showToast('Jugo personalizado añadido al carrito', 'success');
       updateCartCounter();
       setTimeout(() => window.location.href = '/app/carrito/', 500);
@@ -0,0 +1,54 @@
+# conftest.py
+# Configuración compartida de las pruebas: base SQLite temporal y app en proceso.
+#
+# Uso (desde la carpeta "front end"):
+#   python -m pytest -q
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+# El motor se crea al importar natural_power.db: el entorno debe quedar listo antes
+_TMP = tempfile.mkdtemp(prefix="natural_power_tests_")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_TMP, 'test.db')}"
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("ADMIN_EMAILS", "admin@test.naturalpower.cl")
+for _var in ("SMTP_HOST", "SMTP_PORT", "SMTP_USER", "SMTP_PASS", "SMTP_FROM", "MP_ACCESS_TOKEN"):
+    os.environ.pop(_var, None)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from natural_power.db import create_db_and_seed  # noqa: E402
+
+create_db_and_seed()
+
+ADMIN_EMAIL = "admin@test.naturalpower.cl"
+
+
+def _token_para(email: str) -> dict:
+    from natural_power.seguridad import crear_access_token
+    return {"Authorization": f"Bearer {crear_access_token({'sub': email})}"}
+
+
+@pytest.fixture(scope="module")
+def client():
+    # Por módulo: el lifespan arranca los workers (correo, campañas...) y no deben
+    # competir con las pruebas que los ejercitan directamente
+    from fastapi.testclient import TestClient
+
+    import api
+    with TestClient(api.app) as c:
+        yield c
+
+
+@pytest.fixture
+def token_para():
+    """Headers de autorización para un email cualquiera"""
+    return _token_para
+
+
+@pytest.fixture
+def admin():
+    return _token_para(ADMIN_EMAIL)
@@ -0,0 +1,139 @@
+# test_admision.py
+# Control de admisión: bajo sobrecarga se responde 503 con Retry-After al instante.
+
+import asyncio
+
+import pytest
+
+from natural_power import admision
+from natural_power.admision import AdmissionControlMiddleware, ClaseRuta, ControlAdmision
+
+httpx = pytest.importorskip("httpx")
+
+
+class AppLenta:
+    """App ASGI que no responde hasta que se libera `soltar`; anota el orden de atención."""
+
+    def __init__(self) -> None:
+        self.soltar = asyncio.Event()
+        self.atendidas = []
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.atendidas.append(f"{scope['method']} {scope['path']}")
+        if scope["path"] != "/api/health":
+            await self.soltar.wait()
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+
+
+@pytest.fixture
+def control(monkeypatch):
+    # Una petición a la vez por clase, cola de 1 y 200 ms de espera máxima
+    control = ControlAdmision([
+        ClaseRuta("checkout", 0, 1, 1, 200),
+        ClaseRuta("auth", 1, 1, 1, 200),
+        ClaseRuta("escritura", 2, 1, 1, 200),
+        ClaseRuta("lectura", 3, 1, 1, 200),
+        ClaseRuta("exportacion", 4, 1, 1, 200),
+    ], max_en_curso=2)
+    monkeypatch.setattr(admision, "control", control)
+    return control
+
+
+async def _cliente(app):
+    transporte = httpx.ASGITransport(app=AdmissionControlMiddleware(app))
+    return httpx.AsyncClient(transport=transporte, base_url="http://test")
+
+
+def test_cola_llena_responde_503_con_retry_after(control):
+    async def escenario():
+        app = AppLenta()
+        async with await _cliente(app) as cliente:
+            primera = asyncio.create_task(cliente.get("/api/productos"))
+            segunda = asyncio.create_task(cliente.get("/api/productos"))  # queda en cola
+            await asyncio.sleep(0.02)
+            rechazada = await cliente.get("/api/productos")
+            app.soltar.set()
+            return rechazada, await primera, await segunda
+
+    rechazada, primera, segunda = asyncio.run(escenario())
+    assert rechazada.status_code == 503
+    assert rechazada.headers["retry-after"] == str(admision.ADMISION_RETRY_AFTER)
+    assert primera.status_code == segunda.status_code == 200
+    assert control.en_curso == 0
+
+
+def test_plazo_vencido_en_cola_responde_503(control):
+    async def escenario():
+        app = AppLenta()
+        async with await _cliente(app) as cliente:
+            primera = asyncio.create_task(cliente.get("/api/productos"))
+            await asyncio.sleep(0.02)
+            esperada = await cliente.get("/api/productos")  # más de 200 ms en cola
+            app.soltar.set()
+            await primera
+            return esperada
+
+    r = asyncio.run(escenario())
+    assert r.status_code == 503 and "retry-after" in r.headers
+
+
+def test_event_loop_atrasado_rechaza_navegacion_pero_no_checkout(control):
+    control.retraso = 1.0
+
+    async def escenario():
+        app = AppLenta()
+        app.soltar.set()
+        async with await _cliente(app) as cliente:
+            return (await cliente.get("/api/productos"), await cliente.post("/api/pedidos"),
+                    await cliente.get("/api/health"))
+
+    lectura, checkout, health = asyncio.run(escenario())
+    assert lectura.status_code == 503 and "retry-after" in lectura.headers
+    assert checkout.status_code == 200
+    assert health.status_code == 200
+
+
+def test_checkout_pasa_antes_que_la_navegacion(control):
+    async def escenario():
+        app = AppLenta()
+        async with await _cliente(app) as cliente:
+            # Ocupan el total (2): el siguiente cupo lo decide la prioridad
+            ocupadas = [asyncio.create_task(cliente.post("/api/carrito/items")),
+                        asyncio.create_task(cliente.post("/api/auth/login"))]
+            await asyncio.sleep(0.02)
+            lectura = asyncio.create_task(cliente.get("/api/productos"))
+            await asyncio.sleep(0.01)
+            checkout = asyncio.create_task(cliente.post("/api/pedidos"))
+            await asyncio.sleep(0.01)
+            app.soltar.set()
+            await asyncio.gather(*ocupadas, lectura, checkout)
+            return app.atendidas
+
+    atendidas = asyncio.run(escenario())
+    assert atendidas.index("POST /api/pedidos") < atendidas.index("GET /api/productos")
+
+
+def test_exportaciones_tienen_su_propio_cupo(control):
+    assert admision.clasificar("GET", "/api/admin/productos/exportar") == "exportacion"
+
+    async def escenario():
+        app = AppLenta()
+        async with await _cliente(app) as cliente:
+            # Una exportación en curso no ocupa el cupo de lectura ni el total
+            exportacion = asyncio.create_task(cliente.get("/api/admin/productos/exportar"))
+            await asyncio.sleep(0.02)
+            assert control.en_curso == 0
+            lectura = asyncio.create_task(cliente.get("/api/productos"))
+            escritura = asyncio.create_task(cliente.post("/api/carrito/items"))
+            await asyncio.sleep(0.02)
+            assert control.en_curso == 2
+            # La segunda exportación espera la primera y vence su plazo
+            segunda = await cliente.get("/api/admin/productos/exportar")
+            app.soltar.set()
+            return segunda, await exportacion, await lectura, await escritura
+
+    segunda, exportacion, lectura, escritura = asyncio.run(escenario())
+    assert segunda.status_code == 503
+    assert exportacion.status_code == lectura.status_code == escritura.status_code == 200
+    assert control.en_curso == 0 and control.clases["exportacion"].en_curso == 0
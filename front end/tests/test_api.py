@@ -0,0 +1,167 @@
+# test_api.py
+# La API separada en routers conserva las rutas y el contrato del api.py monolítico.
+#
+# api_base.json es el resumen de la app en el commit anterior a la separación
+# (api.py con todas las rutas). Para regenerarlo, desde la carpeta "front end"
+# de un checkout de ese commit:
+#   python <este repo>/front end/tests/test_api.py > api_base.json
+
+import json
+import os
+import sys
+from typing import Any, Dict
+
+import pytest
+
+BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "api_base.json")
+
+
+def _esquema_cuerpo(esquema: Dict[str, Any], op: Dict[str, Any]) -> Dict[str, Any]:
+    contenido = op.get("requestBody", {}).get("content", {}).get("application/json", {}).get("schema", {})
+    ref = contenido.get("$ref")
+    if ref:
+        contenido = esquema["components"]["schemas"][ref.rsplit("/", 1)[1]]
+    return contenido
+
+
+def resumen_api(app) -> Dict[str, Any]:
+    """Rutas (path, método) y, por operación OpenAPI, parámetros, cuerpo y respuestas."""
+    from fastapi.routing import APIRoute
+
+    rutas = sorted({(r.path, m) for r in app.routes if isinstance(r, APIRoute) for m in r.methods})
+    esquema = app.openapi()
+    operaciones = {}
+    for path, metodos in esquema["paths"].items():
+        for metodo, op in metodos.items():
+            cuerpo = _esquema_cuerpo(esquema, op)
+            operaciones[f"{metodo.upper()} {path}"] = {
+                "parametros": sorted([p["in"], p["name"], bool(p.get("required"))] for p in op.get("parameters", [])),
+                "cuerpo": bool(op.get("requestBody")),
+                "campos": sorted(cuerpo.get("properties", {})),
+                "requeridos": sorted(cuerpo.get("required", [])),
+                "respuestas": sorted(op.get("responses", {})),
+            }
+    return {"rutas": [list(r) for r in rutas], "operaciones": operaciones}
+
+
+@pytest.fixture(scope="module")
+def base() -> Dict[str, Any]:
+    with open(BASE, encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="module")
+def actual(client) -> Dict[str, Any]:
+    import api
+    return resumen_api(api.app)
+
+
+def test_se_conservan_todas_las_rutas(base, actual):
+    faltantes = {tuple(r) for r in base["rutas"]} - {tuple(r) for r in actual["rutas"]}
+    assert not faltantes
+
+
+def test_contrato_openapi_compatible(base, actual):
+    # Se pueden agregar parámetros, campos y respuestas opcionales; nada de lo
+    # que ya existía puede desaparecer ni volverse obligatorio
+    for clave, antes in base["operaciones"].items():
+        ahora = actual["operaciones"].get(clave)
+        assert ahora is not None, clave
+        parametros = {(ubicacion, nombre): requerido for ubicacion, nombre, requerido in ahora["parametros"]}
+        for ubicacion, nombre, requerido in antes["parametros"]:
+            assert (ubicacion, nombre) in parametros, (clave, nombre)
+            assert parametros[(ubicacion, nombre)] == requerido, (clave, nombre)
+        nuevos_obligatorios = {(u, n) for (u, n), r in parametros.items() if r} - {
+            (u, n) for u, n, r in antes["parametros"] if r}
+        assert not nuevos_obligatorios, clave
+        assert ahora["cuerpo"] == antes["cuerpo"], clave
+        assert set(antes["campos"]) <= set(ahora["campos"]), clave
+        assert set(ahora["requeridos"]) <= set(antes["requeridos"]), clave
+        assert set(antes["respuestas"]) <= set(ahora["respuestas"]), clave
+
+
+# Recorrido por las rutas principales con la app completa (middlewares y lifespan)
+
+CLIENTE = {"nombre": "Cliente Prueba", "email": "cliente.api@test.cl", "contrasena": "Secreta123", "direccion": "Calle 1"}
+
+
+def test_health_y_catalogo(client):
+    assert client.get("/api/health").status_code == 200
+    r = client.get("/api/productos").json()
+    assert r["status"] == 200
+    assert {p["nombre"] for p in r["body"]} >= {"Verde Detox", "Naranja Boost"}
+
+
+def test_registro_login_y_perfil(client):
+    assert client.post("/api/usuarios/registrar", json=CLIENTE).json()["status"] == 201
+    assert client.post("/api/usuarios/registrar", json=CLIENTE).json()["status"] != 201
+    r = client.post("/api/auth/login", json={"email": CLIENTE["email"], "contrasena": CLIENTE["contrasena"]}).json()
+    assert r["status"] == 200
+    h = {"Authorization": f"Bearer {r['body']['token']}"}
+    perfil = client.get("/api/usuarios/me", headers=h).json()
+    assert perfil["status"] == 200 and perfil["body"]["email"] == CLIENTE["email"]
+    malo = client.post("/api/auth/login", json={"email": CLIENTE["email"], "contrasena": "otra"}).json()
+    assert malo["status"] == 401
+
+
+def test_carrito_pedido_seguimiento_y_cancelacion(client, token_para):
+    h = token_para("comprador.api@test.cl")
+    stock_inicial = _stock(client, 4)
+    r = client.post("/api/carrito/items", headers=h, json={"productoId": 4, "cantidad": 2}).json()
+    assert r["status"] == 201
+    carrito = client.get("/api/carrito", headers=h).json()
+    assert carrito["status"] == 200 and [it["quantity"] for it in carrito["body"]] == [2]
+
+    pedido = client.post("/api/pedidos", headers=h, json={}).json()
+    assert pedido["status"] == 201
+    pedido_id = pedido["body"]["id"]
+    assert _stock(client, 4) == stock_inicial - 2
+    assert client.get("/api/carrito", headers=h).json()["body"] == []
+    assert [p["id"] for p in client.get("/api/pedidos", headers=h).json()["body"]] == [pedido_id]
+    seguimiento = client.get(f"/api/pedidos/{pedido_id}/seguimiento", headers=h).json()
+    assert seguimiento["status"] == 200 and seguimiento["body"]["estado"] == "pendiente"
+    # Otro usuario no ve el pedido
+    assert client.get(f"/api/pedidos/{pedido_id}/seguimiento", headers=token_para("otro.api@test.cl")).json()["status"] in (403, 404)
+
+    cancelado = client.put(f"/api/pedidos/{pedido_id}/cancelar", headers=h, json={"motivo": "prueba"}).json()
+    assert cancelado["status"] == 200 and cancelado["body"]["estado"] == "cancelado"
+    assert _stock(client, 4) == stock_inicial
+
+
+def test_rutas_protegidas(client, admin, token_para):
+    # Sin token el carrito está vacío y el admin responde 403
+    assert client.get("/api/carrito").json() == {"status": 200, "body": []}
+    assert client.get("/api/admin/dashboard").status_code == 403
+    assert client.get("/api/admin/dashboard", headers=token_para("comprador.api@test.cl")).status_code == 403
+    dashboard = client.get("/api/admin/dashboard", headers=admin).json()
+    assert dashboard["status"] == 200 and {"revenue", "orders", "newUsers"} <= set(dashboard["body"])
+    for ruta in ("/api/admin/productos", "/api/admin/usuarios", "/api/admin/pedidos"):
+        assert client.get(ruta, headers=admin).json()["status"] == 200, ruta
+
+
+def test_metricas_requieren_admin_o_token(client, admin, token_para, monkeypatch):
+    from natural_power.routers import infra
+
+    assert client.get("/api/metrics").status_code == 403
+    assert client.get("/api/metrics", headers=token_para("comprador.api@test.cl")).status_code == 403
+    r = client.get("/api/metrics", headers=admin)
+    assert r.status_code == 200 and "http_requests_total" in r.text
+
+    monkeypatch.setattr(infra, "METRICS_TOKEN", "token-del-scraper")
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer token-del-scraper"}).status_code == 200
+    assert client.get("/api/metrics", headers={"Authorization": "Bearer otro"}).status_code == 403
+
+
+def _stock(client, producto_id: int) -> int:
+    from sqlmodel import Session
+
+    from natural_power.db import engine
+    from natural_power.modelos import Product
+    with Session(engine) as session:
+        return session.get(Product, producto_id).stock
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, os.getcwd())
+    import api
+    json.dump(resumen_api(api.app), sys.stdout, ensure_ascii=False, indent=1, sort_keys=True)
@@ -0,0 +1,37 @@
+# test_auth.py
+# Recuperación de contraseña: la respuesta no delata si el email existe.
+
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import OutboundEmail, PasswordResetToken
+from natural_power.routers import auth
+
+
+def _tokens(email: str) -> int:
+    with Session(engine) as session:
+        return len(session.exec(select(PasswordResetToken).where(PasswordResetToken.email == email)).all())
+
+
+def _correos(email: str) -> list:
+    with Session(engine) as session:
+        return session.exec(select(OutboundEmail.plantilla).where(OutboundEmail.to_email == email)).all()
+
+
+def test_recuperar_responde_igual_exista_o_no_el_email(client, monkeypatch):
+    existente = "recupera@test.cl"
+    assert client.post("/api/usuarios/registrar", json={
+        "nombre": "Recupera", "email": existente, "contrasena": "Secreta123", "direccion": "Calle 1"}).json()["status"] == 201
+
+    # El handler no toca la base: todo el trabajo queda en la tarea posterior a la respuesta
+    tareas = []
+    original = auth._enviar_enlace_recuperacion
+    monkeypatch.setattr(auth, "_enviar_enlace_recuperacion", lambda email: (tareas.append(email), original(email)))
+
+    r_existe = client.post("/api/auth/recuperar-password", json={"email": " Recupera@Test.cl "}).json()
+    r_no_existe = client.post("/api/auth/recuperar-password", json={"email": "nadie@test.cl"}).json()
+    assert r_existe == r_no_existe
+    assert tareas == [existente, "nadie@test.cl"]
+
+    assert _tokens(existente) == 1 and _correos(existente) == ["reset_password"]
+    assert _tokens("nadie@test.cl") == 0 and _correos("nadie@test.cl") == []
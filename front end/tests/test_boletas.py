@@ -0,0 +1,87 @@
+# test_boletas.py
+# Boletas en PDF: se renderizan una vez y las descargas siguientes salen del caché o del disco.
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from sqlmodel import Session, select
+
+from natural_power import boleta_pdf
+from natural_power.db import engine
+from natural_power.modelos import Order, OrderItem, OutboundEmail
+from natural_power.servicios import boletas
+
+EMAIL = "boletas@test.cl"
+
+
+@pytest.fixture
+def renders(monkeypatch, tmp_path):
+    """Renderizado en un hilo (el pool de procesos no deja contar) y boletas en una carpeta temporal."""
+    llamadas = []
+    original = boleta_pdf.renderizar_y_guardar
+
+    def renderizar_y_guardar(directorio, data):
+        llamadas.append(data["pedido_id"])
+        return original(directorio, data)
+
+    pool = ThreadPoolExecutor(max_workers=1)
+    monkeypatch.setattr(boletas, "BOLETAS_DIR", str(tmp_path))
+    monkeypatch.setattr(boletas, "obtener_pool_boletas", lambda: pool)
+    monkeypatch.setattr(boletas.boleta_pdf, "renderizar_y_guardar", renderizar_y_guardar)
+    boletas._boletas_cache.clear()
+    yield llamadas
+    pool.shutdown()
+
+
+def _pedido() -> int:
+    with Session(engine) as session:
+        order = Order(user_email=EMAIL, total=2 * 3990)
+        session.add(order)
+        session.commit()
+        session.add(OrderItem(order_id=order.id, product_id=1, name="Verde Detox", price=3990, quantity=2))
+        session.commit()
+        return order.id
+
+
+def test_la_boleta_se_genera_una_vez_y_se_sirve_desde_disco(client, token_para, renders):
+    pedido_id = _pedido()
+    h = token_para(EMAIL)
+    url = f"/api/boletas/{pedido_id}/pdf"
+
+    primera = client.get(url, headers=h)
+    assert primera.status_code == 200
+    assert primera.headers["content-type"] == "application/pdf"
+    assert primera.content.startswith(b"%PDF")
+    sha = hashlib.sha256(primera.content).hexdigest()
+    ruta = boleta_pdf.ruta_por_contenido(boletas.BOLETAS_DIR, sha)
+    assert os.path.isfile(ruta)
+
+    # Caché en memoria y, sin ella, la fila Boleta apuntando al mismo archivo
+    assert client.get(url, headers=h).content == primera.content
+    boletas._boletas_cache.clear()
+    assert client.get(url, headers=h).content == primera.content
+    assert renders == [pedido_id]
+
+    # Si el archivo desaparece se vuelve a generar, idéntico
+    os.remove(ruta)
+    assert client.get(url, headers=h).content == primera.content
+    assert renders == [pedido_id, pedido_id]
+
+    assert client.get(url, headers=token_para("otro.boletas@test.cl")).status_code == 403
+
+
+def test_enviar_boleta_encola_el_pdf_adjunto(client, token_para, renders):
+    pedido_id = _pedido()
+    r = client.post("/api/boletas/enviar-email", headers=token_para(EMAIL), json={"pedidoId": str(pedido_id)}).json()
+    assert r["status"] == 200 and r["body"]["email_encolado"] is True
+    assert r["body"]["pdfUrl"] == f"/api/boletas/{pedido_id}/pdf"
+
+    with Session(engine) as session:
+        correo = session.exec(select(OutboundEmail).where(OutboundEmail.plantilla == "boleta")
+                              .order_by(OutboundEmail.id.desc())).first()
+    assert correo.to_email == EMAIL
+    with open(correo.adjunto_path, "rb") as f:
+        assert f.read() == client.get(r["body"]["pdfUrl"], headers=token_para(EMAIL)).content
+    assert renders == [pedido_id]
@@ -0,0 +1,41 @@
+# test_busqueda.py
+# Búsqueda de productos (FTS5): prefijos, tildes, errores de tipeo e índice al día con el catálogo.
+
+
+def _buscar(client, q: str) -> dict:
+    r = client.get("/api/productos/buscar", params={"q": q}).json()
+    assert r["status"] == 200
+    return {"nombres": [p["nombre"] for p in r["body"]["resultados"]], "corregida": r["body"]["corregida"]}
+
+
+def test_prefijos_y_tildes(client):
+    for q in ("pasi", "PASIÓN", "rojo pas"):
+        assert _buscar(client, q) == {"nombres": ["Rojo Pasión"], "corregida": None}, q
+    # "energia" sin tilde encuentra la descripción "Energía" y el tipo "energia"
+    assert set(_buscar(client, "energia")["nombres"]) >= {"Naranja Boost", "Amanecer Tropical"}
+    assert _buscar(client, "vitamina")["nombres"] == ["Naranja Boost"]
+
+
+def test_el_nombre_pesa_mas_que_la_descripcion(client, admin):
+    client.post("/api/admin/productos", headers=admin, json={
+        "nombre": "Cítrico Sunrise", "descripcion": "Con un toque tropical", "precio": 3000, "stock": 5, "tipo": "energia"})
+    nombres = _buscar(client, "tropical")["nombres"]
+    assert nombres.index("Amanecer Tropical") < nombres.index("Cítrico Sunrise")
+
+
+def test_corrige_errores_de_tipeo(client):
+    tropical = _buscar(client, "tropcal")
+    assert tropical["corregida"] == "tropical" and tropical["nombres"][0] == "Amanecer Tropical"
+    assert _buscar(client, "naranja bost") == {"nombres": ["Naranja Boost"], "corregida": "naranja boost"}
+    assert _buscar(client, "zzqqxx") == {"nombres": [], "corregida": None}
+
+
+def test_el_indice_sigue_los_cambios_del_catalogo(client, admin):
+    r = client.post("/api/admin/productos", headers=admin, json={
+        "nombre": "Frambuesa Fresca", "descripcion": "Roja", "precio": 3500, "stock": 5, "tipo": "antioxidante"}).json()
+    assert _buscar(client, "frambu")["nombres"] == ["Frambuesa Fresca"]
+
+    client.put(f"/api/admin/productos/{r['body']['id']}", headers=admin, json={"nombre": "Arándano Intenso"})
+    assert _buscar(client, "frambuesa")["nombres"] == []
+    # El vocabulario de la corrección también se recarga
+    assert _buscar(client, "arandno") == {"nombres": ["Arándano Intenso"], "corregida": "arandano"}
@@ -0,0 +1,61 @@
+# test_campanas.py
+# Campañas de ofertas: un solo worker toma cada campaña y cada cliente recibe una entrega.
+
+import asyncio
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import OfferCampaign, OfferDelivery, User
+from natural_power.servicios import campanas
+
+
+def _crear_campana(emails) -> int:
+    with Session(engine) as session:
+        for email in emails:
+            if not session.get(User, email):
+                session.add(User(email=email, nombre="Cliente", hashed_password="x"))
+        campaign = OfferCampaign(titulo="Oferta", mensaje="2x1", segmento="todos")
+        session.add(campaign)
+        session.commit()
+        return campaign.id
+
+
+def _entregas(campaign_id: int) -> int:
+    with Session(engine) as session:
+        return session.exec(
+            select(func.count()).select_from(OfferDelivery).where(OfferDelivery.campaign_id == campaign_id)
+        ).one()
+
+
+def test_solo_un_worker_toma_la_campana():
+    campaign_id = _crear_campana([f"campana{i}@test.cl" for i in range(5)])
+    with Session(engine) as session:
+        campaign = session.get(OfferCampaign, campaign_id)
+        session.expunge(campaign)
+
+    total = campanas._resolver_destinatarios(campaign)
+    assert total == _entregas(campaign_id) >= 5
+    # Un segundo worker (o un reinicio) ve la campaña ya tomada y no repite el fan-out
+    assert campanas._resolver_destinatarios(campaign) is None
+    assert _entregas(campaign_id) == total
+
+
+def test_workers_concurrentes_envian_una_vez_por_destinatario(monkeypatch):
+    enviados = []
+
+    async def enviar(destinatario, asunto, cuerpo):
+        enviados.append(destinatario)
+
+    monkeypatch.setitem(campanas.CANALES_NOTIFICACION, "email", (enviar, 1000.0))
+    monkeypatch.setattr(campanas, "_limitadores", {})
+    campaign_id = _crear_campana([f"concurrente{i}@test.cl" for i in range(5)])
+
+    async def dos_workers():
+        await asyncio.gather(campanas._ejecutar_campana(campaign_id), campanas._ejecutar_campana(campaign_id))
+
+    asyncio.run(dos_workers())
+    assert len(enviados) == len(set(enviados)) == _entregas(campaign_id)
+    with Session(engine) as session:
+        assert session.get(OfferCampaign, campaign_id).estado == "completada"
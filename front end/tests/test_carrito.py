@@ -0,0 +1,80 @@
+# test_carrito.py
+# Resumen del carrito: los triggers de cartitem lo mantienen igual a las filas.
+
+from sqlalchemy import update
+from sqlmodel import Session, func, select
+
+from natural_power.db import engine
+from natural_power.modelos import CartItem, CartSummary, LoyaltyPoint, Product
+from natural_power.servicios.usuarios import previsualizar_canje
+
+
+def _desde_filas(email: str) -> dict:
+    with Session(engine) as session:
+        lineas, unidades, subtotal = session.exec(
+            select(func.count(), func.coalesce(func.sum(CartItem.quantity), 0),
+                   func.coalesce(func.sum(CartItem.price * CartItem.quantity), 0.0))
+            .where(CartItem.user_email == email)
+        ).one()
+    return {"lineas": lineas, "unidades": unidades, "subtotal": float(subtotal)}
+
+
+def _resumen(client, h) -> dict:
+    body = client.get("/api/carrito/resumen", headers=h).json()["body"]
+    return {k: body[k] for k in ("lineas", "unidades", "subtotal")}
+
+
+def test_resumen_sigue_a_las_filas_del_carrito(client, token_para):
+    email = "resumen@test.cl"
+    h = token_para(email)
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id.in_([1, 2])).values(stock=50))
+
+    client.post("/api/carrito/items", headers=h, json={"productoId": 1, "cantidad": 2})
+    item = client.post("/api/carrito/items", headers=h, json={"productoId": 2, "cantidad": 1}).json()["body"]
+    esperado = _desde_filas(email)
+    assert esperado["lineas"] == 2 and esperado["unidades"] == 3
+    assert _resumen(client, h) == esperado
+
+    # Agregar un producto que ya está suma sobre la misma línea
+    client.post("/api/carrito/items", headers=h, json={"productoId": 1, "cantidad": 1})
+    assert _resumen(client, h) == _desde_filas(email) == {**esperado, "unidades": 4, "subtotal": esperado["subtotal"] + 3990}
+
+    client.put(f"/api/carrito/items/{item['id']}", headers=h, json={"cantidad": 5})
+    assert _resumen(client, h) == _desde_filas(email)
+
+    # Un cambio de precio por SQL directo también se refleja
+    with engine.begin() as conn:
+        conn.execute(update(CartItem).where(CartItem.id == item["id"]).values(price=1000))
+    assert _resumen(client, h) == _desde_filas(email)
+
+    client.delete(f"/api/carrito/items/{item['id']}", headers=h)
+    assert _resumen(client, h) == _desde_filas(email)
+    assert _resumen(client, h)["lineas"] == 1
+
+    # El pedido vacía el carrito y el resumen queda en cero
+    assert client.post("/api/pedidos", headers=h, json={}).json()["status"] == 201
+    assert _resumen(client, h) == _desde_filas(email) == {"lineas": 0, "unidades": 0, "subtotal": 0.0}
+
+
+def test_items_anonimos_no_tienen_resumen():
+    with Session(engine) as session:
+        session.add(CartItem(user_email=None, product_id=1, name="Verde Detox", price=3990, quantity=1))
+        session.commit()
+        assert session.exec(select(CartSummary).where(CartSummary.user_email == None)).all() == []  # noqa: E711
+
+
+def test_descuento_por_puntos_nunca_es_negativo(client, token_para):
+    assert previsualizar_canje(50, -21060.0, None)["descuento"] == 0
+    assert previsualizar_canje(50, -21060.0, 10)["descuento"] == 0
+    assert previsualizar_canje(50, 1500.0, None)["descuento"] == 1500
+
+    # Una fila con cantidad negativa (escrita fuera de la API) deja el subtotal negativo
+    email = "puntos.negativos@test.cl"
+    with Session(engine) as session:
+        session.add(LoyaltyPoint(user_email=email, puntos=50, motivo="prueba"))
+        session.add(CartItem(user_email=email, product_id=1, name="Verde Detox", price=5265, quantity=-4))
+        session.commit()
+    body = client.get("/api/carrito/resumen", headers=token_para(email)).json()["body"]
+    assert body["subtotal"] < 0
+    assert body["descuentos"] == {}
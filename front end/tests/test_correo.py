@@ -0,0 +1,99 @@
+# test_correo.py
+# Cola de correos: cada correo llega exactamente una vez a un servidor SMTP real (aiosmtpd).
+
+import asyncio
+import socket
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import OutboundEmail
+from natural_power.servicios import correo
+
+aiosmtpd = pytest.importorskip("aiosmtpd.controller")
+
+
+class Buzon:
+    def __init__(self) -> None:
+        self.mensajes = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.mensajes.append(envelope.content.decode("utf-8", "replace"))
+        return "250 OK"
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def buzon(monkeypatch):
+    buzon = Buzon()
+    puerto = _puerto_libre()
+    controlador = aiosmtpd.Controller(buzon, hostname="127.0.0.1", port=puerto)
+    controlador.start()
+    monkeypatch.setenv("SMTP_HOST", "127.0.0.1")
+    monkeypatch.setenv("SMTP_PORT", str(puerto))
+    monkeypatch.setenv("SMTP_FROM", "tienda@naturalpower.cl")
+    monkeypatch.setenv("SMTP_STARTTLS", "0")
+    monkeypatch.setattr(correo, "_smtp_pool", None)
+    with Session(engine) as session:
+        session.exec(delete(OutboundEmail))
+        session.commit()
+    yield buzon
+    if correo._smtp_pool is not None:
+        correo._smtp_pool.cerrar()
+    controlador.stop()
+
+
+def _encolar(cantidad: int) -> None:
+    with Session(engine) as session:
+        for i in range(cantidad):
+            correo.encolar_email(session, f"cliente{i}@test.cl", "oferta", titulo=f"Oferta {i}", mensaje="Hola")
+        session.commit()
+
+
+def _estados() -> list:
+    with Session(engine) as session:
+        return sorted(session.exec(select(OutboundEmail.estado)).all())
+
+
+def _asuntos(buzon: Buzon) -> list:
+    return sorted(line for m in buzon.mensajes for line in m.splitlines() if line.startswith("Subject:"))
+
+
+def test_workers_concurrentes_envian_cada_correo_una_vez(buzon):
+    _encolar(30)
+
+    async def dos_workers():
+        # Dos workers compitiendo por la misma cola hasta vaciarla
+        while sum(await asyncio.gather(correo._procesar_lote_correos(), correo._procesar_lote_correos())):
+            pass
+
+    asyncio.run(dos_workers())
+    assert _asuntos(buzon) == sorted(f"Subject: Oferta {i}" for i in range(30))
+    assert _estados() == ["enviado"] * 30
+
+
+def test_no_retoma_correos_con_lease_vigente(buzon):
+    _encolar(2)
+    ahora = datetime.now(timezone.utc)
+    with Session(engine) as session:
+        vigente, vencido = session.exec(select(OutboundEmail).order_by(OutboundEmail.id)).all()
+        # Uno lo está enviando otro worker vivo; el otro quedó de un proceso que murió
+        vigente.estado, vigente.lote, vigente.reclamado_at = "enviando", "otro", ahora
+        vencido.estado, vencido.lote = "enviando", "muerto"
+        vencido.reclamado_at = ahora - timedelta(seconds=correo.MAIL_LEASE_SECONDS + 1)
+        session.add(vigente)
+        session.add(vencido)
+        session.commit()
+
+    assert asyncio.run(correo._procesar_lote_correos()) == 1
+    assert asyncio.run(correo._procesar_lote_correos()) == 0
+    assert _asuntos(buzon) == ["Subject: Oferta 1"]
+    assert _estados() == ["enviado", "enviando"]
@@ -0,0 +1,87 @@
+# test_cupones.py
+# Cupones: reglas por tipo de producto y subtotal, vigencia, topes de uso y canje al crear el pedido.
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import Coupon, CouponRedemption, Order, Product
+
+VERDE, NARANJA = 1, 2  # detox y energia, $3.990 cada uno
+
+
+def _carrito(client, h, *lineas) -> None:
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id.in_([VERDE, NARANJA])).values(stock=100))
+    for producto_id, cantidad in lineas:
+        assert client.post("/api/carrito/items", headers=h, json={"productoId": producto_id, "cantidad": cantidad}).json()["status"] == 201
+
+
+def _crear(client, admin, **regla) -> dict:
+    r = client.post("/api/admin/cupones", headers=admin, json=regla).json()
+    assert r["status"] == 201, r
+    return r["body"]
+
+
+def _aplicar(client, h, codigo: str) -> dict:
+    return client.post("/api/carrito/aplicar-cupon", headers=h, json={"codigo": codigo}).json()
+
+
+def test_el_descuento_se_calcula_sobre_los_items_alcanzados(client, admin, token_para):
+    _crear(client, admin, codigo="DETOX20", valor=20, tipos=["detox"], subtotal_minimo=10000)
+    h = token_para("cupon.tipo@test.cl")
+    _carrito(client, h, (VERDE, 2), (NARANJA, 1))
+
+    r = _aplicar(client, h, " detox20 ")
+    assert r["status"] == 200
+    assert r["body"] == {"codigo": "DETOX20", "total_anterior": 11970, "descuento": 1596, "total_nuevo": 11970 - 1596}
+
+    # Sin el producto detox el cupón no aplica; bajo el mínimo tampoco
+    h2 = token_para("cupon.minimo@test.cl")
+    _carrito(client, h2, (NARANJA, 3))
+    assert _aplicar(client, h2, "DETOX20")["status"] == 400
+    h3 = token_para("cupon.poco@test.cl")
+    _carrito(client, h3, (VERDE, 1))
+    assert "subtotal mínimo" in _aplicar(client, h3, "DETOX20")["body"]["error"]
+
+
+def test_vigencia_y_edicion_invalidan_al_instante(client, admin, token_para):
+    h = token_para("cupon.vigencia@test.cl")
+    _carrito(client, h, (VERDE, 1))
+    assert _aplicar(client, h, "NO-EXISTE")["status"] == 404
+
+    ayer = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    _crear(client, admin, codigo="VENCIDO", valor=10, hasta=ayer)
+    assert _aplicar(client, h, "VENCIDO")["status"] == 404
+
+    cupon = _crear(client, admin, codigo="MIL", tipo="monto", valor=1000)
+    assert _aplicar(client, h, "MIL")["body"]["descuento"] == 1000  # queda en caché
+    client.put(f"/api/admin/cupones/{cupon['id']}", headers=admin, json={"activo": False})
+    assert _aplicar(client, h, "MIL")["status"] == 404
+
+
+def test_el_pedido_canjea_y_respeta_los_topes(client, admin, token_para):
+    cupon = _crear(client, admin, codigo="UNICO", tipo="monto", valor=500, usos_max=1)
+    _crear(client, admin, codigo="UNAVEZ", valor=10, usos_por_usuario=1)
+    h = token_para("cupon.primero@test.cl")
+    _carrito(client, h, (VERDE, 1))
+    pedido = client.post("/api/pedidos", headers=h, json={"cupon": "UNICO"}).json()
+    assert pedido["status"] == 201 and pedido["body"]["total"] == 3990 - 500
+
+    # Tope global alcanzado: el pedido no se crea y el carrito queda igual
+    otro = "cupon.segundo@test.cl"
+    h2 = token_para(otro)
+    _carrito(client, h2, (VERDE, 1))
+    assert client.post("/api/pedidos", headers=h2, json={"cupon": "UNICO"}).json()["status"] == 409
+    with Session(engine) as session:
+        assert session.exec(select(Order).where(Order.user_email == otro)).all() == []
+        assert session.get(Coupon, cupon["id"]).usos == 1
+        canjes = session.exec(select(CouponRedemption).where(CouponRedemption.coupon_id == cupon["id"])).all()
+    assert [(c.user_email, c.order_id, c.descuento) for c in canjes] == [("cupon.primero@test.cl", pedido["body"]["id"], 500)]
+
+    # Tope por usuario: el segundo uso se rechaza ya al validarlo
+    assert client.post("/api/pedidos", headers=h2, json={"cupon": "UNAVEZ"}).json()["status"] == 201
+    _carrito(client, h2, (VERDE, 1))
+    assert _aplicar(client, h2, "UNAVEZ")["status"] == 409
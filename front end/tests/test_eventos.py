@@ -0,0 +1,87 @@
+# test_eventos.py
+# Seguimiento en vivo (SSE): los cambios de estado llegan al suscriptor y Last-Event-ID recupera lo perdido.
+
+import asyncio
+import json
+
+from sqlmodel import Session
+
+from natural_power.db import engine
+from natural_power.modelos import Order
+from natural_power.routers.pedidos import pedidos_eventos
+from natural_power.servicios.eventos import hub_pedidos
+from natural_power.servicios.pedidos import cambiar_estado_pedido, registrar_estado_inicial
+
+EMAIL = "eventos@test.cl"
+
+
+class PeticionFalsa:
+    """Lo único que el stream consulta de la petición: si el cliente sigue conectado."""
+
+    def __init__(self, conectado: bool) -> None:
+        self.conectado = conectado
+
+    async def is_disconnected(self) -> bool:
+        return not self.conectado
+
+
+def _pedido() -> int:
+    with Session(engine) as session:
+        order = Order(user_email=EMAIL, total=3990)
+        session.add(order)
+        session.commit()
+        registrar_estado_inicial(session, order)
+        session.commit()
+        return order.id
+
+
+def _cambiar(order_id: int, estado: str) -> None:
+    with Session(engine) as session:
+        cambiar_estado_pedido(session, order_id, estado)
+        session.commit()
+
+
+def _eventos(trozos: list) -> list:
+    return [json.loads(t.split("data: ", 1)[1]) for t in trozos if t.startswith("id: ")]
+
+
+async def _leer_sin_conexion(order_id: int, last_event_id=None) -> list:
+    r = await pedidos_eventos(PeticionFalsa(conectado=False), id=order_id, token=None, email_header=EMAIL,
+                              last_event_id=last_event_id)
+    return [trozo async for trozo in r.body_iterator]
+
+
+def test_reconexion_recupera_los_eventos_perdidos():
+    order_id = _pedido()
+    [inicial] = _eventos(asyncio.run(_leer_sin_conexion(order_id)))
+    assert inicial["estado"] == "pendiente"
+
+    _cambiar(order_id, "pagado")
+    _cambiar(order_id, "preparando")
+    # Conexión nueva: solo el estado actual; reconexión: todo lo posterior a Last-Event-ID
+    assert [e["estado"] for e in _eventos(asyncio.run(_leer_sin_conexion(order_id)))] == ["preparando"]
+    recuperados = _eventos(asyncio.run(_leer_sin_conexion(order_id, last_event_id=str(inicial["id"]))))
+    assert [e["estado"] for e in recuperados] == ["pagado", "preparando"]
+
+
+def test_el_cambio_de_estado_llega_al_suscriptor():
+    order_id = _pedido()
+
+    async def escenario():
+        peticion = PeticionFalsa(conectado=True)
+        r = await pedidos_eventos(peticion, id=order_id, token=None, email_header=EMAIL, last_event_id=None)
+        stream = r.body_iterator
+        assert (await stream.__anext__()).startswith("retry:")
+        assert _eventos([await stream.__anext__()])[0]["estado"] == "pendiente"
+        assert hub_pedidos.suscriptores() == 1
+
+        # El commit ocurre en otro hilo, como en un handler síncrono o un worker
+        await asyncio.to_thread(_cambiar, order_id, "pagado")
+        en_vivo = _eventos([await asyncio.wait_for(stream.__anext__(), 2)])
+        peticion.conectado = False
+        await stream.aclose()
+        return en_vivo
+
+    [en_vivo] = asyncio.run(escenario())
+    assert (en_vivo["estado_anterior"], en_vivo["estado"]) == ("pendiente", "pagado")
+    assert hub_pedidos.suscriptores() == 0
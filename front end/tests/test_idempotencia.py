@@ -0,0 +1,79 @@
+# test_idempotencia.py
+# Idempotency-Key: un reintento recibe la respuesta original en vez de crear otro pedido.
+
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import IdempotencyRecord, Order, Product
+from natural_power.servicios.idempotencia import HEADER_REPETIDA, ConflictoIdempotencia, RegistroIdempotencia
+
+
+def _pedidos_de(email: str) -> list:
+    with Session(engine) as session:
+        return session.exec(select(Order.id).where(Order.user_email == email)).all()
+
+
+def test_reintento_devuelve_el_mismo_pedido(client, token_para):
+    email = "idempotencia@test.cl"
+    h = {**token_para(email), "Idempotency-Key": "pedido-1"}
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 1).values(stock=50))
+
+    # Una respuesta de error no se guarda: el reintento se ejecuta de nuevo
+    vacio = client.post("/api/pedidos", headers=h, json={})
+    assert vacio.json()["status"] == 400 and HEADER_REPETIDA not in vacio.headers
+    client.post("/api/carrito/items", headers=token_para(email), json={"productoId": 1, "cantidad": 1})
+
+    primera = client.post("/api/pedidos", headers=h, json={})
+    segunda = client.post("/api/pedidos", headers=h, json={})
+    assert primera.json()["status"] == 201 and HEADER_REPETIDA not in primera.headers
+    assert segunda.json() == primera.json() and segunda.headers[HEADER_REPETIDA] == "true"
+    assert _pedidos_de(email) == [primera.json()["body"]["id"]]
+
+    # La misma clave con otro cuerpo es un error del cliente
+    assert client.post("/api/pedidos", headers=h, json={"cupon": "NATURAL10"}).json()["status"] == 422
+    assert client.post("/api/pedidos", headers={**h, "Idempotency-Key": " "}, json={}).json()["status"] == 400
+
+
+def test_duplicados_concurrentes_esperan_a_la_primera():
+    registro = RegistroIdempotencia()
+    ejecuciones = []
+
+    async def producir():
+        ejecuciones.append(1)
+        await asyncio.sleep(0.05)
+        return {"status": 201, "body": {"id": len(ejecuciones)}}
+
+    async def tres_a_la_vez():
+        return await asyncio.gather(*(registro.ejecutar("prueba", "concurrente", "h", producir) for _ in range(3)))
+
+    resultados = asyncio.run(tres_a_la_vez())
+    assert len(ejecuciones) == 1
+    assert [r for r, _ in resultados] == [{"status": 201, "body": {"id": 1}}] * 3
+    assert sorted(repetida for _, repetida in resultados) == [False, True, True]
+
+
+def test_entre_procesos_la_fila_de_la_base_decide():
+    async def producir():
+        return {"status": 201, "body": {"ok": True}}
+
+    # Otro proceso reservó la clave y sigue trabajando
+    RegistroIdempotencia()._reservar("prueba", "otro-proceso", "h")
+    with pytest.raises(ConflictoIdempotencia) as e:
+        asyncio.run(RegistroIdempotencia().ejecutar("prueba", "otro-proceso", "h", producir))
+    assert e.value.status == 409
+
+    # Si la reserva quedó abandonada, se toma
+    with engine.begin() as conn:
+        conn.execute(update(IdempotencyRecord).where(IdempotencyRecord.clave == "otro-proceso")
+                     .values(created_at=datetime.utcnow() - timedelta(hours=1)))
+    assert asyncio.run(RegistroIdempotencia().ejecutar("prueba", "otro-proceso", "h", producir)) == \
+        ({"status": 201, "body": {"ok": True}}, False)
+    # Y la respuesta guardada la ve un proceso sin nada en memoria
+    assert asyncio.run(RegistroIdempotencia().ejecutar("prueba", "otro-proceso", "h", producir)) == \
+        ({"status": 201, "body": {"ok": True}}, True)
@@ -0,0 +1,95 @@
+# test_inventario.py
+# Importación masiva del catálogo: errores por línea, todo o nada y modo parcial.
+
+import json
+
+import pytest
+from sqlmodel import Session, func, select
+
+from natural_power.db import engine
+from natural_power.modelos import Product
+from natural_power.servicios.inventario import ImportacionRechazada, ResultadoImportacion, aplicar_importacion
+
+CSV = "text/csv"
+JSONL = "application/x-ndjson"
+
+
+def _importar(client, admin, cuerpo: str, tipo: str, parcial: bool = False) -> dict:
+    return client.post(f"/api/admin/productos/importar?parcial={str(parcial).lower()}", content=cuerpo.encode(),
+                       headers={**admin, "Content-Type": tipo}).json()
+
+
+def _producto(nombre: str):
+    with Session(engine) as session:
+        return session.exec(select(Product).where(Product.nombre == nombre)).first()
+
+
+def _total_productos() -> int:
+    with Session(engine) as session:
+        return session.exec(select(func.count()).select_from(Product)).one()
+
+
+def test_errores_por_linea_y_todo_o_nada(client, admin):
+    antes = _total_productos()
+    cuerpo = "\n".join([
+        "nombre,precio,stock,tipo",
+        "Limonada Import,2500,10,energia",
+        "Sin Precio Import,,3,detox",       # línea 3: producto nuevo sin precio
+        "Precio Malo Import,abc,3,detox",   # línea 4
+        "Kiwi Import,3100,4,detox",
+    ])
+    r = _importar(client, admin, cuerpo, CSV)
+    assert r["status"] == 400
+    assert r["body"]["aplicado"] is False
+    assert r["body"]["total_errores"] == 2
+    assert [e["linea"] for e in r["body"]["errores"]] == [3, 4]
+    assert _total_productos() == antes
+    assert _producto("Limonada Import") is None
+
+
+def test_parcial_aplica_las_filas_validas(client, admin):
+    existente = _producto("Verde Detox")
+    cuerpo = "\n".join([
+        json.dumps({"nombre": "Mandarina Import", "precio": 2900, "stock": 7}),
+        json.dumps({"id": existente.id, "stock": 42}),
+        json.dumps({"id": 999999, "stock": 1}),
+        "{no es json",
+    ])
+    r = _importar(client, admin, cuerpo, JSONL, parcial=True)
+    assert r["status"] == 200
+    assert (r["body"]["creados"], r["body"]["actualizados"], r["body"]["total_errores"]) == (1, 1, 2)
+    assert [e["linea"] for e in r["body"]["errores"]] == [3, 4]
+    assert _producto("Mandarina Import").stock == 7
+    # Solo cambia la columna informada
+    actualizado = _producto("Verde Detox")
+    assert actualizado.stock == 42 and actualizado.precio == existente.precio
+
+
+@pytest.mark.parametrize("fila", [{"nombre": None}, {"precio": None}, {"stock": None}])
+def test_null_explicito_es_un_error_de_linea(client, admin, fila):
+    existente = _producto("Naranja Boost")
+    r = _importar(client, admin, json.dumps({"id": existente.id, **fila}), JSONL)
+    assert r["status"] == 400
+    assert r["body"]["errores"][0]["linea"] == 1
+    assert "null" in r["body"]["errores"][0]["error"]
+    assert _producto("Naranja Boost") is not None
+
+
+def test_rechazo_de_la_base_no_escribe_nada():
+    resultado = ResultadoImportacion(filas=[
+        (1, None, {"nombre": "Valida Import", "precio": 1000}),
+        (2, None, {"nombre": None, "precio": 1000}),  # sin pasar por la validación
+    ])
+    with Session(engine) as session, pytest.raises(ImportacionRechazada):
+        aplicar_importacion(session, resultado)
+    assert _producto("Valida Import") is None
+
+
+def test_exportar_trae_las_columnas_de_la_importacion(client, admin):
+    r = client.get("/api/admin/productos/exportar?formato=jsonl", headers=admin)
+    assert r.status_code == 200
+    filas = [json.loads(linea) for linea in r.text.splitlines()]
+    assert len(filas) == _total_productos()
+    assert set(filas[0]) == {"id", "nombre", "descripcion", "precio", "image", "stock", "tipo"}
+    # Lo exportado se puede volver a importar tal cual
+    assert _importar(client, admin, r.text, JSONL)["status"] == 200
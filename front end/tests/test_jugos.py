@@ -0,0 +1,62 @@
+# test_jugos.py
+# Crea tu jugo: el precio y el stock de la receta los decide el servidor.
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import Ingredient
+from natural_power.servicios.jugos import RecetaInvalida, cotizar, cotizar_lote, tabla_ingredientes
+
+
+def _ingrediente(nombre: str) -> Ingredient:
+    with Session(engine) as session:
+        return session.exec(select(Ingredient).where(Ingredient.nombre == nombre)).one()
+
+
+def _fijar_stock(nombre: str, stock: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(update(Ingredient).where(Ingredient.nombre == nombre).values(stock=stock))
+    tabla_ingredientes.invalidar()
+
+
+def test_el_precio_lo_calcula_el_servidor_y_se_reprecia_al_pagar(client, token_para, admin):
+    h = token_para("jugos@test.cl")
+    maracuya = _ingrediente("Maracuyá")
+    stock_maracuya = maracuya.stock
+    receta = {"base": "Jugo de Naranja", "ingredientes": ["Frutilla", "Maracuyá"]}
+
+    # Un precio enviado por el cliente se ignora
+    r = client.post("/api/carrito/items", headers=h,
+                    json={"productoId": -1, "cantidad": 2, "price": 1, "personalizacion": receta}).json()
+    assert r["status"] == 201 and r["body"]["price"] == 1500 + 500 + 700
+
+    # Si el ingrediente sube antes de pagar, se cobra el precio vigente y se avisa
+    r = client.put(f"/api/admin/ingredientes/{maracuya.id}", headers=admin, json={"precio": 900}).json()
+    assert r["status"] == 200
+    pedido = client.post("/api/pedidos", headers=h, json={}).json()
+    assert pedido["status"] == 201
+    assert pedido["body"]["total"] == (1500 + 500 + 900) * 2
+    assert [p["price"] for p in pedido["body"]["precios_actualizados"]] == [1500 + 500 + 900]
+    assert _ingrediente("Maracuyá").stock == stock_maracuya - 2
+
+
+def test_cantidad_menor_a_uno_se_rechaza(client):
+    with pytest.raises(RecetaInvalida):
+        cotizar("Jugo de Naranja", ["Mango"], -2)
+    with pytest.raises(RecetaInvalida):
+        cotizar("Jugo de Naranja", ["Mango"], 0)
+    assert isinstance(cotizar_lote([("Jugo de Naranja", ["Mango"], -1)])[0], RecetaInvalida)
+    assert client.post("/api/jugos/cotizar", json={"base": "Jugo de Naranja", "cantidad": -1}).status_code == 422
+
+
+def test_el_lote_reparte_el_stock_en_orden(client):
+    _fijar_stock("Jengibre", 3)
+    r = client.post("/api/jugos/cotizar/lote", json={"recetas": [
+        {"base": "Agua Purificada", "ingredientes": ["Jengibre"], "cantidad": 2},
+        {"base": "Agua Purificada", "ingredientes": ["Jengibre"], "cantidad": 2},
+        {"base": "Agua Purificada", "ingredientes": ["Jengibre"], "cantidad": 1},
+    ]}).json()["body"]
+    assert [("error" in receta) for receta in r["recetas"]] == [False, True, False]
+    assert r["total"] == (1000 + 200) * 3
@@ -0,0 +1,109 @@
+# test_lecturas.py
+# Lecturas compartidas: N peticiones idénticas a la vez cuestan una sola consulta.
+
+import asyncio
+
+import pytest
+from sqlalchemy import event, update
+
+from natural_power.db import engine
+from natural_power.modelos import Product
+from natural_power.servicios import lecturas
+from natural_power.servicios.lecturas import LecturaCompartida
+
+httpx = pytest.importorskip("httpx")
+
+CONCURRENCIA = 20
+CATALOGO = "/api/productos?pagina=1&limite=20"
+
+
+class ContadorSQL:
+    def __init__(self) -> None:
+        self.consultas = 0
+
+    def __enter__(self) -> "ContadorSQL":
+        event.listen(engine, "before_cursor_execute", self._contar)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        event.remove(engine, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args) -> None:
+        self.consultas += 1
+
+
+def test_calculos_concurrentes_se_comparten():
+    lectura = LecturaCompartida("prueba", ttl=60, tablas=())
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return len(calculos)
+
+    async def estampida():
+        return await asyncio.gather(*(lectura.obtener("clave", calcular) for _ in range(CONCURRENCIA)))
+
+    assert asyncio.run(estampida()) == [1] * CONCURRENCIA
+    assert len(calculos) == 1
+
+
+def test_tras_invalidar_sirve_el_valor_anterior_y_recalcula_una_vez():
+    lectura = LecturaCompartida("prueba_swr", ttl=60, tablas=())
+    calculos = []
+
+    def calcular():
+        calculos.append(1)
+        return len(calculos)
+
+    async def escenario():
+        await lectura.obtener("clave", calcular)
+        lectura.invalidar()
+        viejos = await asyncio.gather(*(lectura.obtener("clave", calcular) for _ in range(CONCURRENCIA)))
+        while lectura.en_vuelo():
+            await asyncio.sleep(0.01)
+        return viejos, await lectura.obtener("clave", calcular)
+
+    viejos, nuevo = asyncio.run(escenario())
+    assert viejos == [1] * CONCURRENCIA  # al instante, sin esperar el recálculo
+    assert nuevo == 2
+    assert len(calculos) == 2
+
+
+def test_estampida_al_catalogo_hace_las_consultas_de_una_peticion():
+    import api
+
+    async def pedir(n: int):
+        transporte = httpx.ASGITransport(app=api.app)
+        async with httpx.AsyncClient(transport=transporte, base_url="http://test") as cliente:
+            return await asyncio.gather(*(cliente.get(CATALOGO) for _ in range(n)))
+
+    lecturas.catalogo._entradas.clear()
+    with ContadorSQL() as una:
+        asyncio.run(pedir(1))
+    assert una.consultas > 0
+
+    lecturas.catalogo._entradas.clear()
+    with ContadorSQL() as fria:
+        respuestas = asyncio.run(pedir(CONCURRENCIA))
+    assert all(r.status_code == 200 for r in respuestas)
+    assert len({r.text for r in respuestas}) == 1
+    assert fria.consultas == una.consultas
+
+    # Caliente: ninguna llega a la base
+    with ContadorSQL() as caliente:
+        asyncio.run(pedir(CONCURRENCIA))
+    assert caliente.consultas == 0
+
+    # Una escritura en product invalida el catálogo, que se recalcula una sola vez
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 0).values(id=0))
+
+    async def tras_escritura():
+        respuestas = await pedir(CONCURRENCIA)
+        while lecturas.catalogo.en_vuelo():
+            await asyncio.sleep(0.01)
+        return respuestas
+
+    with ContadorSQL() as invalidada:
+        asyncio.run(tras_escritura())
+    assert invalidada.consultas == una.consultas
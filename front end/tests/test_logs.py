@@ -0,0 +1,24 @@
+# test_logs.py
+# Los registros que pasan por la cola conservan la excepción y los campos extra.
+
+import json
+import logging
+import queue
+
+from natural_power.logs import ColaHandler, JsonFormatter
+
+
+def test_json_conserva_la_traza_al_pasar_por_la_cola():
+    cola: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    logger = logging.getLogger("natural_power.tests.cola")
+    logger.propagate = False
+    logger.addHandler(ColaHandler(cola))
+    try:
+        1 / 0
+    except ZeroDivisionError:
+        logger.exception("Fallo al procesar %s", "pedido", extra={"pedido_id": 7})
+
+    data = json.loads(JsonFormatter().format(cola.get_nowait()))
+    assert data["msg"] == "Fallo al procesar pedido"
+    assert data["pedido_id"] == 7
+    assert data["exc"].startswith("Traceback") and "ZeroDivisionError" in data["exc"]
@@ -0,0 +1,79 @@
+# test_middlewares.py
+# Middlewares ASGI: actividad por lotes solo de peticiones autenticadas a /api, request id y streaming intacto.
+
+import asyncio
+import time
+
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.metricas import metricas
+from natural_power.middlewares import ActivityTrackingMiddleware, RequestIdMiddleware
+from natural_power.modelos import UserActivity
+from natural_power.servicios import actividad
+
+
+def _acciones(email: str, esperadas: int) -> list:
+    """Registros del middleware (los handlers escriben otros, como LOGIN_FALLIDO).
+
+    El worker del lifespan también vuelca: se espera a que su lote termine de escribirse.
+    """
+    for _ in range(50):
+        asyncio.run(actividad.volcar_actividad())
+        with Session(engine) as session:
+            acciones = [(a.action, a.details) for a in session.exec(
+                select(UserActivity).where(UserActivity.user_email == email).order_by(UserActivity.id))
+                if a.action.startswith(("GET ", "POST "))]
+        if len(acciones) >= esperadas:
+            return acciones
+        time.sleep(0.02)
+    return acciones
+
+
+def test_actividad_solo_de_peticiones_autenticadas_a_la_api(client, token_para):
+    email = "actividad@test.cl"
+    h = token_para(email)
+    client.get("/api/carrito", headers=h)
+    client.get("/api/pedidos/999999/seguimiento", headers=h)
+    client.get("/api/carrito")
+    client.get("/static/css/style.css", headers=h)
+    client.post("/api/auth/login", headers=h, json={"email": email, "contrasena": "x"})
+    assert _acciones(email, 2) == [
+        ("GET /api/carrito", "Status: 200"),
+        ("GET /api/pedidos/999999/seguimiento", "Status: 200"),
+    ]
+
+
+def test_request_id_y_estaticos_sin_contexto(client):
+    r = client.get("/api/health", headers={"X-Request-ID": "prueba-123"})
+    assert r.headers["x-request-id"] == "prueba-123"
+    assert len(client.get("/api/health").headers["x-request-id"]) == 16
+
+    antes = metricas.estaticos.get("/static", 0)
+    r = client.get("/static/css/no-existe.css", headers={"X-Request-ID": "estatico"})
+    assert "x-request-id" not in r.headers
+    assert metricas.estaticos["/static"] == antes + 1
+
+
+def test_el_streaming_pasa_sin_acumularse(token_para):
+    mensajes = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/event-stream")]})
+        for i in range(3):
+            await send({"type": "http.response.body", "body": f"data: {i}\n\n".encode(), "more_body": True})
+            # Cada trozo ya salió antes de producir el siguiente
+            assert len(mensajes) == i + 2
+        await send({"type": "http.response.body", "body": b""})
+
+    async def enviar(message):
+        mensajes.append(message)
+
+    async def recibir():
+        return {"type": "http.request", "body": b""}
+
+    scope = {"type": "http", "method": "GET", "path": "/api/pedidos/1/eventos",
+             "headers": [(b"authorization", token_para("stream@test.cl")["Authorization"].encode())]}
+    asyncio.run(RequestIdMiddleware(ActivityTrackingMiddleware(app))(scope, recibir, enviar))
+    assert [m.get("more_body", False) for m in mensajes[1:]] == [True, True, True, False]
+    assert _acciones("stream@test.cl", 1) == [("GET /api/pedidos/1/eventos", "Status: 200")]
@@ -0,0 +1,69 @@
+# test_paginacion.py
+# Listados por cursor (keyset): recorrido completo, conteo cacheado y selección de campos.
+
+from sqlmodel import Session, func, select
+
+from natural_power.db import engine
+from natural_power.modelos import Product, User
+from natural_power.servicios.paginacion import HEADER_CURSOR, HEADER_TOTAL, codificar_cursor
+
+
+def _recorrer(client, url: str, headers=None) -> list:
+    """Todas las páginas siguiendo X-Next-Cursor."""
+    filas, cursor = [], None
+    while True:
+        r = client.get(url + (f"&cursor={cursor}" if cursor else ""), headers=headers)
+        assert r.json()["status"] == 200
+        filas.extend(r.json()["body"])
+        cursor = r.headers.get(HEADER_CURSOR)
+        if not cursor:
+            return filas
+
+
+def test_el_cursor_recorre_todo_sin_repetir(client, admin):
+    for i in range(5):
+        client.post("/api/usuarios/registrar", json={
+            "nombre": f"Pagina {i}", "email": f"pagina{i}@test.cl", "contrasena": "Secreta123", "direccion": "Calle 1"})
+    with Session(engine) as session:
+        ids = session.exec(select(User.id).order_by(User.id)).all()
+
+    filas = _recorrer(client, "/api/admin/usuarios?limite=2", admin)
+    assert [u["id"] for u in filas] == ids
+
+    r = client.get("/api/admin/usuarios?limite=2&total=1", headers=admin)
+    assert r.headers[HEADER_TOTAL] == str(len(ids))
+    # La última página no trae cursor
+    r = client.get(f"/api/admin/usuarios?limite=2&cursor={codificar_cursor(ids[-2])}", headers=admin)
+    assert [u["id"] for u in r.json()["body"]] == ids[-1:] and HEADER_CURSOR not in r.headers
+
+
+def test_catalogo_por_cursor_igual_que_por_pagina(client):
+    por_cursor = _recorrer(client, "/api/productos?limite=3")
+    por_pagina, pagina = [], 1
+    while True:
+        body = client.get(f"/api/productos?limite=3&pagina={pagina}").json()["body"]
+        if not body:
+            break
+        por_pagina.extend(body)
+        pagina += 1
+    assert [p["id"] for p in por_cursor] == [p["id"] for p in por_pagina]
+    with Session(engine) as session:
+        assert len(por_cursor) == session.exec(select(func.count()).select_from(Product)).one()
+
+
+def test_campos_y_claves_bilingues(client, admin):
+    [p] = client.get("/api/productos?limite=1&fields=id,nombre,precio").json()["body"]
+    assert set(p) == {"id", "nombre", "precio"}
+    [p] = client.get("/api/productos?limite=1&bilingue=false").json()["body"]
+    assert not {"name", "price", "description"} & set(p) and {"nombre", "precio"} <= set(p)
+
+    assert client.get("/api/productos?fields=id,clave").json()["status"] == 400
+    assert client.get("/api/admin/productos?cursor=@@@", headers=admin).json()["status"] == 400
+
+
+def test_el_conteo_se_invalida_al_escribir_por_el_orm(client, admin):
+    total = int(client.get("/api/admin/productos?total=1", headers=admin).headers[HEADER_TOTAL])
+    with Session(engine) as session:
+        session.add(Product(nombre="Conteo Nuevo", precio=1000, stock=1))
+        session.commit()
+    assert client.get("/api/admin/productos?total=1", headers=admin).headers[HEADER_TOTAL] == str(total + 1)
@@ -0,0 +1,124 @@
+# test_pagos.py
+# Webhook de MercadoPago: cada notificación se registra y se procesa una sola vez.
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import delete
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import Order, OrderItem, PaymentEvent, Product
+from natural_power.routers import pagos as router_pagos
+from natural_power.servicios import pagos
+from natural_power.servicios.pasarela import PasarelaNoDisponible, pasarela
+
+PRODUCTO = 3  # Rojo Pasión
+
+
+class MercadoPagoFalso:
+    """obtener_pago que cuenta las consultas por pago y tarda un poco (cede el event loop)."""
+
+    def __init__(self, falla: Exception = None) -> None:
+        self.consultas = {}
+        self.falla = falla
+
+    async def __call__(self, payment_id: str):
+        self.consultas[payment_id] = self.consultas.get(payment_id, 0) + 1
+        await asyncio.sleep(0.01)
+        if self.falla is not None:
+            raise self.falla
+        order_id = payment_id.split("-")[1]
+        return {"status": "approved", "metadata": {"order_id": order_id}}
+
+
+@pytest.fixture
+def mercadopago(monkeypatch):
+    falso = MercadoPagoFalso()
+    monkeypatch.setattr(pasarela, "obtener_pago", falso)
+    with engine.begin() as conn:
+        conn.execute(delete(PaymentEvent))
+    return falso
+
+
+def _pedido(unidades: int) -> int:
+    with Session(engine) as session:
+        order = Order(user_email="pagos@test.cl", total=4290 * unidades)
+        session.add(order)
+        session.commit()
+        session.add(OrderItem(order_id=order.id, product_id=PRODUCTO, name="Rojo Pasión", price=4290, quantity=unidades))
+        session.commit()
+        return order.id
+
+
+def _evento(order_id: int, **valores) -> int:
+    with Session(engine) as session:
+        evento = PaymentEvent(idempotency_key=f"prueba:{order_id}", tipo="payment", data_id=f"pago-{order_id}",
+                              payload="{}", **valores)
+        session.add(evento)
+        session.commit()
+        return evento.id
+
+
+def _vendidos() -> int:
+    with Session(engine) as session:
+        return session.get(Product, PRODUCTO).vendidos
+
+
+def _estado_evento(evento_id: int) -> str:
+    with Session(engine) as session:
+        return session.get(PaymentEvent, evento_id).estado
+
+
+def test_dos_lotes_concurrentes_procesan_cada_notificacion_una_vez(mercadopago):
+    pedidos = [_pedido(2) for _ in range(5)]
+    for order_id in pedidos:
+        _evento(order_id)
+    vendidos = _vendidos()
+
+    async def dos_workers():
+        return await asyncio.gather(pagos._procesar_lote_pagos(), pagos._procesar_lote_pagos())
+
+    procesados = asyncio.run(dos_workers())
+    assert sum(procesados) == 5
+    assert sorted(mercadopago.consultas.values()) == [1] * 5
+    assert _vendidos() == vendidos + 2 * 5
+    with Session(engine) as session:
+        assert {o.estado for o in session.exec(select(Order).where(Order.id.in_(pedidos)))} == {"pagado"}
+        eventos = session.exec(select(PaymentEvent)).all()
+    assert {(e.estado, e.reclamado_at) for e in eventos} == {("procesado", None)}
+
+
+def test_lease_vencido_se_retoma_y_el_vigente_se_respeta(mercadopago):
+    ahora = datetime.now(timezone.utc)
+    abandonado = _evento(_pedido(1), estado="procesando",
+                         reclamado_at=ahora - timedelta(seconds=pagos.PAGOS_LEASE_SECONDS + 1))
+    en_curso = _evento(_pedido(1), estado="procesando", reclamado_at=ahora)
+
+    assert asyncio.run(pagos._procesar_lote_pagos()) == 1
+    assert _estado_evento(abandonado) == "procesado"
+    assert _estado_evento(en_curso) == "procesando"
+
+
+def test_mercadopago_caido_devuelve_la_notificacion_sin_gastar_intentos(mercadopago):
+    mercadopago.falla = PasarelaNoDisponible("caido")
+    evento_id = _evento(_pedido(1))
+
+    assert asyncio.run(pagos._procesar_lote_pagos()) == 0
+    with Session(engine) as session:
+        evento = session.get(PaymentEvent, evento_id)
+        assert (evento.estado, evento.intentos, evento.reclamado_at) == ("pendiente", 0, None)
+
+
+def test_webhook_repetido_se_registra_una_vez(client, mercadopago, monkeypatch):
+    monkeypatch.setattr(router_pagos, "MP_ACCESS_TOKEN", "TEST-token")
+    order_id = _pedido(1)
+    notificacion = {"id": 777, "type": "payment", "data": {"id": f"pago-{order_id}"}}
+
+    primera = client.post("/api/pagos/webhook", json=notificacion).json()
+    segunda = client.post("/api/pagos/webhook", json=notificacion).json()
+    assert primera["body"] == {"ok": True, "duplicate": False}
+    assert segunda["body"] == {"ok": True, "duplicate": True}
+    with Session(engine) as session:
+        assert len(session.exec(select(PaymentEvent).where(PaymentEvent.data_id == f"pago-{order_id}")).all()) == 1
@@ -0,0 +1,122 @@
+# test_pasarela.py
+# MercadoPago falso: timeouts estrictos y circuit breaker sobre /api/pagos/crear-preferencia.
+
+import asyncio
+import json
+import threading
+import time as time_mod
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import Order
+from natural_power.routers import pagos as router_pagos
+from natural_power.servicios import pasarela as modulo_pasarela
+from natural_power.servicios.pasarela import ABIERTO, CERRADO, CircuitBreaker, pasarela
+
+httpx = pytest.importorskip("httpx")
+
+PREFERENCIA = {"items": [{"title": "Verde Detox", "product_id": 1, "quantity": 1, "unit_price": 3990}]}
+
+
+class MercadoPagoFalso(BaseHTTPRequestHandler):
+    """Responde según `modo`: lento (no responde a tiempo), caido (503) u ok."""
+
+    modo = "ok"
+    llamadas = 0
+
+    def do_POST(self) -> None:
+        MercadoPagoFalso.llamadas += 1
+        self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.modo == "lento":
+            time_mod.sleep(1.0)
+        codigo, cuerpo = (503, {"message": "caido"}) if self.modo == "caido" else (
+            201, {"id": "pref-1", "init_point": "https://mp.test/pagar/pref-1"})
+        datos = json.dumps(cuerpo).encode()
+        try:
+            self.send_response(codigo)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+        except OSError:
+            pass  # el cliente ya se fue por timeout
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def mercadopago(monkeypatch):
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), MercadoPagoFalso)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    MercadoPagoFalso.modo, MercadoPagoFalso.llamadas = "ok", 0
+    monkeypatch.setattr(router_pagos, "MP_ACCESS_TOKEN", "TEST-token")
+    monkeypatch.setattr(modulo_pasarela, "MP_ACCESS_TOKEN", "TEST-token")
+    monkeypatch.setattr(modulo_pasarela, "HTTPX_AVAILABLE", True)
+    monkeypatch.setattr(pasarela, "circuito", CircuitBreaker("MercadoPago", fallos_max=3, espera=0.3))
+    # Un cliente por llamada hacia el servidor falso, con timeouts cortos
+    monkeypatch.setattr(pasarela, "_cliente", lambda: httpx.AsyncClient(
+        base_url=f"http://127.0.0.1:{servidor.server_address[1]}",
+        timeout=httpx.Timeout(0.2, connect=0.2, pool=0.2),
+    ))
+    yield MercadoPagoFalso
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def _crear(client, token_para):
+    return client.post("/api/pagos/crear-preferencia", json=PREFERENCIA, headers=token_para("pagador@test.cl"))
+
+
+def _ultimo_pedido() -> Order:
+    with Session(engine) as session:
+        return session.exec(select(Order).order_by(Order.id.desc())).first()
+
+
+def test_timeout_responde_503_y_cancela_el_pedido(client, token_para, mercadopago):
+    mercadopago.modo = "lento"
+    t0 = time_mod.perf_counter()
+    r = _crear(client, token_para)
+    assert r.status_code == 503
+    # El timeout corta la espera: no se queda el segundo que tarda el servidor
+    assert time_mod.perf_counter() - t0 < 0.9
+    assert _ultimo_pedido().estado == "cancelado"
+    assert pasarela.circuito.fallos == 1
+
+
+def test_circuito_se_abre_tras_las_fallas_configuradas(client, token_para, mercadopago):
+    mercadopago.modo = "caido"
+    for _ in range(3):
+        assert _crear(client, token_para).status_code == 503
+    assert mercadopago.llamadas == 3
+    assert pasarela.circuito.estado == ABIERTO
+
+    # Abierto: falla al instante, sin llamar a MercadoPago ni crear otro pedido
+    pedido_antes = _ultimo_pedido().id
+    assert _crear(client, token_para).status_code == 503
+    assert mercadopago.llamadas == 3
+    assert _ultimo_pedido().id == pedido_antes
+
+    # Pasada la espera deja pasar una llamada de prueba; si responde, se cierra
+    time_mod.sleep(0.35)
+    mercadopago.modo = "ok"
+    r = _crear(client, token_para)
+    assert r.status_code == 200
+    assert r.json()["body"]["init_point"].endswith("pref-1")
+    assert pasarela.circuito.estado == CERRADO
+
+
+def test_rechazo_4xx_no_abre_el_circuito():
+    circuito = CircuitBreaker("prueba", fallos_max=1, espera=60)
+
+    async def rechazo():
+        raise modulo_pasarela.ErrorPasarela("400")
+
+    for _ in range(3):
+        with pytest.raises(modulo_pasarela.ErrorPasarela):
+            asyncio.run(circuito.llamar(rechazo))
+    assert circuito.estado == CERRADO
@@ -0,0 +1,92 @@
+# test_pedidos.py
+# Carrito y ciclo de vida del pedido: cantidades, stock exacto y transiciones de estado.
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import CartItem, Order, Product
+
+PRODUCTO = 2  # Naranja Boost
+
+
+def _fijar_stock(producto_id: int, stock: int) -> None:
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == producto_id).values(stock=stock))
+
+
+def _stock(producto_id: int) -> int:
+    with Session(engine) as session:
+        return session.get(Product, producto_id).stock
+
+
+def _pedidos_de(email: str) -> list:
+    with Session(engine) as session:
+        return session.exec(select(Order.id).where(Order.user_email == email)).all()
+
+
+def test_cantidad_menor_a_uno_responde_422(client, token_para):
+    h = token_para("cantidades@test.cl")
+    for cantidad in (0, -4):
+        assert client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": cantidad}).status_code == 422
+    item = client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": 1}).json()["body"]
+    assert client.put(f"/api/carrito/items/{item['id']}", headers=h, json={"cantidad": -4}).status_code == 422
+
+
+def test_checkout_rechaza_filas_con_cantidad_negativa(client, token_para):
+    email = "fila.negativa@test.cl"
+    _fijar_stock(PRODUCTO, 10)
+    with Session(engine) as session:
+        session.add(CartItem(user_email=email, product_id=PRODUCTO, name="Naranja Boost", price=3990, quantity=-4))
+        session.commit()
+
+    r = client.post("/api/pedidos", headers=token_para(email), json={}).json()
+    assert r["status"] == 400
+    assert _stock(PRODUCTO) == 10
+    assert _pedidos_de(email) == []
+
+
+def test_agregar_mas_que_el_stock_responde_400(client, token_para):
+    h = token_para("sin.stock@test.cl")
+    _fijar_stock(PRODUCTO, 3)
+    assert client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": 2}).json()["status"] == 201
+    # Lo que ya está en el carrito cuenta
+    assert client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": 2}).json()["status"] == 400
+
+
+def test_checkout_sin_stock_no_escribe_nada(client, token_para):
+    email = "checkout.sin.stock@test.cl"
+    h = token_para(email)
+    _fijar_stock(PRODUCTO, 5)
+    assert client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": 4}).json()["status"] == 201
+    _fijar_stock(PRODUCTO, 3)  # otro cliente compró entre medio
+
+    r = client.post("/api/pedidos", headers=h, json={}).json()
+    assert r["status"] == 409
+    assert _stock(PRODUCTO) == 3
+    assert _pedidos_de(email) == []
+    assert [it["quantity"] for it in client.get("/api/carrito", headers=h).json()["body"]] == [4]
+
+
+def test_ciclo_de_vida_con_historial(client, token_para, admin):
+    h = token_para("ciclo@test.cl")
+    _fijar_stock(PRODUCTO, 10)
+    client.post("/api/carrito/items", headers=h, json={"productoId": PRODUCTO, "cantidad": 3})
+    pedido_id = client.post("/api/pedidos", headers=h, json={}).json()["body"]["id"]
+    assert _stock(PRODUCTO) == 7
+
+    # Saltarse un estado es un conflicto; el camino completo queda en el historial
+    assert client.put(f"/api/admin/pedidos/{pedido_id}/estado", headers=admin, json={"estado": "enviado"}).json()["status"] == 409
+    for estado in ("pagado", "preparando"):
+        assert client.put(f"/api/admin/pedidos/{pedido_id}/estado", headers=admin, json={"estado": estado}).json()["status"] == 200
+    # Ya en preparación el cliente no puede cancelar; el admin sí, y el stock vuelve exacto
+    assert client.put(f"/api/pedidos/{pedido_id}/cancelar", headers=h, json={"motivo": "x"}).json()["status"] == 409
+    assert client.put(f"/api/pedidos/{pedido_id}/cancelar", headers=admin, json={"motivo": "sin fruta"}).json()["status"] == 200
+    assert _stock(PRODUCTO) == 10
+
+    seguimiento = client.get(f"/api/pedidos/{pedido_id}/seguimiento", headers=h).json()["body"]
+    assert [ev["estado"] for ev in seguimiento["historial"]] == ["pendiente", "pagado", "preparando", "cancelado"]
+    assert seguimiento["historial"][-1]["motivo"] == "sin fruta"
+    # Cancelar dos veces no devuelve stock dos veces
+    assert client.put(f"/api/pedidos/{pedido_id}/cancelar", headers=admin, json={"motivo": "otra vez"}).json()["status"] == 409
+    assert _stock(PRODUCTO) == 10
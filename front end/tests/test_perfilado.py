@@ -0,0 +1,64 @@
+# test_perfilado.py
+# Perfilado de peticiones lentas: tope de SQL por traza y sin trazas de respuestas en streaming.
+
+import asyncio
+
+import pytest
+from sqlalchemy import text
+
+from natural_power import perfilado
+from natural_power.db import engine
+from natural_power.metricas import ContextoPeticion, contexto_peticion
+
+
+async def _pedir(app, path: str = "/api/lenta") -> None:
+    """Una petición ASGI directa, dentro de un contexto de métricas como el de MetricsMiddleware."""
+    contexto_peticion.set(ContextoPeticion())
+    scope = {"type": "http", "method": "GET", "path": path, "headers": []}
+
+    async def recibir():
+        return {"type": "http.request", "body": b""}
+
+    async def enviar(message):
+        pass
+
+    await perfilado.ProfilingMiddleware(app)(scope, recibir, enviar)
+
+
+def _consultas(n: int) -> None:
+    with engine.connect() as conn:
+        for _ in range(n):
+            conn.execute(text("SELECT 1"))
+
+
+@pytest.fixture
+def trazas(monkeypatch):
+    monkeypatch.setattr(perfilado, "PROFILING_THRESHOLD_MS", 0)
+    monkeypatch.setattr(perfilado, "PROFILING_MAX_SENTENCIAS", 5)
+    perfilado._trazas_lentas.clear()
+    return perfilado._trazas_lentas
+
+
+def test_la_traza_guarda_hasta_el_tope_de_sentencias(trazas):
+    async def app(scope, receive, send):
+        _consultas(12)
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-length", b"2")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    asyncio.run(_pedir(app))
+    [traza] = trazas
+    assert traza["consultas"] == 12
+    assert len(traza["sentencias"]) == 5 and traza["sentencias_omitidas"] == 7
+
+
+@pytest.mark.parametrize("tipo", [b"text/event-stream", b"application/x-ndjson"])
+def test_respuestas_en_streaming_no_dejan_traza(trazas, tipo):
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", tipo)]})
+        for _ in range(3):
+            _consultas(4)
+            await send({"type": "http.response.body", "body": b"{}\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    asyncio.run(_pedir(app))
+    assert list(trazas) == []
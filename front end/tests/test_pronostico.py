@@ -0,0 +1,88 @@
+# test_pronostico.py
+# Pronóstico de demanda: días hasta el quiebre, reposición sugerida y agregación incremental de ventas.
+
+from datetime import datetime, time, timedelta, timezone
+
+import pytest
+from sqlmodel import Session, select
+
+from natural_power.db import engine
+from natural_power.modelos import Order, OrderItem, Product, ProductDailySales
+from natural_power.servicios import pronostico
+from natural_power.servicios.pedidos import cambiar_estado_pedido
+
+pytest.importorskip("numpy")
+
+HOY = datetime.now(timezone.utc).date()
+
+
+def _producto(nombre: str, stock: int) -> int:
+    with Session(engine) as session:
+        producto = Product(nombre=nombre, precio=1000, stock=stock)
+        session.add(producto)
+        session.commit()
+        return producto.id
+
+
+def _venta(dias_atras: int, unidades: dict) -> int:
+    """Pedido pagado a mediodía de hace `dias_atras` días."""
+    with Session(engine) as session:
+        order = Order(user_email="pronostico@test.cl", total=0, estado="pagado",
+                      created_at=datetime.combine(HOY - timedelta(days=dias_atras), time(12)))
+        session.add(order)
+        session.commit()
+        for producto_id, cantidad in unidades.items():
+            session.add(OrderItem(order_id=order.id, product_id=producto_id, name="x", price=1000, quantity=cantidad))
+        session.commit()
+        return order.id
+
+
+def _por_id(productos: list) -> dict:
+    return {p["id"]: p for p in productos}
+
+
+def test_dias_hasta_el_quiebre_y_reposicion(client, admin):
+    holgado, justo = _producto("Pronóstico Holgado", 50), _producto("Pronóstico Justo", 5)
+    for d in range(1, pronostico.PRONOSTICO_VENTANA_DIAS + 1):
+        _venta(d, {holgado: 2, justo: 2})
+    _venta(0, {holgado: 40})  # hoy no es un día completo: no cuenta
+
+    pronostico.pronostico.actualizar()
+    with Session(engine) as session:
+        todos = _por_id(pronostico.alertas_stock(session, "todos", 500)["productos"])
+
+    # Demanda constante de 2 por día: el suavizado da 2 y la desviación 0
+    lead, cobertura = pronostico.PRONOSTICO_LEAD_DIAS, pronostico.PRONOSTICO_COBERTURA_DIAS
+    assert {k: todos[holgado][k] for k in ("estado", "demanda_diaria", "promedio_7d", "dias_hasta_quiebre", "sugerido")} == \
+        {"estado": "ok", "demanda_diaria": 2.0, "promedio_7d": 2.0, "dias_hasta_quiebre": 25.0, "sugerido": 0}
+    assert todos[justo]["estado"] == "reponer"
+    assert todos[justo]["dias_hasta_quiebre"] == 2.5
+    assert todos[justo]["punto_reorden"] == 2 * lead
+    assert todos[justo]["sugerido"] == 2 * (lead + cobertura) - 5
+
+    r = client.get("/api/admin/inventario/pronostico?estado=reponer&limite=500", headers=admin).json()
+    assert r["status"] == 200
+    assert justo in _por_id(r["body"]["productos"]) and holgado not in _por_id(r["body"]["productos"])
+
+
+def _unidades(producto_id: int, dias_atras: int) -> int:
+    with Session(engine) as session:
+        fila = session.exec(select(ProductDailySales.unidades).where(
+            ProductDailySales.product_id == producto_id, ProductDailySales.dia == HOY - timedelta(days=dias_atras))).first()
+    return fila or 0
+
+
+def test_la_agregacion_solo_suma_lo_nuevo_y_resta_cancelaciones():
+    producto = _producto("Pronóstico Incremental", 100)
+    pedido = _venta(3, {producto: 4})
+    pronostico.agregar_ventas()
+    assert _unidades(producto, 3) == 4
+    assert pronostico.agregar_ventas() == {"pedidos": 0, "eventos": 0}
+    assert _unidades(producto, 3) == 4
+
+    _venta(3, {producto: 1})
+    with Session(engine) as session:
+        cambiar_estado_pedido(session, pedido, "cancelado")
+        session.commit()
+    pronostico.agregar_ventas()
+    assert _unidades(producto, 3) == 1
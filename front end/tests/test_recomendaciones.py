@@ -0,0 +1,88 @@
+# test_recomendaciones.py
+# "Comprados juntos": similitud coseno de co-ocurrencias, top-k, corrida incremental y endpoint.
+
+import pytest
+from sqlalchemy import update
+from sqlmodel import Session
+
+from natural_power.db import engine
+from natural_power.modelos import Order, OrderItem, Product
+from natural_power.servicios import recomendaciones
+from natural_power.servicios.recomendaciones import (IndiceRecomendaciones, cargar_indice, construir_indice,
+                                                     generar_recomendaciones)
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("scipy")
+
+# pedido -> productos; el producto 1 repetido en el pedido 1 cuenta una vez
+PEDIDOS = {1: [1, 1, 2], 2: [1, 2], 3: [1, 3], 4: [1, 3], 5: [2, 3], 6: [1, 2, 4]}
+
+
+def _pares(pedidos: dict):
+    pares = [(o, p) for o, productos in pedidos.items() for p in productos]
+    return np.array([o for o, _ in pares]), np.array([p for _, p in pares])
+
+
+def _indice(**kwargs) -> IndiceRecomendaciones:
+    a = construir_indice(*_pares(PEDIDOS), min_soporte=2, **kwargs)
+    return IndiceRecomendaciones(a["ids"], a["indptr"], a["vecinos"], a["puntajes"])
+
+
+def test_top_k_por_similitud_coseno():
+    indice = _indice()
+    # 1 y 2 juntos en 3 pedidos (1 está en 5, 2 en 4); 1 y 3 en 2 (3 está en 3); 2 y 3 solo en 1 (bajo el soporte)
+    assert [(v, round(s, 4)) for v, s in indice.recomendados(1, 10)] == [(2, round(3 / 20 ** 0.5, 4)), (3, round(2 / 15 ** 0.5, 4))]
+    assert [v for v, _ in indice.recomendados(2, 10)] == [1]
+    assert [v for v, _ in indice.recomendados(3, 10)] == [1]
+    assert indice.recomendados(4, 10) == [] and indice.recomendados(99, 10) == []
+    assert [v for v, _ in indice.recomendados(1, 1)] == [2]
+    assert [v for v, _ in _indice(k=1).recomendados(1, 10)] == [2]
+
+
+def test_la_corrida_incremental_equivale_a_la_completa():
+    completo = construir_indice(*_pares(PEDIDOS), min_soporte=2)
+    primera = construir_indice(*_pares({o: PEDIDOS[o] for o in (1, 2, 3)}), min_soporte=2)
+    incremental = construir_indice(*_pares({o: PEDIDOS[o] for o in (4, 5, 6)}), previo=primera, min_soporte=2)
+    for clave in ("ids", "indptr", "vecinos", "puntajes", "por_producto"):
+        np.testing.assert_array_equal(incremental[clave], completo[clave], err_msg=clave)
+    assert (incremental["c"] != completo["c"]).nnz == 0
+
+
+def _pedido(productos: list, estado: str = "pendiente") -> None:
+    with Session(engine) as session:
+        order = Order(user_email="recomendaciones@test.cl", total=0, estado=estado)
+        session.add(order)
+        session.commit()
+        for p in productos:
+            session.add(OrderItem(order_id=order.id, product_id=p, name="x", price=1, quantity=1))
+        session.commit()
+
+
+def test_el_archivo_incremental_sigue_a_la_base(tmp_path):
+    incremental, completo = str(tmp_path / "incremental.npz"), str(tmp_path / "completo.npz")
+    _pedido([1, 4])
+    generar_recomendaciones(completo=True, ruta=incremental)
+    _pedido([1, 4])
+    _pedido([1, 4], estado="cancelado")  # no cuenta
+    assert generar_recomendaciones(ruta=incremental)["pedidos_nuevos"] == 1
+    assert generar_recomendaciones(ruta=incremental)["pedidos_nuevos"] == 0
+    generar_recomendaciones(completo=True, ruta=completo)
+
+    a, b = cargar_indice(incremental), cargar_indice(completo)
+    assert a.pedidos == b.pedidos
+    assert a.recomendados(4, 10) == b.recomendados(4, 10) and a.recomendados(4, 10)[0][0] == 1
+
+
+def test_el_endpoint_omite_los_agotados(client, monkeypatch):
+    monkeypatch.setattr(recomendaciones, "_indice", _indice())
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 2).values(stock=5))
+        conn.execute(update(Product).where(Product.id == 3).values(stock=0))
+
+    r = client.get("/api/productos/1/recomendados?fields=id,nombre").json()
+    assert r["status"] == 200
+    assert r["body"] == [{"id": 2, "nombre": "Naranja Boost", "puntaje": round(3 / 20 ** 0.5, 4)}]
+    with engine.begin() as conn:
+        conn.execute(update(Product).where(Product.id == 3).values(stock=5))
+    assert [p["id"] for p in client.get("/api/productos/1/recomendados").json()["body"]] == [2, 3]
+    assert client.get("/api/productos/4/recomendados").json()["body"] == []